@@ -7,6 +7,9 @@ from flask_cors import CORS
 
 from config import get_database_pool, CORS_ORIGINS
 import api.extensions as ext
+from api.metrics import observe_pool_wait
+from api.replicas import create_replica_set
+from api.json_provider import OrjsonProvider, orjson
 from api.middleware import register_middleware
 from api.blueprints import all_blueprints
 
@@ -16,11 +19,23 @@ def create_app():
     app = Flask(__name__)
     app.secret_key = 'vnstock-analytics-secret-key-2024'
 
+    # Faster JSON encoding when orjson is installed
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+
     # Enable CORS
     CORS(app, resources={r"/*": {"origins": CORS_ORIGINS}}, supports_credentials=True)
 
     # Initialize database pool
     ext.db_pool = get_database_pool()
+    ext.db_pool.on_checkout = observe_pool_wait
+
+    # Read replicas for SELECTs, when configured
+    ext.replicas = create_replica_set()
+    if ext.replicas is not None:
+        for replica in ext.replicas.replicas:
+            replica.pool.on_checkout = observe_pool_wait
+        ext.replicas.start()
 
     # Register before/after request hooks
     register_middleware(app)
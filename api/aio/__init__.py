@@ -0,0 +1,120 @@
+"""
+Async (ASGI) serving mode for the read-only API.
+The stocks, market, news and system read routes run on Quart with an
+asyncpg pool, so a worker holds thousands of waiting requests on one event
+loop instead of one thread each. Every other route and method (pages,
+writes, sessions, investment, screener, CORS preflights) is passed to the
+Flask app, which runs on a thread pool inside the same server.
+
+Serve with: python asgi.py (Hypercorn; see config.ASYNC_SERVER)
+"""
+
+import logging
+
+from quart import Quart
+from werkzeug.exceptions import HTTPException
+
+import api.extensions as ext
+from api.aio.blueprints import all_blueprints
+from api.aio.db import create_pool
+from api.aio.middleware import register_middleware
+from api.json_provider import OrjsonProvider, orjson
+from config import DATABASE_REPLICAS
+
+logger = logging.getLogger(__name__)
+
+
+def create_async_app():
+    """Create and configure the Quart application (read-only routes only)."""
+    app = Quart(__name__)
+    app.secret_key = 'vnstock-analytics-secret-key-2024'
+
+    # Same JSON encoding as the Flask app
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+
+    register_middleware(app)
+
+    for bp in all_blueprints:
+        app.register_blueprint(bp)
+
+    # The asyncpg pool belongs to the serving event loop
+    @app.before_serving
+    async def open_pool():
+        ext.async_db_pool = await create_pool().open()
+        if DATABASE_REPLICAS['hosts']:
+            logger.warning("DB_REPLICA_HOSTS has no effect on the async routes: they read from the "
+                           "primary (routes served by the Flask app still use the replicas)")
+
+    @app.after_serving
+    async def close_pool():
+        if ext.async_db_pool is not None:
+            await ext.async_db_pool.close()
+            ext.async_db_pool = None
+
+    return app
+
+
+class AppDispatcher:
+    """ASGI app sending each request to the async app when it has the route, else to Flask"""
+
+    def __init__(self, async_app, wsgi_app):
+        """
+        Args:
+            async_app: Quart app (also receives lifespan events)
+            wsgi_app: ASGI app serving everything else (the wrapped Flask app)
+        """
+        self.async_app = async_app
+        self.wsgi_app = wsgi_app
+        self._urls = async_app.url_map.bind('localhost')
+
+    def handles(self, path, method):
+        """Whether the async app has a route for this path and method"""
+        if method == 'OPTIONS':
+            # Preflights get flask-cors' answer, which knows every route's methods
+            return False
+        try:
+            self._urls.match(path, method=method)
+        except HTTPException:
+            # NotFound, MethodNotAllowed, or a redirect the Flask app issues too
+            return False
+        return True
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan' or (
+                scope['type'] == 'http' and self.handles(scope['path'], scope['method'])):
+            await self.async_app(scope, receive, send)
+        else:
+            await self.wsgi_app(scope, receive, send)
+
+
+def _with_first_chunk(wsgi_app):
+    """
+    WSGI app whose responses always have at least one body chunk
+
+    Hypercorn's WSGI bridge sends the status line with the first chunk, so
+    an empty body (preflight, 304, HEAD) would otherwise never start the
+    response.
+    """
+    def app(environ, start_response):
+        body = wsgi_app(environ, start_response)
+        try:
+            empty = True
+            for chunk in body:
+                empty = False
+                yield chunk
+            if empty:
+                yield b''
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+    return app
+
+
+def create_asgi_app():
+    """Async app in front of the Flask app, as one ASGI application"""
+    from hypercorn.middleware import AsyncioWSGIMiddleware
+    from api import create_app
+
+    # Flask bodies (e.g. watchlist/plan POSTs) up to 1 MB
+    return AppDispatcher(create_async_app(), AsyncioWSGIMiddleware(_with_first_chunk(create_app()), max_body_size=2 ** 20))
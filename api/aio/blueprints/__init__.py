@@ -0,0 +1,16 @@
+"""
+Blueprint registry of the async app (read-only routes; everything else is
+served by the Flask app, see api/aio/__init__.py).
+"""
+
+from api.aio.blueprints.stocks import stocks_bp
+from api.aio.blueprints.market import market_bp
+from api.aio.blueprints.news import news_bp
+from api.aio.blueprints.system import system_bp
+
+all_blueprints = [
+    stocks_bp,
+    market_bp,
+    news_bp,
+    system_bp,
+]
@@ -0,0 +1,52 @@
+"""
+Market indices and watchlist endpoints for the async app.
+GET routes of api/blueprints/market.py; watchlist updates (POST) are
+served by the Flask app.
+"""
+
+import logging
+from quart import Blueprint, jsonify
+
+from api.aio.db import query_db
+from api.blueprints.market import INDICES_QUERY, MACRO_QUERY, _latest_by_type, _watchlist_payload
+
+logger = logging.getLogger(__name__)
+
+market_bp = Blueprint('market', __name__)
+
+
+@market_bp.route('/api/indices', methods=['GET'])
+async def get_indices():
+    """Get latest market indices"""
+    indices = await query_db(INDICES_QUERY)
+
+    return jsonify({
+        "success": True,
+        "indices": indices
+    })
+
+
+@market_bp.route('/api/watchlist', methods=['GET'])
+async def get_watchlist():
+    """Get user watchlist"""
+    return jsonify(_watchlist_payload())
+
+
+@market_bp.route('/api/macro-indicators', methods=['GET'])
+async def get_macro_indicators():
+    """Get latest macro economic indicators"""
+    try:
+        # Group by indicator type and get latest
+        latest_indicators = _latest_by_type(await query_db(MACRO_QUERY))
+
+        return jsonify({
+            "success": True,
+            "indicators": latest_indicators,
+            "count": len(latest_indicators)
+        })
+    except Exception as e:
+        logger.error(f"Error retrieving macro indicators: {e}", exc_info=True)
+        return jsonify({
+            "success": False,
+            "error": f"Failed to retrieve macro indicators: {str(e)}"
+        }), 500
@@ -0,0 +1,55 @@
+"""
+News endpoint for the async app.
+1 route: /api/news (the scrape runs on a worker thread, once for every
+waiting request)
+"""
+
+import asyncio
+from quart import Blueprint, jsonify, request
+from datetime import datetime
+
+from api.aio.cache import get_or_compute, invalidate
+from api.blueprints.news import NEWS_FETCH_LIMIT, _NoArticles, _fetch_news, _news_limit
+
+news_bp = Blueprint('news', __name__)
+
+
+async def _fetch_news_async():
+    # The fetcher does blocking HTTP; keep it off the event loop
+    return await asyncio.to_thread(_fetch_news)
+
+
+@news_bp.route('/api/news', methods=['GET'])
+async def get_news():
+    """Get latest financial news from Vietnamese sources"""
+    try:
+        limit = _news_limit(request.args)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    try:
+        force_refresh = request.args.get('refresh', default='false', type=str).lower() == 'true'
+
+        if force_refresh:
+            invalidate('news')
+
+        # One scrape per cache period, shared by concurrent requests
+        try:
+            articles = (await get_or_compute('news', NEWS_FETCH_LIMIT, _fetch_news_async))[:limit]
+        except _NoArticles:
+            articles = []
+
+        return jsonify({
+            "success": True,
+            "news": articles,
+            "total": len(articles),
+            "timestamp": datetime.now().isoformat(),
+            "cache_info": "News cached for 15 minutes"
+        })
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e),
+            "fallback": []
+        }), 500
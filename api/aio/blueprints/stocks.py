@@ -0,0 +1,462 @@
+"""
+Stock-related API endpoints for the async app.
+The read routes of api/blueprints/stocks.py with the same paths, queries
+and response bodies, awaiting the asyncpg pool instead of holding a
+thread per request.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+from quart import Blueprint, Response, current_app, jsonify, request
+
+from api.aio.cache import cached, cached_query
+from api.aio.conditional import conditional_get
+from api.aio.data_version import get_indicator_version, get_price_version, get_stocks_version
+from api.aio.db import query_db, stream_query
+from api.blueprints.stocks import (
+    ANALYSIS_HISTORY, BATCH_BARS, CATEGORY_ROWS, FULL_HISTORY, HISTORY_COLUMNS,
+    HISTORY_STREAM_CHUNK_ROWS, HISTORY_WINDOW, INDICATOR_HISTORY, LATEST_ANALYSIS,
+    LATEST_INDICATORS, LATEST_PRICE_FIELDS, LATEST_QUOTE, LEVEL_BARS, MOST_ACTIVE_FIELDS,
+    MOVER_FIELDS, SEARCH_ROWS, SNAPSHOT_QUERY, STOCK_BY_SYMBOL, STOCK_CURRENT,
+    STOCK_CURRENT_JSON, STOCK_LIST, STOCK_NAMES,
+    _add_levels, _batch_payload, _batch_request, _categorize, _columnar_payload,
+    _compute_technical_analysis, _current_json, _group_batch, _history_bars, _history_json_row,
+    _history_range, _latest_columns, _latest_results, _live_indicators,
+    _precomputed_indicators, _range_closed, _response_format, level_cache,
+)
+from src import indicators, wire_format
+from src.levels import detect_levels, LEVEL_LOOKBACK_BARS
+from src.market_snapshot import LatestPriceSnapshot
+from src.search_index import StockSearchIndex
+
+logger = logging.getLogger(__name__)
+
+stocks_bp = Blueprint('stocks', __name__)
+
+# Latest-price snapshot and search index of this worker, rebuilt when
+# their data version changes (one rebuild at a time)
+_snapshot = None
+_search_index = None
+_rebuild_lock = asyncio.Lock()
+
+
+def _columnar_response(response_format, columns, **meta):
+    """Serialize parallel columns as columnar JSON or the binary wire format"""
+    if response_format == 'binary':
+        return Response(wire_format.encode_binary(columns, meta), mimetype='application/octet-stream')
+    return jsonify(_columnar_payload(columns, **meta))
+
+
+def _history_range_closed(validators, **view_args):
+    """A range ending before the latest price date can no longer change"""
+    try:
+        _, date_to = _history_range(request.args)
+    except ValueError:
+        return False
+    return _range_closed(validators, date_to)
+
+
+async def get_latest_snapshot():
+    """Current latest-price snapshot, rebuilt lazily after new prices are collected"""
+    global _snapshot
+    version = await get_price_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    async with _rebuild_lock:
+        # Another request may have rebuilt it while we waited
+        if _snapshot is None or _snapshot.version != version:
+            started = time.perf_counter()
+            _snapshot = LatestPriceSnapshot(await query_db(SNAPSHOT_QUERY), version=version)
+            logger.info(f"Latest-price snapshot built: {len(_snapshot)} stocks in "
+                        f"{(time.perf_counter() - started) * 1000:.0f}ms (version {version})")
+        return _snapshot
+
+
+async def get_search_index():
+    """Current stock search index, rebuilt lazily when the stocks table changes"""
+    global _search_index
+    version = await get_stocks_version()
+    index = _search_index
+    if index is not None and index.version == version:
+        return index
+
+    async with _rebuild_lock:
+        if _search_index is None or _search_index.version != version:
+            started = time.perf_counter()
+            rows = await query_db(SEARCH_ROWS)
+            _search_index = StockSearchIndex(rows, version=version)
+            logger.info(f"Built search index: {len(rows)} stocks in {(time.perf_counter() - started) * 1000:.1f}ms")
+        return _search_index
+
+
+@stocks_bp.route('/api/stocks', methods=['GET'])
+async def get_stocks():
+    """Get all stocks"""
+    stocks = await cached_query('stock_list', STOCK_LIST)
+
+    return jsonify({
+        "success": True,
+        "stocks": stocks,
+        "total": len(stocks)
+    })
+
+
+@stocks_bp.route('/api/stock/<symbol>', methods=['GET'])
+async def get_stock(symbol):
+    """Get single stock by symbol"""
+    stock = await query_db(STOCK_BY_SYMBOL, (symbol,), one=True)
+
+    if stock:
+        return jsonify({"success": True, **stock})
+    else:
+        return jsonify({"success": False, "error": "Stock not found"}), 404
+
+
+@stocks_bp.route('/api/stock/<symbol>/current', methods=['GET'])
+@cached('stock_prices')
+async def get_stock_current_price(symbol):
+    """Get current price for a stock"""
+    data = await query_db(STOCK_CURRENT, (symbol,), one=True)
+
+    if data:
+        return jsonify({"success": True, **data})
+    else:
+        return jsonify({"success": False, "error": "No price data found"}), 404
+
+
+@stocks_bp.route('/api/stock/<symbol>/history', methods=['GET'])
+@conditional_get(closed=_history_range_closed)
+@cached('stock_prices')
+async def get_stock_history(symbol):
+    """Get historical prices for a stock (see api.blueprints.stocks.get_stock_history)"""
+    try:
+        date_from, date_to = _history_range(request.args)
+        response_format = _response_format(request.args)
+    except ValueError as e:
+        logger.warning(f"Invalid history request for {symbol}: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    try:
+        history = await query_db(HISTORY_WINDOW, (symbol, date_from, date_to, date_to))
+
+        logger.debug(f"Retrieved {len(history)} days of history for {symbol}")
+        if response_format != 'json':
+            columns = wire_format.columns_from_rows(history, HISTORY_COLUMNS)
+            return _columnar_response(response_format, columns, symbol=symbol)
+        return jsonify({
+            "success": True,
+            "symbol": symbol,
+            "data": history,
+            "count": len(history)
+        })
+    except Exception as e:
+        logger.error(f"Error fetching history for {symbol}: {e}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': f'Failed to fetch historical data for {symbol}'
+        }), 500
+
+
+@stocks_bp.route('/api/history/batch', methods=['GET'])
+@conditional_get(closed=_history_range_closed)
+@cached('stock_prices')
+async def get_history_batch():
+    """Get historical prices for many stocks in one request and one query"""
+    try:
+        symbols, query, args, response_format = _batch_request(request.args)
+    except ValueError as e:
+        logger.warning(f"Invalid batch history request: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    try:
+        rows = await query_db(query, args)
+    except Exception as e:
+        logger.error(f"Error fetching batch history for {len(symbols)} symbols: {e}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': 'Failed to fetch historical data'
+        }), 500
+
+    grouped, row_symbols, missing = _group_batch(rows, symbols)
+    if response_format == 'binary':
+        columns = wire_format.columns_from_rows(rows, HISTORY_COLUMNS)
+        columns['symbol'] = row_symbols
+        return _columnar_response(response_format, columns, missing=missing)
+    return jsonify(_batch_payload(grouped, missing, response_format))
+
+
+@stocks_bp.route('/api/stock/<symbol>/indicators', methods=['GET'])
+@cached('indicators')
+async def get_stock_indicators(symbol):
+    """Get the latest technical indicators for a stock"""
+    symbol = symbol.upper()
+    row = await query_db(LATEST_INDICATORS, (symbol,), one=True)
+    if row:
+        return jsonify(_precomputed_indicators(symbol, row))
+
+    history = await query_db(INDICATOR_HISTORY, (symbol, indicators.LOOKBACK_BARS))
+    if not history:
+        return jsonify({"success": False, "error": f"No data found for {symbol}"}), 404
+    return jsonify(_live_indicators(symbol, history))
+
+
+@stocks_bp.route('/api/latest-prices', methods=['GET'])
+async def get_latest_prices():
+    """Get latest prices for all stocks"""
+    limit = request.args.get('limit', default=100, type=int)
+
+    snapshot = await get_latest_snapshot()
+    prices = [
+        snapshot.row(i, LATEST_PRICE_FIELDS)
+        for i in range(min(max(limit, 0), len(snapshot)))
+    ]
+
+    return jsonify({
+        "success": True,
+        "prices": prices,
+        "total": len(prices),
+        "timestamp": datetime.now().isoformat()
+    })
+
+
+async def _get_levels(symbol):
+    """Support/resistance zones for the stock's latest bar, detected once per bar"""
+    latest = await query_db(LATEST_QUOTE, (symbol,), one=True)
+    if not latest:
+        return None
+
+    last_close = float(latest['close'])
+    levels = level_cache.get(symbol, latest['date'], last_close)
+    if levels is None:
+        bars = await query_db(LEVEL_BARS, (symbol, LEVEL_LOOKBACK_BARS))
+        levels = detect_levels(list(reversed(bars)))
+        level_cache.put(symbol, latest['date'], last_close, levels)
+    return levels
+
+
+@stocks_bp.route('/api/stock/<symbol>/levels', methods=['GET'])
+async def get_stock_levels(symbol):
+    """Get ranked support/resistance zones from multi-window swing pivots"""
+    try:
+        levels = await _get_levels(symbol.upper())
+        if levels is None:
+            return jsonify({
+                'success': False,
+                'error': f'No data found for {symbol}'
+            }), 404
+        return jsonify({
+            'success': True,
+            'symbol': symbol.upper(),
+            'levels': levels
+        })
+    except Exception as e:
+        logger.error(f"Error detecting levels for {symbol}: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@stocks_bp.route('/api/latest', methods=['GET'])
+@conditional_get()
+async def get_latest():
+    """Get latest data for all stocks (compatibility endpoint for dashboard_history.html)"""
+    try:
+        response_format = _response_format(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    snapshot = await get_latest_snapshot()
+    if response_format != 'json':
+        return _columnar_response(response_format, _latest_columns(snapshot))
+
+    all_results = _latest_results(snapshot)
+    return jsonify({
+        'success': True,
+        'all_results': all_results,
+        'total': len(all_results),
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+@stocks_bp.route('/api/stock-analysis/<symbol>', methods=['GET'])
+@conditional_get(versions=(get_indicator_version,))
+@cached('indicators')
+async def get_stock_analysis(symbol):
+    """Get technical analysis for a specific stock"""
+    try:
+        # Serve the row written by the indicator batch job when it covers the latest bar
+        row = await query_db(LATEST_ANALYSIS, (symbol.upper(),), one=True)
+        analysis = row['analysis'] if row and row['analysis'] else None
+
+        if analysis is None:
+            # Fall back to live computation on the last 60 days
+            historical = await query_db(ANALYSIS_HISTORY, (symbol.upper(),))
+
+            if not historical:
+                return jsonify({
+                    'success': False,
+                    'error': f'No data found for {symbol}'
+                }), 404
+
+            analysis = _compute_technical_analysis(symbol, list(reversed(historical)))
+
+        _add_levels(analysis, await _get_levels(symbol.upper()))
+        return jsonify({
+            'success': True,
+            'symbol': symbol,
+            'analysis': analysis
+        })
+    except Exception as e:
+        logger.error(f"Error computing analysis for {symbol}: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@stocks_bp.route('/api/top-gainers', methods=['GET'])
+async def get_top_gainers():
+    """Get top gaining stocks"""
+    limit = request.args.get('limit', default=10, type=int)
+
+    snapshot = await get_latest_snapshot()
+    gainers = [snapshot.row(i, MOVER_FIELDS) for i in snapshot.top('gainers', limit)]
+
+    return jsonify({
+        "success": True,
+        "gainers": gainers
+    })
+
+
+@stocks_bp.route('/api/top-losers', methods=['GET'])
+async def get_top_losers():
+    """Get top losing stocks"""
+    limit = request.args.get('limit', default=10, type=int)
+
+    snapshot = await get_latest_snapshot()
+    losers = [snapshot.row(i, MOVER_FIELDS) for i in snapshot.top('losers', limit)]
+
+    return jsonify({
+        "success": True,
+        "losers": losers
+    })
+
+
+@stocks_bp.route('/api/most-active', methods=['GET'])
+async def get_most_active():
+    """Get most active stocks by volume"""
+    limit = request.args.get('limit', default=10, type=int)
+
+    snapshot = await get_latest_snapshot()
+    most_active = [snapshot.row(i, MOST_ACTIVE_FIELDS) for i in snapshot.top('most_active', limit)]
+
+    return jsonify({
+        "success": True,
+        "most_active": most_active
+    })
+
+
+@stocks_bp.route('/api/search', methods=['GET'])
+async def search_stocks():
+    """Search stocks by symbol or name (diacritics optional: "sua" finds "Sữa")"""
+    query = request.args.get('q', '').strip()
+
+    if not query:
+        return jsonify({"success": False, "error": "Query parameter 'q' is required"}), 400
+
+    stocks = (await get_search_index()).search(query, limit=20)
+
+    return jsonify({
+        "success": True,
+        "query": query,
+        "results": stocks,
+        "total": len(stocks)
+    })
+
+
+# ============================================================
+# COMPATIBILITY ENDPOINTS (for frontend expecting JSON files)
+# ============================================================
+
+@stocks_bp.route('/data/<symbol>_current.json', methods=['GET'])
+async def get_current_json(symbol):
+    """Get current price in JSON file format (compatibility endpoint)"""
+    data = await query_db(STOCK_CURRENT_JSON, (symbol.upper(),), one=True, typed=True)
+
+    if data:
+        return jsonify(_current_json(data))
+    else:
+        return jsonify({"error": f"No data for {symbol}"}), 404
+
+
+@stocks_bp.route('/data/<symbol>_history.json', methods=['GET'])
+@conditional_get()
+async def get_history_json(symbol):
+    """
+    Get historical prices in JSON file format (compatibility endpoint)
+
+    Streamed from a server-side cursor as in api.blueprints.stocks.get_history_json;
+    the compact formats send the most recent ?bars= bars.
+    """
+    try:
+        response_format = _response_format(request.args)
+        bars = _history_bars(request.args) if response_format != 'json' else None
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    if response_format != 'json':
+        rows = await query_db(BATCH_BARS, (None, None, bars, [symbol.upper()]))
+        columns = wire_format.columns_from_rows(rows, HISTORY_COLUMNS)
+        return _columnar_response(response_format, columns, symbol=symbol.upper())
+
+    dumps = current_app.json.dumps
+    chunks = stream_query(FULL_HISTORY, (symbol.upper(),), chunk_size=HISTORY_STREAM_CHUNK_ROWS, typed=True)
+
+    async def generate():
+        # Format to match old JSON structure (typed rows: floats and ISO dates)
+        yield '['
+        separator = ''
+        try:
+            async for rows in chunks:
+                body = dumps([_history_json_row(row) for row in rows])
+                yield separator + body[1:-1]
+                separator = ','
+        except Exception as e:
+            # Headers are already sent; a truncated array tells the client it failed
+            logger.error(f"Error streaming history for {symbol}: {e}", exc_info=True)
+            return
+        finally:
+            await chunks.aclose()
+        yield ']'
+
+    return Response(generate(), mimetype='application/json')
+
+
+@stocks_bp.route('/api/stock-names', methods=['GET'])
+@stocks_bp.route('/stock_names.json', methods=['GET'])
+async def get_stock_names():
+    """Get stock symbol to name mappings"""
+    stocks = await cached_query('stock_list', STOCK_NAMES)
+
+    # Convert to {symbol: name} dict
+    result = {stock['symbol']: stock['name'] for stock in stocks}
+    return jsonify(result)
+
+
+@stocks_bp.route('/api/stock-categories', methods=['GET'])
+@cached('stock_list')
+async def get_stock_categories():
+    """Get stock categories organized by sector"""
+    return jsonify(_categorize(await query_db(CATEGORY_ROWS)))
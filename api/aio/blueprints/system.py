@@ -0,0 +1,164 @@
+"""
+System and utility endpoints for the async app.
+The GET routes of api/blueprints/system.py plus cache invalidation;
+control updates and job triggers are served by the Flask app.
+"""
+
+from quart import Blueprint, Response, jsonify, request
+from datetime import datetime
+
+from api import metrics
+from api import cache as sync_cache
+from api.aio.cache import cache
+from api.aio.db import query_db
+from api.blueprints.system import (
+    ACTIVE_STOCK_COUNT, ACTIVITY, ACTIVITY_BY_TYPE, CONTROL_BY_KEY, CONTROLS, LATEST_UPDATES,
+    SCHEDULER_ACTIVITY, STOCK_COUNT,
+    _cache_admin_allowed, _controls_payload, _new_status, _set_latest_update, _set_overall,
+    _set_scheduler_activity, _set_scheduler_idle, _set_stock_count,
+)
+import api.extensions as ext
+
+system_bp = Blueprint('system', __name__)
+
+
+@system_bp.route('/health', methods=['GET'])
+async def health_check():
+    """Health check endpoint"""
+    try:
+        # Test database connection
+        result = await query_db(STOCK_COUNT, one=True)
+        stock_count = result['count'] if result else 0
+
+        return jsonify({
+            "status": "healthy",
+            "database": "connected",
+            "stocks": stock_count,
+            "timestamp": datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({
+            "status": "unhealthy",
+            "error": str(e),
+            "timestamp": datetime.now().isoformat()
+        }), 500
+
+
+@system_bp.route('/metrics', methods=['GET'])
+async def get_metrics():
+    """Request, query and connection pool metrics (pool gauges: the asyncpg pool)"""
+    return Response(metrics.render(ext.async_db_pool.stats()), mimetype='text/plain; version=0.0.4')
+
+
+@system_bp.route('/api/system-status', methods=['GET'])
+async def system_status():
+    """Comprehensive system status check"""
+    status = _new_status()
+
+    # Check database
+    try:
+        _set_stock_count(status, await query_db(ACTIVE_STOCK_COUNT, one=True))
+        for kind, query in LATEST_UPDATES:
+            _set_latest_update(status, kind, await query_db(query, one=True))
+    except Exception as e:
+        status["database"]["status"] = "error"
+        status["database"]["message"] = str(e)
+
+    # Check scheduler activity in logs as a heartbeat
+    try:
+        if not _set_scheduler_activity(status, await query_db(SCHEDULER_ACTIVITY, one=True)):
+            try:
+                _set_scheduler_idle(status, await query_db("SELECT 1 as test", one=True))
+            except Exception:
+                status["scheduler"]["status"] = "unknown"
+                status["scheduler"]["message"] = "Unable to check scheduler status (database error)"
+    except Exception as e:
+        status["scheduler"]["status"] = "unknown"
+        status["scheduler"]["message"] = f"Cannot check scheduler status: {str(e)}"
+
+    return jsonify(_set_overall(status))
+
+
+@system_bp.route('/api/controls', methods=['GET'])
+async def get_controls():
+    """Get all system controls and settings"""
+    try:
+        return jsonify(_controls_payload(await query_db(CONTROLS)))
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@system_bp.route('/api/controls/<key>', methods=['GET'])
+async def get_control(key):
+    """Get a specific control"""
+    try:
+        control = await query_db(CONTROL_BY_KEY, (key,), one=True)
+
+        if control:
+            return jsonify({"success": True, **control})
+        else:
+            return jsonify({"success": False, "error": "Control not found"}), 404
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@system_bp.route('/api/activity-log', methods=['GET'])
+async def get_activity_log():
+    """Get recent activity log entries"""
+    try:
+        limit = request.args.get('limit', default=50, type=int)
+        activity_type = request.args.get('type', default=None, type=str)
+
+        if activity_type:
+            logs = await query_db(ACTIVITY_BY_TYPE, (activity_type, limit))
+        else:
+            logs = await query_db(ACTIVITY, (limit,))
+
+        return jsonify({
+            "success": True,
+            "logs": logs,
+            "total": len(logs)
+        })
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@system_bp.route('/api/cache/stats', methods=['GET'])
+async def get_cache_stats():
+    """Get response/query cache statistics for this worker's async app"""
+    return jsonify({
+        "success": True,
+        **cache.stats(),
+        "timestamp": datetime.now().isoformat()
+    })
+
+
+@system_bp.route('/api/cache/invalidate', methods=['POST'])
+async def invalidate_cache():
+    """Drop cached entries of both apps in this worker (one category, or everything)"""
+    if not _cache_admin_allowed(request):
+        return jsonify({"success": False, "error": "Forbidden"}), 403
+
+    data = await request.get_json(silent=True) or {}
+    category = data.get('category')
+
+    if category is not None and category not in cache.ttls:
+        return jsonify({"success": False, "error": f"Unknown cache category: {category}"}), 400
+
+    removed = cache.invalidate(category) + sync_cache.invalidate(category)
+    return jsonify({
+        "success": True,
+        "category": category,
+        "removed": removed
+    })
+
+
+@system_bp.route('/api/db-pool/stats', methods=['GET'])
+async def get_db_pool_stats():
+    """Get asyncpg pool gauges and checkout wait times for this worker"""
+    return jsonify({
+        "success": True,
+        **ext.async_db_pool.stats(),
+        "replicas": None,
+        "timestamp": datetime.now().isoformat()
+    })
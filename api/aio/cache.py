@@ -0,0 +1,158 @@
+"""
+Response and query cache for the async app.
+An api.cache.ResponseCache checked against the async app's data versions
+(api/aio/data_version.py). Misses are single-flight across the worker's
+requests like the Flask app's, but identical misses await a future
+instead of parking a thread on an event.
+"""
+
+import asyncio
+from functools import wraps
+
+from quart import current_app, make_response, request
+
+from api.aio.data_version import (
+    get_price_version, get_stocks_version,
+    last_indicator_version, last_price_version, last_stocks_version,
+)
+from api.aio.db import query_db
+from api.cache import _MISSING, FLIGHT_TIMEOUT, ResponseCache, _request_key
+from api.statements import sql_text
+from config import CACHE_ENABLED, CACHE_TTL
+
+# Data versions each category's entries were built from, as last read
+CATEGORY_SOURCES = {
+    'stock_list': (last_stocks_version,),
+    'stock_prices': (last_price_version,),
+    'indicators': (last_price_version, last_indicator_version),
+}
+
+# Throttled reads bringing those versions up to date before a lookup
+# (the price read also refreshes the indicator version)
+CATEGORY_REFRESH = {
+    'stock_list': (get_stocks_version,),
+    'stock_prices': (get_price_version,),
+    'indicators': (get_price_version,),
+}
+
+
+class AsyncResponseCache(ResponseCache):
+    """ResponseCache with a coroutine get_or_compute for the event loop"""
+
+    async def get_or_compute(self, category, key, compute, cacheable=None):
+        """
+        Cached value, computing it at most once across concurrent misses
+
+        As ResponseCache.get_or_compute, with compute a coroutine function.
+        """
+        for refresh in CATEGORY_REFRESH.get(category, ()):
+            await refresh()
+        version = self._version(category)
+
+        with self._lock:
+            value, stale = self._lookup(category, key, version)
+            if value is not _MISSING:
+                self._count(category, 'hits')
+                return value
+
+            flight = self._flights.get((category, key))
+            if flight is not None and stale is not _MISSING:
+                self._count(category, 'stale_served')
+                return stale
+            leader = flight is None
+            if leader:
+                flight = self._flights[(category, key)] = asyncio.get_running_loop().create_future()
+                self._count(category, 'misses')
+            else:
+                self._count(category, 'coalesced')
+
+        if not leader:
+            try:
+                return await asyncio.wait_for(asyncio.shield(flight), FLIGHT_TIMEOUT)
+            except asyncio.TimeoutError:
+                # The computation is taking too long: run our own
+                return await compute()
+            except asyncio.CancelledError:
+                # The computing request went away, not this one
+                if not flight.cancelled():
+                    raise
+                return await compute()
+
+        try:
+            value = await compute()
+        except Exception as e:
+            with self._lock:
+                self._count(category, 'errors')
+            if stale is not _MISSING:
+                # Keep serving the last good value while the source is failing
+                flight.set_result(stale)
+                return stale
+            flight.set_exception(e)
+            flight.exception()  # Waiters re-raise it; nobody else needs to
+            raise
+        else:
+            flight.set_result(value)
+            if cacheable is None or cacheable(value):
+                self.set(category, key, value, version)
+            return value
+        finally:
+            with self._lock:
+                self._flights.pop((category, key), None)
+            if not flight.done():
+                flight.cancel()
+
+
+# Shared by the async app's blueprints in this worker
+cache = AsyncResponseCache(sources=CATEGORY_SOURCES)
+
+
+def invalidate(category=None):
+    """Invalidation hook: drop one category (or everything) from this worker's async cache"""
+    return cache.invalidate(category)
+
+
+async def get_or_compute(category, key, compute, cacheable=None):
+    """Single-flight cached value (compute is a coroutine function)"""
+    if not CACHE_ENABLED:
+        return await compute()
+    return await cache.get_or_compute(category, key, compute, cacheable)
+
+
+def cached(category):
+    """
+    Cache an async route's successful responses (see api.cache.cached)
+
+    Args:
+        category: CACHE_TTL category of the data the route serves
+    """
+    if category not in CACHE_TTL:
+        raise ValueError(f"Unknown cache category: {category}")
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            if not CACHE_ENABLED:
+                return await view(*args, **kwargs)
+
+            async def render():
+                response = await make_response(await view(*args, **kwargs))
+                return await response.get_data(), response.status_code, response.content_type
+
+            body, status, content_type = await cache.get_or_compute(
+                category, _request_key(request), render, cacheable=lambda result: result[1] == 200)
+            return current_app.response_class(body, status=status, content_type=content_type)
+        return wrapper
+    return decorator
+
+
+async def cached_query(category, query, args=(), one=False, typed=False):
+    """
+    api.aio.db.query_db through the cache (see api.cache.cached_query)
+
+    Results are shared between requests and must not be modified.
+    """
+    if not CACHE_ENABLED:
+        return await query_db(query, args, one=one, typed=typed)
+
+    key = (' '.join(sql_text(query).split()), repr(args), one, typed)
+    return await cache.get_or_compute(category, key, lambda: query_db(query, args, one=one, typed=typed))
@@ -0,0 +1,43 @@
+"""
+Conditional GET support for the async app's price-derived endpoints.
+Same validators and headers as api/conditional.py, from the async price
+data version.
+"""
+
+from functools import wraps
+
+from quart import make_response, request
+
+from api.aio.data_version import get_price_validators
+from api.conditional import _etag, _not_modified, _set_validators
+
+
+def conditional_get(closed=None, versions=()):
+    """
+    Decorate an async view with ETag/Last-Modified validators
+
+    Args:
+        closed: Optional callable(validators, **view_kwargs) -> bool (see
+                api.conditional.conditional_get)
+        versions: Extra async version getters hashed into the ETag (see
+                  api.conditional.conditional_get)
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            validators = await get_price_validators()
+            version = '|'.join([validators['version'], *[await get() for get in versions]])
+            etag = _etag(version, request)
+            modified = None if versions else validators['modified']
+            is_closed = bool(closed and closed(validators, **kwargs))
+
+            if _not_modified(request, etag, modified):
+                response = await make_response('', 304)
+            else:
+                response = await make_response(await view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            return _set_validators(response, etag, modified, is_closed)
+        return wrapper
+    return decorator
@@ -0,0 +1,74 @@
+"""
+Price and stock-list data versions for the async app.
+Same queries and throttle as api/data_version.py, awaited on the worker's
+asyncpg pool; the last values read are kept for the response cache's
+version checks.
+"""
+
+import asyncio
+import time
+
+from api.aio.db import query_db
+from api.data_version import DATA_VERSION, DATA_VERSION_ARGS, STOCKS_VERSION, price_state, stocks_version
+from config import REFRESH_INTERVALS
+
+_lock = asyncio.Lock()
+_cached = {'version': None, 'last_date': None, 'modified': None, 'indicator_version': None, 'checked_at': 0.0}
+_stocks_cached = {'version': None, 'checked_at': 0.0}
+
+
+def _due(state, force):
+    return force or state['version'] is None or \
+        time.monotonic() - state['checked_at'] >= REFRESH_INTERVALS['data_version']
+
+
+async def _refresh(force=False):
+    """Re-read the version row when the throttle interval has passed"""
+    if _due(_cached, force):
+        async with _lock:
+            # Another request may have refreshed it while we waited
+            if _due(_cached, force):
+                row = await query_db(DATA_VERSION, DATA_VERSION_ARGS, one=True)
+                _cached.update(price_state(row), checked_at=time.monotonic())
+    return _cached
+
+
+async def get_price_version(force=False):
+    """Current price data version (see api.data_version.get_price_version)"""
+    return (await _refresh(force))['version']
+
+
+async def get_indicator_version(force=False):
+    """Current precomputed-indicator version, read with the price version"""
+    return (await _refresh(force))['indicator_version']
+
+
+async def get_price_validators(force=False):
+    """Price version with its 'last_date' and 'modified' (see api.data_version.get_price_validators)"""
+    state = await _refresh(force)
+    return {key: state[key] for key in ('version', 'last_date', 'modified')}
+
+
+async def get_stocks_version(force=False):
+    """Current version of the stocks table (see api.data_version.get_stocks_version)"""
+    if _due(_stocks_cached, force):
+        async with _lock:
+            if _due(_stocks_cached, force):
+                row = await query_db(STOCKS_VERSION, one=True)
+                _stocks_cached.update(version=stocks_version(row), checked_at=time.monotonic())
+    return _stocks_cached['version']
+
+
+def last_price_version():
+    """Price version as of the last refresh (no query)"""
+    return _cached['version']
+
+
+def last_indicator_version():
+    """Indicator version as of the last refresh (no query)"""
+    return _cached['indicator_version']
+
+
+def last_stocks_version():
+    """Stock-list version as of the last refresh (no query)"""
+    return _stocks_cached['version']
@@ -0,0 +1,291 @@
+"""
+Async database access for the ASGI serving mode.
+query_db/stream_query with the contract of api/helpers.py (dict rows,
+typed fetches, registered Statements, /metrics instrumentation) on an
+asyncpg pool owned by the worker's event loop.
+
+asyncpg prepares every statement once per connection and caches it
+(DB_PREPARED_STATEMENTS=false turns that cache off), so a registered
+Statement only contributes its SQL and its /metrics name here. The async
+app serves read-only routes: everything runs on the primary (DB_REPLICA_HOSTS
+only routes the Flask app's reads), and writes go through the Flask app.
+"""
+
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+
+import asyncpg
+
+import api.extensions as ext
+from api.metrics import observe_pool_wait, observe_query, observe_query_error, track_query
+from api.pool import PoolTimeout
+from api.statements import Statement, positional, sql_text
+from config import DATABASE, DATABASE_POOL
+
+# Statements asyncpg keeps prepared per connection (least recently used
+# are dropped); covers every registered statement and the ad-hoc queries
+STATEMENT_CACHE_SIZE = 256
+
+
+class AsyncPool:
+    """asyncpg pool with the checkout timeout, lifetime, idle validation and stats() of api.pool.ConnectionPool"""
+
+    def __init__(self, minconn, maxconn, timeout=10.0, max_lifetime=1800.0, idle_timeout=30.0,
+                 validate_idle=5.0, prepared_statements=True, **kwargs):
+        """
+        Args:
+            minconn: Connections opened when the pool starts
+            maxconn: Most connections open at once
+            timeout: Seconds a checkout waits for a free connection
+            max_lifetime: Seconds after which a connection is replaced (0 = never)
+            idle_timeout: Seconds an idle connection is kept (0 = forever)
+            validate_idle: Connections idle at least this long are checked
+                           with SELECT 1 before use (0 = always)
+            prepared_statements: Keep statements prepared per connection
+            **kwargs: Connection parameters (as for asyncpg.connect)
+        """
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.idle_timeout = idle_timeout
+        self.validate_idle = validate_idle
+        self.prepared_statements = prepared_statements
+        self._params = kwargs
+        self._pool = None
+        self._in_use = 0
+        self._waiting = 0
+        # Opened and last returned times, by server process id
+        self._born = {}
+        self._returned = {}
+        self._stats = {
+            'checkouts': 0, 'timeouts': 0, 'waits': 0,
+            'wait_seconds_total': 0.0, 'wait_seconds_max': 0.0, 'created': 0,
+            'closed_broken': 0, 'closed_lifetime': 0,
+        }
+
+    async def _init_connection(self, conn):
+        # json/jsonb arrive decoded, as they do from psycopg2
+        for type_name in ('json', 'jsonb'):
+            await conn.set_type_codec(type_name, encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
+        pid = conn.get_server_pid()
+        self._born[pid] = time.monotonic()
+        conn.add_termination_listener(lambda _: self._forget(pid))
+        self._stats['created'] += 1
+
+    def _forget(self, pid):
+        self._born.pop(pid, None)
+        self._returned.pop(pid, None)
+
+    def _expired(self, pid, now):
+        return bool(self.max_lifetime) and now - self._born.get(pid, now) >= self.max_lifetime
+
+    async def _usable(self, conn, pid, now):
+        """Whether a connection handed out by asyncpg still works (checked once idle validate_idle)"""
+        if conn.is_closed():
+            return False
+        if now - self._returned.get(pid, now) < self.validate_idle:
+            return True
+        try:
+            await conn.execute("SELECT 1")
+            return True
+        except (asyncpg.PostgresError, asyncpg.InterfaceError, OSError):
+            return False
+
+    async def _discard(self, conn, reason):
+        """Close a checked-out connection instead of returning it"""
+        self._stats[f'closed_{reason}'] += 1
+        if reason == 'broken':
+            conn.terminate()
+        else:
+            try:
+                await conn.close(timeout=self.timeout)
+            except Exception:
+                conn.terminate()
+        await self._pool.release(conn)
+
+    async def _reset_connection(self, conn):
+        # Nothing to undo on release: the async app never changes session
+        # state (SET, LISTEN, advisory locks), so this replaces asyncpg's
+        # RESET ALL, which would cost a round trip per checkout
+        return None
+
+    async def open(self):
+        """Open the pool's first minconn connections"""
+        self._pool = await asyncpg.create_pool(
+            min_size=self.minconn,
+            max_size=self.maxconn,
+            max_inactive_connection_lifetime=self.idle_timeout,
+            statement_cache_size=STATEMENT_CACHE_SIZE if self.prepared_statements else 0,
+            init=self._init_connection,
+            reset=self._reset_connection,
+            **self._params
+        )
+        return self
+
+    async def close(self):
+        """Close every connection (waits for checked-out ones to come back)"""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    @asynccontextmanager
+    async def connection(self, timeout=None):
+        """
+        Check out a connection for the duration of the block
+
+        Raises:
+            PoolTimeout: Every connection stayed busy for the whole timeout
+        """
+        started = time.perf_counter()
+        deadline = started + (self.timeout if timeout is None else timeout)
+        self._waiting += 1
+        try:
+            while True:
+                try:
+                    conn = await self._pool.acquire(timeout=max(deadline - time.perf_counter(), 0))
+                except asyncio.TimeoutError:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(
+                        f"No database connection available within {self.timeout:g}s ({self.maxconn} in use)") from None
+                pid = conn.get_server_pid()
+                if await self._usable(conn, pid, time.monotonic()):
+                    break
+                await self._discard(conn, 'broken')
+        finally:
+            self._waiting -= 1
+
+        waited = time.perf_counter() - started
+        self._stats['checkouts'] += 1
+        self._stats['wait_seconds_total'] += waited
+        self._stats['wait_seconds_max'] = max(self._stats['wait_seconds_max'], waited)
+        if self._waiting or waited >= 0.001:
+            self._stats['waits'] += 1
+        observe_pool_wait(waited)
+
+        self._in_use += 1
+        try:
+            yield conn
+        finally:
+            self._in_use -= 1
+            now = time.monotonic()
+            if self._expired(pid, now):
+                await self._discard(conn, 'lifetime')
+            else:
+                self._returned[pid] = now
+                await self._pool.release(conn)
+
+    def stats(self):
+        """Pool gauges (in use, idle, waiting) and checkout counters"""
+        stats = dict(self._stats)
+        checkouts = stats['checkouts']
+        stats['wait_ms_avg'] = round(stats['wait_seconds_total'] * 1000 / checkouts, 3) if checkouts else 0.0
+        stats['wait_ms_max'] = round(stats.pop('wait_seconds_max') * 1000, 3)
+        stats['wait_seconds_total'] = round(stats['wait_seconds_total'], 6)
+        size = self._pool.get_size() if self._pool is not None else 0
+        return {
+            'in_use': self._in_use,
+            'idle': max(size - self._in_use, 0),
+            'waiting': self._waiting,
+            'size': size,
+            'min_connections': self.minconn,
+            'max_connections': self.maxconn,
+            'timeout': self.timeout,
+            'max_lifetime': self.max_lifetime,
+            'idle_timeout': self.idle_timeout,
+            **stats,
+        }
+
+
+def create_pool(settings=DATABASE_POOL):
+    """AsyncPool sized like the Flask app's pool (open() it on the serving loop)"""
+    return AsyncPool(
+        settings['min_connections'],
+        settings['max_connections'],
+        timeout=settings['timeout'],
+        max_lifetime=settings['max_lifetime'],
+        idle_timeout=settings['idle_timeout'] / 1000,
+        validate_idle=settings['validate_idle'],
+        prepared_statements=settings['prepared_statements'],
+        **DATABASE
+    )
+
+
+@lru_cache(maxsize=1024)
+def _sql(query):
+    return positional(query)
+
+
+def _text(query):
+    """$n SQL text asyncpg runs for a Statement or %s query"""
+    return query.positional_sql if isinstance(query, Statement) else _sql(query)
+
+
+def _row(record, typed):
+    """Record as a dict; typed: NUMERIC as float and DATE as 'YYYY-MM-DD' (see api.helpers.query_db)"""
+    if not typed:
+        return dict(record)
+    row = {}
+    for key, value in record.items():
+        if isinstance(value, Decimal):
+            value = float(value)
+        elif type(value) is date:
+            value = value.isoformat()
+        row[key] = value
+    return row
+
+
+async def query_db(query, args=(), one=False, typed=False):
+    """
+    Run a SELECT and return its rows as dicts (or the first row, or None)
+
+    query is SQL text with %s placeholders or a registered Statement;
+    typed as for api.helpers.query_db.
+    """
+    name = query.name if isinstance(query, Statement) else None
+    async with ext.async_db_pool.connection() as conn:
+        with track_query(sql_text(query), name) as record:
+            if one:
+                row = await conn.fetchrow(_text(query), *args)
+                record.rows = 1 if row is not None else 0
+                return _row(row, typed) if row is not None else None
+            rows = await conn.fetch(_text(query), *args)
+            record.rows = len(rows)
+            return [_row(row, typed) for row in rows]
+
+
+async def stream_query(query, args=(), chunk_size=2000, typed=False):
+    """
+    Run a SELECT through a server-side cursor and yield its rows in chunks
+
+    The pooled connection stays checked out until the generator is
+    exhausted or closed (aclose() it when stopping early).
+
+    Yields:
+        Lists of up to chunk_size dict rows
+    """
+    elapsed = 0.0
+    total = 0
+    async with ext.async_db_pool.connection() as conn:
+        try:
+            # Cursors live inside a transaction
+            async with conn.transaction(readonly=True):
+                started = time.perf_counter()
+                cursor = await conn.cursor(_text(query), *args)
+                while True:
+                    rows = await cursor.fetch(chunk_size)
+                    elapsed += time.perf_counter() - started
+                    if not rows:
+                        break
+                    total += len(rows)
+                    yield [_row(row, typed) for row in rows]
+                    started = time.perf_counter()
+            observe_query(sql_text(query), elapsed, total)
+        except Exception:
+            observe_query_error(sql_text(query))
+            raise
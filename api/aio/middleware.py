@@ -0,0 +1,61 @@
+"""
+Before/after request hooks for the async app.
+Request metrics, session tracking and CORS headers as the Flask app has
+them (api/middleware.py and flask-cors), so responses look the same
+whichever app serves a route. Preflights are answered by flask-cors.
+"""
+
+import time
+
+from quart import request
+
+from api.extensions import SESSION_TIMEOUT
+from api.helpers import get_or_create_session, log_activity
+from api.metrics import observe_request
+from config import CORS_ORIGINS
+
+
+def _allowed_origin(origin):
+    return origin is not None and ('*' in CORS_ORIGINS or origin in CORS_ORIGINS)
+
+
+def register_middleware(app):
+    """Register before/after request hooks on the Quart app."""
+
+    @app.before_request
+    async def start_request():
+        """Note when the request started"""
+        request.metrics_started = time.perf_counter()
+
+    @app.after_request
+    async def finish_request(response):
+        """Record the route's latency and status (registered first, so it runs last)"""
+        started = getattr(request, 'metrics_started', None)
+        if started is not None:
+            observe_request(request.url_rule, request.method, response.status_code,
+                            time.perf_counter() - started)
+        return response
+
+    @app.before_request
+    async def track_request():
+        """Track API calls (the async app serves no pages or static files)"""
+        if request.path == '/metrics':
+            return
+        session_id = get_or_create_session(request)
+        if request.path.startswith('/api/'):
+            endpoint = request.path.replace('/api/', '')
+            log_activity(session_id, 'api_call', details=endpoint, req=request)
+        request.session_id = session_id
+
+    @app.after_request
+    async def after_request(response):
+        """Set session cookie and CORS headers"""
+        if hasattr(request, 'session_id'):
+            response.set_cookie('session_id', request.session_id, max_age=SESSION_TIMEOUT, samesite='Lax')
+
+        origin = request.headers.get('Origin')
+        if _allowed_origin(origin):
+            response.headers['Access-Control-Allow-Origin'] = origin
+            response.headers['Access-Control-Allow-Credentials'] = 'true'
+            response.vary.add('Origin')
+        return response
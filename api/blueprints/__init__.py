@@ -8,6 +8,7 @@ from api.blueprints.news import news_bp
 from api.blueprints.system import system_bp
 from api.blueprints.sessions import sessions_bp
 from api.blueprints.investment import investment_bp
+from api.blueprints.screener import screener_bp
 from api.blueprints.static_pages import static_pages_bp
 
 all_blueprints = [
@@ -18,6 +19,7 @@ all_blueprints = [
     system_bp,
     sessions_bp,
     investment_bp,
+    screener_bp,
     # Static pages must be last (has catch-all route that matches any path)
     static_pages_bp,
 ]
@@ -7,10 +7,19 @@ from flask import Blueprint, jsonify, request, make_response
 import uuid as uuid_lib
 
 from api.helpers import query_db, get_or_create_session, get_or_create_plan_owner, log_activity
+from api.statements import statement
 from api.extensions import PLAN_COOKIE_MAX_AGE
+from api.replicas import pin_primary
 
 investment_bp = Blueprint('investment', __name__)
 
+# Plans are read back right after they are created or edited, so never
+# serve them from a replica that may not have the change yet
+investment_bp.before_request(pin_primary)
+
+PLAN_COUNT_BY_OWNER = statement(
+    'plan_count_by_owner', "SELECT COUNT(*) as count FROM investment_plans WHERE session_id = %s")
+
 
 def _set_plan_cookie(response, owner_id):
     """Set the long-lived plan_owner_id cookie on a response."""
@@ -27,8 +36,7 @@ def claim_orphaned_plans():
 
         # Count plans already owned
         owned = query_db(
-            "SELECT COUNT(*) as count FROM investment_plans WHERE session_id = %s",
-            [owner_id], one=True
+            PLAN_COUNT_BY_OWNER, [owner_id], one=True
         )
 
         # Reassign all plans not owned by anyone with a current cookie
@@ -39,8 +47,7 @@ def claim_orphaned_plans():
 
         # Count after
         total = query_db(
-            "SELECT COUNT(*) as count FROM investment_plans WHERE session_id = %s",
-            [owner_id], one=True
+            PLAN_COUNT_BY_OWNER, [owner_id], one=True
         )
 
         response = make_response(jsonify({
@@ -54,6 +61,38 @@ def claim_orphaned_plans():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+PLANS_BY_OWNER = statement('plans_by_owner', """
+    SELECT
+        plan_id,
+        name,
+        notes,
+        strategy,
+        strategy_name,
+        budget,
+        expected_return,
+        risk_level,
+        sharpe_ratio,
+        created_at,
+        metadata
+    FROM investment_plans
+    WHERE session_id = %s
+    ORDER BY created_at DESC
+""")
+
+PLAN_HOLDINGS = statement('plan_holdings', """
+    SELECT
+        symbol,
+        shares,
+        buy_price,
+        price_at_creation,
+        allocation_percent,
+        amount,
+        expected_return
+    FROM investment_plan_holdings
+    WHERE plan_id = %s
+""")
+
+
 @investment_bp.route('/api/investment-plans', methods=['GET'])
 def get_investment_plans():
     """Get all investment plans for the current user"""
@@ -64,8 +103,7 @@ def get_investment_plans():
 
         # Auto-claim: if this owner has no plans but orphaned plans exist, adopt them
         own_count = query_db(
-            "SELECT COUNT(*) as count FROM investment_plans WHERE session_id = %s",
-            [owner_id], one=True
+            PLAN_COUNT_BY_OWNER, [owner_id], one=True
         )
         if own_count and own_count['count'] == 0:
             total_count = query_db("SELECT COUNT(*) as count FROM investment_plans", one=True)
@@ -76,39 +114,12 @@ def get_investment_plans():
                 )
 
         # Get all plans for this owner
-        plans = query_db("""
-            SELECT
-                plan_id,
-                name,
-                notes,
-                strategy,
-                strategy_name,
-                budget,
-                expected_return,
-                risk_level,
-                sharpe_ratio,
-                created_at,
-                metadata
-            FROM investment_plans
-            WHERE session_id = %s
-            ORDER BY created_at DESC
-        """, [owner_id])
+        plans = query_db(PLANS_BY_OWNER, [owner_id], typed=True)
 
         # Get holdings for each plan
         result = []
         for plan in plans:
-            holdings = query_db("""
-                SELECT
-                    symbol,
-                    shares,
-                    buy_price,
-                    price_at_creation,
-                    allocation_percent,
-                    amount,
-                    expected_return
-                FROM investment_plan_holdings
-                WHERE plan_id = %s
-            """, [plan['plan_id']])
+            holdings = query_db(PLAN_HOLDINGS, [plan['plan_id']], typed=True)
 
             result.append({
                 'id': str(plan['plan_id']),
@@ -116,19 +127,19 @@ def get_investment_plans():
                 'notes': plan['notes'],
                 'strategy': plan['strategy'],
                 'strategyName': plan['strategy_name'],
-                'budget': float(plan['budget']) if plan['budget'] else 0,
-                'expectedReturn': float(plan['expected_return']) if plan['expected_return'] else 0,
-                'risk': float(plan['risk_level']) if plan['risk_level'] else 0,
-                'sharpeRatio': float(plan['sharpe_ratio']) if plan['sharpe_ratio'] else 0,
+                'budget': plan['budget'] or 0,
+                'expectedReturn': plan['expected_return'] or 0,
+                'risk': plan['risk_level'] or 0,
+                'sharpeRatio': plan['sharpe_ratio'] or 0,
                 'createdDate': plan['created_at'].isoformat() if plan['created_at'] else None,
                 'holdings': [{
                     'symbol': h['symbol'],
-                    'shares': float(h['shares']) if h['shares'] else 0,
-                    'buyPrice': float(h['buy_price']) if h['buy_price'] else 0,
-                    'priceAtCreation': float(h['price_at_creation']) if h['price_at_creation'] else 0,
-                    'allocation': float(h['allocation_percent']) if h['allocation_percent'] else 0,
-                    'amount': float(h['amount']) if h['amount'] else 0,
-                    'expectedReturn': float(h['expected_return']) if h['expected_return'] else 0
+                    'shares': h['shares'] or 0,
+                    'buyPrice': h['buy_price'] or 0,
+                    'priceAtCreation': h['price_at_creation'] or 0,
+                    'allocation': h['allocation_percent'] or 0,
+                    'amount': h['amount'] or 0,
+                    'expectedReturn': h['expected_return'] or 0
                 } for h in holdings]
             })
 
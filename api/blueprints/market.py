@@ -14,22 +14,71 @@ logger = logging.getLogger(__name__)
 market_bp = Blueprint('market', __name__)
 
 
+INDICES_QUERY = """
+    SELECT
+        index_code,
+        index_name,
+        value,
+        change,
+        change_percent,
+        volume,
+        date
+    FROM market_indices
+    WHERE date = (SELECT MAX(date) FROM market_indices)
+    ORDER BY index_code;
+"""
+
+MACRO_QUERY = """
+    SELECT
+        id,
+        indicator_type,
+        country,
+        date,
+        value,
+        unit,
+        source,
+        created_at
+    FROM macro_indicators
+    ORDER BY indicator_type, date DESC;
+"""
+
+
+def _watchlist_payload():
+    """Current watchlist, or a default one of popular stocks when none is saved"""
+    # Return current watchlist as array (for frontend compatibility)
+    # If empty, return a default watchlist with popular stocks
+    if not watchlist_storage:
+        default_watchlist = ['VNM', 'VCB', 'FPT', 'HPG', 'VIC', 'VHM', 'GAS', 'ACB', 'BID', 'MSN']
+        logger.info("Returning default watchlist (no saved watchlist found)")
+        # Return metadata to indicate this is default data
+        return {
+            'watchlist': default_watchlist,
+            'is_default': True,
+            'count': len(default_watchlist)
+        }
+
+    logger.debug(f"Returning saved watchlist with {len(watchlist_storage)} stocks")
+    return {
+        'watchlist': watchlist_storage,
+        'is_default': False,
+        'count': len(watchlist_storage)
+    }
+
+
+def _latest_by_type(indicators):
+    """Latest row of each indicator type from MACRO_QUERY rows"""
+    latest_indicators = {}
+    for indicator in indicators:
+        key = indicator['indicator_type']
+        if key not in latest_indicators:
+            latest_indicators[key] = indicator
+    return list(latest_indicators.values())
+
+
 @market_bp.route('/api/indices', methods=['GET'])
 def get_indices():
     """Get latest market indices"""
-    indices = query_db("""
-        SELECT
-            index_code,
-            index_name,
-            value,
-            change,
-            change_percent,
-            volume,
-            date
-        FROM market_indices
-        WHERE date = (SELECT MAX(date) FROM market_indices)
-        ORDER BY index_code;
-    """)
+    indices = query_db(INDICES_QUERY)
 
     return jsonify({
         "success": True,
@@ -45,24 +94,7 @@ def handle_watchlist():
     No need for manual OPTIONS handling or Access-Control headers
     """
     if request.method == 'GET':
-        # Return current watchlist as array (for frontend compatibility)
-        # If empty, return a default watchlist with popular stocks
-        if not watchlist_storage:
-            default_watchlist = ['VNM', 'VCB', 'FPT', 'HPG', 'VIC', 'VHM', 'GAS', 'ACB', 'BID', 'MSN']
-            logger.info("Returning default watchlist (no saved watchlist found)")
-            # Return metadata to indicate this is default data
-            return jsonify({
-                'watchlist': default_watchlist,
-                'is_default': True,
-                'count': len(default_watchlist)
-            })
-
-        logger.debug(f"Returning saved watchlist with {len(watchlist_storage)} stocks")
-        return jsonify({
-            'watchlist': watchlist_storage,
-            'is_default': False,
-            'count': len(watchlist_storage)
-        })
+        return jsonify(_watchlist_payload())
 
     elif request.method == 'POST':
         # Update watchlist
@@ -106,30 +138,12 @@ def handle_watchlist():
 def get_macro_indicators():
     """Get latest macro economic indicators"""
     try:
-        indicators = query_db("""
-            SELECT
-                id,
-                indicator_type,
-                country,
-                date,
-                value,
-                unit,
-                source,
-                created_at
-            FROM macro_indicators
-            ORDER BY indicator_type, date DESC;
-        """)
-
         # Group by indicator type and get latest
-        latest_indicators = {}
-        for indicator in indicators:
-            key = indicator['indicator_type']
-            if key not in latest_indicators:
-                latest_indicators[key] = indicator
+        latest_indicators = _latest_by_type(query_db(MACRO_QUERY))
 
         return jsonify({
             "success": True,
-            "indicators": list(latest_indicators.values()),
+            "indicators": latest_indicators,
             "count": len(latest_indicators)
         })
     except Exception as e:
@@ -6,21 +6,60 @@ News endpoint.
 from flask import Blueprint, jsonify, request
 from datetime import datetime
 
+from api.cache import get_or_compute, invalidate
 from src.news_fetcher import get_news_fetcher
 
 news_bp = Blueprint('news', __name__)
 
+# Articles scraped per refresh; requests take their limit from this list,
+# so ?limit= may not exceed it
+NEWS_FETCH_LIMIT = 50
+
+
+class _NoArticles(Exception):
+    """Scrape returned nothing (keeps serving the previous articles if any)"""
+
+
+def _fetch_news():
+    """Scrape the news sources once for every waiting request"""
+    articles = get_news_fetcher().fetch_all_news(limit=NEWS_FETCH_LIMIT, force_refresh=True)
+    if not articles:
+        raise _NoArticles()
+    return articles
+
+
+def _news_limit(args):
+    """
+    Articles requested by ?limit= (default 10)
+
+    Raises:
+        ValueError: Limit outside 1..NEWS_FETCH_LIMIT (larger lists are never scraped)
+    """
+    limit = args.get('limit', default=10, type=int)
+    if not 1 <= limit <= NEWS_FETCH_LIMIT:
+        raise ValueError(f'limit must be between 1 and {NEWS_FETCH_LIMIT}')
+    return limit
+
 
 @news_bp.route('/api/news', methods=['GET'])
 def get_news():
     """Get latest financial news from Vietnamese sources"""
     try:
-        limit = request.args.get('limit', default=10, type=int)
+        limit = _news_limit(request.args)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    try:
         force_refresh = request.args.get('refresh', default='false', type=str).lower() == 'true'
 
-        # Fetch news from aggregated sources
-        news_fetcher = get_news_fetcher()
-        articles = news_fetcher.fetch_all_news(limit=limit, force_refresh=force_refresh)
+        if force_refresh:
+            invalidate('news')
+
+        # One scrape per cache period, shared by concurrent requests
+        try:
+            articles = get_or_compute('news', NEWS_FETCH_LIMIT, _fetch_news)[:limit]
+        except _NoArticles:
+            articles = []
 
         return jsonify({
             "success": True,
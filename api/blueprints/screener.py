@@ -0,0 +1,124 @@
+"""
+Cross-sectional screener endpoints.
+2 routes: /api/screener, /api/screener/fields
+"""
+
+import logging
+import threading
+import time
+from flask import Blueprint, jsonify, request
+
+from api.helpers import query_db
+from api.data_version import get_price_version
+from src import indicators
+from src.screener import UniverseScreen, FIELDS, PRESETS, TEXT_FIELDS
+
+logger = logging.getLogger(__name__)
+
+screener_bp = Blueprint('screener', __name__)
+
+# Universe matrix shared by all requests, rebuilt when the price version changes
+_screen = None
+_screen_lock = threading.Lock()
+
+
+def _load_universe(version):
+    """Build the universe screen from the last LOOKBACK_BARS bars of every active stock"""
+    started = time.perf_counter()
+    # One index range scan per active stock on (stock_id, date DESC)
+    # instead of numbering every row of stock_prices
+    rows = query_db("""
+        SELECT s.symbol, s.name, s.exchange, s.sector, s.category,
+               recent.date, recent.close, recent.volume
+        FROM stocks s
+        CROSS JOIN LATERAL (
+            SELECT date, close, volume
+            FROM stock_prices
+            WHERE stock_id = s.id
+            ORDER BY date DESC
+            LIMIT %s
+        ) recent
+        WHERE s.is_active = TRUE
+        ORDER BY s.symbol, recent.date ASC
+    """, (indicators.LOOKBACK_BARS,))
+
+    histories, metadata = {}, {}
+    for row in rows:
+        symbol = row['symbol']
+        if symbol not in metadata:
+            metadata[symbol] = {field: row[field] for field in ('name',) + TEXT_FIELDS}
+        histories.setdefault(symbol, []).append({
+            'date': row['date'].isoformat(),
+            'close': float(row['close']),
+            'volume': int(row['volume'] or 0),
+        })
+
+    screen = UniverseScreen(histories, metadata, version=version)
+    logger.info(f"Screener universe built: {len(screen)} stocks in "
+                f"{(time.perf_counter() - started) * 1000:.0f}ms (version {version})")
+    return screen
+
+
+def get_universe_screen():
+    """Current universe screen, rebuilt lazily after new prices are collected"""
+    global _screen
+    version = get_price_version()
+    screen = _screen
+    if screen is not None and screen.version == version:
+        return screen
+
+    with _screen_lock:
+        # Another request may have rebuilt it while we waited
+        if _screen is None or _screen.version != version:
+            _screen = _load_universe(version)
+        return _screen
+
+
+@screener_bp.route('/api/screener', methods=['GET'])
+def screen_stocks():
+    """
+    Screen the whole universe on the latest bar
+
+    Query params:
+        <field>_lt / _lte / _gt / _gte: numeric bound or another field name
+            (e.g. rsi_lt=30, sma50_gt=sma200, volume_ratio_gte=2, price_lt=bb_lower)
+        signal: comma-separated presets (oversold, golden_cross, volume_spike, ...)
+        exchange, sector, category: comma-separated values
+        sort, order (asc|desc), limit
+    """
+    try:
+        spec = UniverseScreen.parse_filters(request.args.to_dict())
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        screen = get_universe_screen()
+    except Exception as e:
+        logger.error(f"Error building screener universe: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    result = screen.screen(spec)
+    return jsonify({
+        'success': True,
+        'count': len(result['stocks']),
+        'total': result['total'],
+        'universe': result['universe'],
+        'stocks': result['stocks'],
+        'elapsed_ms': result['elapsed_ms'],
+        'data_version': screen.version,
+    })
+
+
+@screener_bp.route('/api/screener/fields', methods=['GET'])
+def get_screener_fields():
+    """List screenable fields and signal presets"""
+    return jsonify({
+        'success': True,
+        'fields': FIELDS,
+        'text_fields': list(TEXT_FIELDS),
+        'operators': ['lt', 'lte', 'gt', 'gte'],
+        'signals': {
+            name: [f"{field} {op} {value}" for field, op, value in conditions]
+            for name, conditions in PRESETS.items()
+        },
+    })
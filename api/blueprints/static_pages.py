@@ -72,12 +72,16 @@ def api_docs():
             "GET /api/stock/:symbol": "Get stock by symbol",
             "GET /api/stock/:symbol/current": "Get current price for stock",
             "GET /api/stock/:symbol/history?days=30": "Get historical prices",
+            "GET /api/stock/:symbol/indicators": "Get latest technical indicators",
+            "GET /api/stock/:symbol/levels": "Get ranked support/resistance zones",
             "GET /api/latest": "Get latest data for all stocks (dashboard format)",
             "GET /api/latest-prices?limit=100": "Get latest prices for all stocks",
             "GET /api/top-gainers?limit=10": "Get top gaining stocks",
             "GET /api/top-losers?limit=10": "Get top losing stocks",
             "GET /api/most-active?limit=10": "Get most active stocks by volume",
             "GET /api/search?q=query": "Search stocks by symbol or name",
+            "GET /api/screener?rsi_lt=30&signal=golden_cross": "Screen all stocks on latest indicators",
+            "GET /api/screener/fields": "List screener fields and signal presets",
             "GET /api/indices": "Get latest market indices",
             "GET /api/watchlist": "Get user's watchlist",
             "POST /api/watchlist": "Update user's watchlist",
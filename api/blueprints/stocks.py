@@ -1,28 +1,211 @@
 """
 Stock-related API endpoints.
-14 routes: /api/stocks, /api/stock/<symbol>/*, search, categories, compatibility endpoints.
+16 routes: /api/stocks, /api/stock/<symbol>/*, search, categories, compatibility endpoints.
 """
 
 import logging
-from flask import Blueprint, jsonify, request
+import threading
+import time
+import numpy as np
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 from datetime import datetime, timedelta
 
-from api.helpers import query_db
+from api.helpers import query_db, stream_query
+from api.statements import statement
+from api.cache import cached, cached_query
+from api.conditional import conditional_get
+from api.data_version import get_indicator_version, get_price_version, get_stocks_version
+from src import indicators, wire_format
+from src.technical_analysis import TechnicalAnalyzer
+from src.levels import LevelCache, detect_levels, LEVEL_LOOKBACK_BARS
+from src.market_snapshot import LatestPriceSnapshot
+from src.search_index import StockSearchIndex
 
 logger = logging.getLogger(__name__)
 
 stocks_bp = Blueprint('stocks', __name__)
 
+# Support/resistance zones per (symbol, last bar date)
+level_cache = LevelCache()
+
+# technical_indicators columns returned by /api/stock/<symbol>/indicators
+INDICATOR_COLUMNS = {**indicators.TABLE_COLUMNS, **indicators.OHLCV_TABLE_COLUMNS}
+
+# Latest bar of every active stock, shared by the market overview endpoints
+# and rebuilt when the price version changes
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+# (snapshot, rows) last served by /api/latest
+_latest_payload = (None, None)
+
+# Symbol/name search index, rebuilt when the stocks table changes
+_search_index = None
+_search_index_lock = threading.Lock()
+
+# Fields returned per stock by the snapshot-backed endpoints
+LATEST_PRICE_FIELDS = ('symbol', 'name', 'exchange', 'date', 'price', 'change', 'change_percent', 'volume')
+MOVER_FIELDS = ('symbol', 'name', 'price', 'change', 'change_percent', 'volume')
+MOST_ACTIVE_FIELDS = ('symbol', 'name', 'price', 'change_percent', 'volume')
+
+# Rows fetched per server-side cursor round trip when streaming full histories
+HISTORY_STREAM_CHUNK_ROWS = 2000
+
+# ?format= values accepted by the history and latest-price endpoints
+RESPONSE_FORMATS = ('json', 'columnar', 'binary')
+
+# Columns sent by the columnar history formats (no 'price' alias of close)
+HISTORY_COLUMNS = ('date', 'open', 'high', 'low', 'close', 'volume', 'change', 'change_percent')
+LATEST_COLUMNS = ('symbol', 'name', 'date') + HISTORY_COLUMNS[1:]
+
+# Limits of /api/history/batch
+BATCH_MAX_SYMBOLS = 500
+BATCH_MAX_BARS = 5000
+
+
+# Latest bar of every active stock (the market snapshot)
+SNAPSHOT_QUERY = """
+    SELECT
+        s.symbol,
+        s.name,
+        s.exchange,
+        sp.date,
+        sp.open,
+        sp.high,
+        sp.low,
+        sp.close,
+        sp.volume,
+        sp.change_percent
+    FROM stocks s
+    JOIN latest_quotes sp ON sp.stock_id = s.id
+    WHERE s.is_active = TRUE
+"""
+
+
+def _load_snapshot(version):
+    """Read the latest bar of every active stock in one query"""
+    started = time.perf_counter()
+    rows = query_db(SNAPSHOT_QUERY)
+    snapshot = LatestPriceSnapshot(rows, version=version)
+    logger.info(f"Latest-price snapshot built: {len(snapshot)} stocks in "
+                f"{(time.perf_counter() - started) * 1000:.0f}ms (version {version})")
+    return snapshot
+
+
+def _response_format(args):
+    """
+    Wire format requested with ?format=
+
+    Raises:
+        ValueError: Unknown format
+    """
+    response_format = args.get('format', 'json').lower()
+    if response_format not in RESPONSE_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(RESPONSE_FORMATS)}")
+    return response_format
+
+
+def _columnar_response(response_format, columns, **meta):
+    """
+    Serialize parallel columns as columnar JSON or the binary wire format
+
+    Args:
+        response_format: 'columnar' or 'binary'
+        columns: Field -> values, dates already as epoch days
+        meta: Top-level fields sent alongside the columns (e.g. symbol)
+    """
+    if response_format == 'binary':
+        return Response(wire_format.encode_binary(columns, meta), mimetype='application/octet-stream')
+    return jsonify(_columnar_payload(columns, **meta))
+
+
+def _columnar_payload(columns, **meta):
+    """Columnar JSON body for parallel columns (see _columnar_response)"""
+    count = len(next(iter(columns.values()))) if columns else 0
+    return {
+        'success': True,
+        **meta,
+        'format': 'columnar',
+        'count': count,
+        'columns': wire_format.to_json_columns(columns)
+    }
+
+
+def _latest_results(snapshot):
+    """
+    /api/latest rows for a snapshot, built once per snapshot
+
+    Format is {SYMBOL: data} for dashboard_history.html compatibility, with
+    missing values sent as 0.
+    """
+    global _latest_payload
+    cached_snapshot, all_results = _latest_payload
+    if cached_snapshot is snapshot:
+        return all_results
+
+    # Whole columns to Python floats at once instead of per-value numpy access
+    values = {key: np.nan_to_num(snapshot.columns[key], nan=0.0).tolist()
+              for key in ('open', 'high', 'low', 'close', 'volume', 'change', 'change_percent')}
+    all_results = {}
+    for i, symbol in enumerate(snapshot.symbols):
+        all_results[symbol] = {
+            'symbol': symbol,
+            'name': snapshot.names[i],
+            'date': snapshot.dates[i].isoformat() if snapshot.dates[i] else '',
+            'open': values['open'][i],
+            'high': values['high'][i],
+            'low': values['low'][i],
+            'close': values['close'][i],
+            'price': values['close'][i],
+            'volume': int(values['volume'][i]),
+            'change': values['change'][i],
+            'change_percent': values['change_percent'][i],
+            'analysis': {}  # Empty analysis - use /api/stock-analysis endpoint
+        }
+
+    _latest_payload = (snapshot, all_results)
+    return all_results
+
+
+def _latest_columns(snapshot):
+    """/api/latest columns for the columnar formats"""
+    columns = {
+        'symbol': snapshot.symbols,
+        'name': snapshot.names,
+        'date': [wire_format.epoch_day(d) for d in snapshot.dates],
+    }
+    for field in LATEST_COLUMNS[3:]:
+        columns[field] = snapshot.columns[field]
+    return columns
+
+
+def get_latest_snapshot():
+    """Current latest-price snapshot, rebuilt lazily after new prices are collected"""
+    global _snapshot
+    version = get_price_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    with _snapshot_lock:
+        # Another request may have rebuilt it while we waited
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = _load_snapshot(version)
+        return _snapshot
+
+
+STOCK_LIST = """
+    SELECT id, symbol, name, exchange, sector, category, market_cap, is_active
+    FROM stocks
+    WHERE is_active = TRUE
+    ORDER BY symbol;
+"""
+
 
 @stocks_bp.route('/api/stocks', methods=['GET'])
 def get_stocks():
     """Get all stocks"""
-    stocks = query_db("""
-        SELECT id, symbol, name, exchange, sector, category, market_cap, is_active
-        FROM stocks
-        WHERE is_active = TRUE
-        ORDER BY symbol;
-    """)
+    stocks = cached_query('stock_list', STOCK_LIST)
 
     return jsonify({
         "success": True,
@@ -31,12 +214,15 @@ def get_stocks():
     })
 
 
+STOCK_BY_SYMBOL = statement('stock_by_symbol', """
+    SELECT * FROM stocks WHERE symbol = %s
+""")
+
+
 @stocks_bp.route('/api/stock/<symbol>', methods=['GET'])
 def get_stock(symbol):
     """Get single stock by symbol"""
-    stock = query_db("""
-        SELECT * FROM stocks WHERE symbol = %s;
-    """, (symbol,), one=True)
+    stock = query_db(STOCK_BY_SYMBOL, (symbol,), one=True)
 
     if stock:
         return jsonify({"success": True, **stock})
@@ -44,27 +230,29 @@ def get_stock(symbol):
         return jsonify({"success": False, "error": "Stock not found"}), 404
 
 
+STOCK_CURRENT = statement('stock_current', """
+    SELECT
+        s.symbol,
+        s.name,
+        sp.date,
+        sp.open,
+        sp.high,
+        sp.low,
+        sp.close as price,
+        sp.volume,
+        (sp.close - sp.open) as change,
+        sp.change_percent
+    FROM stocks s
+    JOIN latest_quotes sp ON sp.stock_id = s.id
+    WHERE s.symbol = %s
+""")
+
+
 @stocks_bp.route('/api/stock/<symbol>/current', methods=['GET'])
+@cached('stock_prices')
 def get_stock_current_price(symbol):
     """Get current price for a stock"""
-    data = query_db("""
-        SELECT
-            s.symbol,
-            s.name,
-            sp.date,
-            sp.open,
-            sp.high,
-            sp.low,
-            sp.close as price,
-            sp.volume,
-            (sp.close - sp.open) as change,
-            sp.change_percent
-        FROM stocks s
-        JOIN stock_prices sp ON s.id = sp.stock_id
-        WHERE s.symbol = %s
-        ORDER BY sp.date DESC
-        LIMIT 1;
-    """, (symbol,), one=True)
+    data = query_db(STOCK_CURRENT, (symbol,), one=True)
 
     if data:
         return jsonify({"success": True, **data})
@@ -72,51 +260,106 @@ def get_stock_current_price(symbol):
         return jsonify({"success": False, "error": "No price data found"}), 404
 
 
+def _history_range(args):
+    """
+    Date range requested from the history endpoint (args: the query arguments)
+
+    Returns:
+        Tuple of (date_from, date_to); date_to is None for open ranges
+
+    Raises:
+        ValueError: Malformed or out-of-range parameters
+    """
+    start, end = args.get('start'), args.get('end')
+    try:
+        date_to = datetime.strptime(end, '%Y-%m-%d').date() if end else None
+        if start:
+            date_from = datetime.strptime(start, '%Y-%m-%d').date()
+        else:
+            date_from = None
+    except ValueError:
+        raise ValueError('start and end must be dates in YYYY-MM-DD format')
+
+    if date_from is None:
+        days = args.get('days', default=30, type=int)
+        if days < 1:
+            raise ValueError('Days parameter must be at least 1')
+        if days > 365:
+            logger.warning(f"Days parameter {days} exceeds maximum (365), capping to 365")
+            days = 365  # Cap to 1 year maximum
+        date_from = (date_to or datetime.now().date()) - timedelta(days=days)
+
+    if date_to is not None and date_to < date_from:
+        raise ValueError('end must not be before start')
+    return date_from, date_to
+
+
+def _history_range_closed(validators, **view_args):
+    """A range ending before the latest price date can no longer change"""
+    try:
+        _, date_to = _history_range(request.args)
+    except ValueError:
+        return False
+    return _range_closed(validators, date_to)
+
+
+def _range_closed(validators, date_to):
+    return date_to is not None and validators['last_date'] is not None and date_to < validators['last_date']
+
+
+HISTORY_WINDOW = statement('history_window', """
+    SELECT
+        sp.date,
+        sp.open,
+        sp.high,
+        sp.low,
+        sp.close,
+        sp.volume,
+        (sp.close - sp.open) as change,
+        sp.change_percent
+    FROM stocks s
+    JOIN stock_prices sp ON s.id = sp.stock_id
+    WHERE s.symbol = %s AND sp.date >= %s
+      AND (%s::date IS NULL OR sp.date <= %s::date)
+    ORDER BY sp.date ASC
+""")
+
+
 @stocks_bp.route('/api/stock/<symbol>/history', methods=['GET'])
+@conditional_get(closed=_history_range_closed)
+@cached('stock_prices')
 def get_stock_history(symbol):
     """Get historical prices for a stock
 
     Args:
         symbol: Stock symbol (from URL path)
         days: Number of days of history to fetch (query param, default=30, max=365)
+        start, end: Optional YYYY-MM-DD range (query params; start replaces
+                    days). Ranges ending before the latest price date are
+                    served with a long-lived Cache-Control.
+        format: 'json' (default), 'columnar' (parallel arrays, dates as
+                epoch days) or 'binary' (see src/wire_format.py)
 
     Returns:
         JSON with historical price data
     """
-    days = request.args.get('days', default=30, type=int)
-
-    # Validate days parameter
-    if days < 1:
-        logger.warning(f"Invalid days parameter: {days} (must be >= 1)")
+    try:
+        date_from, date_to = _history_range(request.args)
+        response_format = _response_format(request.args)
+    except ValueError as e:
+        logger.warning(f"Invalid history request for {symbol}: {e}")
         return jsonify({
             'success': False,
-            'error': 'Days parameter must be at least 1'
+            'error': str(e)
         }), 400
 
-    if days > 365:
-        logger.warning(f"Days parameter {days} exceeds maximum (365), capping to 365")
-        days = 365  # Cap to 1 year maximum
-
-    date_from = (datetime.now() - timedelta(days=days)).date()
-
     try:
-        history = query_db("""
-        SELECT
-            sp.date,
-            sp.open,
-            sp.high,
-            sp.low,
-            sp.close,
-            sp.volume,
-            (sp.close - sp.open) as change,
-            sp.change_percent
-        FROM stocks s
-        JOIN stock_prices sp ON s.id = sp.stock_id
-        WHERE s.symbol = %s AND sp.date >= %s
-        ORDER BY sp.date ASC;
-    """, (symbol, date_from))
+        history = query_db(HISTORY_WINDOW, (symbol, date_from, date_to, date_to))
 
         logger.debug(f"Retrieved {len(history)} days of history for {symbol}")
+        if response_format != 'json':
+            columns = wire_format.columns_from_rows(history, HISTORY_COLUMNS)
+            return _columnar_response(response_format, columns, symbol=symbol)
         return jsonify({
             "success": True,
             "symbol": symbol,
@@ -131,32 +374,255 @@ def get_stock_history(symbol):
         }), 500
 
 
+BATCH_RANGE = """
+    SELECT
+        s.symbol,
+        sp.date,
+        sp.open,
+        sp.high,
+        sp.low,
+        sp.close,
+        sp.volume,
+        (sp.close - sp.open) as change,
+        sp.change_percent
+    FROM stocks s
+    JOIN stock_prices sp ON s.id = sp.stock_id
+    WHERE s.symbol = ANY(%s) AND sp.date >= %s
+      AND (%s::date IS NULL OR sp.date <= %s::date)
+    ORDER BY s.symbol, sp.date ASC;
+"""
+
+# Last N bars per symbol: one index-ordered LIMIT per stock
+BATCH_BARS = """
+    SELECT
+        s.symbol,
+        sp.date,
+        sp.open,
+        sp.high,
+        sp.low,
+        sp.close,
+        sp.volume,
+        (sp.close - sp.open) as change,
+        sp.change_percent
+    FROM stocks s
+    CROSS JOIN LATERAL (
+        SELECT date, open, high, low, close, volume, change_percent
+        FROM stock_prices
+        WHERE stock_id = s.id
+          AND (%s::date IS NULL OR date <= %s::date)
+        ORDER BY date DESC
+        LIMIT %s
+    ) sp
+    WHERE s.symbol = ANY(%s)
+    ORDER BY s.symbol, sp.date ASC;
+"""
+
+
+def _batch_request(args):
+    """
+    Symbols, range and format of a batch history request
+
+    Returns:
+        Tuple of (symbols, query, query_args, response_format)
+
+    Raises:
+        ValueError: Missing or out-of-range parameters
+    """
+    symbols = []
+    for symbol in args.get('symbols', '').split(','):
+        symbol = symbol.strip().upper()
+        if symbol and symbol not in symbols:
+            symbols.append(symbol)
+
+    if not symbols:
+        raise ValueError('symbols parameter is required')
+    if len(symbols) > BATCH_MAX_SYMBOLS:
+        raise ValueError(f'At most {BATCH_MAX_SYMBOLS} symbols per request')
+    date_from, date_to = _history_range(args)
+    bars = args.get('bars', type=int)
+    if bars is not None and not 1 <= bars <= BATCH_MAX_BARS:
+        raise ValueError(f'bars must be between 1 and {BATCH_MAX_BARS}')
+    response_format = _response_format(args)
+
+    if bars is None:
+        return symbols, BATCH_RANGE, (symbols, date_from, date_to, date_to), response_format
+    return symbols, BATCH_BARS, (date_to, date_to, bars, symbols), response_format
+
+
+def _group_batch(rows, symbols):
+    """
+    Split batch rows by symbol (each row's 'symbol' key is removed)
+
+    Returns:
+        Tuple of (rows by symbol, symbol of each row, requested symbols
+        without data)
+    """
+    grouped = {}
+    row_symbols = []
+    for row in rows:
+        row_symbols.append(row.pop('symbol'))
+        grouped.setdefault(row_symbols[-1], []).append(row)
+    missing = [symbol for symbol in symbols if symbol not in grouped]
+    logger.debug(f"Retrieved {len(rows)} bars for {len(grouped)} symbols")
+    return grouped, row_symbols, missing
+
+
+def _batch_payload(grouped, missing, response_format):
+    """JSON body of a 'json' or 'columnar' batch response"""
+    if response_format == 'columnar':
+        data = {
+            symbol: wire_format.to_json_columns(wire_format.columns_from_rows(history, HISTORY_COLUMNS))
+            for symbol, history in grouped.items()
+        }
+        return {
+            'success': True,
+            'format': 'columnar',
+            'data': data,
+            'count': len(data),
+            'missing': missing
+        }
+
+    return {
+        'success': True,
+        'data': grouped,
+        'count': len(grouped),
+        'missing': missing
+    }
+
+
+@stocks_bp.route('/api/history/batch', methods=['GET'])
+@conditional_get(closed=_history_range_closed)
+@cached('stock_prices')
+def get_history_batch():
+    """Get historical prices for many stocks in one request and one query
+
+    Args:
+        symbols: Comma-separated stock symbols (query param, max 500)
+        days, start, end: Date range, as for /api/stock/<symbol>/history
+        bars: Last N bars per symbol up to end instead of a date range
+              (query param, max 5000)
+        format: 'json' (default), 'columnar' (parallel arrays per symbol)
+                or 'binary' (one table with a symbol column)
+
+    Returns:
+        JSON with each symbol's rows (oldest first) and the symbols that
+        have no data
+    """
+    try:
+        symbols, query, args, response_format = _batch_request(request.args)
+    except ValueError as e:
+        logger.warning(f"Invalid batch history request: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    try:
+        rows = query_db(query, args)
+    except Exception as e:
+        logger.error(f"Error fetching batch history for {len(symbols)} symbols: {e}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': 'Failed to fetch historical data'
+        }), 500
+
+    grouped, row_symbols, missing = _group_batch(rows, symbols)
+    if response_format == 'binary':
+        columns = wire_format.columns_from_rows(rows, HISTORY_COLUMNS)
+        columns['symbol'] = row_symbols
+        return _columnar_response(response_format, columns, missing=missing)
+    return jsonify(_batch_payload(grouped, missing, response_format))
+
+
+LATEST_INDICATORS = statement('latest_indicators', """
+    SELECT
+        ti.date,
+        ti.sma_20, ti.sma_50, ti.sma_200,
+        ti.ema_12, ti.ema_26,
+        ti.rsi_14, ti.macd, ti.macd_signal, ti.macd_histogram,
+        ti.bollinger_upper, ti.bollinger_middle, ti.bollinger_lower,
+        ti.stochastic_k, ti.stochastic_d, ti.atr_14, ti.obv, ti.mfi_14
+    FROM stocks s
+    JOIN latest_quotes lq ON lq.stock_id = s.id
+    JOIN technical_indicators ti ON ti.stock_id = s.id AND ti.date = lq.date
+    WHERE s.symbol = %s
+""")
+
+
+# Bars the indicators are computed from when no precomputed row exists
+INDICATOR_HISTORY = statement('indicator_history', """
+    SELECT date, high, low, close, volume
+    FROM stock_prices
+    WHERE stock_id = (SELECT id FROM stocks WHERE symbol = %s)
+    ORDER BY date DESC
+    LIMIT %s
+""")
+
+
+def _precomputed_indicators(symbol, row):
+    """Indicators response body from a LATEST_INDICATORS row"""
+    result = {
+        column: float(row[column]) if row[column] is not None else None
+        for column in INDICATOR_COLUMNS
+    }
+    return {
+        "success": True,
+        "symbol": symbol,
+        "source": "precomputed",
+        "date": row['date'].isoformat(),
+        **result
+    }
+
+
+def _live_indicators(symbol, history):
+    """Indicators response body computed from INDICATOR_HISTORY rows (newest first)"""
+    history = list(reversed(history))
+    _, columns = indicators.build_ohlcv_matrix({symbol: history})
+    series = indicators.compute_all(columns['close'][0], columns['volume'][0],
+                                    highs=columns['high'][0], lows=columns['low'][0])
+
+    result = {
+        column: indicators.to_optional(series[key][-1], 4)
+        for column, key in INDICATOR_COLUMNS.items()
+    }
+    return {
+        "success": True,
+        "symbol": symbol,
+        "source": "live",
+        "date": history[-1]['date'].isoformat(),
+        **result
+    }
+
+
+@stocks_bp.route('/api/stock/<symbol>/indicators', methods=['GET'])
+@cached('indicators')
+def get_stock_indicators(symbol):
+    """Get the latest technical indicators for a stock
+
+    Reads the row precomputed by jobs/compute_indicators.py and falls back to
+    computing from price history when the latest bar has no row yet.
+    """
+    symbol = symbol.upper()
+    row = query_db(LATEST_INDICATORS, (symbol,), one=True)
+    if row:
+        return jsonify(_precomputed_indicators(symbol, row))
+
+    history = query_db(INDICATOR_HISTORY, (symbol, indicators.LOOKBACK_BARS))
+    if not history:
+        return jsonify({"success": False, "error": f"No data found for {symbol}"}), 404
+    return jsonify(_live_indicators(symbol, history))
+
+
 @stocks_bp.route('/api/latest-prices', methods=['GET'])
 def get_latest_prices():
     """Get latest prices for all stocks"""
     limit = request.args.get('limit', default=100, type=int)
 
-    prices = query_db("""
-        SELECT
-            s.symbol,
-            s.name,
-            s.exchange,
-            sp.date,
-            sp.close as price,
-            (sp.close - sp.open) as change,
-            sp.change_percent,
-            sp.volume
-        FROM stocks s
-        JOIN LATERAL (
-            SELECT * FROM stock_prices
-            WHERE stock_id = s.id
-            ORDER BY date DESC
-            LIMIT 1
-        ) sp ON TRUE
-        WHERE s.is_active = TRUE
-        ORDER BY s.symbol
-        LIMIT %s;
-    """, (limit,))
+    snapshot = get_latest_snapshot()
+    prices = [
+        snapshot.row(i, LATEST_PRICE_FIELDS)
+        for i in range(min(max(limit, 0), len(snapshot)))
+    ]
 
     return jsonify({
         "success": True,
@@ -168,155 +634,102 @@ def get_latest_prices():
 
 def _compute_technical_analysis(symbol, historical_data):
     """Compute technical analysis and signals for a stock"""
-    if not historical_data or len(historical_data) < 5:
-        return {
-            'score': 0,
-            'recommendation': 'HOLD',
-            'emoji': '⚪',
-            'signals': [],
-            'indicators': {}
-        }
+    return TechnicalAnalyzer.analyze_price_action(historical_data)
 
-    prices = [float(h['close']) for h in historical_data]
-    signals = []
-    score = 0
-
-    # 1. Detect support levels (local minima)
-    support_found = False
-    for i in range(2, len(prices) - 2):
-        if prices[i] < prices[i-1] and prices[i] < prices[i+1] and \
-           prices[i] < prices[i-2] and prices[i] < prices[i+2]:
-            signals.append(f"🟢 Support Level at {prices[i]:.0f}")
-            support_found = True
-            score += 15
-            break
-
-    # 2. Detect resistance levels (local maxima)
-    resistance_found = False
-    for i in range(2, len(prices) - 2):
-        if prices[i] > prices[i-1] and prices[i] > prices[i+1] and \
-           prices[i] > prices[i-2] and prices[i] > prices[i+2]:
-            signals.append(f"🔴 Resistance Level at {prices[i]:.0f}")
-            resistance_found = True
-            score -= 15
-            break
-
-    # 3. Detect trend direction (last 3+ price movements)
-    recent_uptrend = 0
-    recent_downtrend = 0
-    for i in range(len(prices) - 1, max(len(prices) - 5, 0), -1):
-        if i > 0:
-            if float(prices[i]) > float(prices[i-1]):
-                recent_uptrend += 1
-                recent_downtrend = 0
-            else:
-                recent_downtrend += 1
-                recent_uptrend = 0
-
-    if recent_uptrend >= 3:
-        signals.append("🟢 Recent Uptrend Detected")
-        score += 20
-    elif recent_downtrend >= 3:
-        signals.append("🔴 Recent Downtrend Detected")
-        score -= 20
-
-    # 4. Detect volatility
-    returns = []
-    for i in range(1, len(prices)):
-        # Convert to float to handle decimal.Decimal from database
-        price_i = float(prices[i])
-        price_i_1 = float(prices[i-1])
-        if price_i_1 != 0:
-            returns.append(abs((price_i - price_i_1) / price_i_1))
-
-    if returns:
-        avg_return = float(sum(returns) / len(returns))
-        recent_return = float(returns[-1])
-        if recent_return > avg_return * 1.5:
-            if float(prices[-1]) > float(prices[-2]):
-                signals.append("🟢 High Volatility with Upward Movement")
-                score += 10
-            else:
-                signals.append("🔴 High Volatility with Downward Movement")
-                score -= 10
-
-    # 5. Volume trend (if we have the data)
-    if len(historical_data) >= 2:
-        recent_vol = historical_data[-1].get('volume', 0)
-        prev_vol = historical_data[-2].get('volume', 0)
-        if prev_vol > 0 and recent_vol > prev_vol * 1.2:
-            signals.append("🟢 Volume Spike Detected")
-            score += 5
-
-    # Determine recommendation based on score
-    if score > 20:
-        recommendation = 'BUY'
-        emoji = '🟢'
-    elif score < -20:
-        recommendation = 'SELL'
-        emoji = '🔴'
-    else:
-        recommendation = 'HOLD'
-        emoji = '⚪'
 
-    return {
-        'score': score,
-        'recommendation': recommendation,
-        'emoji': emoji,
-        'signals': signals,
-        'indicators': {
-            'support_level': min(prices) if support_found else None,
-            'resistance_level': max(prices) if resistance_found else None
-        }
-    }
+LATEST_ANALYSIS = statement('latest_analysis', """
+    SELECT ti.indicators -> 'analysis' AS analysis
+    FROM stocks s
+    JOIN latest_quotes lq ON lq.stock_id = s.id
+    JOIN technical_indicators ti ON ti.stock_id = s.id AND ti.date = lq.date
+    WHERE s.symbol = %s
+""")
+
+
+def _get_precomputed_analysis(symbol):
+    """Return the stored analysis for the stock's latest bar, or None if missing"""
+    row = query_db(LATEST_ANALYSIS, (symbol,), one=True)
+
+    if row and row['analysis']:
+        return row['analysis']
+    return None
+
+
+LATEST_QUOTE = statement('latest_quote', """
+    SELECT lq.date, lq.close
+    FROM latest_quotes lq
+    JOIN stocks s ON s.id = lq.stock_id
+    WHERE s.symbol = %s
+""")
+
+
+LEVEL_BARS = statement('level_bars', """
+    SELECT date, high, low, close
+    FROM stock_prices
+    WHERE stock_id = (SELECT id FROM stocks WHERE symbol = %s)
+    ORDER BY date DESC
+    LIMIT %s
+""")
+
+
+def _get_levels(symbol):
+    """Support/resistance zones for the stock's latest bar, detected once per bar"""
+    latest = query_db(LATEST_QUOTE, (symbol,), one=True)
+    if not latest:
+        return None
+
+    last_close = float(latest['close'])
+    levels = level_cache.get(symbol, latest['date'], last_close)
+    if levels is None:
+        bars = query_db(LEVEL_BARS, (symbol, LEVEL_LOOKBACK_BARS))
+        levels = detect_levels(list(reversed(bars)))
+        level_cache.put(symbol, latest['date'], last_close, levels)
+    return levels
+
+
+@stocks_bp.route('/api/stock/<symbol>/levels', methods=['GET'])
+def get_stock_levels(symbol):
+    """Get ranked support/resistance zones from multi-window swing pivots"""
+    try:
+        levels = _get_levels(symbol.upper())
+        if levels is None:
+            return jsonify({
+                'success': False,
+                'error': f'No data found for {symbol}'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'symbol': symbol.upper(),
+            'levels': levels
+        })
+    except Exception as e:
+        logger.error(f"Error detecting levels for {symbol}: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
 
 
 @stocks_bp.route('/api/latest', methods=['GET'])
+@conditional_get()
 def get_latest():
-    """Get latest data for all stocks (compatibility endpoint for dashboard_history.html)"""
-    prices = query_db("""
-        SELECT
-            s.symbol,
-            s.name,
-            sp.date,
-            sp.open,
-            sp.high,
-            sp.low,
-            sp.close,
-            sp.volume,
-            sp.change_percent,
-            (sp.close - sp.open) as change
-        FROM stocks s
-        JOIN LATERAL (
-            SELECT * FROM stock_prices
-            WHERE stock_id = s.id
-            ORDER BY date DESC
-            LIMIT 1
-        ) sp ON TRUE
-        WHERE s.is_active = TRUE
-        ORDER BY s.symbol;
-    """)
-
-    # Format as {all_results: {SYMBOL: data}} for dashboard_history.html compatibility
-    all_results = {}
-    for row in prices:
-        symbol = row['symbol']
+    """
+    Get latest data for all stocks (compatibility endpoint for dashboard_history.html)
 
-        all_results[symbol] = {
-            'symbol': symbol,
-            'name': row['name'],
-            'date': row['date'].isoformat() if row['date'] else '',
-            'open': float(row['open']) if row['open'] else 0,
-            'high': float(row['high']) if row['high'] else 0,
-            'low': float(row['low']) if row['low'] else 0,
-            'close': float(row['close']) if row['close'] else 0,
-            'price': float(row['close']) if row['close'] else 0,
-            'volume': int(row['volume']) if row['volume'] else 0,
-            'change': float(row['change']) if row['change'] else 0,
-            'change_percent': float(row['change_percent']) if row['change_percent'] else 0,
-            'analysis': {}  # Empty analysis - use /api/stock-analysis endpoint
-        }
+    ?format=columnar|binary returns one array per field instead of the
+    per-symbol objects.
+    """
+    try:
+        response_format = _response_format(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
 
+    snapshot = get_latest_snapshot()
+    if response_format != 'json':
+        return _columnar_response(response_format, _latest_columns(snapshot))
+
+    all_results = _latest_results(snapshot)
     return jsonify({
         'success': True,
         'all_results': all_results,
@@ -325,37 +738,57 @@ def get_latest():
     })
 
 
+ANALYSIS_HISTORY = statement('analysis_history', """
+    SELECT
+        date,
+        open,
+        high,
+        low,
+        close,
+        volume
+    FROM stock_prices
+    WHERE stock_id = (SELECT id FROM stocks WHERE symbol = %s)
+    ORDER BY date DESC
+    LIMIT 60
+""")
+
+
+def _add_levels(analysis, levels):
+    """Report the nearest ranked zones instead of the window's min/max"""
+    if levels:
+        analysis['levels'] = levels
+        analysis.setdefault('indicators', {}).update({
+            'support_level': levels['nearest_support'],
+            'resistance_level': levels['nearest_resistance']
+        })
+
+
 @stocks_bp.route('/api/stock-analysis/<symbol>', methods=['GET'])
+@conditional_get(versions=(get_indicator_version,))
+@cached('indicators')
 def get_stock_analysis(symbol):
     """Get technical analysis for a specific stock"""
     try:
-        # Get historical data for the stock (last 60 days)
-        historical = query_db("""
-            SELECT
-                date,
-                open,
-                high,
-                low,
-                close,
-                volume
-            FROM stock_prices
-            WHERE stock_id = (SELECT id FROM stocks WHERE symbol = %s)
-            ORDER BY date DESC
-            LIMIT 60
-        """, (symbol.upper(),))
-
-        if not historical:
-            return jsonify({
-                'success': False,
-                'error': f'No data found for {symbol}'
-            }), 404
+        # Serve the row written by the indicator batch job when it covers the latest bar
+        analysis = _get_precomputed_analysis(symbol.upper())
+
+        if analysis is None:
+            # Fall back to live computation on the last 60 days
+            historical = query_db(ANALYSIS_HISTORY, (symbol.upper(),))
+
+            if not historical:
+                return jsonify({
+                    'success': False,
+                    'error': f'No data found for {symbol}'
+                }), 404
 
-        # Reverse to get chronological order
-        historical = list(reversed(historical))
+            # Reverse to get chronological order
+            historical = list(reversed(historical))
 
-        # Compute technical analysis
-        analysis = _compute_technical_analysis(symbol, historical)
+            # Compute technical analysis
+            analysis = _compute_technical_analysis(symbol, historical)
 
+        _add_levels(analysis, _get_levels(symbol.upper()))
         return jsonify({
             'success': True,
             'symbol': symbol,
@@ -374,25 +807,8 @@ def get_top_gainers():
     """Get top gaining stocks"""
     limit = request.args.get('limit', default=10, type=int)
 
-    gainers = query_db("""
-        SELECT
-            s.symbol,
-            s.name,
-            sp.close as price,
-            (sp.close - sp.open) as change,
-            sp.change_percent,
-            sp.volume
-        FROM stocks s
-        JOIN LATERAL (
-            SELECT * FROM stock_prices
-            WHERE stock_id = s.id
-            ORDER BY date DESC
-            LIMIT 1
-        ) sp ON TRUE
-        WHERE s.is_active = TRUE AND sp.change_percent IS NOT NULL
-        ORDER BY sp.change_percent DESC
-        LIMIT %s;
-    """, (limit,))
+    snapshot = get_latest_snapshot()
+    gainers = [snapshot.row(i, MOVER_FIELDS) for i in snapshot.top('gainers', limit)]
 
     return jsonify({
         "success": True,
@@ -405,25 +821,8 @@ def get_top_losers():
     """Get top losing stocks"""
     limit = request.args.get('limit', default=10, type=int)
 
-    losers = query_db("""
-        SELECT
-            s.symbol,
-            s.name,
-            sp.close as price,
-            (sp.close - sp.open) as change,
-            sp.change_percent,
-            sp.volume
-        FROM stocks s
-        JOIN LATERAL (
-            SELECT * FROM stock_prices
-            WHERE stock_id = s.id
-            ORDER BY date DESC
-            LIMIT 1
-        ) sp ON TRUE
-        WHERE s.is_active = TRUE AND sp.change_percent IS NOT NULL
-        ORDER BY sp.change_percent ASC
-        LIMIT %s;
-    """, (limit,))
+    snapshot = get_latest_snapshot()
+    losers = [snapshot.row(i, MOVER_FIELDS) for i in snapshot.top('losers', limit)]
 
     return jsonify({
         "success": True,
@@ -436,24 +835,8 @@ def get_most_active():
     """Get most active stocks by volume"""
     limit = request.args.get('limit', default=10, type=int)
 
-    most_active = query_db("""
-        SELECT
-            s.symbol,
-            s.name,
-            sp.close as price,
-            sp.change_percent,
-            sp.volume
-        FROM stocks s
-        JOIN LATERAL (
-            SELECT * FROM stock_prices
-            WHERE stock_id = s.id
-            ORDER BY date DESC
-            LIMIT 1
-        ) sp ON TRUE
-        WHERE s.is_active = TRUE
-        ORDER BY sp.volume DESC
-        LIMIT %s;
-    """, (limit,))
+    snapshot = get_latest_snapshot()
+    most_active = [snapshot.row(i, MOST_ACTIVE_FIELDS) for i in snapshot.top('most_active', limit)]
 
     return jsonify({
         "success": True,
@@ -461,23 +844,40 @@ def get_most_active():
     })
 
 
+SEARCH_ROWS = """
+    SELECT symbol, name, exchange, sector
+    FROM stocks
+    WHERE is_active = TRUE;
+"""
+
+
+def get_search_index():
+    """Current stock search index, rebuilt lazily when the stocks table changes"""
+    global _search_index
+    version = get_stocks_version()
+    index = _search_index
+    if index is not None and index.version == version:
+        return index
+
+    with _search_index_lock:
+        # Another request may have rebuilt it while we waited
+        if _search_index is None or _search_index.version != version:
+            started = time.perf_counter()
+            rows = query_db(SEARCH_ROWS)
+            _search_index = StockSearchIndex(rows, version=version)
+            logger.info(f"Built search index: {len(rows)} stocks in {(time.perf_counter() - started) * 1000:.1f}ms")
+        return _search_index
+
+
 @stocks_bp.route('/api/search', methods=['GET'])
 def search_stocks():
-    """Search stocks by symbol or name"""
+    """Search stocks by symbol or name (diacritics optional: "sua" finds "Sữa")"""
     query = request.args.get('q', '').strip()
 
     if not query:
         return jsonify({"success": False, "error": "Query parameter 'q' is required"}), 400
 
-    stocks = query_db("""
-        SELECT symbol, name, exchange, sector
-        FROM stocks
-        WHERE (symbol ILIKE %s OR name ILIKE %s) AND is_active = TRUE
-        ORDER BY
-            CASE WHEN symbol ILIKE %s THEN 1 ELSE 2 END,
-            symbol
-        LIMIT 20;
-    """, (f'%{query}%', f'%{query}%', f'{query}%'))
+    stocks = get_search_index().search(query, limit=20)
 
     return jsonify({
         "success": True,
@@ -491,113 +891,178 @@ def search_stocks():
 # COMPATIBILITY ENDPOINTS (for frontend expecting JSON files)
 # ============================================================
 
+STOCK_CURRENT_JSON = statement('stock_current_json', """
+    SELECT
+        s.symbol,
+        sp.close as price,
+        (sp.close - sp.open) as change,
+        sp.change_percent,
+        sp.volume,
+        sp.high,
+        sp.low,
+        sp.open,
+        sp.date as timestamp
+    FROM stocks s
+    JOIN latest_quotes sp ON sp.stock_id = s.id
+    WHERE s.symbol = %s
+""")
+
+
+def _current_json(data):
+    """Format a typed STOCK_CURRENT_JSON row to match the old JSON structure"""
+    return {
+        "symbol": data['symbol'],
+        "price": data['price'] or 0,
+        "change": data['change'] or 0,
+        "change_percent": data['change_percent'] or 0,
+        "volume": data['volume'] or 0,
+        "high": data['high'] or 0,
+        "low": data['low'] or 0,
+        "open": data['open'] or 0,
+        "timestamp": data['timestamp'] or datetime.now().isoformat(),
+        "source": "PostgreSQL"
+    }
+
+
 @stocks_bp.route('/data/<symbol>_current.json', methods=['GET'])
 def get_current_json(symbol):
     """Get current price in JSON file format (compatibility endpoint)"""
-    data = query_db("""
-        SELECT
-            s.symbol,
-            sp.close as price,
-            (sp.close - sp.open) as change,
-            sp.change_percent,
-            sp.volume,
-            sp.high,
-            sp.low,
-            sp.open,
-            sp.date as timestamp
-        FROM stocks s
-        JOIN stock_prices sp ON s.id = sp.stock_id
-        WHERE s.symbol = %s
-        ORDER BY sp.date DESC
-        LIMIT 1;
-    """, (symbol.upper(),), one=True)
+    data = query_db(STOCK_CURRENT_JSON, (symbol.upper(),), one=True, typed=True)
 
     if data:
-        # Format to match old JSON structure
-        result = {
-            "symbol": data['symbol'],
-            "price": float(data['price']) if data['price'] else 0,
-            "change": float(data['change']) if data['change'] else 0,
-            "change_percent": float(data['change_percent']) if data['change_percent'] else 0,
-            "volume": int(data['volume']) if data['volume'] else 0,
-            "high": float(data['high']) if data['high'] else 0,
-            "low": float(data['low']) if data['low'] else 0,
-            "open": float(data['open']) if data['open'] else 0,
-            "timestamp": data['timestamp'].isoformat() if data['timestamp'] else datetime.now().isoformat(),
-            "source": "PostgreSQL"
-        }
-        return jsonify(result)
+        return jsonify(_current_json(data))
     else:
         return jsonify({"error": f"No data for {symbol}"}), 404
 
 
+FULL_HISTORY = """
+    SELECT
+        date,
+        open,
+        high,
+        low,
+        close,
+        volume,
+        (close - open) as change,
+        change_percent
+    FROM stocks s
+    JOIN stock_prices sp ON s.id = sp.stock_id
+    WHERE s.symbol = %s
+    ORDER BY date ASC;
+"""
+
+
+def _history_json_row(row):
+    """Format a typed FULL_HISTORY row to match the old JSON structure"""
+    return {
+        "date": row['date'] or '',
+        "open": row['open'] or 0,
+        "high": row['high'] or 0,
+        "low": row['low'] or 0,
+        "close": row['close'] or 0,
+        "price": row['close'] or 0,  # alias
+        "volume": row['volume'] or 0,
+        "change": row['change'] or 0,
+        "change_percent": row['change_percent'] or 0
+    }
+
+
+def _history_bars(args):
+    """
+    Most recent bars sent by the compact formats of the history file endpoint
+
+    Column layouts need every row before the first byte goes out, so unlike
+    the streamed JSON array they are bounded (?bars=, default and at most
+    BATCH_MAX_BARS).
+
+    Raises:
+        ValueError: Out-of-range bars
+    """
+    bars = args.get('bars', default=BATCH_MAX_BARS, type=int)
+    if not 1 <= bars <= BATCH_MAX_BARS:
+        raise ValueError(f'bars must be between 1 and {BATCH_MAX_BARS}')
+    return bars
+
+
 @stocks_bp.route('/data/<symbol>_history.json', methods=['GET'])
+@conditional_get()
 def get_history_json(symbol):
-    """Get historical prices in JSON file format (compatibility endpoint)"""
-    history = query_db("""
-        SELECT
-            date,
-            open,
-            high,
-            low,
-            close,
-            volume,
-            change,
-            change_percent
-        FROM stocks s
-        JOIN stock_prices sp ON s.id = sp.stock_id
-        WHERE s.symbol = %s
-        ORDER BY date ASC;
-    """, (symbol.upper(),))
-
-    if history:
-        # Format to match old JSON structure
-        result = []
-        for row in history:
-            result.append({
-                "date": row['date'].isoformat() if row['date'] else '',
-                "open": float(row['open']) if row['open'] else 0,
-                "high": float(row['high']) if row['high'] else 0,
-                "low": float(row['low']) if row['low'] else 0,
-                "close": float(row['close']) if row['close'] else 0,
-                "price": float(row['close']) if row['close'] else 0,  # alias
-                "volume": int(row['volume']) if row['volume'] else 0,
-                "change": float(row['change']) if row['change'] else 0,
-                "change_percent": float(row['change_percent']) if row['change_percent'] else 0
-            })
-        return jsonify(result)
-    else:
-        return jsonify([])
+    """
+    Get historical prices in JSON file format (compatibility endpoint)
+
+    The full history is streamed: rows are read from a server-side cursor
+    in chunks and written out as they arrive, so memory stays flat however
+    long the history is and the first bytes go out before the query ends.
+    ?format=columnar|binary returns the compact column formats instead,
+    limited to the most recent ?bars= bars (see _history_bars).
+    """
+    try:
+        response_format = _response_format(request.args)
+        bars = _history_bars(request.args) if response_format != 'json' else None
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    if response_format != 'json':
+        rows = query_db(BATCH_BARS, (None, None, bars, [symbol.upper()]))
+        columns = wire_format.columns_from_rows(rows, HISTORY_COLUMNS)
+        return _columnar_response(response_format, columns, symbol=symbol.upper())
+
+    dumps = current_app.json.dumps
+    chunks = stream_query(FULL_HISTORY, (symbol.upper(),), chunk_size=HISTORY_STREAM_CHUNK_ROWS, typed=True)
+
+    def generate():
+        # Format to match old JSON structure (typed rows: floats and ISO dates)
+        yield '['
+        separator = ''
+        try:
+            for rows in chunks:
+                body = dumps([_history_json_row(row) for row in rows])
+                yield separator + body[1:-1]
+                separator = ','
+        except Exception as e:
+            # Headers are already sent; a truncated array tells the client it failed
+            logger.error(f"Error streaming history for {symbol}: {e}", exc_info=True)
+            return
+        finally:
+            # Return the pooled connection now, also on errors and disconnects
+            chunks.close()
+        yield ']'
+
+    # Keep the request context for the replica choice and the slow-query log
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+STOCK_NAMES = """
+    SELECT symbol, name
+    FROM stocks
+    WHERE is_active = TRUE
+    ORDER BY symbol;
+"""
 
 
 @stocks_bp.route('/api/stock-names', methods=['GET'])
 @stocks_bp.route('/stock_names.json', methods=['GET'])
 def get_stock_names():
     """Get stock symbol to name mappings"""
-    stocks = query_db("""
-        SELECT symbol, name
-        FROM stocks
-        WHERE is_active = TRUE
-        ORDER BY symbol;
-    """)
+    stocks = cached_query('stock_list', STOCK_NAMES)
 
     # Convert to {symbol: name} dict
     result = {stock['symbol']: stock['name'] for stock in stocks}
     return jsonify(result)
 
 
-@stocks_bp.route('/api/stock-categories', methods=['GET'])
-def get_stock_categories():
-    """Get stock categories organized by sector"""
-    stocks = query_db("""
-        SELECT symbol, sector, category, exchange
-        FROM stocks
-        WHERE is_active = TRUE
-        AND symbol !~ '^[0-9]'  -- Exclude bonds/certificates
-        AND LENGTH(symbol) <= 5  -- Real stocks have 3-5 chars
-        ORDER BY symbol;
-    """)
+CATEGORY_ROWS = """
+    SELECT symbol, sector, category, exchange
+    FROM stocks
+    WHERE is_active = TRUE
+    AND symbol !~ '^[0-9]'  -- Exclude bonds/certificates
+    AND LENGTH(symbol) <= 5  -- Real stocks have 3-5 chars
+    ORDER BY symbol;
+"""
+
 
+def _categorize(stocks):
+    """Stock categories response body from CATEGORY_ROWS"""
     # Hardcoded category memberships (fallback when sector/category data missing)
     BLUE_CHIPS = {'VCB', 'VHM', 'VIC', 'VNM', 'HPG', 'GAS', 'MSN', 'TCB', 'VPB', 'MBB', 'BID', 'CTG', 'VRE', 'SAB', 'PLX', 'MWG', 'SSI', 'FPT', 'VJC', 'GVR', 'POW', 'VCI', 'NVL', 'HDB', 'TPB', 'HVN', 'PVD'}
     BANKS = {'VCB', 'TCB', 'MBB', 'VPB', 'CTG', 'BID', 'ACB', 'STB', 'HDB', 'TPB', 'VIB', 'MSB', 'SHB', 'EIB', 'LPB', 'OCB', 'VAB', 'VBB', 'BAB', 'BVB', 'NVB', 'PGB', 'SGB', 'ABB', 'NAB'}
@@ -663,9 +1128,16 @@ def get_stock_categories():
     all_symbols = [stock['symbol'] for stock in stocks if 'COPPER' not in stock['symbol'] and 'GOLD' not in stock['symbol'] and 'SILVER' not in stock['symbol']]
     categories['all'] = sorted(list(set(all_symbols)))
 
-    return jsonify({
+    return {
         'success': True,
         'categories': categories,
         'total': len(categories['all']),
         'total_stocks': len(categories['all'])
-    })
+    }
+
+
+@stocks_bp.route('/api/stock-categories', methods=['GET'])
+@cached('stock_list')
+def get_stock_categories():
+    """Get stock categories organized by sector"""
+    return jsonify(_categorize(query_db(CATEGORY_ROWS)))
@@ -1,23 +1,74 @@
 """
 System and utility endpoints.
-7 routes: /health, system-status, controls, jobs, activity-log
+11 routes: /health, /metrics, system-status, controls, jobs, activity-log, cache, db-pool
 """
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 from datetime import datetime
+import hmac
 
+from api import metrics
+from api.cache import cache
 from api.helpers import query_db
+from api.metrics import timed_execute
+from api.replicas import pin_primary
+from api.statements import statement
 import api.extensions as ext
+from config import CACHE_ADMIN_TOKEN
 
 system_bp = Blueprint('system', __name__)
 
+# Controls and job triggers are read back right after they are updated,
+# and health checks should report on the primary
+system_bp.before_request(pin_primary)
+
+
+STOCK_COUNT = "SELECT COUNT(*) as count FROM stocks;"
+ACTIVE_STOCK_COUNT = "SELECT COUNT(*) as count FROM stocks WHERE is_active = TRUE;"
+LATEST_STOCK_UPDATE = """
+    SELECT MAX(date) as latest_date, COUNT(*) as count
+    FROM latest_quotes
+    WHERE date = (SELECT MAX(date) FROM latest_quotes);
+"""
+LATEST_INDEX_UPDATE = """
+    SELECT MAX(date) as latest_date
+    FROM market_indices;
+"""
+LATEST_MACRO_UPDATE = """
+    SELECT MAX(date) as latest_date
+    FROM macro_indicators;
+"""
+# Scheduler heartbeat: collection/scheduler activity in the last hour
+SCHEDULER_ACTIVITY = """
+    SELECT COUNT(*) as count, MAX(timestamp) as last_seen
+    FROM activity_log
+    WHERE activity_type IN ('collection', 'scheduler')
+    AND timestamp > NOW() - INTERVAL '1 hour';
+"""
+CONTROLS = """
+    SELECT control_key, control_value, control_type, description, updated_at
+    FROM system_controls
+    ORDER BY control_type, control_key;
+"""
+ACTIVITY_BY_TYPE = """
+    SELECT * FROM activity_log
+    WHERE activity_type = %s
+    ORDER BY timestamp DESC
+    LIMIT %s;
+"""
+ACTIVITY = """
+    SELECT * FROM activity_log
+    ORDER BY timestamp DESC
+    LIMIT %s;
+"""
+
 
 @system_bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     try:
         # Test database connection
-        result = query_db("SELECT COUNT(*) as count FROM stocks;", one=True)
+        result = query_db(STOCK_COUNT, one=True)
         stock_count = result['count'] if result else 0
 
         return jsonify({
@@ -34,13 +85,16 @@ def health_check():
         }), 500
 
 
-@system_bp.route('/api/system-status', methods=['GET'])
-def system_status():
-    """Comprehensive system status check"""
-    import subprocess
-    import os
+@system_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request, query and connection pool metrics in the Prometheus text format"""
+    replica_stats = ext.replicas.stats() if ext.replicas is not None else None
+    return Response(metrics.render(ext.db_pool.stats(), replica_stats), mimetype='text/plain; version=0.0.4')
+
 
-    status = {
+def _new_status():
+    """System status body before any check has run"""
+    return {
         "timestamp": datetime.now().isoformat(),
         "api": {
             "status": "online",
@@ -65,42 +119,73 @@ def system_status():
         }
     }
 
+
+def _set_stock_count(status, stock_count):
+    status["database"]["stock_count"] = stock_count['count']
+    status["database"]["status"] = "connected"
+    status["database"]["message"] = f"{stock_count['count']} active stocks"
+
+
+# Latest-date query behind each data_collection.last_<kind>_update
+LATEST_UPDATES = (('stock', LATEST_STOCK_UPDATE), ('index', LATEST_INDEX_UPDATE), ('macro', LATEST_MACRO_UPDATE))
+
+
+def _set_latest_update(status, kind, latest):
+    """Record the latest date found for 'stock', 'index' or 'macro' data"""
+    if latest and latest['latest_date']:
+        status["data_collection"][f"last_{kind}_update"] = latest['latest_date'].isoformat()
+        if kind == 'stock':
+            status["data_collection"]["stock_count_today"] = latest['count']
+
+
+def _set_scheduler_activity(status, recent_activity):
+    """
+    Mark the scheduler running when it logged activity in the last hour
+
+    Returns:
+        False when there was no recent activity to go by
+    """
+    if recent_activity and recent_activity['count'] > 0:
+        status["scheduler"]["status"] = "running"
+        last_seen = recent_activity['last_seen']
+        minutes_ago = int((datetime.now() - last_seen).total_seconds() / 60) if last_seen else 0
+        status["scheduler"]["message"] = f"Last activity: {minutes_ago} minutes ago"
+        status["scheduler"]["pid"] = None  # Not available in Docker
+        return True
+    return False
+
+
+def _set_scheduler_idle(status, test):
+    if test:
+        status["scheduler"]["status"] = "running"
+        status["scheduler"]["message"] = "Scheduler idle (no jobs scheduled in last hour)"
+    else:
+        status["scheduler"]["status"] = "unknown"
+        status["scheduler"]["message"] = "Unable to verify scheduler status"
+
+
+def _set_overall(status):
+    overall_status = "healthy"
+    if status["database"]["status"] != "connected":
+        overall_status = "degraded"
+    if status["scheduler"]["status"] == "stopped":
+        overall_status = "warning"
+
+    status["overall"] = overall_status
+    return status
+
+
+@system_bp.route('/api/system-status', methods=['GET'])
+def system_status():
+    """Comprehensive system status check"""
+    status = _new_status()
+
     # Check database
     try:
-        stock_count = query_db("SELECT COUNT(*) as count FROM stocks WHERE is_active = TRUE;", one=True)
-        status["database"]["stock_count"] = stock_count['count']
-        status["database"]["status"] = "connected"
-        status["database"]["message"] = f"{stock_count['count']} active stocks"
-
-        # Get latest stock data
-        latest_stock = query_db("""
-            SELECT MAX(date) as latest_date, COUNT(*) as count
-            FROM stock_prices
-            WHERE date = (SELECT MAX(date) FROM stock_prices);
-        """, one=True)
-
-        if latest_stock and latest_stock['latest_date']:
-            status["data_collection"]["last_stock_update"] = latest_stock['latest_date'].isoformat()
-            status["data_collection"]["stock_count_today"] = latest_stock['count']
-
-        # Get latest index data
-        latest_index = query_db("""
-            SELECT MAX(date) as latest_date
-            FROM market_indices;
-        """, one=True)
-
-        if latest_index and latest_index['latest_date']:
-            status["data_collection"]["last_index_update"] = latest_index['latest_date'].isoformat()
-
-        # Get latest macro data
-        latest_macro = query_db("""
-            SELECT MAX(date) as latest_date
-            FROM macro_indicators;
-        """, one=True)
-
-        if latest_macro and latest_macro['latest_date']:
-            status["data_collection"]["last_macro_update"] = latest_macro['latest_date'].isoformat()
-
+        _set_stock_count(status, query_db(ACTIVE_STOCK_COUNT, one=True))
+        # Get latest stock, index and macro data
+        for kind, query in LATEST_UPDATES:
+            _set_latest_update(status, kind, query_db(query, one=True))
     except Exception as e:
         status["database"]["status"] = "error"
         status["database"]["message"] = str(e)
@@ -111,32 +196,13 @@ def system_status():
     try:
         # Check if scheduler has logged activity in the last 1 hour
         # (Scheduler runs jobs every 30-60 minutes, so 5 minutes is too short)
-        recent_activity = query_db("""
-            SELECT COUNT(*) as count, MAX(timestamp) as last_seen
-            FROM activity_log
-            WHERE activity_type IN ('collection', 'scheduler')
-            AND timestamp > NOW() - INTERVAL '1 hour';
-        """, one=True)
-
-        if recent_activity and recent_activity['count'] > 0:
-            status["scheduler"]["status"] = "running"
-            last_seen = recent_activity['last_seen']
-            minutes_ago = int((datetime.now() - last_seen).total_seconds() / 60) if last_seen else 0
-            status["scheduler"]["message"] = f"Last activity: {minutes_ago} minutes ago"
-            status["scheduler"]["pid"] = None  # Not available in Docker
-        else:
+        if not _set_scheduler_activity(status, query_db(SCHEDULER_ACTIVITY, one=True)):
             # No recent activity in last hour - scheduler may be idle or stopped
             # Since scheduler jobs run every 30-60 minutes, this could be normal
             # Check database connection to see if scheduler could potentially write logs
             try:
                 # If we can query the database, scheduler should be able to as well
-                test = query_db("SELECT 1 as test", one=True)
-                if test:
-                    status["scheduler"]["status"] = "running"
-                    status["scheduler"]["message"] = "Scheduler idle (no jobs scheduled in last hour)"
-                else:
-                    status["scheduler"]["status"] = "unknown"
-                    status["scheduler"]["message"] = "Unable to verify scheduler status"
+                _set_scheduler_idle(status, query_db("SELECT 1 as test", one=True))
             except:
                 status["scheduler"]["status"] = "unknown"
                 status["scheduler"]["message"] = "Unable to check scheduler status (database error)"
@@ -145,60 +211,53 @@ def system_status():
         status["scheduler"]["message"] = f"Cannot check scheduler status: {str(e)}"
 
     # Overall status
-    overall_status = "healthy"
-    if status["database"]["status"] != "connected":
-        overall_status = "degraded"
-    if status["scheduler"]["status"] == "stopped":
-        overall_status = "warning"
+    return jsonify(_set_overall(status))
 
-    status["overall"] = overall_status
 
-    return jsonify(status)
+def _controls_payload(controls):
+    """Controls response body, grouped by type"""
+    result = {
+        'settings': [],
+        'signals': [],
+        'states': []
+    }
+
+    for control in controls:
+        item = dict(control)
+        if control['control_type'] == 'setting':
+            result['settings'].append(item)
+        elif control['control_type'] == 'signal':
+            result['signals'].append(item)
+        elif control['control_type'] == 'state':
+            result['states'].append(item)
+
+    return {
+        "success": True,
+        **result,
+        "total": len(controls)
+    }
 
 
 @system_bp.route('/api/controls', methods=['GET'])
 def get_controls():
     """Get all system controls and settings"""
     try:
-        controls = query_db("""
-            SELECT control_key, control_value, control_type, description, updated_at
-            FROM system_controls
-            ORDER BY control_type, control_key;
-        """)
-
-        # Group by type
-        result = {
-            'settings': [],
-            'signals': [],
-            'states': []
-        }
-
-        for control in controls:
-            item = dict(control)
-            if control['control_type'] == 'setting':
-                result['settings'].append(item)
-            elif control['control_type'] == 'signal':
-                result['signals'].append(item)
-            elif control['control_type'] == 'state':
-                result['states'].append(item)
-
-        return jsonify({
-            "success": True,
-            **result,
-            "total": len(controls)
-        })
+        return jsonify(_controls_payload(query_db(CONTROLS)))
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+CONTROL_BY_KEY = statement('control_by_key', """
+    SELECT * FROM system_controls WHERE control_key = %s
+""")
+
+
 @system_bp.route('/api/controls/<key>', methods=['GET', 'PUT'])
 def manage_control(key):
     """Get or update a specific control"""
     try:
         if request.method == 'GET':
-            control = query_db("""
-                SELECT * FROM system_controls WHERE control_key = %s;
-            """, (key,), one=True)
+            control = query_db(CONTROL_BY_KEY, (key,), one=True)
 
             if control:
                 return jsonify({"success": True, **control})
@@ -215,7 +274,7 @@ def manage_control(key):
             conn = ext.db_pool.getconn()
             try:
                 with conn.cursor() as cursor:
-                    cursor.execute("""
+                    timed_execute(cursor, """
                         UPDATE system_controls
                         SET control_value = %s, updated_at = NOW()
                         WHERE control_key = %s
@@ -227,7 +286,7 @@ def manage_control(key):
 
                     if result:
                         # Log the change
-                        cursor.execute("""
+                        timed_execute(cursor, """
                             INSERT INTO activity_log (activity_type, activity, details, status)
                             VALUES ('system', 'Control updated', %s, 'info');
                         """, (f"Updated {key} to {new_value}",))
@@ -259,14 +318,14 @@ def trigger_job():
         try:
             with conn.cursor() as cursor:
                 # Set trigger signal
-                cursor.execute("""
+                timed_execute(cursor, """
                     UPDATE system_controls
                     SET control_value = 'true', updated_at = NOW()
                     WHERE control_key = %s;
                 """, (control_key,))
 
                 # Log the action
-                cursor.execute("""
+                timed_execute(cursor, """
                     INSERT INTO activity_log (activity_type, activity, details, status)
                     VALUES ('collection', 'Job triggered', %s, 'info');
                 """, (f'{job_type.capitalize()} collection job triggered from UI',))
@@ -293,18 +352,9 @@ def get_activity_log():
         activity_type = request.args.get('type', default=None, type=str)
 
         if activity_type:
-            logs = query_db("""
-                SELECT * FROM activity_log
-                WHERE activity_type = %s
-                ORDER BY timestamp DESC
-                LIMIT %s;
-            """, (activity_type, limit))
+            logs = query_db(ACTIVITY_BY_TYPE, (activity_type, limit))
         else:
-            logs = query_db("""
-                SELECT * FROM activity_log
-                ORDER BY timestamp DESC
-                LIMIT %s;
-            """, (limit,))
+            logs = query_db(ACTIVITY, (limit,))
 
         return jsonify({
             "success": True,
@@ -313,3 +363,60 @@ def get_activity_log():
         })
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
+
+
+@system_bp.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Get response/query cache statistics for this worker"""
+    return jsonify({
+        "success": True,
+        **cache.stats(),
+        "timestamp": datetime.now().isoformat()
+    })
+
+
+# Addresses allowed to invalidate caches when no CACHE_ADMIN_TOKEN is set
+LOOPBACK_ADDRESSES = ('127.0.0.1', '::1')
+
+
+def _cache_admin_allowed(req):
+    """
+    Whether a request may drop cache entries: it must carry the
+    CACHE_ADMIN_TOKEN bearer token, or come from loopback when no token is
+    configured (nginx also denies the route to public clients)
+    """
+    if CACHE_ADMIN_TOKEN is None:
+        return req.remote_addr in LOOPBACK_ADDRESSES
+    scheme, _, token = req.headers.get('Authorization', '').partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(token.encode(), CACHE_ADMIN_TOKEN.encode())
+
+
+@system_bp.route('/api/cache/invalidate', methods=['POST'])
+def invalidate_cache():
+    """Drop cached entries (one category, or everything when none is given)"""
+    if not _cache_admin_allowed(request):
+        return jsonify({"success": False, "error": "Forbidden"}), 403
+
+    data = request.get_json(silent=True) or {}
+    category = data.get('category')
+
+    if category is not None and category not in cache.ttls:
+        return jsonify({"success": False, "error": f"Unknown cache category: {category}"}), 400
+
+    removed = cache.invalidate(category)
+    return jsonify({
+        "success": True,
+        "category": category,
+        "removed": removed
+    })
+
+
+@system_bp.route('/api/db-pool/stats', methods=['GET'])
+def get_db_pool_stats():
+    """Get database connection pool gauges and checkout wait times for this worker"""
+    return jsonify({
+        "success": True,
+        **ext.db_pool.stats(),
+        "replicas": ext.replicas.stats() if ext.replicas is not None else None,
+        "timestamp": datetime.now().isoformat()
+    })
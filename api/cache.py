@@ -0,0 +1,324 @@
+"""
+Response and query cache for the API server.
+Entries expire after their category's CACHE_TTL, are evicted least recently
+used beyond CACHE_MAX_ENTRIES, and are dropped as soon as the data version
+their category depends on changes (collectors bump those versions).
+
+Misses are single-flight: concurrent requests for the same key wait for
+one computation instead of each running it. Within CACHE_STALE_TTL after
+expiry, the old value is served while that one computation refreshes it,
+and kept if the refresh fails.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+from api.data_version import get_indicator_version, get_price_version, get_stocks_version
+from api.helpers import query_db
+from api.statements import sql_text
+from config import CACHE_ENABLED, CACHE_MAX_ENTRIES, CACHE_STALE_TTL, CACHE_TTL
+
+# Data versions each category's entries were built from; any change makes
+# them stale without waiting for the TTL
+CATEGORY_SOURCES = {
+    'stock_list': (get_stocks_version,),
+    'stock_prices': (get_price_version,),
+    'indicators': (get_price_version, get_indicator_version),
+}
+
+# Query-string parameters that never change a response (cache busters)
+IGNORED_ARGS = ('_',)
+
+# Longest a request waits on another request's computation before running
+# its own
+FLIGHT_TIMEOUT = 30.0
+
+_MISSING = object()
+
+
+class _Flight:
+    """One in-progress computation that identical misses wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = _MISSING
+        self.error = None
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with per-category TTLs, versions and statistics"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttls=None, sources=None, stale_ttls=None):
+        """
+        Args:
+            max_entries: Entries kept across all categories
+            ttls: Category -> seconds (default: CACHE_TTL)
+            sources: Category -> data version callables (default: CATEGORY_SOURCES)
+            stale_ttls: Category -> seconds an expired entry may still be
+                        served while it is refreshed (default: CACHE_STALE_TTL)
+        """
+        self.max_entries = max_entries
+        self.ttls = CACHE_TTL if ttls is None else ttls
+        self.sources = CATEGORY_SOURCES if sources is None else sources
+        self.stale_ttls = CACHE_STALE_TTL if stale_ttls is None else stale_ttls
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _count(self, category, event, amount=1):
+        counters = self._stats.setdefault(category, {
+            'hits': 0, 'misses': 0, 'stale': 0, 'expired': 0, 'evictions': 0, 'invalidations': 0,
+            'stale_served': 0, 'coalesced': 0, 'errors': 0,
+        })
+        counters[event] += amount
+
+    def _version(self, category):
+        return tuple(source() for source in self.sources.get(category, ()))
+
+    def _lookup(self, category, key, version):
+        """
+        Fresh and stale values of one entry (lock held)
+
+        Entries from an older data version, or past their stale window, are
+        removed. An expired entry of the current version is kept as the
+        stale value for its category's stale window.
+        """
+        entry = self._entries.get((category, key))
+        if entry is None:
+            return _MISSING, _MISSING
+
+        value, expires_at, entry_version = entry
+        now = time.monotonic()
+        if entry_version == version:
+            if expires_at > now:
+                self._entries.move_to_end((category, key))
+                return value, _MISSING
+            if expires_at + self.stale_ttls.get(category, 0) > now:
+                return _MISSING, value
+
+        del self._entries[(category, key)]
+        self._count(category, 'stale' if entry_version != version else 'expired')
+        return _MISSING, _MISSING
+
+    def get(self, category, key, default=None):
+        """
+        Look up an entry
+
+        Returns:
+            The cached value, or default when missing, expired or stale
+        """
+        version = self._version(category)
+        with self._lock:
+            value, _ = self._lookup(category, key, version)
+            if value is _MISSING:
+                self._count(category, 'misses')
+                return default
+            self._count(category, 'hits')
+            return value
+
+    def set(self, category, key, value, version=None):
+        """Store an entry for the category's TTL"""
+        if category not in self.ttls:
+            raise ValueError(f"Unknown cache category: {category}")
+
+        version = self._version(category) if version is None else version
+        expires_at = time.monotonic() + self.ttls[category]
+        with self._lock:
+            self._entries[(category, key)] = (value, expires_at, version)
+            self._entries.move_to_end((category, key))
+            while len(self._entries) > self.max_entries:
+                (evicted, _), _ = self._entries.popitem(last=False)
+                self._count(evicted, 'evictions')
+
+    def get_or_compute(self, category, key, compute, cacheable=None):
+        """
+        Cached value, computing it at most once across concurrent misses
+
+        The first request to miss runs compute(); identical requests
+        arriving meanwhile are given the expired value when one is still
+        within the stale window, and otherwise wait for the result.
+
+        Args:
+            category: Cache category
+            key: Key within the category
+            compute: Callable producing the value
+            cacheable: Optional predicate; values it rejects are handed to
+                       the waiting requests but not stored
+
+        Returns:
+            The cached or computed value
+        """
+        version = self._version(category)
+        with self._lock:
+            value, stale = self._lookup(category, key, version)
+            if value is not _MISSING:
+                self._count(category, 'hits')
+                return value
+
+            flight = self._flights.get((category, key))
+            if flight is not None and stale is not _MISSING:
+                self._count(category, 'stale_served')
+                return stale
+            leader = flight is None
+            if leader:
+                flight = self._flights[(category, key)] = _Flight()
+                self._count(category, 'misses')
+            else:
+                self._count(category, 'coalesced')
+
+        if not leader:
+            flight.done.wait(FLIGHT_TIMEOUT)
+            if flight.error is not None:
+                raise flight.error
+            if flight.value is not _MISSING:
+                return flight.value
+            # The computation is taking too long: run our own
+            return compute()
+
+        try:
+            value = compute()
+        except Exception as e:
+            with self._lock:
+                self._count(category, 'errors')
+            if stale is not _MISSING:
+                # Keep serving the last good value while the source is failing
+                flight.value = stale
+                return stale
+            flight.error = e
+            raise
+        else:
+            flight.value = value
+            if cacheable is None or cacheable(value):
+                self.set(category, key, value, version)
+            return value
+        finally:
+            with self._lock:
+                self._flights.pop((category, key), None)
+            flight.done.set()
+
+    def invalidate(self, category=None, key=None):
+        """
+        Drop entries
+
+        Args:
+            category: Category to clear (None clears everything)
+            key: Single key within the category
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            if key is not None:
+                removed = [(category, key)] if (category, key) in self._entries else []
+            else:
+                removed = [k for k in self._entries if category is None or k[0] == category]
+            for entry_key in removed:
+                del self._entries[entry_key]
+                self._count(entry_key[0], 'invalidations')
+            return len(removed)
+
+    def stats(self):
+        """Entry counts and hit/miss/eviction counters per category"""
+        with self._lock:
+            entries = {}
+            for category, _ in self._entries:
+                entries[category] = entries.get(category, 0) + 1
+
+            categories = {}
+            for category in sorted(set(self._stats) | set(entries)):
+                counters = dict(self._stats.get(category, {}))
+                served = counters.get('hits', 0) + counters.get('stale_served', 0)
+                lookups = served + counters.get('misses', 0) + counters.get('coalesced', 0)
+                counters['entries'] = entries.get(category, 0)
+                counters['ttl'] = self.ttls.get(category)
+                counters['stale_ttl'] = self.stale_ttls.get(category)
+                counters['hit_rate'] = round(served / lookups, 4) if lookups else None
+                categories[category] = counters
+
+            return {
+                'enabled': CACHE_ENABLED,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'in_flight': len(self._flights),
+                'categories': categories,
+            }
+
+
+# Shared by every blueprint in this worker
+cache = ResponseCache()
+
+
+def invalidate(category=None):
+    """Invalidation hook: drop one category (or everything) from this worker's cache"""
+    return cache.invalidate(category)
+
+
+def get_or_compute(category, key, compute, cacheable=None):
+    """Single-flight cached value from this worker's cache (see ResponseCache.get_or_compute)"""
+    if not CACHE_ENABLED:
+        return compute()
+    return cache.get_or_compute(category, key, compute, cacheable)
+
+
+def _request_key(req):
+    """Route path plus sorted query arguments, ignoring cache busters"""
+    args = tuple(sorted(
+        (name, value.strip())
+        for name, values in req.args.lists() if name not in IGNORED_ARGS
+        for value in values
+    ))
+    return req.path, args
+
+
+def cached(category):
+    """
+    Cache a route's successful responses
+
+    Keyed by path and normalized query arguments. Responses are buffered;
+    only 200 responses are stored, but concurrent identical requests share
+    whatever the one computing request produced.
+
+    Args:
+        category: CACHE_TTL category of the data the route serves
+    """
+    if category not in CACHE_TTL:
+        raise ValueError(f"Unknown cache category: {category}")
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not CACHE_ENABLED:
+                return view(*args, **kwargs)
+
+            def render():
+                response = make_response(view(*args, **kwargs))
+                return response.get_data(), response.status_code, response.content_type
+
+            body, status, content_type = cache.get_or_compute(
+                category, _request_key(request), render, cacheable=lambda result: result[1] == 200)
+            return current_app.response_class(body, status=status, content_type=content_type)
+        return wrapper
+    return decorator
+
+
+def cached_query(category, query, args=(), one=False, typed=False):
+    """
+    query_db through the cache
+
+    Keyed by the whitespace-normalized SQL and its arguments. Results are
+    shared between requests and must not be modified.
+
+    Args:
+        category: CACHE_TTL category of the data the query reads
+        query, args, one, typed: As for query_db (query may be a Statement)
+    """
+    if not CACHE_ENABLED:
+        return query_db(query, args, one=one, typed=typed)
+
+    key = (' '.join(sql_text(query).split()), repr(args), one, typed)
+    return cache.get_or_compute(category, key, lambda: query_db(query, args, one=one, typed=typed))
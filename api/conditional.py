@@ -0,0 +1,83 @@
+"""
+Conditional GET support for price-derived endpoints.
+Validators come from the price data version, so a client (or nginx) holding
+the current payload gets a 304 before the view runs any query.
+"""
+
+import hashlib
+from functools import wraps
+
+from flask import make_response, request
+
+from api.data_version import get_price_validators
+from config import HTTP_CACHE
+
+
+def _etag(version, req):
+    """Strong ETag for the request's URL (path + query string) at a data version"""
+    digest = hashlib.sha1(f"{version}|{req.full_path}".encode('utf-8')).hexdigest()
+    return digest[:20]
+
+
+def _not_modified(req, etag, modified):
+    """Whether the request's validators still match (If-None-Match wins)"""
+    if req.if_none_match:
+        # Accept weak forms: nginx weakens ETags when it gzips a response
+        return req.if_none_match.contains_weak(etag)
+    if req.if_modified_since and modified is not None:
+        return req.if_modified_since >= modified.replace(microsecond=0)
+    return False
+
+
+def _cache_control(closed):
+    """Long-lived for closed historical ranges, revalidate-always otherwise"""
+    if closed:
+        return f"public, max-age={HTTP_CACHE['closed_range_max_age']}"
+    return 'public, no-cache'
+
+
+def _set_validators(response, etag, modified, closed):
+    """Add the ETag, Last-Modified and Cache-Control headers to a 200/304 response"""
+    response.set_etag(etag)
+    if modified is not None:
+        response.last_modified = modified
+    response.headers['Cache-Control'] = _cache_control(closed)
+    return response
+
+
+def conditional_get(closed=None, versions=()):
+    """
+    Decorate a view with ETag/Last-Modified validators
+
+    Matching If-None-Match / If-Modified-Since requests are answered with
+    304 without calling the view. Successful responses carry the validators
+    and a Cache-Control header.
+
+    Args:
+        closed: Optional callable(validators, **view_kwargs) -> bool telling
+                whether the request covers a closed date range that new
+                collections can no longer change
+        versions: Extra version getters (e.g. get_indicator_version) for
+                  views that also serve other derived data; each version is
+                  hashed into the ETag. Last-Modified only follows prices, so
+                  these views are validated by ETag alone
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            validators = get_price_validators()
+            version = '|'.join([validators['version'], *(get() for get in versions)])
+            etag = _etag(version, request)
+            modified = None if versions else validators['modified']
+            is_closed = bool(closed and closed(validators, **kwargs))
+
+            if _not_modified(request, etag, modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            return _set_validators(response, etag, modified, is_closed)
+        return wrapper
+    return decorator
@@ -0,0 +1,139 @@
+"""
+Price data version tracking.
+Lets in-memory caches notice when the collectors have written new prices
+without re-reading stock_prices on every request.
+"""
+
+import threading
+import time
+
+from api.helpers import query_db
+from api.statements import statement
+from config import REFRESH_INTERVALS
+
+# system_controls row bumped by the stock collector on every price upsert
+PRICE_VERSION_KEY = 'data.stock_prices.version'
+
+# system_controls row bumped by jobs/compute_indicators.py after each run
+INDICATOR_VERSION_KEY = 'data.technical_indicators.version'
+
+# Read on every throttled version check, so prepared once per connection
+DATA_VERSION = statement('data_version', """
+    SELECT
+        (SELECT control_value FROM system_controls WHERE control_key = %s) AS counter,
+        (SELECT updated_at::timestamptz FROM system_controls WHERE control_key = %s) AS modified,
+        (SELECT MAX(date) FROM latest_quotes) AS last_date,
+        (SELECT control_value FROM system_controls WHERE control_key = %s) AS indicator_counter
+""")
+DATA_VERSION_ARGS = (PRICE_VERSION_KEY, PRICE_VERSION_KEY, INDICATOR_VERSION_KEY)
+
+_lock = threading.Lock()
+_cached = {'version': None, 'last_date': None, 'modified': None, 'indicator_version': None, 'checked_at': 0.0}
+
+
+def _refresh(force=False):
+    """Re-read the version row when the throttle interval has passed"""
+    now = time.monotonic()
+    with _lock:
+        if not force and _cached['version'] is not None \
+                and now - _cached['checked_at'] < REFRESH_INTERVALS['data_version']:
+            return dict(_cached)
+
+        row = query_db(DATA_VERSION, DATA_VERSION_ARGS, one=True)
+        _cached.update(price_state(row), checked_at=now)
+        return dict(_cached)
+
+
+def price_state(row):
+    """Price/indicator versions and validators from a DATA_VERSION row"""
+    return {
+        'version': f"{row['counter'] or 0}:{row['last_date'] or ''}",
+        'last_date': row['last_date'],
+        'modified': row['modified'],
+        'indicator_version': row['indicator_counter'] or '0',
+    }
+
+
+def get_price_version(force=False):
+    """
+    Get the current price data version
+
+    The version combines the collector's write counter with the latest
+    price date, so it changes on intraday re-collection as well as on a
+    new trading day. The database is consulted at most once every
+    REFRESH_INTERVALS['data_version'] seconds per process.
+
+    Args:
+        force: Skip the throttle and re-read the version now
+
+    Returns:
+        Opaque version string
+    """
+    return _refresh(force)['version']
+
+
+def get_indicator_version(force=False):
+    """
+    Get the precomputed-indicator version (bumped by compute_indicators)
+
+    Read together with the price version, so it costs no extra query.
+
+    Args:
+        force: Skip the throttle and re-read the version now
+
+    Returns:
+        Opaque version string
+    """
+    return _refresh(force)['indicator_version']
+
+
+def get_price_validators(force=False):
+    """
+    Get the version together with the data it is derived from
+
+    Returns:
+        Dictionary with 'version', 'last_date' (latest price date) and
+        'modified' (aware datetime of the last collector write, or None
+        before the first one)
+    """
+    state = _refresh(force)
+    return {key: state[key] for key in ('version', 'last_date', 'modified')}
+
+
+STOCKS_VERSION = statement('stocks_version', """
+    SELECT COUNT(*) AS total, MAX(id) AS max_id, MAX(updated_at) AS modified
+    FROM stocks
+""")
+
+_stocks_cached = {'version': None, 'checked_at': 0.0}
+
+
+def stocks_version(row):
+    """Stock-list version string from a STOCKS_VERSION row"""
+    return f"{row['total']}:{row['max_id'] or 0}:{row['modified'] or ''}"
+
+
+def get_stocks_version(force=False):
+    """
+    Get a version of the stocks table (listings, names, exchanges)
+
+    Changes whenever a stock is added, removed or updated (the
+    update_stocks_updated_at trigger bumps updated_at). Throttled like
+    get_price_version().
+
+    Args:
+        force: Skip the throttle and re-read the version now
+
+    Returns:
+        Opaque version string
+    """
+    now = time.monotonic()
+    with _lock:
+        if not force and _stocks_cached['version'] is not None \
+                and now - _stocks_cached['checked_at'] < REFRESH_INTERVALS['data_version']:
+            return _stocks_cached['version']
+
+        row = query_db(STOCKS_VERSION, one=True)
+        _stocks_cached['version'] = stocks_version(row)
+        _stocks_cached['checked_at'] = now
+        return _stocks_cached['version']
@@ -8,6 +8,12 @@ import threading
 # Database connection pool (initialized in create_app)
 db_pool = None
 
+# Read replicas (api.replicas.ReplicaSet; None when DB_REPLICA_HOSTS is unset)
+replicas = None
+
+# asyncpg pool of the ASGI app (api.aio.db.AsyncPool, opened when it starts serving)
+async_db_pool = None
+
 # In-memory session storage
 active_sessions = {}  # session_id: session_data
 recent_activity = []  # List of recent page views and actions
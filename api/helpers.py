@@ -3,38 +3,204 @@ Database query helpers and session management functions.
 """
 
 from datetime import datetime
-from flask import request
+from flask import has_app_context, request
+from psycopg2 import extensions
 from psycopg2.extras import RealDictCursor
+import time
 import uuid
 
 import api.extensions as ext
+from api import statements
+from api.metrics import observe_prepare, observe_query, observe_query_error, track_query
+from api.replicas import FAILOVER_ERRORS, pin_primary, pinned_to_primary
+from api.statements import Statement, sql_text
 from api.extensions import (
     active_sessions, recent_activity,
     activity_lock, SESSION_TIMEOUT
 )
 
 
-def query_db(query, args=(), one=False):
-    """Execute query and return results"""
-    conn = ext.db_pool.getconn()
+# Typecasters for typed fetches: NUMERIC as float, DATE as its ISO string
+FLOAT_NUMERIC = extensions.new_type(
+    extensions.DECIMAL.values, 'FLOAT_NUMERIC',
+    lambda value, cursor: float(value) if value is not None else None)
+ISO_DATE = extensions.new_type(
+    extensions.DATE.values, 'ISO_DATE',
+    lambda value, cursor: value)
+
+
+def _typed(cursor):
+    """Register the typed-fetch casters on one cursor (the connection is untouched)"""
+    extensions.register_type(FLOAT_NUMERIC, cursor)
+    extensions.register_type(ISO_DATE, cursor)
+    return cursor
+
+
+def _is_write(query):
+    return sql_text(query).lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE'))
+
+
+def _read_replica(query, primary):
+    """
+    Replica to run a statement on, or None for the primary
+
+    A write pins the rest of the request to the primary, so later reads
+    see it.
+    """
+    if _is_write(query):
+        if has_app_context():
+            pin_primary()
+        return None
+    if primary or ext.replicas is None or pinned_to_primary():
+        return None
+    return ext.replicas.choose()
+
+
+def _run_query(pool, query, args, one, typed):
+    name = query.name if isinstance(query, Statement) else None
+    conn = pool.getconn()
     try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-            cursor.execute(query, args)
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor, \
+                track_query(sql_text(query), name) as record:
+            if typed:
+                _typed(cursor)
+            if name is None:
+                cursor.execute(query, args)
+            elif statements.execute(cursor, query, args):
+                observe_prepare(name)
             # Commit for INSERT/UPDATE/DELETE queries
-            if query.strip().upper().startswith(('INSERT', 'UPDATE', 'DELETE')):
+            if _is_write(query):
                 conn.commit()
+                record.rows = max(cursor.rowcount, 0)
                 return None
             # Fetch results for SELECT queries
             if one:
-                return cursor.fetchone()
-            return cursor.fetchall()
+                row = cursor.fetchone()
+                record.rows = 1 if row is not None else 0
+                return row
+            rows = cursor.fetchall()
+            record.rows = len(rows)
+            return rows
+    finally:
+        pool.putconn(conn)
+
+
+def query_db(query, args=(), one=False, typed=False, primary=False):
+    """
+    Execute query and return results
+
+    query is SQL text or a registered Statement (see api/statements.py),
+    which runs as a prepared statement.
+
+    With typed=True, NUMERIC columns arrive as float and DATE columns as
+    'YYYY-MM-DD' strings, ready to serialize without a per-row conversion.
+
+    SELECTs run on a read replica when one is configured and healthy
+    (see api/replicas.py), falling back to the primary if the replica
+    fails; primary=True keeps a read on the primary.
+    """
+    replica = _read_replica(query, primary)
+    if replica is not None:
+        try:
+            return _run_query(replica.pool, query, args, one, typed)
+        except FAILOVER_ERRORS as e:
+            ext.replicas.mark_failed(replica, e)
+    return _run_query(ext.db_pool, query, args, one, typed)
+
+
+def _open_stream(pool, query, args, chunk_size, typed):
+    """
+    Check out a connection, open a named cursor and fetch the first chunk
+
+    Connection failures surface here rather than mid-response, so the
+    caller can still fail over. The connection goes back to the pool if
+    any step raises.
+
+    Returns:
+        (conn, cursor, first rows, database seconds)
+    """
+    conn = pool.getconn()
+    try:
+        cursor = conn.cursor(name=f"stream_{uuid.uuid4().hex}", cursor_factory=RealDictCursor)
+        cursor.itersize = chunk_size
+        if typed:
+            _typed(cursor)
+        started = time.perf_counter()
+        cursor.execute(query, args)
+        rows = cursor.fetchmany(chunk_size)
+        return conn, cursor, rows, time.perf_counter() - started
+    except Exception:
+        pool.putconn(conn)
+        raise
+
+
+def stream_query(query, args=(), chunk_size=2000, typed=False):
+    """
+    Execute a SELECT through a named server-side cursor and yield its rows
+    in chunks, so large results are never held in memory at once
+
+    The pooled connection stays checked out until the generator is exhausted
+    or closed (e.g. when a streaming response's client disconnects). Runs
+    on a read replica like query_db; a replica that fails before the first
+    chunk is read falls back to the primary, so no rows are ever mixed from
+    two servers.
+
+    Replica choice (pinned_to_primary) and the slow-query log read the
+    request context, so streamed responses must iterate it inside one
+    (flask.stream_with_context).
+
+    Args:
+        query: SELECT statement
+        args: Query parameters
+        chunk_size: Rows fetched from the server per round trip
+        typed: Fetch NUMERIC as float and DATE as ISO strings (see query_db)
+
+    Yields:
+        Lists of up to chunk_size RealDictRows
+    """
+    pool = ext.db_pool
+    stream = None
+    replica = _read_replica(query, False)
+    try:
+        if replica is not None:
+            try:
+                stream = _open_stream(replica.pool, query, args, chunk_size, typed)
+                pool = replica.pool
+            except FAILOVER_ERRORS as e:
+                ext.replicas.mark_failed(replica, e)
+        if stream is None:
+            stream = _open_stream(pool, query, args, chunk_size, typed)
+    except Exception:
+        observe_query_error(query)
+        raise
+    conn, cursor, rows, elapsed = stream
+
+    # Database time only, not the time the consumer spends between chunks
+    total = 0
+    try:
+        while rows:
+            total += len(rows)
+            yield rows
+            started = time.perf_counter()
+            rows = cursor.fetchmany(chunk_size)
+            elapsed += time.perf_counter() - started
+        observe_query(query, elapsed, total)
+    except Exception:
+        observe_query_error(query)
+        raise
     finally:
-        ext.db_pool.putconn(conn)
+        # Named cursors live inside a transaction; putconn rolls it back
+        # (or discards a broken connection) before pooling
+        pool.putconn(conn)
+
 
+def get_or_create_session(req=None):
+    """Get existing session or create new one
 
-def get_or_create_session():
-    """Get existing session or create new one"""
-    session_id = request.cookies.get('session_id')
+    req is the current request (default: Flask's; the async app passes its own)
+    """
+    req = request if req is None else req
+    session_id = req.cookies.get('session_id')
 
     if not session_id or session_id not in active_sessions:
         session_id = str(uuid.uuid4())
@@ -43,8 +209,8 @@ def get_or_create_session():
                 'id': session_id,
                 'created_at': datetime.now().isoformat(),
                 'last_seen': datetime.now().isoformat(),
-                'ip_address': request.remote_addr,
-                'user_agent': request.headers.get('User-Agent', 'Unknown'),
+                'ip_address': req.remote_addr,
+                'user_agent': req.headers.get('User-Agent', 'Unknown'),
                 'page_views': 0,
                 'actions': [],
                 'current_page': None
@@ -57,8 +223,9 @@ def get_or_create_session():
     return session_id
 
 
-def log_activity(session_id, activity_type, page=None, details=None):
-    """Log user activity"""
+def log_activity(session_id, activity_type, page=None, details=None, req=None):
+    """Log user activity (req as for get_or_create_session)"""
+    req = request if req is None else req
     with activity_lock:
         activity = {
             'session_id': session_id,
@@ -66,7 +233,7 @@ def log_activity(session_id, activity_type, page=None, details=None):
             'type': activity_type,
             'page': page,
             'details': details,
-            'ip': request.remote_addr
+            'ip': req.remote_addr
         }
         recent_activity.append(activity)
 
@@ -0,0 +1,343 @@
+"""
+Request and query instrumentation for the API server.
+Per-route and per-statement latency histograms, row and error counters and
+connection pool wait times, rendered in the Prometheus text format at
+/metrics. Statements are grouped by fingerprint (literals and parameters
+replaced by ?), and those slower than SLOW_QUERY_MS are logged.
+
+Metrics are kept per worker process; scrape each worker (or the single
+process) directly. Recording an observation is a dict lookup and a short
+locked update, so instrumentation stays on in production.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import lru_cache
+
+from flask import has_request_context, request
+
+from config import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Distinct statements tracked; any beyond are counted under 'other'
+MAX_STATEMENTS = 500
+
+PREFIX = 'vnstock_'
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_LITERALS = re.compile(r"'(?:[^']|'')*'|%\(\w+\)s|%s|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROWS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(query):
+    """
+    Normalize a statement so executions differing only in values group together
+
+    Args:
+        query: SQL text, with or without parameter placeholders
+
+    Returns:
+        Single-line SQL with literals and placeholders as ?, and value
+        lists / multi-row VALUES collapsed to (...)
+    """
+    text = _LITERALS.sub('?', _COMMENTS.sub(' ', query))
+    text = _ROWS.sub('(...)', _LISTS.sub('(...)', text))
+    return ' '.join(text.split()).rstrip(';').strip()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = PREFIX + name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labels, labels)} {_number(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = PREFIX + name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}  # labels -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            series = {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+        for labels, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == '+Inf' else f'le="{bound:g}"'
+                yield f"{self.name}_bucket{_labels(self.labels, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labels, labels)} {cumulative}"
+
+
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'Time to produce a response, by route', ('route', 'method'))
+REQUESTS = Counter(
+    'http_requests_total', 'Responses by route and status', ('route', 'method', 'status'))
+QUERY_SECONDS = Histogram(
+    'db_query_duration_seconds', 'Statement execution and fetch time, by fingerprint', ('query',))
+QUERY_ROWS = Counter(
+    'db_query_rows_total', 'Rows returned or affected, by fingerprint', ('query',))
+QUERY_ERRORS = Counter(
+    'db_query_errors_total', 'Statements that raised, by fingerprint', ('query',))
+POOL_WAIT_SECONDS = Histogram(
+    'db_pool_wait_seconds', 'Time waiting to check out a database connection')
+SLOW_QUERIES = Counter(
+    'db_slow_queries_total', 'Statements slower than SLOW_QUERY_MS', ('query',))
+PREPARES = Counter(
+    'db_statements_prepared_total', 'PREPAREs of registered statements on pooled connections', ('query',))
+
+ALL_METRICS = (REQUEST_SECONDS, REQUESTS, QUERY_SECONDS, QUERY_ROWS, QUERY_ERRORS,
+               SLOW_QUERIES, PREPARES, POOL_WAIT_SECONDS)
+
+# Statement id (label value) -> fingerprint, for vnstock_db_statement_info
+_statements = {}
+_statements_lock = threading.Lock()
+
+
+@lru_cache(maxsize=2048)
+def statement_id(query, name=None):
+    """
+    Short, stable label for a statement's fingerprint
+
+    Args:
+        query: SQL text
+        name: Registered statement name to use as the label (see api/statements.py)
+
+    Returns:
+        The name, 12 hex digits, or 'other' once MAX_STATEMENTS distinct
+        fingerprints have been seen
+    """
+    text = fingerprint(query)
+    digest = name or hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+    with _statements_lock:
+        if digest not in _statements:
+            if len(_statements) >= MAX_STATEMENTS:
+                return 'other'
+            _statements[digest] = text
+    return digest
+
+
+class _QueryRecord:
+    """Rows and elapsed time of one tracked statement"""
+
+    def __init__(self):
+        self.rows = 0
+        self.seconds = 0.0
+
+
+@contextmanager
+def track_query(query, name=None):
+    """
+    Time one statement: its latency, rows and errors are recorded under
+    the statement's name, or else its fingerprint
+
+    Set .rows on the yielded record. Statements over SLOW_QUERY_MS are
+    logged along with the request path they ran for.
+    """
+    record = _QueryRecord()
+    if not METRICS['enabled']:
+        yield record
+        return
+
+    started = time.perf_counter()
+    try:
+        yield record
+    except Exception:
+        observe_query_error(query, name)
+        raise
+    finally:
+        record.seconds += time.perf_counter() - started
+    observe_query(query, record.seconds, record.rows, name)
+
+
+def observe_query(query, seconds, rows=0, name=None):
+    """Record a statement executed outside track_query (e.g. a streamed result)"""
+    if not METRICS['enabled']:
+        return
+    labels = (statement_id(query, name),)
+    QUERY_SECONDS.observe(seconds, labels)
+    if rows:
+        QUERY_ROWS.inc(labels, rows)
+
+    slow_ms = METRICS['slow_query_ms']
+    if slow_ms and seconds * 1000 >= slow_ms:
+        SLOW_QUERIES.inc(labels)
+        path = request.path if has_request_context() else '-'
+        logger.warning("Slow query %.0f ms, %d rows, %s [%s]: %s",
+                       seconds * 1000, rows, path, labels[0], fingerprint(query))
+
+
+def observe_query_error(query, name=None):
+    """Count a statement that raised"""
+    if METRICS['enabled']:
+        QUERY_ERRORS.inc((statement_id(query, name),))
+
+
+def observe_prepare(name):
+    """Count a registered statement being prepared on a connection"""
+    if METRICS['enabled']:
+        PREPARES.inc((name,))
+
+
+def timed_execute(cursor, query, args=None):
+    """cursor.execute() recorded as one statement (rows = cursor.rowcount)"""
+    with track_query(query) as record:
+        cursor.execute(query, args)
+        record.rows = max(cursor.rowcount, 0)
+    return cursor
+
+
+def observe_pool_wait(seconds):
+    """Pool checkout hook (see api.pool.ConnectionPool.on_checkout)"""
+    if METRICS['enabled']:
+        POOL_WAIT_SECONDS.observe(seconds)
+
+
+def start_request():
+    """before_request hook: note when the request started"""
+    request.metrics_started = time.perf_counter()
+
+
+def observe_request(url_rule, method, status, seconds):
+    """Record one request's latency and status under its route rule"""
+    if METRICS['enabled']:
+        route = url_rule.rule if url_rule is not None else '<unmatched>'
+        REQUEST_SECONDS.observe(seconds, (route, method))
+        REQUESTS.inc((route, method, str(status)))
+
+
+def finish_request(response):
+    """after_request hook: record the route's latency and status"""
+    started = getattr(request, 'metrics_started', None)
+    if started is not None:
+        observe_request(request.url_rule, request.method, response.status_code,
+                        time.perf_counter() - started)
+    return response
+
+
+def _pool_samples(pool_stats):
+    gauges = [
+        ('db_pool_connections', 'gauge', 'Open connections by state',
+         [('{state="in_use"}', pool_stats['in_use']), ('{state="idle"}', pool_stats['idle'])]),
+        ('db_pool_max_connections', 'gauge', 'Pool size limit', [('', pool_stats['max_connections'])]),
+        ('db_pool_waiting', 'gauge', 'Requests waiting for a connection', [('', pool_stats['waiting'])]),
+        ('db_pool_timeouts_total', 'counter', 'Checkouts that timed out', [('', pool_stats['timeouts'])]),
+        ('db_pool_connections_created_total', 'counter', 'Connections opened', [('', pool_stats['created'])]),
+        ('db_pool_connections_closed_total', 'counter', 'Connections closed by reason', [
+            (f'{{reason="{reason}"}}', pool_stats[f'closed_{reason}'])
+            for reason in ('broken', 'lifetime', 'idle') if f'closed_{reason}' in pool_stats]),
+    ]
+    for name, kind, help_text, samples in gauges:
+        yield f"# HELP {PREFIX}{name} {help_text}"
+        yield f"# TYPE {PREFIX}{name} {kind}"
+        for labels, value in samples:
+            yield f"{PREFIX}{name}{labels} {_number(value)}"
+
+
+def _replica_samples(replica_stats):
+    series = [
+        ('db_replica_up', 'gauge', 'Whether the replica passed its last health/lag probe',
+         lambda r: 1 if r['healthy'] else 0),
+        ('db_replica_lag_seconds', 'gauge', 'Replication lag at the last probe',
+         lambda r: r['lag_seconds']),
+        ('db_replica_reads_total', 'counter', 'Reads routed to the replica', lambda r: r['reads']),
+        ('db_replica_failures_total', 'counter', 'Reads that failed over to the primary',
+         lambda r: r['failures']),
+    ]
+    for name, kind, help_text, value in series:
+        yield f"# HELP {PREFIX}{name} {help_text}"
+        yield f"# TYPE {PREFIX}{name} {kind}"
+        for replica in replica_stats['replicas']:
+            if value(replica) is not None:
+                yield f'{PREFIX}{name}{{replica="{_escape(replica["name"])}"}} {_number(value(replica))}'
+
+
+def render(pool_stats=None, replica_stats=None):
+    """
+    All metrics in the Prometheus text exposition format
+
+    Args:
+        pool_stats: ConnectionPool.stats() to include as gauges
+        replica_stats: ReplicaSet.stats() to include as gauges
+
+    Returns:
+        Exposition text (version 0.0.4)
+    """
+    lines = []
+    for metric in ALL_METRICS:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+
+    with _statements_lock:
+        statements = sorted(_statements.items())
+    lines.append(f"# HELP {PREFIX}db_statement_info Fingerprint of each statement id")
+    lines.append(f"# TYPE {PREFIX}db_statement_info gauge")
+    for digest, text in statements:
+        lines.append(f'{PREFIX}db_statement_info{{query="{digest}",statement="{_escape(text)}"}} 1')
+
+    if pool_stats is not None:
+        lines.extend(_pool_samples(pool_stats))
+    if replica_stats is not None:
+        lines.extend(_replica_samples(replica_stats))
+    return '\n'.join(lines) + '\n'
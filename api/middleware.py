@@ -1,15 +1,21 @@
 """
-Before/after request hooks for session tracking.
+Before/after request hooks for session tracking and request metrics.
 """
 
 from flask import request
 from api.extensions import active_sessions, activity_lock, SESSION_TIMEOUT
 from api.helpers import get_or_create_session, log_activity
+from api.metrics import finish_request, start_request
 
 
 def register_middleware(app):
     """Register before/after request hooks on the Flask app."""
 
+    # Registered first so route latency covers the other hooks too
+    # (after_request hooks run in reverse order, so finish_request runs last)
+    app.before_request(start_request)
+    app.after_request(finish_request)
+
     @app.before_request
     def track_request():
         """Track all page requests"""
@@ -19,7 +25,8 @@ def register_middleware(app):
             request.path.startswith('/js') or
             request.path.endswith('.svg') or
             request.path.endswith('.png') or
-            request.path.endswith('.jpg')):
+            request.path.endswith('.jpg') or
+            request.path == '/metrics'):
             return
 
         session_id = get_or_create_session()
@@ -0,0 +1,331 @@
+"""
+Thread-safe database connection pool for the API server.
+Drop-in replacement for psycopg2's SimpleConnectionPool (getconn/putconn)
+that is safe to share between request threads:
+
+- When every connection is busy, getconn() waits up to DB_POOL_TIMEOUT for
+  one to be returned instead of failing at once
+- Connections idle for a while are checked with a round trip before being
+  handed out; broken ones are replaced
+- Connections are retired after DB_POOL_MAX_LIFETIME, and idle connections
+  above the minimum are closed after DB_POOL_IDLE_TIMEOUT
+- stats() reports in-use/idle/waiting gauges and checkout wait times
+
+A pool belongs to the process that created it: after a fork (e.g. a
+pre-loading multi-worker server) the child opens its own connections.
+"""
+
+import os
+import threading
+import time
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+
+class PoolTimeout(PoolError):
+    """No connection became available within the checkout timeout"""
+
+
+class ConnectionPool:
+    """Bounded, validating pool of psycopg2 connections"""
+
+    def __init__(self, minconn, maxconn, timeout=10.0, max_lifetime=1800.0,
+                 idle_timeout=30.0, validate_idle=5.0, connect=None, **kwargs):
+        """
+        Args:
+            minconn: Connections opened up front and kept through idle reaping
+            maxconn: Most connections open at once
+            timeout: Seconds getconn() waits for a free connection
+            max_lifetime: Seconds after which a connection is replaced (0 = never)
+            idle_timeout: Seconds an idle connection above minconn is kept
+            validate_idle: Connections idle at least this long are checked
+                           with SELECT 1 on checkout (0 = always)
+            connect: Connection factory (default: psycopg2.connect)
+            **kwargs: Connection parameters (as for psycopg2.connect)
+        """
+        if minconn < 0 or maxconn < max(minconn, 1):
+            raise ValueError("Invalid pool size: need 0 <= minconn <= maxconn and maxconn >= 1")
+
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.idle_timeout = idle_timeout
+        self.validate_idle = validate_idle
+        self.closed = False
+        # Optional callable given each checkout's wait in seconds (e.g. metrics)
+        self.on_checkout = None
+        self._connect_fn = connect or psycopg2.connect
+        self._kwargs = kwargs
+
+        self._cond = threading.Condition()
+        self._idle = []        # (conn, returned_at), most recently returned last
+        self._in_use = {}      # id(conn) -> conn
+        self._born = {}        # id(conn) -> monotonic time it was opened
+        self._opening = 0      # Connections being opened outside the lock
+        self._waiting = 0
+        self._pid = os.getpid()
+        self._inherited = []
+        self._stats = {
+            'checkouts': 0, 'timeouts': 0, 'waits': 0, 'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0, 'created': 0, 'closed_broken': 0,
+            'closed_lifetime': 0, 'closed_idle': 0,
+        }
+
+        for _ in range(minconn):
+            conn = self._connect()
+            self._idle.append((conn, time.monotonic()))
+
+    def _connect(self):
+        conn = self._connect_fn(**self._kwargs)
+        with self._cond:
+            self._born[id(conn)] = time.monotonic()
+            self._stats['created'] += 1
+        return conn
+
+    def _size(self):
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def _expired(self, conn, now):
+        return bool(self.max_lifetime) and now - self._born.get(id(conn), now) >= self.max_lifetime
+
+    def _close(self, conn, reason):
+        """Close a connection that is no longer tracked (lock held)"""
+        self._born.pop(id(conn), None)
+        self._stats[f'closed_{reason}'] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._cond.notify()
+
+    def _check_fork(self):
+        """
+        Forget connections inherited from a parent process (lock held)
+
+        They share sockets with the parent, so they are neither used nor
+        closed here; references are kept so garbage collection never
+        closes them either.
+        """
+        if self._pid == os.getpid():
+            return
+        self._inherited.extend(conn for conn, _ in self._idle)
+        self._inherited.extend(self._in_use.values())
+        self._idle.clear()
+        self._in_use.clear()
+        self._born.clear()
+        self._opening = 0
+        self._pid = os.getpid()
+
+    def _reap(self, now):
+        """Close idle connections past the idle timeout above minconn (lock held)"""
+        if not self.idle_timeout:
+            return
+        excess = self._size() - self.minconn
+        # Oldest returns first; the most recently used connections stay warm
+        while excess > 0 and self._idle and now - self._idle[0][1] >= self.idle_timeout:
+            conn, _ = self._idle.pop(0)
+            self._close(conn, 'idle')
+            excess -= 1
+
+    def _reserve(self, deadline):
+        """
+        Take an idle connection or a slot for a new one, waiting until the
+        deadline when the pool is at maxconn (lock held)
+
+        Returns:
+            (conn, idle_seconds), or (None, None) when a new connection
+            should be opened
+        """
+        while True:
+            if self.closed:
+                raise PoolError("connection pool is closed")
+            self._check_fork()
+
+            now = time.monotonic()
+            self._reap(now)
+            while self._idle:
+                conn, returned_at = self._idle.pop()
+                if conn.closed or self._expired(conn, now):
+                    self._close(conn, 'broken' if conn.closed else 'lifetime')
+                    continue
+                self._in_use[id(conn)] = conn
+                return conn, now - returned_at
+
+            if self._size() < self.maxconn:
+                self._opening += 1
+                return None, None
+
+            remaining = deadline - now
+            if remaining <= 0:
+                self._stats['timeouts'] += 1
+                raise PoolTimeout(
+                    f"No database connection available within {self.timeout:g}s "
+                    f"({self.maxconn} in use)")
+            self._waiting += 1
+            try:
+                self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+    def _usable(self, conn, idle_seconds):
+        """Whether a connection taken from the idle list still works"""
+        if conn.closed:
+            return False
+        if idle_seconds < self.validate_idle:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self, key=None, timeout=None):
+        """
+        Check out a connection
+
+        Args:
+            key: Accepted for psycopg2 pool compatibility (ignored)
+            timeout: Seconds to wait for a free connection (default: pool timeout)
+
+        Returns:
+            An open connection; hand it back with putconn()
+
+        Raises:
+            PoolTimeout: Every connection stayed busy for the whole timeout
+        """
+        started = time.monotonic()
+        deadline = started + (self.timeout if timeout is None else timeout)
+        while True:
+            with self._cond:
+                conn, idle_seconds = self._reserve(deadline)
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                finally:
+                    with self._cond:
+                        self._opening -= 1
+                        if conn is None:
+                            self._cond.notify()
+                        else:
+                            self._in_use[id(conn)] = conn
+            elif not self._usable(conn, idle_seconds):
+                with self._cond:
+                    self._in_use.pop(id(conn), None)
+                    self._close(conn, 'broken')
+                continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._stats['checkouts'] += 1
+                self._stats['wait_seconds_total'] += waited
+                self._stats['wait_seconds_max'] = max(self._stats['wait_seconds_max'], waited)
+                if waited >= 0.001:
+                    self._stats['waits'] += 1
+            if self.on_checkout is not None:
+                self.on_checkout(waited)
+            return conn
+
+    def putconn(self, conn, key=None, close=False):
+        """
+        Return a checked-out connection
+
+        An open transaction is rolled back. Broken connections, connections
+        past their lifetime, or close=True discard the connection instead.
+        """
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            if self.closed:
+                conn.close()
+                return
+            if id(conn) not in self._in_use:
+                raise PoolError("trying to put unkeyed connection")
+
+        # Still counted as in use, so no one opens a replacement meanwhile
+        keep = not (close or conn.closed)
+        if keep:
+            try:
+                status = conn.info.transaction_status
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    keep = False
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                keep = False
+
+        with self._cond:
+            del self._in_use[id(conn)]
+            now = time.monotonic()
+            if not keep:
+                self._close(conn, 'broken')
+            elif self.closed:
+                conn.close()
+            elif self._expired(conn, now):
+                self._close(conn, 'lifetime')
+            else:
+                self._idle.append((conn, now))
+                self._cond.notify()
+            self._reap(now)
+
+    def closeall(self):
+        """Close every connection; later getconn() calls fail"""
+        with self._cond:
+            self.closed = True
+            for conn in [c for c, _ in self._idle] + list(self._in_use.values()):
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._idle.clear()
+            self._in_use.clear()
+            self._born.clear()
+            self._cond.notify_all()
+
+    def close_idle(self):
+        """
+        Close every idle connection (e.g. after the server restarted, when
+        they are all likely broken)
+
+        Returns:
+            Number of connections closed
+        """
+        with self._cond:
+            self._check_fork()
+            idle, self._idle = self._idle, []
+            for conn, _ in idle:
+                self._close(conn, 'broken')
+            return len(idle)
+
+    def reap(self):
+        """Close idle connections past the idle timeout now"""
+        with self._cond:
+            self._check_fork()
+            self._reap(time.monotonic())
+
+    def stats(self):
+        """Pool gauges (in use, idle, waiting) and checkout/connection counters"""
+        with self._cond:
+            stats = dict(self._stats)
+            checkouts = stats['checkouts']
+            stats['wait_ms_avg'] = round(stats['wait_seconds_total'] * 1000 / checkouts, 3) if checkouts else 0.0
+            stats['wait_ms_max'] = round(stats.pop('wait_seconds_max') * 1000, 3)
+            stats['wait_seconds_total'] = round(stats['wait_seconds_total'], 6)
+            return {
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'opening': self._opening,
+                'waiting': self._waiting,
+                'size': self._size(),
+                'min_connections': self.minconn,
+                'max_connections': self.maxconn,
+                'timeout': self.timeout,
+                'max_lifetime': self.max_lifetime,
+                'idle_timeout': self.idle_timeout,
+                **stats,
+            }
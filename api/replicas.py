@@ -0,0 +1,222 @@
+"""
+Read-replica routing for the API server.
+SELECTs from query_db/stream_query go to a healthy read replica
+(round-robin) when DB_REPLICA_HOSTS is set; everything else stays on the
+primary pool:
+
+- Writes, and every read after a write in the same request, use the
+  primary (read-your-writes)
+- Blueprints serving data users have just written call pin_primary()
+- A background thread probes each replica with a lag query every
+  DB_REPLICA_CHECK_INTERVAL, so requests only read the last result;
+  unreachable replicas, or ones further behind than DB_REPLICA_MAX_LAG,
+  are skipped until a later probe succeeds
+- A read that fails on a replica with a connection-level error is retried
+  on the primary
+"""
+
+import threading
+import time
+
+import psycopg2
+from flask import g, has_app_context
+from psycopg2.pool import PoolError
+
+from api.pool import ConnectionPool
+from config import DATABASE, DATABASE_POOL, DATABASE_REPLICAS
+
+# Seconds the replica has not yet replayed; 0 when it has replayed all the
+# WAL it received (an idle primary does not make the replica "lag"), and
+# NULL when the server is not a standby
+LAG_QUERY = """
+    SELECT pg_is_in_recovery() AS standby,
+           CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+           END AS lag
+"""
+
+# Errors after which a read is retried on the primary
+FAILOVER_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError, PoolError)
+
+# Seconds a probe waits for a replica connection (also the replicas'
+# connect_timeout, so a blackholed host fails fast instead of after the
+# OS connect timeout)
+PROBE_TIMEOUT = 1.0
+
+
+class Replica:
+    """One read replica's pool and last known health"""
+
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.healthy = None   # Unknown until the first probe
+        self.lag = None
+        self.error = None
+        self.checked_at = None
+        self.reads = 0
+        self.failures = 0
+
+
+class ReplicaSet:
+    """Round-robin choice among healthy, sufficiently current replicas"""
+
+    def __init__(self, replicas, max_lag=0, check_interval=5.0):
+        """
+        Args:
+            replicas: Replica objects
+            max_lag: Seconds of replication lag beyond which a replica is
+                     skipped (0 = no limit)
+            check_interval: Seconds between probes of each replica
+        """
+        self.replicas = list(replicas)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._next = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._monitor = None
+        self.primary_fallbacks = 0
+
+    def start(self):
+        """Start probing every replica on a background thread (idempotent)"""
+        if self._monitor is None:
+            self._monitor = threading.Thread(target=self._run, name='replica-monitor', daemon=True)
+            self._monitor.start()
+        return self
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self.probe_all()
+            self._stopped.wait(self.check_interval)
+
+    def probe_all(self):
+        """Refresh every replica's health and lag once"""
+        for replica in self.replicas:
+            self._probe(replica)
+
+    def _probe(self, replica):
+        """Refresh one replica's health and lag (never raises)"""
+        healthy, lag, error = False, None, None
+        try:
+            conn = replica.pool.getconn(timeout=PROBE_TIMEOUT)
+        except Exception as e:
+            error = str(e)
+        else:
+            close = False
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(LAG_QUERY)
+                    standby, lag = cursor.fetchone()
+                lag = float(lag) if lag is not None else None
+                healthy = bool(standby) and (not self.max_lag or (lag or 0) <= self.max_lag)
+                if not standby:
+                    error = "not a standby (pg_is_in_recovery() is false)"
+                elif not healthy:
+                    error = f"replication lag {lag:.1f}s exceeds {self.max_lag:g}s"
+            except Exception as e:
+                error = str(e)
+                close = True
+            finally:
+                replica.pool.putconn(conn, close=close)
+
+        if not healthy and error is not None and lag is None:
+            # Unreachable: don't hand out its other, probably dead, connections
+            replica.pool.close_idle()
+        with self._lock:
+            replica.healthy, replica.lag, replica.error = healthy, lag, error
+            replica.checked_at = time.monotonic()
+
+    def choose(self):
+        """
+        Replica for the next read
+
+        Never probes: health comes from the monitor thread (start()), and
+        until a replica's first probe finishes its reads use the primary.
+
+        Returns:
+            A Replica, or None when no replica is usable (read from the primary)
+        """
+        with self._lock:
+            count = len(self.replicas)
+            for offset in range(count):
+                replica = self.replicas[(self._next + offset) % count]
+                if replica.healthy:
+                    self._next = (self._next + offset + 1) % count
+                    replica.reads += 1
+                    return replica
+            self.primary_fallbacks += 1
+            return None
+
+    def mark_failed(self, replica, error):
+        """Take a replica out of rotation until the monitor's next probe"""
+        replica.pool.close_idle()
+        with self._lock:
+            replica.healthy = False
+            replica.error = str(error)
+            replica.checked_at = time.monotonic()
+            replica.failures += 1
+
+    def closeall(self):
+        """Stop probing and close every replica connection"""
+        self._stopped.set()
+        for replica in self.replicas:
+            replica.pool.closeall()
+
+    def stats(self):
+        """Health, lag and read counts per replica"""
+        with self._lock:
+            return {
+                'max_lag': self.max_lag,
+                'check_interval': self.check_interval,
+                'primary_fallbacks': self.primary_fallbacks,
+                'replicas': [{
+                    'name': r.name,
+                    'healthy': r.healthy,
+                    'lag_seconds': r.lag,
+                    'error': r.error,
+                    'reads': r.reads,
+                    'failures': r.failures,
+                    'pool': r.pool.stats(),
+                } for r in self.replicas],
+            }
+
+
+def create_replica_set(settings=DATABASE_REPLICAS):
+    """
+    Build the replica set from DB_REPLICA_HOSTS
+
+    Replica pools open connections on demand, so an unreachable replica
+    never prevents startup. Call start() on the result to begin probing.
+
+    Returns:
+        ReplicaSet, or None when no replicas are configured
+    """
+    if not settings['hosts']:
+        return None
+
+    replicas = []
+    for host in settings['hosts']:
+        name, _, port = host.rpartition(':') if ':' in host else (host, '', '')
+        params = dict(DATABASE, host=name, port=int(port or DATABASE['port']),
+                      connect_timeout=max(1, int(PROBE_TIMEOUT)))
+        pool = ConnectionPool(
+            0, DATABASE_POOL['max_connections'],
+            timeout=DATABASE_POOL['timeout'],
+            max_lifetime=DATABASE_POOL['max_lifetime'],
+            idle_timeout=DATABASE_POOL['idle_timeout'] / 1000,
+            validate_idle=DATABASE_POOL['validate_idle'],
+            **params
+        )
+        replicas.append(Replica(host, pool))
+    return ReplicaSet(replicas, settings['max_lag'], settings['check_interval'])
+
+
+def pin_primary():
+    """Send the rest of this request's reads to the primary (usable as a before_request hook)"""
+    g.db_primary = True
+
+
+def pinned_to_primary():
+    """Whether this request's reads must use the primary"""
+    return has_app_context() and g.get('db_primary', False)
@@ -0,0 +1,154 @@
+"""
+Prepared-statement registry for the API server.
+Hot queries are registered once by name; query_db PREPAREs each on a
+pooled connection the first time that connection runs it, then sends
+only EXECUTE name(args), so Postgres skips parsing and (after its first
+executions) planning on every later call.
+
+Statements keep psycopg2's %s placeholders, are timed under their name
+in /metrics, and fall back to plain execution when
+DB_PREPARED_STATEMENTS=false (e.g. behind a transaction-pooling
+PgBouncer, which does not keep prepared statements per client).
+"""
+
+import re
+import threading
+import weakref
+
+from psycopg2 import errors
+
+from config import DATABASE_POOL
+
+# Server errors meaning the connection's prepared statements are not what
+# we recorded: gone (DISCARD ALL, failover), already there, or stale after
+# a schema change ("cached plan must not change result type")
+RESET_ERRORS = (errors.InvalidSqlStatementName, errors.DuplicatePreparedStatement,
+                errors.FeatureNotSupported)
+
+_NAME = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+# Every registered statement, by name
+REGISTRY = {}
+
+# Connection -> names prepared on it (entries vanish with the connection)
+_prepared = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+class Statement:
+    """A named SQL statement, prepared once per connection"""
+
+    def __init__(self, name, sql):
+        """
+        Args:
+            name: SQL identifier to prepare the statement under
+            sql: Statement text with psycopg2 %s placeholders
+        """
+        self.name = name
+        self.sql = sql
+        self.param_count = sql.count('%s')
+        # $n form, also what the async driver (api/aio/db.py) sends
+        self.positional_sql = positional(sql)
+        self.prepare_sql = f"PREPARE {name} AS {self.positional_sql}"
+        self.execute_sql = f"EXECUTE {name}" + (
+            f"({', '.join(['%s'] * self.param_count)})" if self.param_count else '')
+
+    def __repr__(self):
+        return f"Statement({self.name!r})"
+
+
+def statement(name, sql):
+    """
+    Register a hot statement
+
+    Args:
+        name: Unique lower_snake_case name (also its /metrics label)
+        sql: Statement text with %s placeholders (no %(name)s or literal %)
+
+    Returns:
+        Statement to pass to query_db in place of the SQL text
+
+    Raises:
+        ValueError: Invalid name, unsupported placeholders, or the name is
+                    already registered for different SQL
+    """
+    if not _NAME.match(name):
+        raise ValueError(f"Invalid statement name: {name}")
+    if '%(' in sql or sql.replace('%s', '').count('%'):
+        raise ValueError(f"Statement {name} may only use %s placeholders")
+
+    existing = REGISTRY.get(name)
+    if existing is not None:
+        if existing.sql != sql:
+            raise ValueError(f"Statement {name} is already registered with different SQL")
+        return existing
+
+    REGISTRY[name] = Statement(name, sql)
+    return REGISTRY[name]
+
+
+def _forget(conn):
+    with _lock:
+        _prepared.pop(conn, None)
+
+
+def execute(cursor, stmt, args=()):
+    """
+    Run a registered statement on cursor, preparing it on the cursor's
+    connection first if needed
+
+    Args:
+        cursor: Cursor of a connection with no transaction work to keep
+                (statement errors roll it back)
+        stmt: Statement from statement()
+        args: Parameter values, one per %s
+
+    Returns:
+        True when the statement was prepared by this call
+    """
+    if not DATABASE_POOL['prepared_statements']:
+        cursor.execute(stmt.sql, args)
+        return False
+
+    conn = cursor.connection
+    with _lock:
+        names = _prepared.setdefault(conn, set())
+        prepared = stmt.name in names
+
+    if prepared:
+        try:
+            cursor.execute(stmt.execute_sql, args)
+            return False
+        except RESET_ERRORS:
+            # Re-sync: drop whatever the server has and prepare afresh
+            conn.rollback()
+            cursor.execute("DEALLOCATE ALL")
+            _forget(conn)
+            with _lock:
+                names = _prepared.setdefault(conn, set())
+
+    try:
+        cursor.execute(stmt.prepare_sql)
+    except errors.DuplicatePreparedStatement:
+        conn.rollback()
+    with _lock:
+        names.add(stmt.name)
+    cursor.execute(stmt.execute_sql, args)
+    return True
+
+
+def prepared_on(conn):
+    """Names of the statements prepared on a connection"""
+    with _lock:
+        return set(_prepared.get(conn, ()))
+
+
+def positional(sql):
+    """SQL text with psycopg2 %s placeholders numbered $1, $2, ... (trailing ; dropped)"""
+    params = iter(range(1, sql.count('%s') + 1))
+    return re.sub(r'%s', lambda _: f"${next(params)}", sql.strip().rstrip(';'))
+
+
+def sql_text(query):
+    """SQL text of a Statement or plain query string"""
+    return query.sql if isinstance(query, Statement) else query
@@ -153,8 +153,35 @@ const DataAPI = {
     /**
      * Get multiple stocks' historical data
      */
-    async getMultipleHistoricalData(symbols) {
-        const promises = symbols.map(symbol => this.getHistoricalData(symbol));
+    async getMultipleHistoricalData(symbols, days = 365) {
+        try {
+            // One request and one query for the whole list
+            const response = await fetch(`${this.baseURL}/api/history/batch?symbols=${encodeURIComponent(symbols.join(','))}&days=${days}`);
+            if (response.ok) {
+                const result = await response.json();
+                if (result.success) {
+                    return symbols
+                        .map(symbol => ({
+                            symbol: symbol,
+                            data: (result.data[symbol.toUpperCase()] || []).map(item => ({
+                                date: item.date,
+                                open: parseFloat(item.open) || 0,
+                                high: parseFloat(item.high) || 0,
+                                low: parseFloat(item.low) || 0,
+                                close: parseFloat(item.close) || 0,
+                                volume: parseInt(item.volume) || 0,
+                                change: parseFloat(item.change) || 0,
+                                change_percent: parseFloat(item.change_percent) || 0
+                            }))
+                        }))
+                        .filter(item => item.data.length > 0);
+                }
+            }
+        } catch (error) {
+            console.error('Error fetching batch history, falling back to per-symbol requests:', error);
+        }
+
+        const promises = symbols.map(symbol => this.getHistoricalData(symbol, days));
         const results = await Promise.allSettled(promises);
 
         return results
@@ -165,6 +192,37 @@ const DataAPI = {
             .filter(item => item.data.length > 0);
     },
 
+    /**
+     * Get ranked support/resistance zones for a stock
+     */
+    async getLevels(symbol) {
+        try {
+            const response = await fetch(`${this.baseURL}/api/stock/${symbol}/levels`);
+            if (!response.ok) return null;
+            const result = await response.json();
+            return result.success ? result.levels : null;
+        } catch (error) {
+            console.error(`Error fetching levels for ${symbol}:`, error);
+            return null;
+        }
+    },
+
+    /**
+     * Screen the whole universe on latest indicators
+     * e.g. screen({ rsi_lt: 30, sma50_gt: 'sma200', exchange: 'HOSE', sort: 'rsi' })
+     */
+    async screen(filters = {}) {
+        try {
+            const params = new URLSearchParams(filters);
+            const response = await fetch(`${this.baseURL}/api/screener?${params}`);
+            if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+            return await response.json();
+        } catch (error) {
+            console.error('Error screening stocks:', error);
+            return { success: false, stocks: [], total: 0 };
+        }
+    },
+
     /**
      * Get automation config
      */
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Async (ASGI) entry point for the Vietnamese Stock Analytics API Server.
+Read-only stocks/market/news/system routes run on asyncio with an asyncpg
+pool; everything else is served by the Flask app (see api/aio/__init__.py).
+
+Run: python asgi.py   (or: hypercorn asgi:app --workers N)
+"""
+
+from config import API_SERVER, ASYNC_SERVER, DATABASE_REPLICAS
+
+if __name__ == '__main__':
+    from hypercorn.config import Config
+    from hypercorn.run import run
+
+    config = Config()
+    # Each worker process builds its own app (and database pools)
+    config.application_path = 'api.aio:create_asgi_app()'
+    config.bind = [f"{API_SERVER['host']}:{API_SERVER['port']}"]
+    config.workers = ASYNC_SERVER['workers']
+    config.worker_class = 'asyncio'
+    config.accesslog = '-' if API_SERVER['debug'] else None
+
+    print("=" * 60)
+    print("Vietnamese Stock Analytics API Server v2.0 (async)")
+    print("=" * 60)
+    print(f"Listening on {config.bind[0]} with {config.workers} worker(s)")
+    if DATABASE_REPLICAS['hosts']:
+        print("Note: async routes read from the primary; DB_REPLICA_HOSTS only applies to Flask routes")
+    print("\nPress CTRL+C to stop the server")
+    print("=" * 60)
+
+    run(config)
+else:
+    from api.aio import create_asgi_app
+
+    app = create_asgi_app()
@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+Async Serving Benchmark
+Load-tests the threaded Flask server (gunicorn, one thread per in-flight
+request) against the async (ASGI) serving mode (hypercorn, one event loop
+per worker) at a fixed memory budget: the same database pool size per
+worker, and the same worker count unless --sync-workers/--async-workers
+are set to match the two servers' resident memory instead.
+
+Each server is started on a free port against the configured database
+(DB_* environment variables), warmed up, then driven by keep-alive HTTP
+clients at each --concurrency level for --duration seconds. Requests cycle
+through uncached, database-backed read routes for real symbols.
+
+Reported per level: requests/s, p50/p99 latency, errors, and the peak RSS
+of the server's process tree (Linux /proc). --db-latency-ms puts a proxy
+between the servers and Postgres that delays every reply by that much, to
+model a database across the network rather than on the same host.
+
+Run: python3 benchmarks/bench_async_serving.py [--output results.json]
+     python3 benchmarks/bench_async_serving.py --concurrency 10,100,1000 --db-latency-ms 5
+     python3 benchmarks/bench_async_serving.py --workers 2 --threads 16 --pool-max 16
+     python3 benchmarks/bench_async_serving.py --sync-workers 3 --async-workers 2   (match RSS)
+
+Needs gunicorn (sync mode) and Quart, hypercorn and asyncpg (async mode).
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import platform
+import threading
+import subprocess
+import multiprocessing
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from config import DATABASE
+
+DEFAULT_CONCURRENCY = (10, 50, 200, 1000)
+
+# Uncached read routes; {symbol} cycles through the active stocks
+DEFAULT_PATHS = ('/api/stock/{symbol}', '/data/{symbol}_current.json', '/api/indices')
+
+# Seconds a server gets to answer /health after starting
+STARTUP_TIMEOUT = 60
+
+# Symbols the request paths cycle through
+MAX_SYMBOLS = 200
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# ------------------------------------------------------------
+# Database latency proxy
+# ------------------------------------------------------------
+
+async def _pipe(reader, writer, delay):
+    """Forward one direction, each chunk leaving `delay` seconds after it arrived"""
+    queue = asyncio.Queue()
+
+    async def drain():
+        loop = asyncio.get_running_loop()
+        while True:
+            due, chunk = await queue.get()
+            if chunk is None:
+                break
+            wait = due - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            writer.write(chunk)
+            await writer.drain()
+        writer.close()
+
+    sender = asyncio.create_task(drain())
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                break
+            queue.put_nowait((loop.time() + delay, chunk))
+    except ConnectionError:
+        pass
+    finally:
+        queue.put_nowait((0, None))
+        await sender
+
+
+async def _serve_proxy(port, upstream, delay, ready):
+    async def handle(client_reader, client_writer):
+        if upstream.startswith('/'):
+            server_reader, server_writer = await asyncio.open_unix_connection(upstream)
+        else:
+            host, upstream_port = upstream.rsplit(':', 1)
+            server_reader, server_writer = await asyncio.open_connection(host, int(upstream_port))
+        # Replies are delayed; requests go straight through
+        await asyncio.gather(_pipe(client_reader, server_writer, 0),
+                             _pipe(server_reader, client_writer, delay),
+                             return_exceptions=True)
+
+    server = await asyncio.start_server(handle, '127.0.0.1', port)
+    ready.set()
+    async with server:
+        await server.serve_forever()
+
+
+def _proxy_main(port, upstream, delay, ready):
+    asyncio.run(_serve_proxy(port, upstream, delay, ready))
+
+
+def start_latency_proxy(delay_ms):
+    """
+    Start a Postgres proxy adding delay_ms to every reply
+
+    Returns:
+        (process, port)
+    """
+    host, port = DATABASE['host'], DATABASE['port']
+    upstream = f"{host}/.s.PGSQL.{port}" if host.startswith('/') else f"{host}:{port}"
+    listen = _free_port()
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(target=_proxy_main, args=(listen, upstream, delay_ms / 1000, ready),
+                                      daemon=True)
+    process.start()
+    if not ready.wait(10):
+        process.terminate()
+        raise RuntimeError('Latency proxy did not start')
+    return process, listen
+
+
+# ------------------------------------------------------------
+# Servers
+# ------------------------------------------------------------
+
+def server_command(mode, port, workers, threads):
+    """Command line serving the API in the given mode"""
+    if mode == 'sync':
+        return [sys.executable, '-m', 'gunicorn', 'run:app', '--bind', f'127.0.0.1:{port}',
+                '--workers', str(workers), '--threads', str(threads), '--worker-class', 'gthread',
+                '--backlog', '4096', '--log-level', 'warning']
+    return [sys.executable, '-m', 'hypercorn', 'asgi:app', '--bind', f'127.0.0.1:{port}',
+            '--workers', str(workers), '--backlog', '4096', '--log-level', 'warning']
+
+
+def start_server(mode, workers, threads, env):
+    """
+    Start a server and wait until /health answers
+
+    Returns:
+        (process, port)
+    """
+    port = _free_port()
+    process = subprocess.Popen(server_command(mode, port, workers, threads), cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{mode} server exited: {process.stderr.read()[-2000:]}")
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=2) as response:
+                if response.status == 200:
+                    return process, port
+        except OSError:
+            time.sleep(0.3)
+    stop_server(process)
+    raise RuntimeError(f"{mode} server did not become healthy within {STARTUP_TIMEOUT}s")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def _children(pid):
+    children = []
+    for task in Path(f'/proc/{pid}/task').glob('*'):
+        try:
+            children.extend(int(child) for child in (task / 'children').read_text().split())
+        except OSError:
+            pass
+    return children
+
+
+def tree_rss_mb(pid):
+    """Resident memory of a process and all its descendants, in MB"""
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            for line in Path(f'/proc/{current}/status').read_text().splitlines():
+                if line.startswith('VmRSS:'):
+                    total_kb += int(line.split()[1])
+                    break
+        except OSError:
+            continue
+        pending.extend(_children(current))
+    return total_kb / 1024
+
+
+class RssSampler:
+    """Peak tree RSS of a process while the block runs"""
+
+    def __init__(self, pid, interval=0.25):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, tree_rss_mb(self.pid))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, tree_rss_mb(self.pid))
+
+
+# ------------------------------------------------------------
+# Load generator
+# ------------------------------------------------------------
+
+async def _read_response(reader):
+    """Read one HTTP/1.1 response; returns the status code"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Connection closed')
+    status = int(status_line.split()[1])
+    length, chunked = 0, False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value.lower():
+            chunked = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return status
+
+
+async def _client(port, paths, offset, deadline, latencies, errors):
+    """One keep-alive connection sending requests back to back until the deadline"""
+    loop = asyncio.get_running_loop()
+    reader = writer = None
+    i = offset
+    while loop.time() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        started = loop.time()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n'.encode('latin-1'))
+            status = await asyncio.wait_for(_read_response(reader), 30)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError, IndexError):
+            errors.append('connection')
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            continue
+        if status >= 500:
+            errors.append(status)
+        else:
+            latencies.append(loop.time() - started)
+    if writer is not None:
+        writer.close()
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+async def _load(port, paths, concurrency, duration):
+    loop = asyncio.get_running_loop()
+    latencies, errors = [], []
+    deadline = loop.time() + duration
+    started = loop.time()
+    await asyncio.gather(*(
+        _client(port, paths, n * 7, deadline, latencies, errors) for n in range(concurrency)))
+    elapsed = loop.time() - started
+    kinds = {}
+    for error in errors:
+        kinds[str(error)] = kinds.get(str(error), 0) + 1
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'error_kinds': kinds,
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(_percentile(latencies, 0.50) * 1000, 1) if latencies else None,
+        'p99_ms': round(_percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+    }
+
+
+def run_load(port, paths, concurrency, duration):
+    """Drive a server with `concurrency` connections for `duration` seconds"""
+    return asyncio.run(_load(port, paths, concurrency, duration))
+
+
+# ------------------------------------------------------------
+# Suite
+# ------------------------------------------------------------
+
+def request_paths(port, templates):
+    """Expand the path templates over the active stock symbols"""
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}/api/stocks', timeout=30) as response:
+        symbols = [stock['symbol'] for stock in json.load(response)['stocks']][:MAX_SYMBOLS]
+    paths = []
+    for symbol in symbols:
+        for template in templates:
+            paths.append(template.format(symbol=symbol))
+    return paths or [template for template in templates if '{' not in template]
+
+
+def run_mode(mode, args, env):
+    """Start one server, run every concurrency level against it and stop it"""
+    workers = args.sync_workers if mode == 'sync' else args.async_workers
+    process, port = start_server(mode, workers, args.threads, env)
+    try:
+        paths = request_paths(port, args.paths)
+        run_load(port, paths, min(args.concurrency), args.warmup)
+        idle_rss = tree_rss_mb(process.pid)
+        print(f"\n  {mode}: {workers} worker(s)"
+              + (f" x {args.threads} threads" if mode == 'sync' else ', one event loop each')
+              + f", pool max {args.pool_max}/worker, idle RSS {idle_rss:.0f} MB")
+
+        levels = []
+        for concurrency in args.concurrency:
+            with RssSampler(process.pid) as rss:
+                result = run_load(port, paths, concurrency, args.duration)
+            result.update(concurrency=concurrency, peak_rss_mb=round(rss.peak, 1))
+            levels.append(result)
+            print(f"    c={concurrency:<6} {result['rps']:>9,.1f} req/s  "
+                  f"p50 {result['p50_ms'] or 0:>8,.1f} ms  p99 {result['p99_ms'] or 0:>8,.1f} ms  "
+                  f"errors {result['errors']:>5}  RSS {result['peak_rss_mb']:>6,.0f} MB")
+        return {'mode': mode, 'workers': workers, 'idle_rss_mb': round(idle_rss, 1), 'levels': levels}
+    finally:
+        stop_server(process)
+
+
+def summarize(modes, slo_ms):
+    """Highest concurrency each mode served without errors within the p99 SLO, and its peak RSS"""
+    summary = {}
+    for result in modes:
+        passing = [level for level in result['levels']
+                   if level['errors'] == 0 and level['p99_ms'] is not None and level['p99_ms'] <= slo_ms]
+        best = max(passing, key=lambda level: level['concurrency']) if passing else None
+        summary[result['mode']] = {
+            'max_concurrency_within_slo': best['concurrency'] if best else 0,
+            'rps_at_max': best['rps'] if best else None,
+            'peak_rss_mb': max(level['peak_rss_mb'] for level in result['levels']),
+        }
+    return summary
+
+
+def environment(args):
+    """Machine and settings stored next to the results"""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'sync_workers': args.sync_workers,
+        'async_workers': args.async_workers,
+        'threads': args.threads,
+        'pool_max': args.pool_max,
+        'db_latency_ms': args.db_latency_ms,
+        'duration': args.duration,
+        'paths': args.paths,
+    }
+
+
+def _int_list(text):
+    return [int(part) for part in text.split(',') if part]
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Compare threaded and async serving under load')
+    parser.add_argument('--modes', type=lambda t: t.split(','), default=['sync', 'async'],
+                        help='Comma-separated subset of: sync, async')
+    parser.add_argument('--concurrency', type=_int_list, default=list(DEFAULT_CONCURRENCY),
+                        help='Comma-separated open connections per level (default: 10,50,200,1000)')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per level')
+    parser.add_argument('--warmup', type=float, default=3, help='Seconds of warm-up load before measuring')
+    parser.add_argument('--workers', type=int, default=2, help='Worker processes of either server')
+    parser.add_argument('--sync-workers', type=int, help='Sync worker processes (default: --workers)')
+    parser.add_argument('--async-workers', type=int, help='Async worker processes (default: --workers)')
+    parser.add_argument('--threads', type=int, default=16, help='Threads per sync worker')
+    parser.add_argument('--pool-max', type=int, default=16, help='DB_POOL_MAX per worker (both modes)')
+    parser.add_argument('--db-latency-ms', type=float, default=0,
+                        help='Delay added to every database reply by a local proxy')
+    parser.add_argument('--paths', type=lambda t: t.split(','), default=list(DEFAULT_PATHS),
+                        help='Comma-separated request paths; {symbol} is filled in')
+    parser.add_argument('--slo-ms', type=float, default=500, help='p99 latency target of the summary')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    args.sync_workers = args.sync_workers or args.workers
+    args.async_workers = args.async_workers or args.workers
+
+    unknown = [mode for mode in args.modes if mode not in ('sync', 'async')]
+    if unknown:
+        parser.error(f"Unknown modes: {', '.join(unknown)}")
+
+    env = dict(os.environ, DB_POOL_MAX=str(args.pool_max), PYTHONUNBUFFERED='1')
+    proxy = None
+    if args.db_latency_ms > 0:
+        proxy, proxy_port = start_latency_proxy(args.db_latency_ms)
+        env.update(DB_HOST='127.0.0.1', DB_PORT=str(proxy_port))
+
+    print(f"⏱️  Serving benchmark: {args.duration:g}s per level, "
+          f"{args.db_latency_ms:g} ms added database latency")
+    try:
+        modes = [run_mode(mode, args, env) for mode in args.modes]
+    finally:
+        if proxy is not None:
+            proxy.terminate()
+
+    report = {'environment': environment(args), 'results': modes, 'summary': summarize(modes, args.slo_ms)}
+    print(f"\n📊 Highest concurrency with no errors and p99 <= {args.slo_ms:g} ms")
+    for mode, row in report['summary'].items():
+        print(f"  {mode:<6} c={row['max_concurrency_within_slo']:<6} "
+              f"{row['rps_at_max'] or 0:>9,.1f} req/s  peak RSS {row['peak_rss_mb']:,.0f} MB")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results saved to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
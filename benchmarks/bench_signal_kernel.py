@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Signal Kernel Benchmark
+Per-symbol cost of the full signal analysis (indicator + price-action
+signals) before and after the single-pass kernel.
+
+  before: NumPy engine on a one-row matrix for the indicator signals, plus
+          the original multi-pass price-action scorer with per-value float()
+          conversion of Decimal rows
+  after:  one SignalKernel pass over a preconverted float array
+
+Run: python3 benchmarks/bench_signal_kernel.py [--data-dir data] [--repeat 5]
+"""
+
+import sys
+import json
+import time
+import argparse
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import indicators
+from src.demo_data import DemoStockData
+from src.technical_analysis import TechnicalAnalyzer
+
+# Bars fed to the price-action analysis (matches /api/stock-analysis)
+ANALYSIS_BARS = 60
+
+
+def legacy_price_action(historical_data):
+    """Price-action scorer as it was before the kernel (kept as the baseline)"""
+    if not historical_data or len(historical_data) < 5:
+        return {'score': 0, 'recommendation': 'HOLD', 'emoji': '⚪', 'signals': [], 'indicators': {}}
+
+    prices = [float(h['close']) for h in historical_data]
+    signals = []
+    score = 0
+
+    support_found = False
+    for i in range(2, len(prices) - 2):
+        if prices[i] < prices[i-1] and prices[i] < prices[i+1] and \
+           prices[i] < prices[i-2] and prices[i] < prices[i+2]:
+            signals.append(f"🟢 Support Level at {prices[i]:.0f}")
+            support_found = True
+            score += 15
+            break
+
+    resistance_found = False
+    for i in range(2, len(prices) - 2):
+        if prices[i] > prices[i-1] and prices[i] > prices[i+1] and \
+           prices[i] > prices[i-2] and prices[i] > prices[i+2]:
+            signals.append(f"🔴 Resistance Level at {prices[i]:.0f}")
+            resistance_found = True
+            score -= 15
+            break
+
+    recent_uptrend = 0
+    recent_downtrend = 0
+    for i in range(len(prices) - 1, max(len(prices) - 5, 0), -1):
+        if i > 0:
+            if float(prices[i]) > float(prices[i-1]):
+                recent_uptrend += 1
+                recent_downtrend = 0
+            else:
+                recent_downtrend += 1
+                recent_uptrend = 0
+
+    if recent_uptrend >= 3:
+        signals.append("🟢 Recent Uptrend Detected")
+        score += 20
+    elif recent_downtrend >= 3:
+        signals.append("🔴 Recent Downtrend Detected")
+        score -= 20
+
+    returns = []
+    for i in range(1, len(prices)):
+        price_i = float(prices[i])
+        price_i_1 = float(prices[i-1])
+        if price_i_1 != 0:
+            returns.append(abs((price_i - price_i_1) / price_i_1))
+
+    if returns:
+        avg_return = float(sum(returns) / len(returns))
+        recent_return = float(returns[-1])
+        if recent_return > avg_return * 1.5:
+            if float(prices[-1]) > float(prices[-2]):
+                signals.append("🟢 High Volatility with Upward Movement")
+                score += 10
+            else:
+                signals.append("🔴 High Volatility with Downward Movement")
+                score -= 10
+
+    if len(historical_data) >= 2:
+        recent_vol = historical_data[-1].get('volume', 0)
+        prev_vol = historical_data[-2].get('volume', 0)
+        if prev_vol > 0 and recent_vol > prev_vol * 1.2:
+            signals.append("🟢 Volume Spike Detected")
+            score += 5
+
+    return {'score': score, 'signals': signals}
+
+
+def before(rows):
+    """Two separate scorers over Decimal database rows"""
+    prices = [float(r['close']) for r in rows]
+    volumes = [float(r['volume']) for r in rows]
+    series = indicators.compute_all(indicators.as_matrix(prices), indicators.as_matrix(volumes))
+    TechnicalAnalyzer.evaluate_signals(series)
+    legacy_price_action(rows[-ANALYSIS_BARS:])
+
+
+def after(rows):
+    """One kernel pass over floats converted once"""
+    prices = [float(r['close']) for r in rows]
+    volumes = [float(r['volume']) for r in rows]
+    TechnicalAnalyzer.analyze(prices, volumes, price_action_bars=ANALYSIS_BARS)
+
+
+def load_universe(data_dir):
+    """Histories as Decimal rows, like query_db returns them"""
+    histories = []
+    for path in sorted(Path(data_dir).glob('*_history.json')):
+        with open(path, 'r', encoding='utf-8') as f:
+            bars = json.load(f)
+        if len(bars) >= 2:
+            histories.append([
+                {'close': Decimal(str(b['close'])), 'volume': int(b.get('volume') or 0)} for b in bars
+            ])
+    if not histories:
+        # No exported data: synthesize a year of bars per stock
+        for symbol in DemoStockData.STOCK_PRICES:
+            bars = DemoStockData.generate_historical_data(symbol, days=260)
+            histories.append([{'close': Decimal(str(b['close'])), 'volume': int(b['nmVolume'])} for b in bars])
+    return histories
+
+
+def measure(fn, histories, repeat):
+    """Best-of-`repeat` microseconds per symbol"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for rows in histories:
+            fn(rows)
+        best = min(best, time.perf_counter() - started)
+    return best / len(histories) * 1e6
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Benchmark the signal kernel against the old scorers')
+    parser.add_argument('--data-dir', default='data', help='Directory with *_history.json files')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per variant (best is kept)')
+    args = parser.parse_args()
+
+    histories = load_universe(args.data_dir)
+    bars = sum(len(h) for h in histories) / len(histories)
+
+    cost_before = measure(before, histories, args.repeat)
+    cost_after = measure(after, histories, args.repeat)
+
+    print(f"Symbols: {len(histories)}  (avg {bars:.0f} bars)")
+    print(f"before  {cost_before:8.1f} µs/symbol")
+    print(f"after   {cost_after:8.1f} µs/symbol")
+    print(f"speedup {cost_before / cost_after:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Technical Analysis Benchmark Suite
+Times the analysis hot path on synthetic data and compares the results with
+a stored baseline, so regressions are caught before deploy.
+
+Functions: calculate_rsi, calculate_ema, calculate_macd,
+calculate_bollinger_bands, analyze_stock and _compute_technical_analysis
+(the /api/stock/<symbol>/analysis fallback), each on 60, 1k and 10k bar
+series for 1 and 1,000 symbols. Data comes from
+DemoStockData.generate_price_matrix with a fixed seed, so every run sees the
+same series and no network or database is needed.
+
+Run: python3 benchmarks/bench_technical_analysis.py [--output results.json]
+     python3 benchmarks/bench_technical_analysis.py --update-baseline
+     python3 benchmarks/bench_technical_analysis.py --bars 60,1000 --symbols 1
+
+Exit status is 1 when any case is slower than the baseline by more than
+--threshold.
+"""
+
+import sys
+import json
+import time
+import argparse
+import platform
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api.blueprints.stocks import _compute_technical_analysis
+from src.demo_data import DemoStockData
+from src.technical_analysis import TechnicalAnalyzer
+
+DEFAULT_BASELINE = Path(__file__).parent / 'baseline.json'
+
+DEFAULT_BARS = (60, 1000, 10000)
+DEFAULT_SYMBOLS = (1, 1000)
+
+# Seed of the synthetic universe; changing it invalidates the baseline
+SEED = 20240101
+
+# Allowed slowdown against the baseline before a case counts as a regression
+DEFAULT_THRESHOLD = 0.25
+
+
+def _closes(row):
+    return row['close'].tolist()
+
+
+def _newest_first_bars(row):
+    """Rows shaped like VNStockData.get_historical_data (newest first)"""
+    return [{'close': c, 'nmVolume': v} for c, v in zip(row['close'].tolist()[::-1], row['volume'].tolist()[::-1])]
+
+
+def _database_rows(row):
+    """Rows shaped like the stock_prices query in the analysis route (oldest first)"""
+    return [
+        {'high': h, 'low': lo, 'close': c, 'volume': int(v)}
+        for h, lo, c, v in zip(row['high'].tolist(), row['low'].tolist(), row['close'].tolist(), row['volume'].tolist())
+    ]
+
+
+# name -> (input builder, function); input building is not timed
+CASES = {
+    'calculate_rsi': (_closes, TechnicalAnalyzer.calculate_rsi),
+    'calculate_ema': (_closes, lambda prices: TechnicalAnalyzer.calculate_ema(prices, 12)),
+    'calculate_macd': (_closes, TechnicalAnalyzer.calculate_macd),
+    'calculate_bollinger_bands': (_closes, TechnicalAnalyzer.calculate_bollinger_bands),
+    'analyze_stock': (_newest_first_bars, TechnicalAnalyzer.analyze_stock),
+    '_compute_technical_analysis': (_database_rows, lambda rows: _compute_technical_analysis('BENCH', rows)),
+}
+
+
+def case_key(result):
+    """Identity of a result across runs"""
+    return f"{result['function']}[bars={result['bars']},symbols={result['symbols']}]"
+
+
+def run_case(name, universe, repeat):
+    """
+    Time one function over every symbol of a universe
+
+    Returns:
+        Best-of-`repeat` seconds for the whole universe
+    """
+    build, fn = CASES[name]
+    symbols = universe['close'].shape[0]
+    best = float('inf')
+    for _ in range(repeat):
+        elapsed = 0.0
+        for i in range(symbols):
+            data = build({key: matrix[i] for key, matrix in universe.items()})
+            started = time.perf_counter()
+            fn(data)
+            elapsed += time.perf_counter() - started
+        best = min(best, elapsed)
+    return best
+
+
+def run_suite(bars_list, symbols_list, functions, repeat):
+    """Run every (bars, symbols, function) combination"""
+    results = []
+    for bars in bars_list:
+        for symbols in symbols_list:
+            universe = DemoStockData.generate_price_matrix(symbols, bars, seed=SEED)
+            # Fewer repeats for the large grids keeps the full suite to minutes
+            runs = repeat if bars * symbols <= 1_000_000 else 1
+            for name in functions:
+                seconds = run_case(name, universe, runs)
+                result = {
+                    'function': name,
+                    'bars': bars,
+                    'symbols': symbols,
+                    'repeat': runs,
+                    'seconds': round(seconds, 6),
+                    'us_per_symbol': round(seconds / symbols * 1e6, 2),
+                }
+                results.append(result)
+                print(f"  {case_key(result):<58} {result['us_per_symbol']:>12,.1f} µs/symbol")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results with a baseline
+
+    Returns:
+        List of comparison rows with 'key', 'baseline', 'current', 'ratio'
+        and 'regression' (cases missing from the baseline are skipped)
+    """
+    reference = {case_key(r): r for r in baseline.get('results', [])}
+    rows = []
+    for result in results:
+        key = case_key(result)
+        if key not in reference:
+            continue
+        before = reference[key]['us_per_symbol']
+        ratio = result['us_per_symbol'] / before if before else float('inf')
+        rows.append({
+            'key': key,
+            'baseline': before,
+            'current': result['us_per_symbol'],
+            'ratio': round(ratio, 3),
+            'regression': ratio > 1 + threshold,
+        })
+    return rows
+
+
+def environment():
+    """Machine description stored next to the timings"""
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'seed': SEED,
+    }
+
+
+def _int_list(text):
+    return [int(part) for part in text.split(',') if part]
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Benchmark the technical-analysis hot path')
+    parser.add_argument('--bars', type=_int_list, default=list(DEFAULT_BARS),
+                        help='Comma-separated series lengths (default: 60,1000,10000)')
+    parser.add_argument('--symbols', type=_int_list, default=list(DEFAULT_SYMBOLS),
+                        help='Comma-separated universe sizes (default: 1,1000)')
+    parser.add_argument('--functions', type=lambda t: t.split(','), default=list(CASES),
+                        help='Comma-separated subset of: ' + ', '.join(CASES))
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case (best is kept)')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='Baseline JSON to compare against')
+    parser.add_argument('--update-baseline', action='store_true', help='Store this run as the new baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Allowed slowdown before a case fails (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    unknown = [name for name in args.functions if name not in CASES]
+    if unknown:
+        parser.error(f"Unknown functions: {', '.join(unknown)}")
+
+    print("⏱️  Technical analysis benchmark")
+    report = {'environment': environment(), 'results': run_suite(args.bars, args.symbols, args.functions, args.repeat)}
+
+    baseline_path = Path(args.baseline)
+    exit_code = 0
+    if baseline_path.exists() and not args.update_baseline:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        report['baseline'] = {'path': str(baseline_path), 'environment': baseline.get('environment')}
+        report['comparison'] = compare(report['results'], baseline, args.threshold)
+
+        print(f"\n📊 Against baseline {baseline_path} (threshold +{args.threshold:.0%})")
+        for row in report['comparison']:
+            flag = '❌' if row['regression'] else '✅'
+            print(f"  {flag} {row['key']:<58} {row['baseline']:>12,.1f} -> {row['current']:>12,.1f}  x{row['ratio']:.2f}")
+        regressions = [row for row in report['comparison'] if row['regression']]
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s)")
+            exit_code = 1
+        else:
+            print("\n✅ No regressions")
+    elif not args.update_baseline:
+        print(f"\n⚠️  No baseline at {baseline_path}; run with --update-baseline to create one")
+
+    if args.update_baseline:
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump({'environment': report['environment'], 'results': report['results']}, f, indent=2)
+        print(f"\n💾 Baseline saved to {baseline_path}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results saved to {args.output}")
+
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Universe Analysis Benchmark
+Wall time of analyze_universe with one process against a pool of N, for a
+range of universe sizes, to show where the shared-memory process pool pays
+for its startup (fork, attach, result pickling).
+
+Data comes from DemoStockData.generate_price_matrix with a fixed seed, so
+no network or database is needed.
+
+Run: python3 benchmarks/bench_universe_analysis.py [--symbols 50,400,1600]
+                                                   [--workers 2,4] [--bars 260]
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.demo_data import DemoStockData
+from src import universe_analysis
+from src.universe_analysis import analyze_universe
+
+# Seed of the synthetic universe
+SEED = 20240101
+
+
+def build_histories(symbols, bars):
+    """symbol -> bars (oldest first) with 'close' and 'volume'"""
+    matrix = DemoStockData.generate_price_matrix(symbols, bars, seed=SEED)
+    return {
+        f"S{row:04d}": [{'close': c, 'volume': v} for c, v in zip(closes, volumes)]
+        for row, (closes, volumes) in enumerate(zip(matrix['close'].tolist(), matrix['volume'].tolist()))
+    }
+
+
+def measure(histories, workers, repeat):
+    """Best-of-`repeat` wall time in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        analyze_universe(histories, workers=workers)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Benchmark analyze_universe with 1 vs N worker processes')
+    parser.add_argument('--symbols', default='50,400,1600', help='Comma-separated universe sizes')
+    parser.add_argument('--workers', default=None,
+                        help='Comma-separated pool sizes to compare with 1 (default: 2 and the CPU count)')
+    parser.add_argument('--bars', type=int, default=260, help='Bars per symbol')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case (best is kept)')
+    args = parser.parse_args()
+
+    sizes = [int(n) for n in args.symbols.split(',')]
+    pools = sorted({int(n) for n in args.workers.split(',')} if args.workers else {2, os.cpu_count() or 1} - {1})
+
+    # Measure the pool itself, not the small-universe inline fallback
+    universe_analysis.MIN_PARALLEL_SYMBOLS = 0
+
+    print(f"CPUs: {os.cpu_count()}  bars/symbol: {args.bars}")
+    print(f"{'symbols':>8} {'workers':>8} {'ms':>10} {'vs 1':>8}")
+    for size in sizes:
+        histories = build_histories(size, args.bars)
+        serial = measure(histories, 1, args.repeat)
+        print(f"{size:>8} {1:>8} {serial:>10.1f} {1.0:>7.2f}x")
+        for workers in pools:
+            parallel = measure(histories, workers, args.repeat)
+            print(f"{size:>8} {workers:>8} {parallel:>10.1f} {serial / parallel:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
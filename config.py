@@ -38,10 +38,30 @@ DATABASE_URL = (
 # - idle_timeout: Time in ms before closing idle connections (30000 = 30 seconds)
 #   * Lower timeout (10-20s) for bursty traffic to free connections quickly
 #   * Higher timeout (60-120s) for steady traffic to reduce connection overhead
+# - timeout: Seconds a request waits for a free connection before failing
+# - max_lifetime: Seconds before a connection is replaced (0 = never)
+# - validate_idle: Connections idle this many seconds are checked with
+#   SELECT 1 before use (0 = check on every checkout)
+# - prepared_statements: PREPARE registered hot queries once per connection
+#   (api/statements.py); disable behind transaction-pooling PgBouncer
 DATABASE_POOL = {
     'min_connections': int(os.getenv('DB_POOL_MIN', 2)),
     'max_connections': int(os.getenv('DB_POOL_MAX', 20)),
     'idle_timeout': int(os.getenv('DB_POOL_IDLE_TIMEOUT', 30000)),
+    'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+    'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+    'validate_idle': float(os.getenv('DB_POOL_VALIDATE_IDLE', 5)),
+    'prepared_statements': os.getenv('DB_PREPARED_STATEMENTS', 'true').lower() == 'true',
+}
+
+# Read replicas (streaming standbys of DATABASE, same database and user)
+# - DB_REPLICA_HOSTS: Comma-separated host[:port] list; empty = all reads on the primary
+# - max_lag: Skip replicas more than this many seconds behind (0 = no limit)
+# - check_interval: Seconds between health/lag probes of each replica
+DATABASE_REPLICAS = {
+    'hosts': [h.strip() for h in os.getenv('DB_REPLICA_HOSTS', '').split(',') if h.strip()],
+    'max_lag': float(os.getenv('DB_REPLICA_MAX_LAG', 0)),
+    'check_interval': float(os.getenv('DB_REPLICA_CHECK_INTERVAL', 5)),
 }
 
 # ════════════════════════════════════════════════════════════════
@@ -54,6 +74,12 @@ API_SERVER = {
     'debug': os.getenv('DEBUG', 'False').lower() == 'true',
 }
 
+# Async serving mode (python asgi.py): Hypercorn worker processes, each
+# with one event loop and its own DB_POOL_MIN..DB_POOL_MAX asyncpg pool
+ASYNC_SERVER = {
+    'workers': int(os.getenv('ASYNC_WORKERS', 2)),
+}
+
 # CORS settings
 CORS_ORIGINS = [
     'http://localhost:5000',
@@ -99,6 +125,21 @@ REFRESH_INTERVALS = {
     'prices': int(os.getenv('PRICE_UPDATE_INTERVAL', 300)),        # 5 minutes
     'indicators': int(os.getenv('INDICATOR_UPDATE_INTERVAL', 3600)), # 1 hour
     'forecasts': int(os.getenv('FORECAST_UPDATE_INTERVAL', 86400)),  # 24 hours
+    # How often API workers re-check whether collectors wrote new prices
+    'data_version': float(os.getenv('DATA_VERSION_CHECK_INTERVAL', 5)),
+}
+
+# Request/query instrumentation exposed at /metrics (see api/metrics.py)
+METRICS = {
+    'enabled': os.getenv('METRICS_ENABLED', 'true').lower() == 'true',
+    # Statements slower than this are logged with their fingerprint (0 = off)
+    'slow_query_ms': float(os.getenv('SLOW_QUERY_MS', 500)),
+}
+
+# HTTP caching of price-derived responses (see api/conditional.py)
+HTTP_CACHE = {
+    # Cache lifetime for history ranges that end before the latest price date
+    'closed_range_max_age': int(os.getenv('CLOSED_RANGE_MAX_AGE', 86400)),
 }
 
 # ════════════════════════════════════════════════════════════════
@@ -204,13 +245,28 @@ FORECAST_DAYS = 7
 # CACHE SETTINGS
 # ════════════════════════════════════════════════════════════════
 
-CACHE_ENABLED = True
+CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'true').lower() == 'true'
 CACHE_TTL = {
     'stock_list': 3600,        # 1 hour
     'stock_prices': 300,       # 5 minutes
     'indicators': 1800,        # 30 minutes
     'forecasts': 7200,         # 2 hours
+    'news': 900,               # 15 minutes
 }
+# How long past its TTL an entry may still be served while one request
+# refreshes it (stale-while-revalidate), or when the refresh fails
+CACHE_STALE_TTL = {
+    'stock_list': 3600,
+    'stock_prices': 60,
+    'indicators': 300,
+    'forecasts': 3600,
+    'news': 3600,
+}
+# Cached responses/query results per API worker (least recently used are evicted)
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 2048))
+# Bearer token for POST /api/cache/invalidate; when unset the endpoint only
+# answers requests from the API host itself (loopback)
+CACHE_ADMIN_TOKEN = os.getenv('CACHE_ADMIN_TOKEN') or None
 
 # ════════════════════════════════════════════════════════════════
 # HELPER FUNCTIONS
@@ -242,8 +298,11 @@ def get_database_pool():
     """
     Get database connection pool
 
+    A thread-safe pool (api.pool.ConnectionPool): getconn() waits up to
+    DB_POOL_TIMEOUT for a free connection, and connections are validated,
+    recycled after DB_POOL_MAX_LIFETIME and reaped when idle.
+
     Usage:
-        from psycopg2 import pool
         from config import get_database_pool
 
         db_pool = get_database_pool()
@@ -252,10 +311,14 @@ def get_database_pool():
         db_pool.putconn(conn)
     """
     try:
-        from psycopg2 import pool
-        return pool.SimpleConnectionPool(
+        from api.pool import ConnectionPool
+        return ConnectionPool(
             DATABASE_POOL['min_connections'],
             DATABASE_POOL['max_connections'],
+            timeout=DATABASE_POOL['timeout'],
+            max_lifetime=DATABASE_POOL['max_lifetime'],
+            idle_timeout=DATABASE_POOL['idle_timeout'] / 1000,
+            validate_idle=DATABASE_POOL['validate_idle'],
             **DATABASE
         )
     except ImportError:
@@ -316,6 +379,8 @@ def validate_config():
         errors.append("DB_POOL_MAX must be >= DB_POOL_MIN")
     if DATABASE_POOL['max_connections'] > 100:
         errors.append("DB_POOL_MAX should not exceed 100 (PostgreSQL limit)")
+    if DATABASE_POOL['timeout'] <= 0:
+        errors.append("DB_POOL_TIMEOUT must be positive")
 
     # Validate API server settings
     if not (1024 <= API_SERVER['port'] <= 65535):
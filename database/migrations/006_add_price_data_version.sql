@@ -0,0 +1,7 @@
+-- Add price data version counter
+-- Bumped by the stock collector in the same transaction as each price upsert;
+-- API workers poll it to know when in-memory screens and caches are stale
+
+INSERT INTO system_controls (control_key, control_value, control_type, description) VALUES
+    ('data.stock_prices.version', '0', 'state', 'Incremented on every stock price write')
+ON CONFLICT (control_key) DO NOTHING;
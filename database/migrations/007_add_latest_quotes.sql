@@ -0,0 +1,95 @@
+-- Add trigger-maintained latest quote table
+-- One row per stock holding its most recent stock_prices bar, kept current
+-- by a trigger on stock_prices, so "latest price" reads no longer scan the
+-- price history (DISTINCT ON / LATERAL) and cost the same at any history size
+
+CREATE TABLE IF NOT EXISTS latest_quotes (
+    stock_id INTEGER PRIMARY KEY REFERENCES stocks(id) ON DELETE CASCADE,
+    date DATE NOT NULL,
+    open DECIMAL(15, 2) NOT NULL,
+    high DECIMAL(15, 2) NOT NULL,
+    low DECIMAL(15, 2) NOT NULL,
+    close DECIMAL(15, 2) NOT NULL,
+    volume BIGINT NOT NULL DEFAULT 0,
+    change_percent DECIMAL(10, 4),
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_latest_quotes_date ON latest_quotes(date DESC);
+
+-- Re-derive one stock's latest quote from its history (used after deletes
+-- and updates that may have removed the current latest bar)
+CREATE OR REPLACE FUNCTION rebuild_latest_quote(p_stock_id INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM latest_quotes WHERE stock_id = p_stock_id;
+    INSERT INTO latest_quotes (stock_id, date, open, high, low, close, volume, change_percent)
+    SELECT stock_id, date, open, high, low, close, volume, change_percent
+    FROM stock_prices
+    WHERE stock_id = p_stock_id
+    ORDER BY date DESC
+    LIMIT 1;
+END;
+$$ language 'plpgsql';
+
+-- Keep latest_quotes in step with every stock_prices write
+CREATE OR REPLACE FUNCTION sync_latest_quote()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        -- The old row was the latest bar and has moved or gone: re-derive
+        IF EXISTS (SELECT 1 FROM latest_quotes WHERE stock_id = OLD.stock_id AND date = OLD.date)
+           AND (TG_OP = 'DELETE' OR NEW.stock_id <> OLD.stock_id OR NEW.date < OLD.date) THEN
+            PERFORM rebuild_latest_quote(OLD.stock_id);
+        END IF;
+        IF TG_OP = 'DELETE' THEN
+            RETURN OLD;
+        END IF;
+    END IF;
+
+    -- Older bars (backfills) leave the current quote alone
+    INSERT INTO latest_quotes (stock_id, date, open, high, low, close, volume, change_percent, updated_at)
+    VALUES (NEW.stock_id, NEW.date, NEW.open, NEW.high, NEW.low, NEW.close, NEW.volume, NEW.change_percent, NOW())
+    ON CONFLICT (stock_id) DO UPDATE SET
+        date = EXCLUDED.date,
+        open = EXCLUDED.open,
+        high = EXCLUDED.high,
+        low = EXCLUDED.low,
+        close = EXCLUDED.close,
+        volume = EXCLUDED.volume,
+        change_percent = EXCLUDED.change_percent,
+        updated_at = EXCLUDED.updated_at
+    WHERE latest_quotes.date <= EXCLUDED.date;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS sync_latest_quote ON stock_prices;
+CREATE TRIGGER sync_latest_quote AFTER INSERT OR UPDATE OR DELETE ON stock_prices
+    FOR EACH ROW EXECUTE FUNCTION sync_latest_quote();
+
+-- Seed from existing history
+INSERT INTO latest_quotes (stock_id, date, open, high, low, close, volume, change_percent)
+SELECT DISTINCT ON (stock_id) stock_id, date, open, high, low, close, volume, change_percent
+FROM stock_prices
+ORDER BY stock_id, date DESC
+ON CONFLICT (stock_id) DO NOTHING;
+
+-- Serve the latest prices view from the stored quotes
+CREATE OR REPLACE VIEW latest_stock_prices AS
+SELECT
+    s.id as stock_id,
+    s.symbol,
+    s.name,
+    lq.date,
+    lq.close as price,
+    lq.volume,
+    lq.change_percent,
+    lq.open,
+    lq.high,
+    lq.low
+FROM stocks s
+JOIN latest_quotes lq ON lq.stock_id = s.id
+WHERE s.is_active = TRUE;
+
+COMMENT ON TABLE latest_quotes IS 'Latest stock_prices bar per stock, maintained by the sync_latest_quote trigger';
@@ -0,0 +1,7 @@
+-- Add precomputed indicator version counter
+-- Bumped by jobs/compute_indicators.py in the same transaction as each batch;
+-- API workers poll it to drop cached indicator responses
+
+INSERT INTO system_controls (control_key, control_value, control_type, description) VALUES
+    ('data.technical_indicators.version', '0', 'state', 'Incremented on every indicator batch')
+ON CONFLICT (control_key) DO NOTHING;
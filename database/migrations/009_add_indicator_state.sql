@@ -0,0 +1,16 @@
+-- Add persisted incremental indicator state
+-- One row per stock holding the running accumulators (EMAs, Wilder averages,
+-- rolling-window sums, MACD signal). The collector advances it by each saved
+-- bar and jobs/compute_indicators.py reads it for the close-based columns of
+-- the latest technical_indicators row instead of recomputing them from history
+
+CREATE TABLE IF NOT EXISTS indicator_state (
+    stock_id INTEGER PRIMARY KEY REFERENCES stocks(id) ON DELETE CASCADE,
+    last_date DATE NOT NULL,        -- Date of the last bar applied to the state
+    state JSONB NOT NULL,           -- Serialized src.indicator_state.IndicatorState
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_indicator_state_last_date ON indicator_state(last_date DESC);
+
+COMMENT ON TABLE indicator_state IS 'Incremental per-stock indicator accumulators behind the latest technical_indicators row';
@@ -59,6 +59,21 @@ CREATE INDEX idx_stock_prices_stock_date ON stock_prices(stock_id, date DESC);
 CREATE INDEX idx_stock_prices_date ON stock_prices(date DESC);
 CREATE INDEX idx_stock_prices_volume ON stock_prices(volume DESC);
 
+-- Latest bar per stock, maintained by the sync_latest_quote trigger below
+CREATE TABLE latest_quotes (
+    stock_id INTEGER PRIMARY KEY REFERENCES stocks(id) ON DELETE CASCADE,
+    date DATE NOT NULL,
+    open DECIMAL(15, 2) NOT NULL,
+    high DECIMAL(15, 2) NOT NULL,
+    low DECIMAL(15, 2) NOT NULL,
+    close DECIMAL(15, 2) NOT NULL,
+    volume BIGINT NOT NULL DEFAULT 0,
+    change_percent DECIMAL(10, 4),
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX idx_latest_quotes_date ON latest_quotes(date DESC);
+
 -- Partition by date (for better performance with large datasets)
 -- Optional: Can be enabled for very large datasets
 -- CREATE TABLE stock_prices_2024 PARTITION OF stock_prices
@@ -102,6 +117,17 @@ CREATE TABLE technical_indicators (
 -- Indexes for technical_indicators table
 CREATE INDEX idx_tech_indicators_stock_date ON technical_indicators(stock_id, date DESC);
 
+-- Incremental indicator accumulators (advanced one bar at a time by the collector
+-- and the indicator batch, which reads them for the latest-bar columns)
+CREATE TABLE indicator_state (
+    stock_id INTEGER PRIMARY KEY REFERENCES stocks(id) ON DELETE CASCADE,
+    last_date DATE NOT NULL,
+    state JSONB NOT NULL, -- Serialized src.indicator_state.IndicatorState
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX idx_indicator_state_last_date ON indicator_state(last_date DESC);
+
 -- ═══════════════════════════════════════════════════════════════
 -- 4. PRICE FORECASTS
 -- ═══════════════════════════════════════════════════════════════
@@ -375,21 +401,20 @@ CREATE INDEX idx_audit_created ON audit_log(created_at DESC);
 
 -- Latest prices view
 CREATE OR REPLACE VIEW latest_stock_prices AS
-SELECT DISTINCT ON (s.id)
+SELECT
     s.id as stock_id,
     s.symbol,
     s.name,
-    sp.date,
-    sp.close as price,
-    sp.volume,
-    sp.change_percent,
-    sp.open,
-    sp.high,
-    sp.low
+    lq.date,
+    lq.close as price,
+    lq.volume,
+    lq.change_percent,
+    lq.open,
+    lq.high,
+    lq.low
 FROM stocks s
-JOIN stock_prices sp ON s.id = sp.stock_id
-WHERE s.is_active = TRUE
-ORDER BY s.id, sp.date DESC;
+JOIN latest_quotes lq ON lq.stock_id = s.id
+WHERE s.is_active = TRUE;
 
 -- Portfolio performance view
 CREATE OR REPLACE VIEW portfolio_performance AS
@@ -448,6 +473,56 @@ CREATE TRIGGER update_position_gain_loss BEFORE UPDATE ON portfolio_positions
     FOR EACH ROW WHEN (NEW.current_price IS DISTINCT FROM OLD.current_price)
     EXECUTE FUNCTION calculate_position_gain_loss();
 
+-- Re-derive one stock's latest quote from its history (used after deletes
+-- and updates that may have removed the current latest bar)
+CREATE OR REPLACE FUNCTION rebuild_latest_quote(p_stock_id INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM latest_quotes WHERE stock_id = p_stock_id;
+    INSERT INTO latest_quotes (stock_id, date, open, high, low, close, volume, change_percent)
+    SELECT stock_id, date, open, high, low, close, volume, change_percent
+    FROM stock_prices
+    WHERE stock_id = p_stock_id
+    ORDER BY date DESC
+    LIMIT 1;
+END;
+$$ language 'plpgsql';
+
+-- Keep latest_quotes in step with every stock_prices write
+CREATE OR REPLACE FUNCTION sync_latest_quote()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        -- The old row was the latest bar and has moved or gone: re-derive
+        IF EXISTS (SELECT 1 FROM latest_quotes WHERE stock_id = OLD.stock_id AND date = OLD.date)
+           AND (TG_OP = 'DELETE' OR NEW.stock_id <> OLD.stock_id OR NEW.date < OLD.date) THEN
+            PERFORM rebuild_latest_quote(OLD.stock_id);
+        END IF;
+        IF TG_OP = 'DELETE' THEN
+            RETURN OLD;
+        END IF;
+    END IF;
+
+    -- Older bars (backfills) leave the current quote alone
+    INSERT INTO latest_quotes (stock_id, date, open, high, low, close, volume, change_percent, updated_at)
+    VALUES (NEW.stock_id, NEW.date, NEW.open, NEW.high, NEW.low, NEW.close, NEW.volume, NEW.change_percent, NOW())
+    ON CONFLICT (stock_id) DO UPDATE SET
+        date = EXCLUDED.date,
+        open = EXCLUDED.open,
+        high = EXCLUDED.high,
+        low = EXCLUDED.low,
+        close = EXCLUDED.close,
+        volume = EXCLUDED.volume,
+        change_percent = EXCLUDED.change_percent,
+        updated_at = EXCLUDED.updated_at
+    WHERE latest_quotes.date <= EXCLUDED.date;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER sync_latest_quote AFTER INSERT OR UPDATE OR DELETE ON stock_prices
+    FOR EACH ROW EXECUTE FUNCTION sync_latest_quote();
+
 -- ═══════════════════════════════════════════════════════════════
 -- 17. INVESTMENT PLANS (Dashboard Advanced Feature)
 -- ═══════════════════════════════════════════════════════════════
@@ -505,6 +580,8 @@ CREATE INDEX idx_investment_plan_holdings_plan ON investment_plan_holdings(plan_
 COMMENT ON TABLE stocks IS 'Master table for all Vietnamese stocks';
 COMMENT ON TABLE stock_prices IS 'Historical OHLCV price data for all stocks';
 COMMENT ON TABLE technical_indicators IS 'Pre-calculated technical indicators for faster queries';
+COMMENT ON TABLE latest_quotes IS 'Latest stock_prices bar per stock, maintained by the sync_latest_quote trigger';
+COMMENT ON TABLE indicator_state IS 'Incremental per-stock indicator accumulators behind the latest technical_indicators row';
 COMMENT ON TABLE price_forecasts IS 'ML/AI generated price predictions';
 COMMENT ON TABLE forecast_accuracy IS 'Model performance metrics for evaluation';
 COMMENT ON TABLE users IS 'User accounts and authentication';
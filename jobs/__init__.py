@@ -4,5 +4,6 @@ Data Collection Jobs Package
 
 from .collect_stock_data import StockDataCollector
 from .collect_macro_data import MacroDataCollector
+from .compute_indicators import TechnicalIndicatorCalculator
 
-__all__ = ['StockDataCollector', 'MacroDataCollector']
+__all__ = ['StockDataCollector', 'MacroDataCollector', 'TechnicalIndicatorCalculator']
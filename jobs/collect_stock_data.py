@@ -20,6 +20,7 @@ from config import (
     COLLECTION_CONFIG
 )
 from psycopg2.extras import execute_values
+from src.indicator_state import advance_states
 
 
 class StockDataCollector:
@@ -197,9 +198,12 @@ class StockDataCollector:
                         """,
                         records
                     )
+                    self.bump_price_version(cursor)
                     conn.commit()
                     print(f"✅ Saved {len(records)} price records")
 
+                    self.update_indicator_state(conn, records)
+
             conn.close()
             return True
 
@@ -210,6 +214,31 @@ class StockDataCollector:
                 conn.close()
             return False
 
+    def bump_price_version(self, cursor):
+        """Signal API workers that stock prices changed"""
+        cursor.execute("""
+            INSERT INTO system_controls (control_key, control_value, control_type, description)
+            VALUES ('data.stock_prices.version', '1', 'state', 'Incremented on every stock price write')
+            ON CONFLICT (control_key) DO UPDATE SET
+                control_value = (COALESCE(NULLIF(system_controls.control_value, ''), '0')::bigint + 1)::text,
+                updated_at = NOW()
+        """)
+
+    def update_indicator_state(self, conn, records):
+        """Advance each stock's persisted indicator state by the saved bar"""
+        try:
+            with conn.cursor() as cursor:
+                states = advance_states(cursor, [
+                    {'stock_id': r[0], 'date': r[1], 'close': r[5], 'volume': r[6]}
+                    for r in records
+                ])
+            conn.commit()
+            print(f"📐 Updated indicator state for {len(states)} stocks")
+        except Exception as e:
+            # Prices are already committed; indicators catch up on the next run
+            conn.rollback()
+            print(f"⚠️  Indicator state update failed: {e}")
+
     def run(self):
         """Run the stock data collection job"""
         try:
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Technical Indicator Batch Job
+Computes indicators for every active stock in bulk and upserts them into
+the technical_indicators table. Runs after each stock data collection.
+
+The close-based columns of the latest bar come from the persisted
+incremental state (src/indicator_state.py), so a regular run only reads the
+short history the OHLCV columns and the price-action analysis need.
+"""
+
+import sys
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import get_database_connection
+from psycopg2.extras import Json, execute_values
+from src import indicators
+from src.indicator_state import advance_states, rebuild_states
+from src.technical_analysis import TechnicalAnalyzer
+
+
+# Bars fed to the price-action analysis (matches /api/stock-analysis)
+ANALYSIS_BARS = 60
+
+# Bars read per stock on a regular run: covers the 14-bar OHLCV windows and
+# the analysis; the 200-bar SMA and the EMAs come from the persisted state
+INCREMENTAL_BARS = ANALYSIS_BARS
+
+# Every stored column, close-based and OHLCV-based
+TABLE_COLUMNS = {**indicators.TABLE_COLUMNS, **indicators.OHLCV_TABLE_COLUMNS}
+
+
+class TechnicalIndicatorCalculator:
+    """Computes technical indicators for the whole universe in one batch"""
+
+    def __init__(self, backfill=False):
+        # backfill=True writes every historical date, not only the latest bar
+        self.backfill = backfill
+
+    def load_histories(self, cursor):
+        """Load recent OHLCV history for every active stock in one query"""
+        cursor.execute("""
+            SELECT stock_id, date, open, high, low, close, volume
+            FROM (
+                SELECT sp.stock_id, sp.date, sp.open, sp.high, sp.low, sp.close, sp.volume,
+                       ROW_NUMBER() OVER (PARTITION BY sp.stock_id ORDER BY sp.date DESC) AS rn
+                FROM stock_prices sp
+                JOIN stocks s ON s.id = sp.stock_id
+                WHERE s.is_active = TRUE
+            ) recent
+            WHERE %s::int IS NULL OR rn <= %s::int
+            ORDER BY stock_id, date ASC
+        """, (None if self.backfill else INCREMENTAL_BARS,) * 2)
+
+        histories = {}
+        for stock_id, bar_date, open_, high, low, close, volume in cursor.fetchall():
+            histories.setdefault(stock_id, []).append({
+                'date': bar_date,
+                'open': float(open_),
+                'high': float(high),
+                'low': float(low),
+                'close': float(close),
+                'volume': int(volume or 0),
+            })
+        return histories
+
+    def compute(self, histories, states=None):
+        """
+        Compute indicator rows for every stock
+
+        Args:
+            histories: Bars per stock id, oldest first
+            states: Optional indicator states advanced to each stock's latest
+                    bar; they supply that bar's close-based columns
+
+        Returns:
+            List of tuples ready for the technical_indicators upsert
+        """
+        stock_ids, columns = indicators.build_ohlcv_matrix(histories)
+        series = indicators.compute_all(columns['close'], columns['volume'],
+                                        highs=columns['high'], lows=columns['low'])
+
+        length = columns['close'].shape[1]
+        records = []
+        for row, stock_id in enumerate(stock_ids):
+            bars = histories[stock_id]
+            offset = length - len(bars)
+            analysis = TechnicalAnalyzer.analyze_price_action(bars[-ANALYSIS_BARS:])
+
+            positions = range(offset, length) if self.backfill else [length - 1]
+            for col in positions:
+                bar_date = bars[col - offset]['date']
+                values = {column: _db_value(series[key][row, col]) for column, key in TABLE_COLUMNS.items()}
+                extra = {'volume_sma_20': _db_value(series['volume_ma20'][row, col])}
+                if col == length - 1:
+                    extra['analysis'] = analysis
+                    state = (states or {}).get(stock_id)
+                    if state is not None and state.last_date == str(bar_date):
+                        latest = state.values()
+                        values.update({column: _db_value(latest[column]) for column in indicators.TABLE_COLUMNS})
+                        extra['volume_sma_20'] = _db_value(latest['volume_sma_20'])
+                records.append((stock_id, bar_date, *values.values(), Json(extra)))
+        return records
+
+    def save(self, cursor, records):
+        """Upsert indicator rows in one batch"""
+        columns = ', '.join(TABLE_COLUMNS)
+        updates = ',\n                '.join(f"{c} = EXCLUDED.{c}" for c in TABLE_COLUMNS)
+        execute_values(cursor, f"""
+            INSERT INTO technical_indicators (stock_id, date, {columns}, indicators)
+            VALUES %s
+            ON CONFLICT (stock_id, date)
+            DO UPDATE SET
+                {updates},
+                indicators = EXCLUDED.indicators
+        """, records, page_size=1000)
+
+    def bump_indicator_version(self, cursor):
+        """Signal API workers that precomputed indicators changed (invalidates cached responses)"""
+        cursor.execute("""
+            INSERT INTO system_controls (control_key, control_value, control_type, description)
+            VALUES ('data.technical_indicators.version', '1', 'state', 'Incremented on every indicator batch')
+            ON CONFLICT (control_key) DO UPDATE SET
+                control_value = (COALESCE(NULLIF(system_controls.control_value, ''), '0')::bigint + 1)::text,
+                updated_at = NOW()
+        """)
+
+    def run(self):
+        """Run the indicator batch job"""
+        print("=" * 70)
+        print(f"📐 Computing Technical Indicators - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print("=" * 70)
+
+        conn = get_database_connection()
+        try:
+            with conn.cursor() as cursor:
+                histories = self.load_histories(cursor)
+                if not histories:
+                    print("⚠️  No price history found")
+                    return 0
+
+                started = datetime.now()
+                states = None
+                if not self.backfill:
+                    states = advance_states(cursor, [
+                        {'stock_id': stock_id, **bars[-1]} for stock_id, bars in histories.items()
+                    ])
+                records = self.compute(histories, states)
+                elapsed = (datetime.now() - started).total_seconds()
+                print(f"Computed {len(records)} indicator rows for {len(histories)} stocks in {elapsed:.2f}s")
+
+                self.save(cursor, records)
+                if self.backfill:
+                    # Restart the incremental path from the recomputed history
+                    rebuild_states(cursor, list(histories))
+                self.bump_indicator_version(cursor)
+            conn.commit()
+            print(f"✅ Saved {len(records)} technical indicator rows")
+            return len(records)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+
+def _db_value(value):
+    """NaN-safe float for NUMERIC columns"""
+    if value is None or np.isnan(value):
+        return None
+    return round(float(value), 4)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Compute technical indicators for all active stocks')
+    parser.add_argument('--backfill', action='store_true',
+                        help='Recompute and store indicators for every historical date')
+    args = parser.parse_args()
+
+    TechnicalIndicatorCalculator(backfill=args.backfill).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -18,6 +18,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from config import get_database_connection
 from jobs.collect_stock_data import StockDataCollector
+from jobs.compute_indicators import TechnicalIndicatorCalculator
 from jobs.collect_macro_data import MacroDataCollector
 
 # Setup logging
@@ -118,6 +119,12 @@ class JobWatcher:
                 collector = StockDataCollector()
                 collector.run()
 
+                # Refresh precomputed indicators for the new bars
+                try:
+                    TechnicalIndicatorCalculator().run()
+                except Exception as e:
+                    logger.error(f"Indicator computation failed: {e}")
+
                 # Update last collection time
                 self.set_control_value('system.last_stock_collection', datetime.now().isoformat())
 
@@ -29,6 +29,7 @@ from config import (
 
 # Import job modules
 from jobs.collect_stock_data import StockDataCollector
+from jobs.compute_indicators import TechnicalIndicatorCalculator
 from jobs.collect_macro_data import MacroDataCollector
 
 
@@ -94,6 +95,19 @@ class DataScheduler:
         except Exception as e:
             logger.error(f"Stock collection job failed: {e}", exc_info=True)
             log_activity('collection', 'Stock collection failed', str(e), 'error')
+            return
+
+        self.compute_indicators()
+
+    def compute_indicators(self):
+        """Job stage: Compute technical indicators after stock collection"""
+        try:
+            logger.info("Computing technical indicators for all active stocks")
+            rows = TechnicalIndicatorCalculator().run()
+            log_activity('collection', 'Indicators computed', f'{rows} technical indicator rows updated', 'success')
+        except Exception as e:
+            logger.error(f"Indicator computation failed: {e}", exc_info=True)
+            log_activity('collection', 'Indicator computation failed', str(e), 'error')
 
     def collect_macro(self):
         """Job: Collect macro data"""
@@ -5,7 +5,9 @@ Use this when VNDirect API is not accessible
 
 import random
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+import numpy as np
 
 
 class DemoStockData:
@@ -113,6 +115,43 @@ class DemoStockData:
         return history
 
 
+    @staticmethod
+    def generate_price_matrix(symbols: int, days: int, seed: Optional[int] = 0) -> Dict[str, np.ndarray]:
+        """
+        Generate OHLCV histories for many synthetic stocks at once
+
+        Vectorized counterpart of generate_historical_data: the same +/-3%
+        daily random walk, but for a whole symbol x date grid in a few NumPy
+        operations. There is no clamping to the base range, so multi-year
+        series keep moving instead of sticking to the band edges.
+
+        Args:
+            symbols: Number of rows (base prices cycle through STOCK_PRICES)
+            days: Number of bars per row (oldest first)
+            seed: RNG seed; the same seed always yields the same data
+
+        Returns:
+            Dictionary with 'open', 'high', 'low', 'close' and 'volume'
+            matrices of shape (symbols, days)
+        """
+        rng = np.random.default_rng(seed)
+        bases = np.array([info['base'] for info in DemoStockData.STOCK_PRICES.values()], dtype=np.float64)
+        base = np.resize(bases, symbols)[:, None]
+
+        close = base * np.cumprod(1 + rng.uniform(-0.03, 0.03, (symbols, days)), axis=1)
+        open_ = close * (1 + rng.uniform(-0.01, 0.01, (symbols, days)))
+        high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.02, (symbols, days)))
+        low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.02, (symbols, days)))
+
+        return {
+            'open': np.round(open_),
+            'high': np.round(high),
+            'low': np.round(low),
+            'close': np.round(close),
+            'volume': rng.integers(100000, 5000000, (symbols, days)).astype(np.float64) * 1000,
+        }
+
+
 # Patch the real API with demo data
 def use_demo_data():
     """Monkey patch the real stock data fetcher to use demo data"""
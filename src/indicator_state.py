@@ -0,0 +1,447 @@
+"""
+Incremental Indicator State
+Per-symbol indicator accumulators that advance one bar at a time in O(1)
+
+The state carries everything needed to produce the latest value of each
+indicator stored in `technical_indicators` without re-reading history:
+EMA accumulators, Wilder RSI averages, rolling-window sums for the SMAs and
+Bollinger Bands, and the MACD signal line. A revised bar for the same date
+(intraday re-collection) rolls the previous update back before applying the
+new values, also in O(1).
+"""
+
+import math
+from collections import deque
+from datetime import date
+from typing import Dict, List, Optional
+
+from psycopg2.extras import Json, execute_values
+
+
+SMA_PERIODS = (20, 50, 200)
+EMA_PERIODS = (12, 26)
+RSI_PERIOD = 14
+MACD_SIGNAL_PERIOD = 9
+BOLLINGER_PERIOD = 20
+BOLLINGER_STD = 2
+VOLUME_PERIOD = 20
+
+# Longest window the state has to remember closes for
+WINDOW_SIZE = max(SMA_PERIODS)
+
+# Scalar fields saved for rollback and persistence
+_SCALAR_FIELDS = (
+    'last_date', 'bars', 'prev_close',
+    'ema_12', 'ema_26', 'macd_signal',
+    'avg_gain', 'avg_loss',
+    'sum_20', 'sum_50', 'sum_200', 'sumsq_20', 'volume_sum',
+)
+
+
+class IndicatorState:
+    """Running indicator accumulators for one symbol"""
+
+    def __init__(self):
+        self.last_date: Optional[str] = None
+        self.bars = 0
+        self.prev_close: Optional[float] = None
+
+        self.ema_12: Optional[float] = None
+        self.ema_26: Optional[float] = None
+        self.macd_signal: Optional[float] = None
+
+        self.avg_gain: Optional[float] = None
+        self.avg_loss: Optional[float] = None
+
+        self.sum_20 = 0.0
+        self.sum_50 = 0.0
+        self.sum_200 = 0.0
+        self.sumsq_20 = 0.0
+        self.volume_sum = 0.0
+
+        # Last WINDOW_SIZE closes and VOLUME_PERIOD volumes (oldest first)
+        self.closes = deque()
+        self.volumes = deque()
+
+        # Warm-up buffers, emptied once the corresponding average is seeded
+        self.rsi_warmup: List[List[float]] = []
+        self.macd_warmup: List[float] = []
+
+        # Undo record for the most recent advance()
+        self._undo: Optional[Dict] = None
+
+    # ------------------------------------------------------------------
+    # Updating
+    # ------------------------------------------------------------------
+
+    def advance(self, bar_date, close: float, volume: float = 0) -> Dict[str, Optional[float]]:
+        """
+        Apply one bar and return the latest indicator values.
+
+        A bar with the same date as the last one replaces it (intraday revision).
+
+        Args:
+            bar_date: Trading date of the bar (date or ISO string)
+            close: Closing price
+            volume: Traded volume
+
+        Returns:
+            Dictionary of indicator values (see values())
+        """
+        bar_date = _iso(bar_date)
+        if self.last_date is not None:
+            if bar_date == self.last_date:
+                self.rollback()
+            elif bar_date < self.last_date:
+                raise ValueError(f"Bar {bar_date} is older than last applied bar {self.last_date}")
+
+        close = float(close)
+        volume = float(volume or 0)
+        undo = {field: getattr(self, field) for field in _SCALAR_FIELDS}
+        undo['rsi_warmup'] = len(self.rsi_warmup)
+        undo['macd_warmup'] = len(self.macd_warmup)
+
+        # Rolling windows: add the new bar, drop what falls out of each window
+        self.closes.append(close)
+        self.sum_20 += close - self._close_ago(20)
+        self.sum_50 += close - self._close_ago(50)
+        self.sum_200 += close - self._close_ago(200)
+        dropped_20 = self._close_ago(20)
+        self.sumsq_20 += close * close - dropped_20 * dropped_20
+        undo['evicted_close'] = self.closes.popleft() if len(self.closes) > WINDOW_SIZE else None
+
+        self.volumes.append(volume)
+        self.volume_sum += volume
+        if len(self.volumes) > VOLUME_PERIOD:
+            evicted_volume = self.volumes.popleft()
+            self.volume_sum -= evicted_volume
+            undo['evicted_volume'] = evicted_volume
+        else:
+            undo['evicted_volume'] = None
+
+        self.bars += 1
+
+        # EMAs are seeded with the SMA of their first `period` closes
+        self.ema_12 = self._advance_ema(self.ema_12, close, 12)
+        self.ema_26 = self._advance_ema(self.ema_26, close, 26)
+
+        if self.ema_26 is not None:
+            line = self.ema_12 - self.ema_26
+            if self.macd_signal is None:
+                self.macd_warmup.append(line)
+                if len(self.macd_warmup) == MACD_SIGNAL_PERIOD:
+                    self.macd_signal = sum(self.macd_warmup) / MACD_SIGNAL_PERIOD
+            else:
+                self.macd_signal += (line - self.macd_signal) * 2 / (MACD_SIGNAL_PERIOD + 1)
+
+        # Wilder RSI averages are seeded with the mean of the first 14 changes
+        if self.prev_close is not None:
+            change = close - self.prev_close
+            gain, loss = max(change, 0.0), max(-change, 0.0)
+            if self.avg_gain is None:
+                self.rsi_warmup.append([gain, loss])
+                if len(self.rsi_warmup) == RSI_PERIOD:
+                    self.avg_gain = sum(g for g, _ in self.rsi_warmup) / RSI_PERIOD
+                    self.avg_loss = sum(l for _, l in self.rsi_warmup) / RSI_PERIOD
+            else:
+                self.avg_gain = (self.avg_gain * (RSI_PERIOD - 1) + gain) / RSI_PERIOD
+                self.avg_loss = (self.avg_loss * (RSI_PERIOD - 1) + loss) / RSI_PERIOD
+
+        self.prev_close = close
+        self.last_date = bar_date
+        self._undo = undo
+        return self.values()
+
+    def rollback(self):
+        """Undo the most recent advance() (only one level of undo is kept)"""
+        undo = self._undo
+        if undo is None:
+            raise ValueError("No bar to roll back")
+
+        self.closes.pop()
+        if undo['evicted_close'] is not None:
+            self.closes.appendleft(undo['evicted_close'])
+        self.volumes.pop()
+        if undo['evicted_volume'] is not None:
+            self.volumes.appendleft(undo['evicted_volume'])
+
+        del self.rsi_warmup[undo['rsi_warmup']:]
+        del self.macd_warmup[undo['macd_warmup']:]
+        for field in _SCALAR_FIELDS:
+            setattr(self, field, undo[field])
+        self._undo = None
+
+    def _close_ago(self, period: int) -> float:
+        """Close that leaves a `period` window after the latest append (0 if none)"""
+        if len(self.closes) > period:
+            return self.closes[-period - 1]
+        return 0.0
+
+    def _advance_ema(self, current: Optional[float], close: float, period: int) -> Optional[float]:
+        if current is not None:
+            return current + (close - current) * 2 / (period + 1)
+        if self.bars == period:
+            return sum(list(self.closes)[-period:]) / period
+        return None
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def values(self) -> Dict[str, Optional[float]]:
+        """Latest indicator values keyed by technical_indicators column"""
+        count = len(self.closes)
+        result = {
+            'sma_20': self.sum_20 / 20 if count >= 20 else None,
+            'sma_50': self.sum_50 / 50 if count >= 50 else None,
+            'sma_200': self.sum_200 / 200 if count >= 200 else None,
+            'ema_12': self.ema_12,
+            'ema_26': self.ema_26,
+            'rsi_14': None,
+            'macd': None,
+            'macd_signal': self.macd_signal,
+            'macd_histogram': None,
+            'bollinger_upper': None,
+            'bollinger_middle': None,
+            'bollinger_lower': None,
+            'volume_sma_20': self.volume_sum / VOLUME_PERIOD if len(self.volumes) >= VOLUME_PERIOD else None,
+        }
+
+        if self.avg_loss is not None:
+            if self.avg_loss == 0:
+                result['rsi_14'] = 100.0
+            else:
+                result['rsi_14'] = 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+
+        if self.ema_26 is not None:
+            result['macd'] = self.ema_12 - self.ema_26
+            if self.macd_signal is not None:
+                result['macd_histogram'] = result['macd'] - self.macd_signal
+
+        if count >= BOLLINGER_PERIOD:
+            middle = self.sum_20 / BOLLINGER_PERIOD
+            variance = (self.sumsq_20 - self.sum_20 * middle) / (BOLLINGER_PERIOD - 1)
+            std = math.sqrt(max(variance, 0.0))
+            result['bollinger_upper'] = middle + BOLLINGER_STD * std
+            result['bollinger_middle'] = middle
+            result['bollinger_lower'] = middle - BOLLINGER_STD * std
+
+        return result
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def to_dict(self) -> Dict:
+        """Serialize to a JSON-compatible dict (including the undo record)"""
+        data = {field: getattr(self, field) for field in _SCALAR_FIELDS}
+        data['closes'] = list(self.closes)
+        data['volumes'] = list(self.volumes)
+        data['rsi_warmup'] = self.rsi_warmup
+        data['macd_warmup'] = self.macd_warmup
+        data['undo'] = self._undo
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'IndicatorState':
+        """Restore a state produced by to_dict()"""
+        state = cls()
+        for field in _SCALAR_FIELDS:
+            setattr(state, field, data.get(field, getattr(state, field)))
+        state.closes = deque(data.get('closes', []))
+        state.volumes = deque(data.get('volumes', []))
+        state.rsi_warmup = [list(pair) for pair in data.get('rsi_warmup', [])]
+        state.macd_warmup = list(data.get('macd_warmup', []))
+        state._undo = data.get('undo')
+        return state
+
+    @classmethod
+    def from_history(cls, bars: List[Dict]) -> 'IndicatorState':
+        """
+        Build a state by replaying a history once (oldest first)
+
+        Args:
+            bars: List of dicts with 'date', 'close' and optional 'volume'
+        """
+        state = cls()
+        for bar in bars:
+            state.advance(bar['date'], bar['close'], bar.get('volume') or 0)
+        return state
+
+
+def _iso(value) -> str:
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+# ══════════════════════════════════════════════════════════════════
+# DATABASE PERSISTENCE (indicator_state table)
+# ══════════════════════════════════════════════════════════════════
+
+def load_states(cursor, stock_ids: List[int]) -> Dict[int, IndicatorState]:
+    """Load persisted states for the given stock ids"""
+    if not stock_ids:
+        return {}
+    cursor.execute("""
+        SELECT stock_id, state
+        FROM indicator_state
+        WHERE stock_id = ANY(%s)
+    """, (list(stock_ids),))
+    return {row[0]: IndicatorState.from_dict(row[1]) for row in cursor.fetchall()}
+
+
+def load_recent_history(cursor, stock_ids: List[int], bars: int = WINDOW_SIZE,
+                        before=None) -> Dict[int, List[Dict]]:
+    """
+    Load the last `bars` bars (oldest first) for each stock in one query,
+    optionally only bars dated before `before`
+    """
+    if not stock_ids:
+        return {}
+    cursor.execute("""
+        SELECT stock_id, date, close, volume
+        FROM (
+            SELECT stock_id, date, close, volume,
+                   ROW_NUMBER() OVER (PARTITION BY stock_id ORDER BY date DESC) AS rn
+            FROM stock_prices
+            WHERE stock_id = ANY(%s)
+              AND (%s::date IS NULL OR date < %s::date)
+        ) recent
+        WHERE rn <= %s
+        ORDER BY stock_id, date ASC
+    """, (list(stock_ids), before, before, bars))
+
+    history: Dict[int, List[Dict]] = {stock_id: [] for stock_id in stock_ids}
+    for stock_id, bar_date, close, volume in cursor.fetchall():
+        history[stock_id].append({'date': bar_date, 'close': float(close), 'volume': volume})
+    return history
+
+
+def save_states(cursor, states: Dict[int, IndicatorState]):
+    """Upsert states for many stocks in one statement"""
+    if not states:
+        return
+    execute_values(cursor, """
+        INSERT INTO indicator_state (stock_id, last_date, state, updated_at)
+        VALUES %s
+        ON CONFLICT (stock_id)
+        DO UPDATE SET
+            last_date = EXCLUDED.last_date,
+            state = EXCLUDED.state,
+            updated_at = NOW()
+    """, [
+        (stock_id, state.last_date, Json(state.to_dict()))
+        for stock_id, state in states.items()
+    ], template="(%s, %s, %s, NOW())")
+
+
+def load_gap_bars(cursor, gaps: Dict[int, tuple]) -> Dict[int, List[Dict]]:
+    """
+    Load the stored bars each state missed in one query (oldest first)
+
+    Args:
+        cursor: Open database cursor
+        gaps: {stock_id: (after, before)}; bars strictly between the two dates
+    """
+    if not gaps:
+        return {}
+    stock_ids = list(gaps)
+    cursor.execute("""
+        SELECT sp.stock_id, sp.date, sp.close, sp.volume
+        FROM unnest(%s::int[], %s::date[], %s::date[]) AS gap(stock_id, after_date, before_date)
+        JOIN stock_prices sp
+          ON sp.stock_id = gap.stock_id
+         AND sp.date > gap.after_date
+         AND sp.date < gap.before_date
+        ORDER BY sp.stock_id, sp.date ASC
+    """, (stock_ids, [gaps[s][0] for s in stock_ids], [gaps[s][1] for s in stock_ids]))
+
+    missed: Dict[int, List[Dict]] = {stock_id: [] for stock_id in stock_ids}
+    for stock_id, bar_date, close, volume in cursor.fetchall():
+        missed[stock_id].append({'date': bar_date, 'close': float(close), 'volume': volume})
+    return missed
+
+
+def plan_updates(states: Dict[int, IndicatorState], bars: List[Dict]):
+    """
+    Decide how each stock's state reaches its new bar
+
+    Returns:
+        (rebuild, gaps): stock ids to rebuild from stored history (no state
+        yet, or a bar older than the last applied one), and
+        {stock_id: (last_date, bar_date)} for states behind the new bar,
+        whose missed bars are replayed first
+    """
+    rebuild = set()
+    gaps = {}
+    for bar in bars:
+        stock_id, bar_date = bar['stock_id'], _iso(bar['date'])
+        state = states.get(stock_id)
+        if state is None or state.last_date is None or bar_date < state.last_date:
+            rebuild.add(stock_id)
+        elif bar_date > state.last_date:
+            gaps[stock_id] = (state.last_date, bar_date)
+    return rebuild, gaps
+
+
+def advance_states(cursor, bars: List[Dict]) -> Dict[int, IndicatorState]:
+    """
+    Advance the persisted state of every stock in `bars` to its new bar.
+
+    Bars stored since the state's last_date (an earlier update failed or
+    was skipped) are replayed before the new bar. Stocks without a state, or
+    whose new bar is older than the last applied one, are rebuilt from
+    their stored history instead; after that each update is O(1).
+
+    Args:
+        cursor: Open database cursor (caller commits); the bars must
+                already be saved to stock_prices
+        bars: List of dicts with 'stock_id', 'date', 'close', 'volume'
+
+    Returns:
+        Updated states keyed by stock_id
+    """
+    stock_ids = [bar['stock_id'] for bar in bars]
+    states = load_states(cursor, stock_ids)
+    rebuild, gaps = plan_updates(states, bars)
+    missed = load_gap_bars(cursor, gaps)
+
+    for bar in bars:
+        stock_id = bar['stock_id']
+        if stock_id in rebuild:
+            continue
+        state = states[stock_id]
+        try:
+            for past in missed.get(stock_id, ()):
+                state.advance(past['date'], past['close'], past.get('volume') or 0)
+            state.advance(bar['date'], bar['close'], bar.get('volume') or 0)
+        except ValueError as e:
+            # e.g. a revision whose undo record is gone; only this stock is rebuilt
+            print(f"⚠️  Rebuilding indicator state for stock {stock_id}: {e}")
+            rebuild.add(stock_id)
+
+    if rebuild:
+        history = load_recent_history(cursor, list(rebuild))
+        for bar in bars:
+            stock_id = bar['stock_id']
+            if stock_id not in rebuild:
+                continue
+            state = IndicatorState.from_history(history.get(stock_id, []))
+            if state.last_date is None or _iso(bar['date']) > state.last_date:
+                state.advance(bar['date'], bar['close'], bar.get('volume') or 0)
+            states[stock_id] = state
+
+    save_states(cursor, states)
+    return states
+
+
+def rebuild_states(cursor, stock_ids: List[int]) -> Dict[int, IndicatorState]:
+    """
+    Rebuild states from stored history, e.g. after a historical backfill
+    wrote bars the incremental path never saw.
+    """
+    history = load_recent_history(cursor, stock_ids)
+    states = {stock_id: IndicatorState.from_history(past) for stock_id, past in history.items() if past}
+    save_states(cursor, states)
+    return states
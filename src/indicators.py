@@ -0,0 +1,360 @@
+"""
+Vectorized Indicator Engine
+Full-series technical indicators backed by NumPy
+
+Every function accepts either a 1-D series (one symbol, oldest first) or a
+2-D symbol x date matrix and returns an array of the same shape. Rows of a
+matrix may start with NaN padding when a symbol has a shorter history than
+the rest of the universe; each row is seeded from its own first valid bar.
+Positions without enough data are NaN.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.rolling import (
+    as_matrix, restore_shape, rolling_max, rolling_mean, rolling_min, rolling_std, rolling_sum,
+)
+
+
+# Bars needed for the longest indicator (SMA200) plus warm-up of the
+# exponential indicators
+LOOKBACK_BARS = 260
+
+# technical_indicators column -> compute_all() series key
+TABLE_COLUMNS = {
+    'sma_20': 'ma20',
+    'sma_50': 'ma50',
+    'sma_200': 'ma200',
+    'ema_12': 'ema12',
+    'ema_26': 'ema26',
+    'rsi_14': 'rsi',
+    'macd': 'macd',
+    'macd_signal': 'macd_signal',
+    'macd_histogram': 'macd_histogram',
+    'bollinger_upper': 'bollinger_upper',
+    'bollinger_middle': 'bollinger_middle',
+    'bollinger_lower': 'bollinger_lower',
+}
+
+# OHLCV-based columns, present when compute_all() gets highs and lows
+OHLCV_TABLE_COLUMNS = {
+    'stochastic_k': 'stochastic_k',
+    'stochastic_d': 'stochastic_d',
+    'atr_14': 'atr',
+    'obv': 'obv',
+    'mfi_14': 'mfi',
+}
+
+
+def first_valid_index(matrix: np.ndarray) -> np.ndarray:
+    """Index of the first non-NaN value in each row (row length if none)"""
+    valid = ~np.isnan(matrix)
+    first = valid.argmax(axis=1)
+    first[~valid.any(axis=1)] = matrix.shape[1]
+    return first
+
+
+def _seeded_ewm(matrix: np.ndarray, alpha: float, period: int) -> np.ndarray:
+    """
+    Exponentially weighted average seeded with the simple mean of the first
+    `period` valid values of each row.
+
+    The loop runs over dates only; all symbols advance together.
+    """
+    rows, cols = matrix.shape
+    out = np.full((rows, cols), np.nan)
+    if cols == 0:
+        return out
+
+    start = first_valid_index(matrix)
+    seed_at = start + period - 1
+
+    if rows == 1:
+        # Plain float loop: cheaper than per-column array ops for one symbol
+        first = int(start[0])
+        if first + period > cols:
+            return out
+        values = matrix[0].tolist()
+        state = sum(values[first:first + period]) / period
+        smoothed = [state]
+        for price in values[first + period:]:
+            state += alpha * (price - state)
+            smoothed.append(state)
+        out[0, first + period - 1:] = smoothed
+        return out
+
+    seed_mean = rolling_mean(matrix, period)
+
+    # NaN state stays NaN until each row reaches its own seed column
+    seed_mask = np.arange(cols)[None, :] == seed_at[:, None]
+    state = np.full(rows, np.nan)
+    for t in range(cols):
+        state = state + alpha * (matrix[:, t] - state)
+        state = np.where(seed_mask[:, t], seed_mean[:, t], state)
+        out[:, t] = state
+    return out
+
+
+def ema(values, period: int) -> np.ndarray:
+    """Exponential moving average seeded with the SMA of the first `period` bars"""
+    matrix = as_matrix(values)
+    result = _seeded_ewm(matrix, 2.0 / (period + 1), period)
+    return restore_shape(result, values)
+
+
+def rsi(values, period: int = 14) -> np.ndarray:
+    """Relative Strength Index with Wilder smoothing"""
+    matrix = as_matrix(values)
+    rows, cols = matrix.shape
+    changes = np.full((rows, cols), np.nan)
+    if cols > 1:
+        changes[:, 1:] = np.diff(matrix, axis=1)
+
+    gains = np.where(changes > 0, changes, 0.0)
+    losses = np.where(changes < 0, -changes, 0.0)
+    gains[np.isnan(changes)] = np.nan
+    losses[np.isnan(changes)] = np.nan
+
+    alpha = 1.0 / period
+    avg_gain = _seeded_ewm(gains, alpha, period)
+    avg_loss = _seeded_ewm(losses, alpha, period)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    result = np.where((avg_loss == 0) & ~np.isnan(avg_gain), 100.0, result)
+    return restore_shape(result, values)
+
+
+def macd(values, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+    """
+    MACD line, EMA signal line and histogram
+
+    Returns:
+        Dictionary with 'macd', 'signal' and 'histogram' series
+    """
+    matrix = as_matrix(values)
+    macd_line = _seeded_ewm(matrix, 2.0 / (fast + 1), fast) - \
+        _seeded_ewm(matrix, 2.0 / (slow + 1), slow)
+    signal_line = _seeded_ewm(macd_line, 2.0 / (signal + 1), signal)
+    return {
+        'macd': restore_shape(macd_line, values),
+        'signal': restore_shape(signal_line, values),
+        'histogram': restore_shape(macd_line - signal_line, values),
+    }
+
+
+def bollinger_bands(values, period: int = 20, std_dev: float = 2) -> Dict[str, np.ndarray]:
+    """
+    Bollinger Bands (sample standard deviation, like statistics.stdev)
+
+    Returns:
+        Dictionary with 'upper', 'middle' and 'lower' series
+    """
+    middle = rolling_mean(values, period)
+    std = rolling_std(values, period)
+    return {
+        'upper': middle + std_dev * std,
+        'middle': middle,
+        'lower': middle - std_dev * std,
+    }
+
+
+def _previous(matrix: np.ndarray) -> np.ndarray:
+    """Each row shifted right by one bar (NaN in the first column)"""
+    shifted = np.full(matrix.shape, np.nan)
+    shifted[:, 1:] = matrix[:, :-1]
+    return shifted
+
+
+def stochastic(highs, lows, closes, k_period: int = 14, d_period: int = 3) -> Dict[str, np.ndarray]:
+    """
+    Stochastic oscillator
+
+    %K is the close's position in the `k_period`-bar high/low range (50 when
+    the range is flat); %D is the `d_period`-bar SMA of %K.
+
+    Returns:
+        Dictionary with 'k' and 'd' series
+    """
+    high_matrix, low_matrix, close_matrix = as_matrix(highs), as_matrix(lows), as_matrix(closes)
+    highest = rolling_max(high_matrix, k_period)
+    lowest = rolling_min(low_matrix, k_period)
+    spread = highest - lowest
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = np.where(spread > 0, (close_matrix - lowest) / spread * 100.0, 50.0)
+    k[np.isnan(spread) | np.isnan(close_matrix)] = np.nan
+    return {
+        'k': restore_shape(k, closes),
+        'd': restore_shape(rolling_mean(k, d_period), closes),
+    }
+
+
+def atr(highs, lows, closes, period: int = 14) -> np.ndarray:
+    """Average True Range with Wilder smoothing (the first bar's range is high - low)"""
+    high_matrix, low_matrix = as_matrix(highs), as_matrix(lows)
+    prev_close = _previous(as_matrix(closes))
+    # fmax skips the gap terms on each row's first bar, where there is no previous close
+    true_range = np.fmax(high_matrix - low_matrix,
+                         np.fmax(np.abs(high_matrix - prev_close), np.abs(low_matrix - prev_close)))
+    return restore_shape(_seeded_ewm(true_range, 1.0 / period, period), closes)
+
+
+def obv(closes, volumes) -> np.ndarray:
+    """On-Balance Volume, starting from 0 at each row's first bar"""
+    close_matrix, volume_matrix = as_matrix(closes), as_matrix(volumes)
+    direction = np.sign(close_matrix - _previous(close_matrix))
+    flow = np.where(np.isnan(direction), 0.0, direction * np.nan_to_num(volume_matrix))
+    result = np.cumsum(flow, axis=1)
+    result[np.isnan(close_matrix)] = np.nan
+    return restore_shape(result, closes)
+
+
+def mfi(highs, lows, closes, volumes, period: int = 14) -> np.ndarray:
+    """
+    Money Flow Index
+
+    Raw money flow (typical price x volume) is positive when the typical
+    price rises and negative when it falls; the index compares the two over
+    the last `period` bars. 100 when there is no negative flow, 50 when
+    there is no flow at all.
+    """
+    typical = (as_matrix(highs) + as_matrix(lows) + as_matrix(closes)) / 3.0
+    change = typical - _previous(typical)
+    money_flow = typical * np.nan_to_num(as_matrix(volumes))
+    positive = np.where(change > 0, money_flow, 0.0)
+    negative = np.where(change < 0, money_flow, 0.0)
+    positive[np.isnan(change)] = np.nan
+    negative[np.isnan(change)] = np.nan
+
+    # Prefix-sum differences can leave tiny residues instead of exact zeros
+    positive_sum = np.maximum(rolling_sum(positive, period), 0.0)
+    negative_sum = np.maximum(rolling_sum(negative, period), 0.0)
+    total = positive_sum + negative_sum
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = np.where(total > 0, 100.0 * positive_sum / total, 50.0)
+    result[np.isnan(total)] = np.nan
+    return restore_shape(result, closes)
+
+
+def compute_all(closes, volumes=None, highs=None, lows=None) -> Dict[str, np.ndarray]:
+    """
+    Compute every indicator used by TechnicalAnalyzer in one pass.
+
+    Args:
+        closes: Closing prices, 1-D series or symbol x date matrix
+        volumes: Optional volumes with the same shape as closes
+        highs: Optional highs; with lows and volumes adds the
+               OHLCV_TABLE_COLUMNS series (stochastic, ATR, OBV, MFI)
+        lows: Optional lows with the same shape as closes
+
+    Returns:
+        Dictionary of full indicator series keyed by name
+    """
+    matrix = as_matrix(closes)
+    ema12 = ema(matrix, 12)
+    ema26 = ema(matrix, 26)
+    macd_line = ema12 - ema26
+    signal_line = _seeded_ewm(macd_line, 2.0 / (9 + 1), 9)
+    bands = bollinger_bands(matrix)
+    result = {
+        'close': matrix,
+        'rsi': rsi(matrix),
+        'ma20': bands['middle'],
+        'ma50': rolling_mean(matrix, 50),
+        'ma200': rolling_mean(matrix, 200),
+        'ema12': ema12,
+        'ema26': ema26,
+        'macd': macd_line,
+        'macd_signal': signal_line,
+        'macd_histogram': macd_line - signal_line,
+        'bollinger_upper': bands['upper'],
+        'bollinger_middle': bands['middle'],
+        'bollinger_lower': bands['lower'],
+    }
+    if volumes is not None:
+        volume_matrix = as_matrix(volumes)
+        result['volume'] = volume_matrix
+        result['volume_ma20'] = rolling_mean(volume_matrix, 20)
+
+        if highs is not None and lows is not None:
+            high_matrix, low_matrix = as_matrix(highs), as_matrix(lows)
+            oscillator = stochastic(high_matrix, low_matrix, matrix)
+            result['stochastic_k'] = oscillator['k']
+            result['stochastic_d'] = oscillator['d']
+            result['atr'] = atr(high_matrix, low_matrix, matrix)
+            result['obv'] = obv(matrix, volume_matrix)
+            result['mfi'] = mfi(high_matrix, low_matrix, matrix, volume_matrix)
+
+    if np.ndim(closes) == 1:
+        return {key: series[0] for key, series in result.items()}
+    return result
+
+
+def build_price_matrix(histories: Dict[str, List[Dict]],
+                       price_key: str = 'close',
+                       volume_key: str = 'volume') -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Align per-symbol histories into right-aligned symbol x date matrices.
+
+    Histories must be ordered oldest first (the layout of data/*_history.json).
+    The latest bar of every symbol lands in the last column; shorter histories
+    are padded with NaN on the left.
+
+    Returns:
+        Tuple of (symbols, closes, volumes)
+    """
+    symbols = sorted(histories)
+    length = max((len(histories[s]) for s in symbols), default=0)
+    closes = np.full((len(symbols), length), np.nan)
+    volumes = np.full((len(symbols), length), np.nan)
+
+    for row, symbol in enumerate(symbols):
+        bars = histories[symbol]
+        if not bars:
+            continue
+        offset = length - len(bars)
+        closes[row, offset:] = [float(bar.get(price_key) or 0) for bar in bars]
+        volumes[row, offset:] = [float(bar.get(volume_key) or 0) for bar in bars]
+
+    return symbols, closes, volumes
+
+
+def build_ohlcv_matrix(histories: Dict[str, List[Dict]]) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    """
+    Like build_price_matrix, but for every OHLCV column.
+
+    Bars without a high or low fall back to the close.
+
+    Returns:
+        Tuple of (symbols, {'open', 'high', 'low', 'close', 'volume'} matrices)
+    """
+    symbols = sorted(histories)
+    length = max((len(histories[s]) for s in symbols), default=0)
+    columns = {key: np.full((len(symbols), length), np.nan) for key in ('open', 'high', 'low', 'close', 'volume')}
+
+    for row, symbol in enumerate(symbols):
+        bars = histories[symbol]
+        if not bars:
+            continue
+        offset = length - len(bars)
+        closes = [float(bar.get('close') or 0) for bar in bars]
+        columns['close'][row, offset:] = closes
+        for key in ('open', 'high', 'low'):
+            columns[key][row, offset:] = [float(bar.get(key) or c) for bar, c in zip(bars, closes)]
+        columns['volume'][row, offset:] = [float(bar.get('volume') or 0) for bar in bars]
+
+    return symbols, columns
+
+
+def latest(series: np.ndarray) -> np.ndarray:
+    """Last column of a series or matrix"""
+    return series[..., -1]
+
+
+def to_optional(value, digits: int = 2) -> Optional[float]:
+    """Round a scalar indicator value, mapping NaN to None"""
+    if value is None or np.isnan(value):
+        return None
+    return round(float(value), digits)
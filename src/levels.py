@@ -0,0 +1,222 @@
+"""
+Support/Resistance Level Detection
+Finds swing highs and lows for several window sizes in linear time and
+clusters them into ranked support/resistance zones.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.rolling import rolling_argmax, rolling_argmin
+
+
+# Half-widths of the swing windows: a swing high at bar i is the highest
+# high of bars [i - w, i + w]
+DEFAULT_WINDOWS = (3, 5, 10, 20)
+
+# Pivots within this fraction of each other are merged into one zone
+DEFAULT_TOLERANCE = 0.015
+
+# Zones returned per side
+DEFAULT_MAX_ZONES = 5
+
+# Bars scanned for levels (about one trading year)
+LEVEL_LOOKBACK_BARS = 260
+
+
+def swing_points(values: Sequence[float], window: int, highs: bool = True) -> List[int]:
+    """
+    Indices of swing highs (or lows) for one window size in O(n)
+
+    A bar is a swing point when it is the extreme of the 2 * window + 1 bars
+    centred on it. On flat tops/bottoms only the first bar of the run counts.
+    Uses the monotonic-deque arg-extrema from src.rolling.
+
+    Args:
+        values: Highs (for swing highs) or lows (for swing lows), oldest first
+        window: Bars required on each side
+        highs: True for swing highs, False for swing lows
+
+    Returns:
+        Sorted list of swing indices
+    """
+    span = 2 * window + 1
+    if window < 1 or len(values) < span:
+        return []
+
+    # Bar c is a swing point when it is the leftmost extreme of the window ending at c + window
+    extremes = rolling_argmax(values, span) if highs else rolling_argmin(values, span)
+    return [j - window for j in range(span - 1, len(values)) if extremes[j] == j - window]
+
+
+def find_pivots(highs: Sequence[float], lows: Sequence[float],
+                windows: Sequence[int] = DEFAULT_WINDOWS) -> List[Tuple[float, str, int, int]]:
+    """
+    Swing highs and lows for every window size
+
+    Returns:
+        List of (price, kind, window, index) with kind 'high' or 'low'
+    """
+    pivots = []
+    for window in windows:
+        pivots.extend((highs[i], 'high', window, i) for i in swing_points(highs, window, highs=True))
+        pivots.extend((lows[i], 'low', window, i) for i in swing_points(lows, window, highs=False))
+    return pivots
+
+
+def cluster_pivots(pivots: List[Tuple[float, str, int, int]], length: int,
+                   tolerance: float = DEFAULT_TOLERANCE) -> List[Dict]:
+    """
+    Merge nearby pivot prices into zones
+
+    Each pivot is weighted by its window size (wider swings matter more)
+    and by recency (recent pivots count up to twice as much as the oldest).
+
+    Args:
+        pivots: Output of find_pivots
+        length: Number of bars the pivots were found in
+        tolerance: Maximum relative gap between a zone's lowest pivot and
+                   a pivot joining it
+
+    Returns:
+        Zones with price, low, high, touches, windows, last_index and strength
+    """
+    zones = []
+    current = None
+    for price, kind, window, index in sorted(pivots):
+        if current is None or price > current['low'] * (1 + tolerance):
+            current = {'low': price, 'members': []}
+            zones.append(current)
+        current['members'].append((price, kind, window, index))
+
+    result = []
+    for zone in zones:
+        members = zone['members']
+        weights = [window * (1 + (index + 1) / length) for _, _, window, index in members]
+        strength = sum(weights)
+        result.append({
+            'price': sum(p * w for (p, _, _, _), w in zip(members, weights)) / strength,
+            'low': members[0][0],
+            'high': members[-1][0],
+            'touches': len({index for _, _, _, index in members}),
+            'swing_highs': sum(1 for _, kind, _, _ in members if kind == 'high'),
+            'swing_lows': sum(1 for _, kind, _, _ in members if kind == 'low'),
+            'windows': sorted({window for _, _, window, _ in members}),
+            'last_index': max(index for _, _, _, index in members),
+            'strength': strength,
+        })
+    return result
+
+
+def detect_levels(bars: List[Dict], windows: Sequence[int] = DEFAULT_WINDOWS,
+                  tolerance: float = DEFAULT_TOLERANCE, max_zones: int = DEFAULT_MAX_ZONES) -> Dict:
+    """
+    Ranked support and resistance zones for a price history
+
+    Args:
+        bars: Price rows with 'close' and optionally 'high', 'low', 'date'
+              (oldest first)
+        windows: Swing window half-widths
+        tolerance: Zone merge tolerance (fraction of price)
+        max_zones: Zones returned per side
+
+    Returns:
+        Dictionary with 'support' and 'resistance' zones (strongest first),
+        'nearest_support', 'nearest_resistance' and scan metadata
+    """
+    closes = [float(b['close']) for b in bars]
+    highs = [float(b.get('high') or c) for b, c in zip(bars, closes)]
+    lows = [float(b.get('low') or c) for b, c in zip(bars, closes)]
+
+    result = {
+        'last_close': closes[-1] if closes else None,
+        'last_date': _date_str(bars[-1].get('date')) if bars else None,
+        'bars': len(bars),
+        'windows': list(windows),
+        'pivots': 0,
+        'support': [],
+        'resistance': [],
+        'nearest_support': None,
+        'nearest_resistance': None,
+    }
+    if not bars:
+        return result
+
+    pivots = find_pivots(highs, lows, windows)
+    result['pivots'] = len(pivots)
+    zones = cluster_pivots(pivots, len(bars), tolerance)
+    if not zones:
+        return result
+
+    last_close = closes[-1]
+    top = max(zone['strength'] for zone in zones)
+    for zone in zones:
+        last_index = zone.pop('last_index')
+        zone['strength'] = round(zone['strength'] / top * 100, 1)
+        zone['last_touch'] = _date_str(bars[last_index].get('date')) or last_index
+        zone['distance_percent'] = round((zone['price'] - last_close) / last_close * 100, 2) \
+            if last_close else None
+        for key in ('price', 'low', 'high'):
+            zone[key] = round(zone[key], 2)
+
+    ranked = sorted(zones, key=lambda z: (-z['strength'], abs(z['price'] - last_close)))
+    result['support'] = [z for z in ranked if z['price'] < last_close][:max_zones]
+    result['resistance'] = [z for z in ranked if z['price'] >= last_close][:max_zones]
+
+    if result['support']:
+        result['nearest_support'] = max(z['price'] for z in result['support'])
+    if result['resistance']:
+        result['nearest_resistance'] = min(z['price'] for z in result['resistance'])
+    return result
+
+
+def _date_str(value) -> Optional[str]:
+    """ISO date for date objects, strings passed through"""
+    if value is None:
+        return None
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+class LevelCache:
+    """
+    Thread-safe LRU cache of detected levels keyed by (symbol, last bar date)
+
+    Entries also remember the last close, so an intraday re-collection of
+    the same date invalidates them.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, symbol: str, last_date, last_close: float) -> Optional[Dict]:
+        """Cached levels for the symbol's current last bar, or None"""
+        key = (symbol, _date_str(last_date))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != last_close:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, symbol: str, last_date, last_close: float, levels: Dict):
+        """Store levels, replacing older bars of the same symbol"""
+        date_key = _date_str(last_date)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == symbol and k[1] != date_key]:
+                del self._entries[key]
+            self._entries[(symbol, date_key)] = (last_close, levels)
+            self._entries.move_to_end((symbol, date_key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        """Entry count and hit/miss counters"""
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
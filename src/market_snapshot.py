@@ -0,0 +1,104 @@
+"""
+Latest-Price Snapshot
+Holds the latest bar of every active stock as float columns with
+precomputed leaderboard orderings, so the market overview endpoints are
+answered from memory instead of one database query per request.
+"""
+
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Numeric columns read from the latest bar ('change' is derived as close - open)
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'change_percent', 'volume')
+
+# Output field -> column, for fields named differently from their column
+FIELD_ALIASES = {'price': 'close'}
+
+
+class LatestPriceSnapshot:
+    """Latest bar per symbol with indexes sorted by change_percent and volume"""
+
+    def __init__(self, rows: List[Dict], version=None):
+        """
+        Build the snapshot from latest-bar rows
+
+        Args:
+            rows: One row per stock with symbol, name, exchange, date, open,
+                  high, low, close, volume and change_percent
+            version: Data version the snapshot was built from
+        """
+        self.version = version
+        self.built_at = time.time()
+
+        rows = sorted(rows, key=lambda r: r['symbol'])
+        self.symbols = [r['symbol'] for r in rows]
+        self.names = [r.get('name') for r in rows]
+        self.exchanges = [r.get('exchange') for r in rows]
+        self.dates = [r.get('date') for r in rows]
+
+        def column(key):
+            return np.array([np.nan if r.get(key) is None else float(r[key]) for r in rows], dtype=np.float64)
+
+        self.columns = {key: column(key) for key in PRICE_COLUMNS}
+        self.columns['change'] = self.columns['close'] - self.columns['open']
+
+        # Stable sorts over symbol order: ties stay alphabetical; stocks without
+        # a change_percent are left out of the gainer/loser boards
+        change = self.columns['change_percent']
+        known = np.flatnonzero(~np.isnan(change))
+        self.by_change_desc = known[np.argsort(-change[known], kind='stable')]
+        self.by_change_asc = known[np.argsort(change[known], kind='stable')]
+        self.by_volume_desc = np.argsort(-np.nan_to_num(self.columns['volume']), kind='stable')
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def value(self, key: str, index: int) -> Optional[float]:
+        """One stock's column value, None when missing"""
+        value = self.columns[key][index]
+        return None if np.isnan(value) else float(value)
+
+    def row(self, index: int, fields: Tuple[str, ...]) -> Dict:
+        """
+        Serialize one stock
+
+        Args:
+            index: Row index
+            fields: Output fields: symbol, name, exchange, date, price or any
+                    column name (volume is returned as an integer)
+        """
+        meta = {
+            'symbol': self.symbols[index],
+            'name': self.names[index],
+            'exchange': self.exchanges[index],
+            'date': self.dates[index],
+        }
+        result = {}
+        for field in fields:
+            if field in meta:
+                result[field] = meta[field]
+                continue
+            value = self.value(FIELD_ALIASES.get(field, field), index)
+            result[field] = int(value) if field == 'volume' and value is not None else value
+        return result
+
+    def top(self, board: str, limit: int) -> List[int]:
+        """
+        Row indexes of a leaderboard
+
+        Args:
+            board: 'gainers', 'losers' or 'most_active'
+            limit: Maximum number of rows
+
+        Returns:
+            Indexes into the snapshot, best first
+        """
+        order = {
+            'gainers': self.by_change_desc,
+            'losers': self.by_change_asc,
+            'most_active': self.by_volume_desc,
+        }[board]
+        return order[:max(limit, 0)].tolist()
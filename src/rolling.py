@@ -0,0 +1,286 @@
+"""
+Rolling-Window Statistics
+O(n) windowed statistics over full series and symbol x date matrices, plus
+a streaming window for bar-by-bar consumers.
+
+- sums and means: prefix sums
+- variance / standard deviation: windowed Welford updates (numerically
+  stable over long VND-scale histories)
+- min / max: van Herk/Gil-Werman block scans for arrays, monotonic deques
+  for streaming and arg-extrema
+
+Array functions accept a 1-D series (oldest first) or a 2-D matrix (one row
+per symbol) and return the same shape. Windows that are incomplete or
+contain NaN are NaN.
+"""
+
+import math
+from collections import deque
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+def as_matrix(values) -> np.ndarray:
+    """Convert a series or matrix to a 2-D float64 array (one row per symbol)"""
+    arr = np.asarray(values, dtype=np.float64)
+    if arr.ndim == 1:
+        return arr.reshape(1, -1)
+    if arr.ndim != 2:
+        raise ValueError(f"Expected 1-D or 2-D price data, got {arr.ndim}-D")
+    return arr
+
+
+def restore_shape(result: np.ndarray, original) -> np.ndarray:
+    """Return a 1-D result when the caller passed a 1-D series"""
+    if np.ndim(original) == 1:
+        return result[0]
+    return result
+
+
+def rolling_sum(values, period: int) -> np.ndarray:
+    """Rolling sum over `period` bars using prefix sums"""
+    matrix = as_matrix(values)
+    rows, cols = matrix.shape
+    out = np.full((rows, cols), np.nan)
+    if period < 1 or cols < period:
+        return restore_shape(out, values)
+
+    valid = ~np.isnan(matrix)
+    prefix = np.zeros((rows, cols + 1))
+    np.cumsum(np.where(valid, matrix, 0.0), axis=1, out=prefix[:, 1:])
+    counts = np.zeros((rows, cols + 1))
+    np.cumsum(valid, axis=1, out=counts[:, 1:])
+
+    window = prefix[:, period:] - prefix[:, :-period]
+    complete = (counts[:, period:] - counts[:, :-period]) == period
+    out[:, period - 1:] = np.where(complete, window, np.nan)
+    return restore_shape(out, values)
+
+
+def rolling_mean(values, period: int) -> np.ndarray:
+    """Simple moving average over `period` bars"""
+    return rolling_sum(values, period) / period
+
+
+def rolling_var(values, period: int, ddof: int = 1) -> np.ndarray:
+    """
+    Rolling variance over `period` bars with windowed Welford updates
+
+    Each step adds the new bar and removes the one leaving the window, so
+    the cost is O(n) and no large sums of squares are ever differenced.
+    A NaN restarts the window of its row.
+    """
+    matrix = as_matrix(values)
+    rows, cols = matrix.shape
+    out = np.full((rows, cols), np.nan)
+    if period <= ddof or cols < period:
+        return restore_shape(out, values)
+
+    if rows == 1:
+        # Plain float loop: cheaper than per-column array ops for one symbol
+        # RollingStats does the Welford updates; reading m2 directly skips
+        # the per-bar full/variance() calls, which cost as much as the push
+        stats = RollingStats(period)
+        push = stats.push
+        variances = [math.nan] * cols
+        divisor = period - ddof
+        held = 0
+        for t, x in enumerate(matrix[0].tolist()):
+            if x != x:
+                stats = RollingStats(period)
+                push = stats.push
+                held = 0
+                continue
+            push(x)
+            held += 1
+            if held >= period:
+                m2 = stats.m2
+                variances[t] = m2 / divisor if m2 > 0.0 else 0.0
+        out[0] = variances
+        return restore_shape(out, values)
+
+    mean = np.zeros(rows)
+    m2 = np.zeros(rows)
+    count = np.zeros(rows, dtype=np.int64)
+    for t in range(cols):
+        x = matrix[:, t]
+        valid = ~np.isnan(x)
+
+        # Grow: window not full yet
+        delta = x - mean
+        grow_mean = mean + delta / (count + 1)
+        grow_m2 = m2 + delta * (x - grow_mean)
+
+        # Slide: add x, drop the bar `period` steps back
+        old = matrix[:, t - period] if t >= period else np.zeros(rows)
+        slide_mean = mean + (x - old) / period
+        slide_m2 = m2 + (x - old) * (x - slide_mean + old - mean)
+
+        sliding = count >= period
+        mean = np.where(valid, np.where(sliding, slide_mean, grow_mean), 0.0)
+        m2 = np.where(valid, np.where(sliding, slide_m2, grow_m2), 0.0)
+        count = np.where(valid, np.minimum(count + 1, period), 0)
+
+        full = count == period
+        out[full, t] = np.maximum(m2[full] / (period - ddof), 0.0)
+    return restore_shape(out, values)
+
+
+def rolling_std(values, period: int, ddof: int = 1) -> np.ndarray:
+    """Rolling standard deviation over `period` bars (see rolling_var)"""
+    return np.sqrt(rolling_var(values, period, ddof))
+
+
+def _block_scan(values, period: int, op) -> np.ndarray:
+    """
+    van Herk/Gil-Werman sliding extremum: prefix and suffix scans inside
+    blocks of `period` bars, combined at each window. O(n) and vectorized
+    across rows; NaN propagates through np.maximum/np.minimum.
+    """
+    matrix = as_matrix(values)
+    rows, cols = matrix.shape
+    out = np.full((rows, cols), np.nan)
+    if period < 1 or cols < period:
+        return restore_shape(out, values)
+
+    pad = (-cols) % period
+    padded = np.concatenate([matrix, np.full((rows, pad), np.nan)], axis=1)
+    blocks = padded.reshape(rows, -1, period)
+    prefix = op.accumulate(blocks, axis=2).reshape(rows, -1)
+    suffix = op.accumulate(blocks[:, :, ::-1], axis=2)[:, :, ::-1].reshape(rows, -1)
+
+    out[:, period - 1:] = op(suffix[:, :cols - period + 1], prefix[:, period - 1:cols])
+    return restore_shape(out, values)
+
+
+def rolling_max(values, period: int) -> np.ndarray:
+    """Highest value of the last `period` bars"""
+    return _block_scan(values, period, np.maximum)
+
+
+def rolling_min(values, period: int) -> np.ndarray:
+    """Lowest value of the last `period` bars"""
+    return _block_scan(values, period, np.minimum)
+
+
+def _rolling_arg_extreme(values: Sequence[float], period: int, sign: float) -> List[int]:
+    """Index of the leftmost extreme of each trailing window via a monotonic deque"""
+    keyed = [sign * v for v in values]
+    result = [-1] * len(keyed)
+    candidates = deque()
+    for j, value in enumerate(keyed):
+        # Keep earlier equal values so the front is the leftmost extreme
+        while candidates and keyed[candidates[-1]] < value:
+            candidates.pop()
+        candidates.append(j)
+        if candidates[0] <= j - period:
+            candidates.popleft()
+        if j >= period - 1:
+            result[j] = candidates[0]
+    return result
+
+
+def rolling_argmax(values: Sequence[float], period: int) -> List[int]:
+    """
+    Index of the leftmost maximum of each trailing `period`-bar window
+
+    Returns:
+        List aligned with values; -1 where the window is incomplete
+    """
+    return _rolling_arg_extreme(values, period, 1.0)
+
+
+def rolling_argmin(values: Sequence[float], period: int) -> List[int]:
+    """Index of the leftmost minimum of each trailing `period`-bar window"""
+    return _rolling_arg_extreme(values, period, -1.0)
+
+
+class RollingStats:
+    """
+    Streaming window of the last `period` values
+
+    push() is O(1) amortized; sum, mean and variance use the same Welford
+    updates as rolling_var, so streaming and batch results agree exactly.
+    Window max/min cost two monotonic deques per push, so they are only
+    tracked with extrema=True.
+    """
+
+    __slots__ = ('period', 'window', 'mean', 'm2', '_max', '_min', '_pushed')
+
+    def __init__(self, period: int, extrema: bool = False):
+        self.period = period
+        self.window = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self._max = deque() if extrema else None
+        self._min = deque() if extrema else None
+        self._pushed = 0
+
+    def push(self, x: float) -> Optional[float]:
+        """
+        Add a value
+
+        Returns:
+            The value that left the window, or None while it is filling
+        """
+        window = self.window
+        evicted = None
+        if len(window) < self.period:
+            delta = x - self.mean
+            self.mean = self.mean + delta / (len(window) + 1)
+            self.m2 = self.m2 + delta * (x - self.mean)
+        else:
+            evicted = window.popleft()
+            mean = self.mean + (x - evicted) / self.period
+            self.m2 = self.m2 + (x - evicted) * (x - mean + evicted - self.mean)
+            self.mean = mean
+        window.append(x)
+        if self._max is None:
+            return evicted
+
+        index = self._pushed
+        self._pushed += 1
+        while self._max and self._max[-1][1] <= x:
+            self._max.pop()
+        self._max.append((index, x))
+        while self._min and self._min[-1][1] >= x:
+            self._min.pop()
+        self._min.append((index, x))
+        oldest = index - self.period
+        if self._max[0][0] <= oldest:
+            self._max.popleft()
+        if self._min[0][0] <= oldest:
+            self._min.popleft()
+        return evicted
+
+    @property
+    def full(self) -> bool:
+        return len(self.window) == self.period
+
+    @property
+    def sum(self) -> float:
+        return self.mean * len(self.window)
+
+    @property
+    def max(self) -> float:
+        if self._max is None:
+            raise ValueError("Window max needs RollingStats(period, extrema=True)")
+        return self._max[0][1] if self._max else math.nan
+
+    @property
+    def min(self) -> float:
+        if self._min is None:
+            raise ValueError("Window min needs RollingStats(period, extrema=True)")
+        return self._min[0][1] if self._min else math.nan
+
+    def variance(self, ddof: int = 1) -> float:
+        """Window variance (NaN until more than ddof values are held)"""
+        n = len(self.window)
+        if n <= ddof:
+            return math.nan
+        return max(self.m2 / (n - ddof), 0.0)
+
+    def std(self, ddof: int = 1) -> float:
+        """Window standard deviation"""
+        return math.sqrt(self.variance(ddof))
@@ -0,0 +1,237 @@
+"""
+Cross-Sectional Stock Screener
+Holds the latest indicator values for the whole universe as column vectors
+and evaluates screening filters against them with vectorized comparisons.
+"""
+
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from src import indicators
+
+
+# Screenable numeric fields (name -> description)
+FIELDS = {
+    'price': 'Latest close',
+    'change_percent': 'Change vs previous close (%)',
+    'rsi': 'RSI(14)',
+    'sma20': 'SMA(20)',
+    'sma50': 'SMA(50)',
+    'sma200': 'SMA(200)',
+    'ema12': 'EMA(12)',
+    'ema26': 'EMA(26)',
+    'macd': 'MACD line',
+    'macd_signal': 'MACD signal line',
+    'macd_histogram': 'MACD histogram',
+    'bb_upper': 'Upper Bollinger band',
+    'bb_middle': 'Middle Bollinger band',
+    'bb_lower': 'Lower Bollinger band',
+    'bb_position': 'Price position inside the bands (0 = lower, 1 = upper)',
+    'volume': 'Latest volume',
+    'volume_ma20': '20-day average volume',
+    'volume_ratio': 'Latest volume / 20-day average volume',
+}
+
+# Text fields matched against comma-separated lists
+TEXT_FIELDS = ('exchange', 'sector', 'category')
+
+# Named conditions, mirroring the ad-hoc queries in database/queries.sql
+PRESETS = {
+    'oversold': [('rsi', 'lt', 30)],
+    'overbought': [('rsi', 'gt', 70)],
+    'golden_cross': [('sma50', 'gt', 'sma200')],
+    'death_cross': [('sma50', 'lt', 'sma200')],
+    'above_sma200': [('price', 'gt', 'sma200')],
+    'below_sma200': [('price', 'lt', 'sma200')],
+    'below_lower_band': [('price', 'lt', 'bb_lower')],
+    'above_upper_band': [('price', 'gt', 'bb_upper')],
+    'macd_bullish': [('macd', 'gt', 'macd_signal')],
+    'macd_bearish': [('macd', 'lt', 'macd_signal')],
+    'volume_spike': [('volume_ratio', 'gte', 2)],
+}
+
+OPERATORS = {
+    'lt': np.less,
+    'lte': np.less_equal,
+    'gt': np.greater,
+    'gte': np.greater_equal,
+}
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+class UniverseScreen:
+    """Latest-bar indicator vectors for every stock in the universe"""
+
+    def __init__(self, histories: Dict[str, List[Dict]], metadata: Dict[str, Dict], version=None):
+        """
+        Build the screen from price histories
+
+        Args:
+            histories: symbol -> bars (oldest first) with 'close' and 'volume'
+            metadata: symbol -> {'name', 'exchange', 'sector', 'category'}
+            version: Data version the screen was built from
+        """
+        self.version = version
+        self.built_at = time.time()
+
+        symbols, closes, volumes = indicators.build_price_matrix(histories)
+        self.symbols = np.array(symbols, dtype=object)
+        self.dates = [str(histories[s][-1].get('date', '')) for s in symbols]
+
+        if closes.shape[1] < 2:
+            # Keep column shapes valid for an empty or single-bar universe
+            closes = np.hstack([np.full((len(symbols), 2 - closes.shape[1]), np.nan), closes])
+            volumes = np.hstack([np.full((len(symbols), 2 - volumes.shape[1]), np.nan), volumes])
+        series = indicators.compute_all(closes, volumes)
+        last = lambda key: series[key][:, -1]
+
+        price = last('close')
+        previous = closes[:, -2]
+        upper, lower = last('bollinger_upper'), last('bollinger_lower')
+        volume, volume_ma = last('volume'), last('volume_ma20')
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.columns = {
+                'price': price,
+                'change_percent': (price - previous) / previous * 100,
+                'rsi': last('rsi'),
+                'sma20': last('ma20'),
+                'sma50': last('ma50'),
+                'sma200': last('ma200'),
+                'ema12': last('ema12'),
+                'ema26': last('ema26'),
+                'macd': last('macd'),
+                'macd_signal': last('macd_signal'),
+                'macd_histogram': last('macd_histogram'),
+                'bb_upper': upper,
+                'bb_middle': last('bollinger_middle'),
+                'bb_lower': lower,
+                'bb_position': np.where(upper > lower, (price - lower) / (upper - lower), np.nan),
+                'volume': volume,
+                'volume_ma20': volume_ma,
+                'volume_ratio': np.where(volume_ma > 0, volume / volume_ma, np.nan),
+            }
+
+        self.metadata = [metadata.get(s, {}) for s in symbols]
+        self.text = {
+            field: np.array([(m.get(field) or '').lower() for m in self.metadata], dtype=object)
+            for field in TEXT_FIELDS
+        }
+
+    def __len__(self):
+        return len(self.symbols)
+
+    @staticmethod
+    def parse_filters(params: Dict[str, str]) -> Dict:
+        """
+        Turn query-string parameters into a filter spec
+
+        Numeric conditions use `<field>_<op>=<value>` with op one of lt, lte,
+        gt, gte; the value may be a number or another field name
+        (e.g. sma50_gt=sma200). `signal` takes comma-separated preset names.
+
+        Raises:
+            ValueError: Unknown field, operator, preset or sort key
+        """
+        conditions = []
+        for key, raw in params.items():
+            field, _, op = key.rpartition('_')
+            if op not in OPERATORS or not field:
+                continue
+            if field not in FIELDS:
+                raise ValueError(f"Unknown field '{field}'")
+            raw = raw.strip()
+            if raw in FIELDS:
+                conditions.append((field, op, raw))
+            else:
+                try:
+                    conditions.append((field, op, float(raw)))
+                except ValueError:
+                    raise ValueError(f"Invalid value for {key}: '{raw}'")
+
+        for name in filter(None, (params.get('signal') or '').split(',')):
+            name = name.strip()
+            if name not in PRESETS:
+                raise ValueError(f"Unknown signal '{name}'")
+            conditions.extend(PRESETS[name])
+
+        text = {}
+        for field in TEXT_FIELDS:
+            values = [v.strip().lower() for v in (params.get(field) or '').split(',') if v.strip()]
+            if values:
+                text[field] = values
+
+        sort = params.get('sort') or 'symbol'
+        if sort != 'symbol' and sort not in FIELDS:
+            raise ValueError(f"Unknown sort field '{sort}'")
+
+        try:
+            limit = int(params.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            raise ValueError(f"Invalid limit: '{params.get('limit')}'")
+
+        return {
+            'conditions': conditions,
+            'text': text,
+            'sort': sort,
+            'descending': (params.get('order') or 'asc').lower() == 'desc',
+            'limit': max(1, min(limit, MAX_LIMIT)),
+        }
+
+    def mask(self, conditions, text=None) -> np.ndarray:
+        """Boolean mask of stocks meeting every condition (NaN never matches)"""
+        mask = np.ones(len(self.symbols), dtype=bool)
+        for field, op, value in conditions:
+            other = self.columns[value] if isinstance(value, str) else value
+            with np.errstate(invalid='ignore'):
+                mask &= OPERATORS[op](self.columns[field], other)
+        for field, values in (text or {}).items():
+            mask &= np.isin(self.text[field], values)
+        return mask
+
+    def screen(self, spec: Dict) -> Dict:
+        """
+        Evaluate a filter spec from parse_filters
+
+        Returns:
+            Dictionary with matching stocks, total match count and timing
+        """
+        started = time.perf_counter()
+        matches = np.flatnonzero(self.mask(spec['conditions'], spec['text']))
+
+        if spec['sort'] == 'symbol':
+            order = matches[np.argsort(self.symbols[matches])]
+        else:
+            # NaN sorts last in either direction
+            keys = self.columns[spec['sort']][matches]
+            keys = -keys if spec['descending'] else keys
+            order = matches[np.argsort(keys, kind='stable')]
+        if spec['sort'] == 'symbol' and spec['descending']:
+            order = order[::-1]
+
+        rows = [self._row(i) for i in order[:spec['limit']]]
+        return {
+            'stocks': rows,
+            'total': int(len(matches)),
+            'universe': len(self.symbols),
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 3),
+        }
+
+    def _row(self, index: int) -> Dict:
+        """Serialize one stock's latest values"""
+        meta = self.metadata[index]
+        row = {
+            'symbol': self.symbols[index],
+            'name': meta.get('name'),
+            'date': self.dates[index],
+        }
+        for field in TEXT_FIELDS:
+            row[field] = meta.get(field)
+        for field, values in self.columns.items():
+            digits = 4 if field in ('bb_position', 'volume_ratio') else 2
+            row[field] = indicators.to_optional(values[index], digits)
+        return row
@@ -0,0 +1,149 @@
+"""
+Stock Search Index
+In-memory symbol/name search over the stocks table. Names are accent-folded
+("Sữa" -> "sua") so plain-ASCII queries match Vietnamese names; a prefix
+trie answers autocomplete and a trigram index answers substring queries.
+"""
+
+import time
+import unicodedata
+from typing import Dict, List, Optional, Set
+
+# Output fields per result
+RESULT_FIELDS = ('symbol', 'name', 'exchange', 'sector')
+
+NGRAM = 3
+
+
+def fold(text: Optional[str]) -> str:
+    """
+    Lower-case and strip diacritics, keeping letters and digits
+
+    Args:
+        text: Any text (e.g. "Công ty Sữa Việt Nam")
+
+    Returns:
+        Folded text with single spaces between words ("cong ty sua viet nam")
+    """
+    if not text:
+        return ''
+    text = text.replace('đ', 'd').replace('Đ', 'D')
+    decomposed = unicodedata.normalize('NFD', text.lower())
+    kept = ''.join(ch if ch.isalnum() else ' '
+                   for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(kept.split())
+
+
+def _ngrams(text: str) -> Set[str]:
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def _insert(trie: Dict, word: str, index: int):
+    """Add index under every prefix of word"""
+    node = trie
+    for ch in word:
+        node = node.setdefault(ch, {})
+        node.setdefault('', set()).add(index)
+
+
+class StockSearchIndex:
+    """Prefix trie and trigram index over folded stock symbols and names"""
+
+    def __init__(self, rows: List[Dict], version=None):
+        """
+        Build the index
+
+        Args:
+            rows: Stocks with symbol, name, exchange and sector
+            version: Stocks table version the index was built from
+        """
+        self.version = version
+        self.built_at = time.time()
+
+        rows = sorted(rows, key=lambda r: r['symbol'])
+        self.results = [{field: row.get(field) for field in RESULT_FIELDS} for row in rows]
+        self.by_symbol = {fold(row['symbol']): index for index, row in enumerate(rows)}
+        self.texts = [f"{fold(row['symbol'])} {fold(row.get('name'))}" for row in rows]
+
+        # Trie nodes are dicts of char -> child; '' holds ids of every
+        # stock with a word (or symbol) under that prefix
+        self.trie: Dict = {}
+        self.symbol_trie: Dict = {}
+        self.ngrams: Dict[str, Set[int]] = {}
+        for index, text in enumerate(self.texts):
+            _insert(self.symbol_trie, text.split()[0] if text else '', index)
+            for word in set(text.split()):
+                _insert(self.trie, word, index)
+            for gram in _ngrams(text):
+                self.ngrams.setdefault(gram, set()).add(index)
+
+    def __len__(self):
+        return len(self.results)
+
+    def _prefixed(self, word: str, trie: Optional[Dict] = None) -> Set[int]:
+        """Ids with a word (or symbol, with the symbol trie) starting with word"""
+        node = self.trie if trie is None else trie
+        for ch in word:
+            node = node.get(ch)
+            if node is None:
+                return set()
+        return node['']
+
+    def _containing(self, text: str) -> Set[int]:
+        """Ids whose folded symbol/name contains text"""
+        if len(text) < NGRAM:
+            return {i for i, candidate in enumerate(self.texts) if text in candidate}
+
+        grams = sorted(_ngrams(text), key=lambda gram: len(self.ngrams.get(gram, ())))
+        candidates = set(self.ngrams.get(grams[0], ()))
+        for gram in grams[1:]:
+            candidates &= self.ngrams.get(gram, set())
+            if not candidates:
+                break
+        return {i for i in candidates if text in self.texts[i]}
+
+    def search(self, query: str, limit: int = 20) -> List[Dict]:
+        """
+        Find stocks by symbol or name
+
+        Every query word must prefix a word of the symbol or name; otherwise
+        the whole query must appear inside them. Exact symbols rank first,
+        then symbol prefixes, word prefixes and substring matches, each
+        in symbol order.
+
+        Args:
+            query: Search text, with or without diacritics
+            limit: Maximum number of results
+
+        Returns:
+            Result rows (symbol, name, exchange, sector)
+        """
+        folded = fold(query)
+        if not folded or limit <= 0:
+            return []
+
+        words = folded.split()
+        matched = self._prefixed(words[0])
+        for word in words[1:]:
+            matched = matched & self._prefixed(word)
+
+        exact = self.by_symbol.get(folded)
+        tiers = [
+            [] if exact is None else [exact],
+            self._prefixed(folded, self.symbol_trie),
+            matched,
+        ]
+
+        # Ids follow symbol order, so sorting each tier keeps ties alphabetical
+        found = []
+        seen = set()
+        for tier in tiers:
+            for index in sorted(tier):
+                if index not in seen:
+                    seen.add(index)
+                    found.append(index)
+
+        # Substring matches only when the better tiers ran short
+        if len(found) < limit:
+            found.extend(sorted(self._containing(folded) - seen))
+        return [self.results[index] for index in found[:limit]]
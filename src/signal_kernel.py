@@ -0,0 +1,371 @@
+"""
+Signal Kernel
+Computes every trading signal for one symbol in a single pass over a float
+price array: the indicator signals (RSI, moving averages, MACD, Bollinger
+Bands, volume) and the price-action signals (support/resistance, trend,
+volatility, volume spike).
+
+Values match the vectorized engine in src/indicators.py exactly - the
+accumulators follow the same summation order - so a symbol scores the same
+whether it goes through the kernel or through the universe matrix path.
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.rolling import RollingStats
+
+
+# Tunable periods and thresholds; override any subset per SignalKernel
+DEFAULT_CONFIG = {
+    # Indicator periods
+    'rsi_period': 14,
+    'ma_short': 20,
+    'ma_long': 50,
+    'ema_fast': 12,
+    'ema_slow': 26,
+    'macd_signal': 9,
+    'bollinger_period': 20,
+    'bollinger_std': 2,
+    'volume_period': 20,
+    # Indicator signal thresholds
+    'rsi_oversold': 30,
+    'rsi_overbought': 70,
+    'rsi_neutral_low': 40,
+    'rsi_neutral_high': 60,
+    'high_volume_multiplier': 1.5,
+    # Price-action settings
+    'price_action_bars': None,      # Trailing bars scanned (None = whole series)
+    'price_action_min_bars': 5,
+    'trend_moves': 4,               # Recent moves inspected for a trend
+    'trend_min_run': 3,
+    'volatility_multiplier': 1.5,
+    'volume_spike_multiplier': 1.2,
+    # Signal groups to evaluate
+    'indicators': True,
+    'price_action': True,
+}
+
+# Indicator signals evaluated on the latest bar: (key, message, score points)
+INDICATOR_RULES = [
+    ('rsi_oversold', "🟢 RSI oversold (potential buy)", 20),
+    ('rsi_overbought', "🔴 RSI overbought (potential sell)", -20),
+    ('rsi_neutral', "⚪ RSI neutral", 0),
+    ('price_above_ma', "🟢 Price above MA20 and MA50 (bullish)", 15),
+    ('price_below_ma', "🔴 Price below MA20 and MA50 (bearish)", -15),
+    ('golden_cross', "🟢 MA20 above MA50 (golden cross area)", 10),
+    ('death_cross', "🔴 MA20 below MA50 (death cross area)", -10),
+    ('macd_bullish', "🟢 MACD bullish", 10),
+    ('macd_bearish', "🔴 MACD bearish", -10),
+    ('below_lower_band', "🟢 Price near lower Bollinger Band (oversold)", 15),
+    ('above_upper_band', "🔴 Price near upper Bollinger Band (overbought)", -15),
+    ('high_volume', "📈 High volume (strong interest)", 5),
+]
+
+# Price-action signal points (messages carry the level, see _price_action)
+PRICE_ACTION_POINTS = {
+    'support': 15,
+    'resistance': -15,
+    'uptrend': 20,
+    'downtrend': -20,
+    'volatile_up': 10,
+    'volatile_down': -10,
+    'volume_spike': 5,
+}
+
+
+def indicator_flags(latest: Dict, config: Optional[Dict] = None) -> Dict:
+    """
+    Evaluate the indicator rules on latest-bar values
+
+    Works on scalars (one symbol) and on NumPy arrays (one entry per symbol).
+    Indicator values are compared after rounding to 2 decimals, the precision
+    they are reported with.
+
+    Args:
+        latest: 'price', 'rsi', 'ma20', 'ma50', 'macd_histogram',
+                'bollinger_upper', 'bollinger_lower' and optionally
+                'volume' / 'volume_ma20' (NaN where unavailable)
+        config: Full kernel configuration (default: DEFAULT_CONFIG)
+
+    Returns:
+        Dictionary of booleans keyed by rule, plus the summed 'score'
+    """
+    config = config or DEFAULT_CONFIG
+    scalar = np.ndim(latest['price']) == 0
+
+    def last(key):
+        value = np.round(latest[key], 2)
+        return float(value) if scalar else value
+
+    # Written with comparisons only (x == x is False for NaN) so the same
+    # expressions run on plain floats without NumPy scalar overhead
+    price = latest['price']
+    rsi = last('rsi')
+    ma20, ma50 = last('ma20'), last('ma50')
+    histogram = last('macd_histogram')
+    upper, lower = last('bollinger_upper'), last('bollinger_lower')
+
+    has_ma = (ma20 == ma20) & (ma50 == ma50) & (ma20 != 0) & (ma50 != 0)
+    has_macd = histogram == histogram
+    has_bands = (upper == upper) & (lower == lower)
+
+    flags = {
+        'rsi_oversold': rsi < config['rsi_oversold'],
+        'rsi_overbought': rsi > config['rsi_overbought'],
+        'rsi_neutral': (rsi >= config['rsi_neutral_low']) & (rsi <= config['rsi_neutral_high']),
+        'price_above_ma': has_ma & (price > ma20) & (ma20 > ma50),
+        'price_below_ma': has_ma & (price < ma20) & (ma20 < ma50),
+        'golden_cross': has_ma & (ma20 > ma50),
+        'death_cross': has_ma & (ma20 <= ma50),
+        'macd_bullish': has_macd & (histogram > 0),
+        'macd_bearish': has_macd & (histogram <= 0),
+        'below_lower_band': has_bands & (price < lower),
+        'above_upper_band': has_bands & (price >= lower) & (price > upper),
+    }
+
+    if latest.get('volume') is not None:
+        avg_volume = latest['volume_ma20']
+        flags['high_volume'] = (avg_volume == avg_volume) & \
+            (latest['volume'] > avg_volume * config['high_volume_multiplier'])
+    else:
+        flags['high_volume'] = False if scalar else np.zeros(np.shape(price), dtype=bool)
+
+    score = 0
+    for key, _, points in INDICATOR_RULES:
+        score = score + flags[key] * points
+    flags['score'] = score
+    return flags
+
+
+class SignalKernel:
+    """Single-pass signal computation for one symbol"""
+
+    def __init__(self, config: Optional[Dict] = None):
+        """
+        Args:
+            config: Overrides for DEFAULT_CONFIG
+        """
+        unknown = set(config or {}) - set(DEFAULT_CONFIG)
+        if unknown:
+            raise ValueError(f"Unknown signal kernel settings: {', '.join(sorted(unknown))}")
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
+
+    def run(self, closes: Sequence[float], volumes: Optional[Sequence[float]] = None) -> Dict:
+        """
+        Compute all enabled signal groups
+
+        Args:
+            closes: Closing prices as floats, oldest first (list or ndarray)
+            volumes: Optional volumes aligned with closes
+
+        Returns:
+            Dictionary with 'bars', 'values' (latest indicator values, NaN
+            when unavailable), 'flags', 'score', 'signals' and 'price_action'
+        """
+        cfg = self.config
+        prices = closes.tolist() if isinstance(closes, np.ndarray) else list(closes)
+        if volumes is not None:
+            volumes = volumes.tolist() if isinstance(volumes, np.ndarray) else list(volumes)
+        n = len(prices)
+        if n == 0:
+            raise ValueError("Signal kernel needs at least one price")
+
+        fast, slow, sig = cfg['ema_fast'], cfg['ema_slow'], cfg['macd_signal']
+        rsi_period = cfg['rsi_period']
+        fast_alpha, slow_alpha = 2.0 / (fast + 1), 2.0 / (slow + 1)
+        sig_alpha, rsi_alpha = 2.0 / (sig + 1), 1.0 / rsi_period
+
+        # Window sums are prefix differences; remember the prefix where each window starts
+        windows = {cfg['ma_short'], cfg['ma_long'], cfg['bollinger_period'], cfg['volume_period']}
+        starts = {n - w for w in windows if 0 < w <= n}
+        marks = {0: (0.0, 0.0)} if 0 in starts else {}
+        total = volume_total = 0.0
+        # Windowed Welford variance, the same updates as rolling.rolling_var
+        band = RollingStats(cfg['bollinger_period'])
+
+        ema_fast = ema_slow = macd_signal = avg_gain = avg_loss = math.nan
+        macd_line = math.nan
+        macd_count = 0
+        macd_seed = gain_seed = loss_seed = 0.0
+
+        # Price-action window and accumulators
+        do_pa = cfg['price_action']
+        pa_bars = n if cfg['price_action_bars'] is None else min(n, cfg['price_action_bars'])
+        pa_start = n - pa_bars
+        trend_start = max(n - cfg['trend_moves'], pa_start + 1)
+        support = resistance = None
+        low = high = prices[pa_start]
+        return_sum, return_count, last_return = 0.0, 0, None
+        trend_up, trend_len, trend_open = None, 0, True
+
+        prev = None
+        for i, price in enumerate(prices):
+            total += price
+            band.push(price)
+            if volumes is not None:
+                volume_total += volumes[i]
+            if i + 1 in starts:
+                marks[i + 1] = (total, volume_total)
+
+            # Seeded EMAs: simple mean of the first `period` bars, then smoothing
+            if i == fast - 1:
+                ema_fast = total / fast
+            elif i >= fast:
+                ema_fast += fast_alpha * (price - ema_fast)
+            if i == slow - 1:
+                ema_slow = total / slow
+            elif i >= slow:
+                ema_slow += slow_alpha * (price - ema_slow)
+
+            if i >= slow - 1 and i >= fast - 1:
+                macd_line = ema_fast - ema_slow
+                macd_count += 1
+                if macd_count < sig:
+                    macd_seed += macd_line
+                elif macd_count == sig:
+                    macd_signal = (macd_seed + macd_line) / sig
+                else:
+                    macd_signal += sig_alpha * (macd_line - macd_signal)
+
+            if prev is not None:
+                change = price - prev
+                gain = change if change > 0 else 0.0
+                loss = -change if change < 0 else 0.0
+                if i < rsi_period:
+                    gain_seed += gain
+                    loss_seed += loss
+                elif i == rsi_period:
+                    avg_gain = (gain_seed + gain) / rsi_period
+                    avg_loss = (loss_seed + loss) / rsi_period
+                else:
+                    avg_gain += rsi_alpha * (gain - avg_gain)
+                    avg_loss += rsi_alpha * (loss - avg_loss)
+
+            if do_pa and i >= pa_start:
+                if price < low:
+                    low = price
+                if price > high:
+                    high = price
+                if i > pa_start and prev != 0:
+                    last_return = abs((price - prev) / prev)
+                    return_sum += last_return
+                    return_count += 1
+                if i >= trend_start:
+                    up = price > prev
+                    if trend_up is None:
+                        trend_up, trend_len = up, 1
+                    elif trend_open and up == trend_up:
+                        trend_len += 1
+                    else:
+                        trend_open = False
+                # Pivot two bars back, now that both neighbours on each side are known
+                j = i - 2
+                if j >= pa_start + 2:
+                    pivot = prices[j]
+                    if support is None and pivot < prices[j - 1] and pivot < prices[j + 1] and \
+                            pivot < prices[j - 2] and pivot < price:
+                        support = pivot
+                    if resistance is None and pivot > prices[j - 1] and pivot > prices[j + 1] and \
+                            pivot > prices[j - 2] and pivot > price:
+                        resistance = pivot
+            prev = price
+
+        values = {'price': prices[-1]}
+
+        def window(period, slot):
+            start = marks.get(n - period)
+            end = (total, volume_total)[slot]
+            return math.nan if start is None or period < 1 else end - start[slot]
+
+        values['ma20'] = window(cfg['ma_short'], 0) / cfg['ma_short']
+        values['ma50'] = window(cfg['ma_long'], 0) / cfg['ma_long']
+        period = cfg['bollinger_period']
+        middle = window(period, 0) / period
+        std = band.std() if period > 1 and band.full else math.nan
+        values['bollinger_middle'] = middle
+        values['bollinger_upper'] = middle + cfg['bollinger_std'] * std
+        values['bollinger_lower'] = middle - cfg['bollinger_std'] * std
+
+        values['ema12'] = ema_fast
+        values['ema26'] = ema_slow
+        values['macd'] = macd_line
+        values['macd_signal'] = macd_signal
+        values['macd_histogram'] = macd_line - macd_signal
+
+        if math.isnan(avg_loss):
+            values['rsi'] = math.nan
+        elif avg_loss == 0:
+            values['rsi'] = 100.0
+        else:
+            values['rsi'] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+        if volumes is not None:
+            values['volume'] = volumes[-1]
+            values['volume_ma20'] = window(cfg['volume_period'], 1) / cfg['volume_period']
+
+        result = {'bars': n, 'values': values, 'flags': {}, 'score': 0, 'signals': []}
+        if cfg['indicators']:
+            flags = indicator_flags(values, cfg)
+            result['flags'] = {key: bool(flags[key]) for key, _, _ in INDICATOR_RULES}
+            result['score'] = int(flags['score'])
+            result['signals'] = [message for key, message, _ in INDICATOR_RULES if result['flags'][key]]
+
+        if do_pa:
+            result['price_action'] = self._price_action(
+                prices, volumes, pa_bars, support, resistance, low, high,
+                return_sum, return_count, last_return, trend_up, trend_len,
+            )
+        return result
+
+    def _price_action(self, prices, volumes, bars, support, resistance, low, high,
+                      return_sum, return_count, last_return, trend_up, trend_len) -> Dict:
+        """Turn the price-action accumulators into score and signals"""
+        cfg = self.config
+        if bars < cfg['price_action_min_bars']:
+            return {'score': 0, 'signals': [], 'indicators': {}}
+
+        points = PRICE_ACTION_POINTS
+        signals: List[str] = []
+        score = 0
+
+        if support is not None:
+            signals.append(f"🟢 Support Level at {support:.0f}")
+            score += points['support']
+        if resistance is not None:
+            signals.append(f"🔴 Resistance Level at {resistance:.0f}")
+            score += points['resistance']
+
+        if trend_up is not None and trend_len >= cfg['trend_min_run']:
+            if trend_up:
+                signals.append("🟢 Recent Uptrend Detected")
+                score += points['uptrend']
+            else:
+                signals.append("🔴 Recent Downtrend Detected")
+                score += points['downtrend']
+
+        if return_count:
+            if last_return > return_sum / return_count * cfg['volatility_multiplier']:
+                if prices[-1] > prices[-2]:
+                    signals.append("🟢 High Volatility with Upward Movement")
+                    score += points['volatile_up']
+                else:
+                    signals.append("🔴 High Volatility with Downward Movement")
+                    score += points['volatile_down']
+
+        if volumes is not None and bars >= 2:
+            recent, previous = volumes[-1], volumes[-2]
+            if previous > 0 and recent > previous * cfg['volume_spike_multiplier']:
+                signals.append("🟢 Volume Spike Detected")
+                score += points['volume_spike']
+
+        return {
+            'score': score,
+            'signals': signals,
+            'indicators': {
+                'support_level': low if support is not None else None,
+                'resistance_level': high if resistance is not None else None,
+            },
+        }
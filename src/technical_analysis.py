@@ -3,17 +3,48 @@ Technical Analysis for Vietnamese Stocks
 Calculate indicators: RSI, MACD, Moving Averages, Bollinger Bands
 """
 
+from functools import lru_cache
 from typing import List, Dict, Optional, Tuple
-import statistics
+
+import numpy as np
+
+from src import indicators
+from src import signal_kernel
+from src.signal_kernel import SignalKernel
+
+# Bars before MACD is reported (slow EMA plus signal line warm-up)
+MACD_MIN_BARS = signal_kernel.DEFAULT_CONFIG['ema_slow'] + signal_kernel.DEFAULT_CONFIG['macd_signal']
+
+# Shared kernels for the common analyses
+_INDICATOR_KERNEL = SignalKernel({'price_action': False})
+_PRICE_ACTION_KERNEL = SignalKernel({'indicators': False})
+
+
+@lru_cache(maxsize=None)
+def _windowed_kernel(price_action_bars: Optional[int]) -> SignalKernel:
+    """Full kernel scanning the trailing `price_action_bars` for price action"""
+    return SignalKernel({'price_action_bars': price_action_bars})
 
 
 class TechnicalAnalyzer:
     """Perform technical analysis on stock data"""
 
+    # Signal rules evaluated on the latest bar: (key, message, score points)
+    SIGNAL_RULES = signal_kernel.INDICATOR_RULES
+
+    # Score thresholds, checked in order: (exclusive lower bound, recommendation, emoji)
+    RECOMMENDATIONS = [
+        (40, "STRONG BUY", "🟢🟢"),
+        (20, "BUY", "🟢"),
+        (-20, "HOLD", "⚪"),
+        (-40, "SELL", "🔴"),
+    ]
+    FLOOR_RECOMMENDATION = ("STRONG SELL", "🔴🔴")
+
     @staticmethod
     def calculate_rsi(prices: List[float], period: int = 14) -> Optional[float]:
         """
-        Calculate Relative Strength Index (RSI)
+        Calculate Relative Strength Index (RSI) with Wilder smoothing
 
         Args:
             prices: List of closing prices (oldest first)
@@ -25,31 +56,7 @@ class TechnicalAnalyzer:
         if len(prices) < period + 1:
             return None
 
-        gains = []
-        losses = []
-
-        for i in range(1, len(prices)):
-            change = prices[i] - prices[i-1]
-            if change > 0:
-                gains.append(change)
-                losses.append(0)
-            else:
-                gains.append(0)
-                losses.append(abs(change))
-
-        if len(gains) < period:
-            return None
-
-        avg_gain = sum(gains[-period:]) / period
-        avg_loss = sum(losses[-period:]) / period
-
-        if avg_loss == 0:
-            return 100
-
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-
-        return round(rsi, 2)
+        return indicators.to_optional(indicators.latest(indicators.rsi(prices, period)))
 
     @staticmethod
     def calculate_moving_average(prices: List[float], period: int) -> Optional[float]:
@@ -66,7 +73,7 @@ class TechnicalAnalyzer:
         if len(prices) < period:
             return None
 
-        return round(sum(prices[-period:]) / period, 2)
+        return indicators.to_optional(indicators.latest(indicators.rolling_mean(prices, period)))
 
     @staticmethod
     def calculate_ema(prices: List[float], period: int) -> Optional[float]:
@@ -83,13 +90,7 @@ class TechnicalAnalyzer:
         if len(prices) < period:
             return None
 
-        multiplier = 2 / (period + 1)
-        ema = sum(prices[:period]) / period
-
-        for price in prices[period:]:
-            ema = (price - ema) * multiplier + ema
-
-        return round(ema, 2)
+        return indicators.to_optional(indicators.latest(indicators.ema(prices, period)))
 
     @staticmethod
     def calculate_macd(prices: List[float], fast: int = 12, slow: int = 26, signal: int = 9) -> Optional[Dict]:
@@ -100,35 +101,20 @@ class TechnicalAnalyzer:
             prices: List of closing prices
             fast: Fast EMA period
             slow: Slow EMA period
-            signal: Signal line period
+            signal: Signal line period (EMA of the MACD line)
 
         Returns:
             Dictionary with MACD, signal, and histogram
         """
-        if len(prices) < slow:
-            return None
-
-        ema_fast = TechnicalAnalyzer.calculate_ema(prices, fast)
-        ema_slow = TechnicalAnalyzer.calculate_ema(prices, slow)
-
-        if ema_fast is None or ema_slow is None:
-            return None
-
-        macd_line = ema_fast - ema_slow
-
-        # Calculate signal line (EMA of MACD)
-        # For simplicity, we'll use SMA here
         if len(prices) < slow + signal:
             return None
 
-        signal_line = macd_line  # Simplified
-
-        histogram = macd_line - signal_line
+        series = indicators.macd(prices, fast, slow, signal)
 
         return {
-            'macd': round(macd_line, 2),
-            'signal': round(signal_line, 2),
-            'histogram': round(histogram, 2)
+            'macd': indicators.to_optional(indicators.latest(series['macd'])),
+            'signal': indicators.to_optional(indicators.latest(series['signal'])),
+            'histogram': indicators.to_optional(indicators.latest(series['histogram']))
         }
 
     @staticmethod
@@ -147,17 +133,183 @@ class TechnicalAnalyzer:
         if len(prices) < period:
             return None
 
-        recent_prices = prices[-period:]
-        middle_band = sum(recent_prices) / period
-        std = statistics.stdev(recent_prices)
+        bands = indicators.bollinger_bands(prices, period, std_dev)
+
+        return {
+            'upper': indicators.to_optional(indicators.latest(bands['upper'])),
+            'middle': indicators.to_optional(indicators.latest(bands['middle'])),
+            'lower': indicators.to_optional(indicators.latest(bands['lower']))
+        }
+
+    @staticmethod
+    def evaluate_signals(series: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Evaluate every signal rule on the latest bar of each symbol
+
+        Args:
+            series: Indicator matrices from indicators.compute_all
+
+        Returns:
+            Dictionary of boolean arrays (one entry per symbol) keyed by rule,
+            plus the summed 'score'
+        """
+        keys = ['rsi', 'ma20', 'ma50', 'macd_histogram', 'bollinger_upper', 'bollinger_lower']
+        latest = {key: indicators.latest(series[key]) for key in keys}
+        latest['price'] = indicators.latest(series['close'])
+        if 'volume' in series:
+            latest['volume'] = indicators.latest(series['volume'])
+            latest['volume_ma20'] = indicators.latest(series['volume_ma20'])
+        return signal_kernel.indicator_flags(latest)
+
+    @staticmethod
+    def recommend(score: float) -> Tuple[str, str]:
+        """Map a signal score to (recommendation, emoji)"""
+        for threshold, recommendation, emoji in TechnicalAnalyzer.RECOMMENDATIONS:
+            if score > threshold:
+                return recommendation, emoji
+        return TechnicalAnalyzer.FLOOR_RECOMMENDATION
+
+    @staticmethod
+    def score_universe(closes, volumes=None) -> Dict[str, np.ndarray]:
+        """
+        Score every symbol of a symbol x date price matrix in one pass
+
+        Args:
+            closes: Closing price matrix (one row per symbol, oldest first,
+                    NaN-padded on the left for shorter histories)
+            volumes: Optional volume matrix with the same shape
+
+        Returns:
+            Dictionary with per-symbol 'score' and 'recommendation' arrays
+            and the boolean signal flags
+        """
+        series = indicators.compute_all(indicators.as_matrix(closes),
+                                        None if volumes is None else indicators.as_matrix(volumes))
+        flags = TechnicalAnalyzer.evaluate_signals(series)
+
+        labels = np.full(flags['score'].shape, TechnicalAnalyzer.FLOOR_RECOMMENDATION[0], dtype=object)
+        for threshold, recommendation, _ in reversed(TechnicalAnalyzer.RECOMMENDATIONS):
+            labels[flags['score'] > threshold] = recommendation
+        flags['recommendation'] = labels
+        return flags
+
+    @staticmethod
+    def analyze_series(prices: List[float], volumes: Optional[List[float]] = None) -> Dict:
+        """
+        Perform comprehensive technical analysis on a close series
+
+        Args:
+            prices: Closing prices (oldest first)
+            volumes: Optional traded volumes aligned with prices
+
+        Returns:
+            Dictionary with all technical indicators and signals
+        """
+        return TechnicalAnalyzer.format_analysis(_INDICATOR_KERNEL.run(prices, volumes))
+
+    @staticmethod
+    def analyze(prices: List[float], volumes: Optional[List[float]] = None,
+                price_action_bars: Optional[int] = None) -> Dict:
+        """
+        Indicator and price-action analysis from a single kernel pass
+
+        Args:
+            prices: Closing prices (oldest first)
+            volumes: Optional traded volumes aligned with prices
+            price_action_bars: Trailing bars for the price-action signals
+                               (default: the whole series)
+
+        Returns:
+            analyze_series() result with the analyze_price_action() result
+            under 'price_action'
+        """
+        result = _windowed_kernel(price_action_bars).run(prices, volumes)
+        analysis = TechnicalAnalyzer.format_analysis(result)
+        analysis['price_action'] = TechnicalAnalyzer.format_price_action(result['price_action'])
+        return analysis
+
+    @staticmethod
+    def format_analysis(result: Dict) -> Dict:
+        """Shape a kernel result as the indicator analysis returned by the API"""
+        values = result['values']
+
+        def value(key):
+            return indicators.to_optional(values[key])
+
+        macd = None
+        if result['bars'] >= MACD_MIN_BARS:
+            macd = {
+                'macd': value('macd'),
+                'signal': value('macd_signal'),
+                'histogram': value('macd_histogram')
+            }
+
+        bollinger = None
+        if not np.isnan(values['bollinger_middle']):
+            bollinger = {
+                'upper': value('bollinger_upper'),
+                'middle': value('bollinger_middle'),
+                'lower': value('bollinger_lower')
+            }
+
+        recommendation, emoji = TechnicalAnalyzer.recommend(result['score'])
+
+        return {
+            'current_price': float(values['price']),
+            'indicators': {
+                'rsi': value('rsi'),
+                'ma20': value('ma20'),
+                'ma50': value('ma50'),
+                'ema12': value('ema12'),
+                'ema26': value('ema26'),
+                'macd': macd,
+                'bollinger': bollinger
+            },
+            'signals': result['signals'],
+            'score': result['score'],
+            'recommendation': recommendation,
+            'emoji': emoji
+        }
+
+    @staticmethod
+    def analyze_price_action(historical_data: List[Dict]) -> Dict:
+        """
+        Price-action analysis used by the API: support/resistance, trend,
+        volatility and volume signals
+
+        Args:
+            historical_data: Price rows with 'close' and 'volume' (oldest first)
+
+        Returns:
+            Dictionary with score, recommendation, emoji, signals and
+            support/resistance indicators
+        """
+        if not historical_data:
+            return TechnicalAnalyzer.format_price_action({'score': 0, 'signals': [], 'indicators': {}})
+
+        # Convert Decimal database values once, up front
+        prices = [float(h['close']) for h in historical_data]
+        volumes = [float(h.get('volume') or 0) for h in historical_data]
+        result = _PRICE_ACTION_KERNEL.run(prices, volumes)
+        return TechnicalAnalyzer.format_price_action(result['price_action'])
 
-        upper_band = middle_band + (std_dev * std)
-        lower_band = middle_band - (std_dev * std)
+    @staticmethod
+    def format_price_action(result: Dict) -> Dict:
+        """Attach the recommendation to a kernel price-action result"""
+        score = result['score']
+        if score > 20:
+            recommendation, emoji = 'BUY', '🟢'
+        elif score < -20:
+            recommendation, emoji = 'SELL', '🔴'
+        else:
+            recommendation, emoji = 'HOLD', '⚪'
 
         return {
-            'upper': round(upper_band, 2),
-            'middle': round(middle_band, 2),
-            'lower': round(lower_band, 2)
+            'score': result['score'],
+            'recommendation': recommendation,
+            'emoji': emoji,
+            'signals': result['signals'],
+            'indicators': result['indicators']
         }
 
     @staticmethod
@@ -166,7 +318,8 @@ class TechnicalAnalyzer:
         Perform comprehensive technical analysis on a stock
 
         Args:
-            historical_data: List of historical price data (oldest first)
+            historical_data: List of historical price data (newest first,
+                             as returned by VNStockData.get_historical_data)
 
         Returns:
             Dictionary with all technical indicators and signals
@@ -181,108 +334,7 @@ class TechnicalAnalyzer:
         if not prices or prices[0] == 0:
             return {'error': 'Invalid price data'}
 
-        current_price = prices[-1]
-
-        # Calculate indicators
-        rsi = TechnicalAnalyzer.calculate_rsi(prices)
-        ma20 = TechnicalAnalyzer.calculate_moving_average(prices, 20)
-        ma50 = TechnicalAnalyzer.calculate_moving_average(prices, 50)
-        ema12 = TechnicalAnalyzer.calculate_ema(prices, 12)
-        ema26 = TechnicalAnalyzer.calculate_ema(prices, 26)
-        macd = TechnicalAnalyzer.calculate_macd(prices)
-        bollinger = TechnicalAnalyzer.calculate_bollinger_bands(prices)
-
-        # Generate signals
-        signals = []
-        score = 0  # -100 to 100 (bearish to bullish)
-
-        # RSI signals
-        if rsi is not None:
-            if rsi < 30:
-                signals.append("🟢 RSI oversold (potential buy)")
-                score += 20
-            elif rsi > 70:
-                signals.append("🔴 RSI overbought (potential sell)")
-                score -= 20
-            elif 40 <= rsi <= 60:
-                signals.append("⚪ RSI neutral")
-
-        # Moving Average signals
-        if ma20 and ma50:
-            if current_price > ma20 > ma50:
-                signals.append("🟢 Price above MA20 and MA50 (bullish)")
-                score += 15
-            elif current_price < ma20 < ma50:
-                signals.append("🔴 Price below MA20 and MA50 (bearish)")
-                score -= 15
-
-            # Golden/Death cross
-            if ma20 > ma50:
-                signals.append("🟢 MA20 above MA50 (golden cross area)")
-                score += 10
-            else:
-                signals.append("🔴 MA20 below MA50 (death cross area)")
-                score -= 10
-
-        # MACD signals
-        if macd:
-            if macd['histogram'] > 0:
-                signals.append("🟢 MACD bullish")
-                score += 10
-            else:
-                signals.append("🔴 MACD bearish")
-                score -= 10
-
-        # Bollinger Bands signals
-        if bollinger:
-            if current_price < bollinger['lower']:
-                signals.append("🟢 Price near lower Bollinger Band (oversold)")
-                score += 15
-            elif current_price > bollinger['upper']:
-                signals.append("🔴 Price near upper Bollinger Band (overbought)")
-                score -= 15
-
-        # Volume analysis
-        if len(volumes) >= 20:
-            avg_volume = sum(volumes[-20:]) / 20
-            current_volume = volumes[-1]
-            if current_volume > avg_volume * 1.5:
-                signals.append("📈 High volume (strong interest)")
-                score += 5
-
-        # Overall recommendation
-        if score > 40:
-            recommendation = "STRONG BUY"
-            emoji = "🟢🟢"
-        elif score > 20:
-            recommendation = "BUY"
-            emoji = "🟢"
-        elif score > -20:
-            recommendation = "HOLD"
-            emoji = "⚪"
-        elif score > -40:
-            recommendation = "SELL"
-            emoji = "🔴"
-        else:
-            recommendation = "STRONG SELL"
-            emoji = "🔴🔴"
-
-        return {
-            'current_price': current_price,
-            'indicators': {
-                'rsi': rsi,
-                'ma20': ma20,
-                'ma50': ma50,
-                'ema12': ema12,
-                'ema26': ema26,
-                'macd': macd,
-                'bollinger': bollinger
-            },
-            'signals': signals,
-            'score': score,
-            'recommendation': recommendation,
-            'emoji': emoji
-        }
+        return TechnicalAnalyzer.analyze_series(prices, volumes)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,260 @@
+"""
+Parallel Universe Analysis
+Loads every stock's close/volume history into one shared-memory NumPy block
+and fans per-symbol analysis out across a process pool. Workers attach to
+the block by name, so only row ranges and result rows cross process
+boundaries - the price data itself is never pickled.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import indicators
+from src.technical_analysis import TechnicalAnalyzer
+
+
+# Bars fed to the price-action analysis (matches /api/stock-analysis)
+ANALYSIS_BARS = 60
+
+# Row ranges handed to each worker per task; several per worker keeps the
+# pool busy when some symbols have much longer histories than others
+CHUNKS_PER_WORKER = 4
+
+# Universes smaller than this are analyzed inline: starting the pool costs
+# ~25ms against ~0.5ms of analysis per symbol, so two workers break even
+# around 100 symbols (see benchmarks/bench_universe_analysis.py)
+MIN_PARALLEL_SYMBOLS = 200
+
+# Columns of the results table, in display order
+RESULT_COLUMNS = [
+    'symbol', 'price', 'score', 'recommendation', 'rsi', 'ma20', 'ma50',
+    'macd_histogram', 'price_action_score', 'price_action_recommendation', 'signals',
+]
+
+
+class SharedPriceMatrix:
+    """Close and volume matrices (symbol x date) backed by one shared-memory block"""
+
+    def __init__(self, block: shared_memory.SharedMemory, shape: Tuple[int, int], owner: bool):
+        self.block = block
+        self.shape = shape
+        self.owner = owner
+        data = np.ndarray((2,) + shape, dtype=np.float64, buffer=block.buf)
+        self.closes, self.volumes = data[0], data[1]
+
+    @classmethod
+    def create(cls, closes: np.ndarray, volumes: np.ndarray) -> 'SharedPriceMatrix':
+        """Allocate a block and copy the matrices into it"""
+        shape = closes.shape
+        block = shared_memory.SharedMemory(create=True, size=max(1, 2 * closes.size * 8))
+        matrix = cls(block, shape, owner=True)
+        matrix.closes[:] = closes
+        matrix.volumes[:] = volumes
+        return matrix
+
+    @classmethod
+    def attach(cls, name: str, shape: Tuple[int, int]) -> 'SharedPriceMatrix':
+        """Map an existing block created by another process"""
+        return cls(shared_memory.SharedMemory(name=name), shape, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.block.name
+
+    def close(self):
+        """Release the mapping; the creating process also frees the block"""
+        self.closes = self.volumes = None
+        self.block.close()
+        if self.owner:
+            self.block.unlink()
+
+
+# Per-worker state set by _init_worker
+_worker = {}
+
+
+def _init_worker(name: str, shape: Tuple[int, int], symbols: List[str]):
+    """Attach the shared block once per worker process"""
+    _worker['matrix'] = SharedPriceMatrix.attach(name, shape)
+    _worker['symbols'] = symbols
+
+
+def _analyze_rows(start: int, stop: int) -> List[Dict]:
+    """Analyze rows [start, stop) of the shared matrix (runs in a worker)"""
+    matrix = _worker['matrix']
+    return [
+        analyze_row(_worker['symbols'][row], matrix.closes[row], matrix.volumes[row])
+        for row in range(start, stop)
+    ]
+
+
+def analyze_row(symbol: str, closes: np.ndarray, volumes: np.ndarray) -> Optional[Dict]:
+    """
+    Run the indicator and price-action signals for one matrix row
+
+    Args:
+        symbol: Stock symbol
+        closes: Row of the close matrix (NaN-padded on the left)
+        volumes: Matching row of the volume matrix
+
+    Returns:
+        One results-table row, or None when the history is too short
+    """
+    start = int(indicators.first_valid_index(closes.reshape(1, -1))[0])
+    closes, volumes = closes[start:], volumes[start:]
+    if len(closes) < 2:
+        return None
+
+    # One kernel pass yields both the indicator and the price-action signals
+    analysis = TechnicalAnalyzer.analyze(closes, volumes, price_action_bars=ANALYSIS_BARS)
+    price_action = analysis['price_action']
+
+    values = analysis['indicators']
+    return {
+        'symbol': symbol,
+        'price': analysis['current_price'],
+        'score': analysis['score'],
+        'recommendation': analysis['recommendation'],
+        'rsi': values.get('rsi'),
+        'ma20': values.get('ma20'),
+        'ma50': values.get('ma50'),
+        'macd_histogram': (values.get('macd') or {}).get('histogram'),
+        'price_action_score': price_action['score'],
+        'price_action_recommendation': price_action['recommendation'],
+        'signals': len(analysis['signals']) + len(price_action['signals']),
+    }
+
+
+def _chunks(rows: int, workers: int) -> List[Tuple[int, int]]:
+    """Split [0, rows) into contiguous ranges"""
+    count = max(1, min(rows, workers * CHUNKS_PER_WORKER))
+    bounds = np.linspace(0, rows, count + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def analyze_universe(histories: Dict[str, List[Dict]], workers: Optional[int] = None) -> List[Dict]:
+    """
+    Analyze every symbol, in parallel when workers > 1 and the universe
+    has at least MIN_PARALLEL_SYMBOLS symbols
+
+    Args:
+        histories: symbol -> bars (oldest first) with 'close' and 'volume'
+        workers: Process count (default: os.cpu_count())
+
+    Returns:
+        Results table rows sorted by score, best first
+    """
+    workers = workers or os.cpu_count() or 1
+    symbols, closes, volumes = indicators.build_price_matrix(histories)
+
+    if workers == 1 or len(symbols) < max(2, MIN_PARALLEL_SYMBOLS):
+        rows = [analyze_row(s, closes[i], volumes[i]) for i, s in enumerate(symbols)]
+    else:
+        matrix = SharedPriceMatrix.create(closes, volumes)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(matrix.name, matrix.shape, symbols)) as pool:
+                futures = [pool.submit(_analyze_rows, a, b) for a, b in _chunks(len(symbols), workers)]
+                rows = [row for future in futures for row in future.result()]
+        finally:
+            matrix.close()
+
+    rows = [row for row in rows if row]
+    rows.sort(key=lambda r: (-r['score'], -r['price_action_score'], r['symbol']))
+    return rows
+
+
+def load_histories_from_files(data_dir: str = 'data') -> Dict[str, List[Dict]]:
+    """Load data/<SYMBOL>_history.json files (oldest first)"""
+    histories = {}
+    for path in sorted(Path(data_dir).glob('*_history.json')):
+        with open(path, 'r', encoding='utf-8') as f:
+            bars = json.load(f)
+        if bars:
+            histories[path.name[:-len('_history.json')]] = bars
+    return histories
+
+
+def load_histories_from_db(bars: int = indicators.LOOKBACK_BARS) -> Dict[str, List[Dict]]:
+    """Load the last `bars` closes/volumes of every active stock in one query"""
+    from config import get_database_connection
+
+    conn = get_database_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT symbol, close, volume
+                FROM (
+                    SELECT s.symbol, sp.date, sp.close, sp.volume,
+                           ROW_NUMBER() OVER (PARTITION BY sp.stock_id ORDER BY sp.date DESC) AS rn
+                    FROM stock_prices sp
+                    JOIN stocks s ON s.id = sp.stock_id
+                    WHERE s.is_active = TRUE
+                ) recent
+                WHERE rn <= %s
+                ORDER BY symbol, date ASC
+            """, (bars,))
+            histories = {}
+            for symbol, close, volume in cursor.fetchall():
+                histories.setdefault(symbol, []).append({'close': float(close), 'volume': int(volume or 0)})
+            return histories
+    finally:
+        conn.close()
+
+
+def format_table(rows: List[Dict], limit: Optional[int] = None) -> str:
+    """Render result rows as a fixed-width text table"""
+    def cell(value):
+        if value is None:
+            return '-'
+        if isinstance(value, float):
+            return f"{value:,.2f}"
+        return str(value)
+
+    shown = [[cell(row[c]) for c in RESULT_COLUMNS] for row in rows[:limit]]
+    widths = [max([len(c)] + [len(r[i]) for r in shown]) for i, c in enumerate(RESULT_COLUMNS)]
+    lines = ['  '.join(c.ljust(w) for c, w in zip(RESULT_COLUMNS, widths))]
+    lines.append('  '.join('-' * w for w in widths))
+    lines.extend('  '.join(v.rjust(w) for v, w in zip(r, widths)) for r in shown)
+    return '\n'.join(lines)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Analyze every stock in parallel')
+    parser.add_argument('--source', choices=['db', 'files'], default='db',
+                        help='Load histories from PostgreSQL or data/*_history.json')
+    parser.add_argument('--data-dir', default='data', help='Directory for --source files')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--limit', type=int, default=None, help='Rows to print')
+    parser.add_argument('--json', dest='json_path', help='Also write the results table to this JSON file')
+    args = parser.parse_args()
+
+    histories = load_histories_from_db() if args.source == 'db' else load_histories_from_files(args.data_dir)
+
+    started = time.perf_counter()
+    rows = analyze_universe(histories, workers=args.workers)
+    elapsed = time.perf_counter() - started
+
+    print(format_table(rows, args.limit))
+    print(f"\n📊 Analyzed {len(rows)} stocks with {args.workers or os.cpu_count()} workers in {elapsed:.2f}s")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+        print(f"💾 Results saved to {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""
+Columnar Wire Format
+Compact encodings for row-oriented price data: parallel arrays per field
+(JSON) or a little-endian binary buffer, instead of one keyed object per row.
+
+Binary layout (all little-endian):
+    header      magic b'VNSC', version (u8), column count (u8),
+                row count (u32), metadata length (u32)
+    metadata    UTF-8 JSON object (e.g. {"symbol": "VNM"})
+    columns     per column: name length (u8), UTF-8 name, type code (1 byte)
+    data        per column, each starting at an 8-byte aligned offset:
+                'd' float64 (NaN = missing), 'q' int64 / 'i' int32
+                (INT_NULL = missing), 's' u32 byte length followed by the
+                UTF-8 values joined by NUL
+Dates are sent as days since 1970-01-01.
+"""
+
+import json
+import struct
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+
+MAGIC = b'VNSC'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sBBII')
+_EPOCH = date(1970, 1, 1)
+
+# Column type per field; unknown fields are sent as float64
+COLUMN_TYPES = {
+    'date': 'i',
+    'open': 'd',
+    'high': 'd',
+    'low': 'd',
+    'close': 'd',
+    'price': 'd',
+    'change': 'd',
+    'change_percent': 'd',
+    'volume': 'q',
+    'symbol': 's',
+    'name': 's',
+    'exchange': 's',
+}
+
+_NUMPY_TYPES = {'d': '<f8', 'q': '<i8', 'i': '<i4'}
+
+# Missing value marker for integer columns
+INT_NULL = {'q': np.iinfo(np.int64).min, 'i': np.iinfo(np.int32).min}
+
+
+def epoch_day(value: Optional[date]) -> Optional[int]:
+    """Days since 1970-01-01, None for a missing date"""
+    return None if value is None else (value - _EPOCH).days
+
+
+def columns_from_rows(rows: Iterable[Dict], fields: Sequence[str],
+                      aliases: Optional[Dict[str, str]] = None) -> Dict[str, list]:
+    """
+    Pivot rows into one list per field
+
+    Args:
+        rows: Row dictionaries (e.g. RealDictRows)
+        fields: Output fields, in order
+        aliases: Output field -> row key, for fields named differently
+
+    Returns:
+        Dictionary of field -> list; dates become epoch days and Decimals
+        become floats
+    """
+    aliases = aliases or {}
+    columns = {field: [] for field in fields}
+    for row in rows:
+        for field in fields:
+            value = row[aliases.get(field, field)]
+            if value is not None:
+                kind = COLUMN_TYPES.get(field, 'd')
+                if field == 'date':
+                    value = epoch_day(value)
+                elif kind == 'd':
+                    value = float(value)
+                elif kind == 'q':
+                    value = int(value)
+            columns[field].append(value)
+    return columns
+
+
+def to_json_columns(columns: Dict[str, Sequence]) -> Dict[str, list]:
+    """Columns as JSON-ready lists (NaN becomes null, volume an integer)"""
+    result = {}
+    for field, values in columns.items():
+        if isinstance(values, np.ndarray) and values.dtype.kind == 'f':
+            kind = COLUMN_TYPES.get(field, 'd')
+            cast = int if kind in ('q', 'i') else float
+            result[field] = [None if np.isnan(v) else cast(v) for v in values.tolist()]
+        else:
+            result[field] = list(values)
+    return result
+
+
+def _numeric(values: Sequence, kind: str) -> np.ndarray:
+    """Encode one numeric column with its missing-value marker"""
+    if kind == 'd':
+        return np.array([np.nan if v is None else v for v in values], dtype=_NUMPY_TYPES[kind])
+
+    if isinstance(values, np.ndarray) and values.dtype.kind == 'f':
+        missing = np.isnan(values)
+        encoded = np.where(missing, 0, values).astype(_NUMPY_TYPES[kind])
+        encoded[missing] = INT_NULL[kind]
+        return encoded
+    null = INT_NULL[kind]
+    return np.array([null if v is None else v for v in values], dtype=_NUMPY_TYPES[kind])
+
+
+def encode_binary(columns: Dict[str, Sequence], meta: Optional[Dict] = None) -> bytes:
+    """
+    Encode columns into the binary wire format
+
+    Args:
+        columns: Field -> values (lists or numpy arrays, all the same length);
+                 date columns must already be epoch days
+        meta: Small JSON-serializable metadata object
+
+    Returns:
+        Encoded payload
+    """
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError('All columns must have the same length')
+    rows = lengths.pop() if lengths else 0
+
+    meta_bytes = json.dumps(meta or {}, default=str).encode('utf-8')
+    parts = [_HEADER.pack(MAGIC, VERSION, len(columns), rows, len(meta_bytes)), meta_bytes]
+    for field in columns:
+        name = field.encode('utf-8')
+        parts.append(struct.pack('<B', len(name)) + name + COLUMN_TYPES.get(field, 'd').encode('ascii'))
+
+    offset = sum(len(part) for part in parts)
+    for field, values in columns.items():
+        kind = COLUMN_TYPES.get(field, 'd')
+        if kind == 's':
+            text = '\0'.join('' if v is None else str(v) for v in values).encode('utf-8')
+            data = struct.pack('<I', len(text)) + text
+        else:
+            data = _numeric(values, kind).tobytes()
+
+        padding = -offset % 8
+        parts.append(b'\0' * padding + data)
+        offset += padding + len(data)
+    return b''.join(parts)
+
+
+def decode_binary(payload: bytes) -> Dict:
+    """
+    Decode a binary payload
+
+    Returns:
+        Dictionary with 'meta' and 'columns' (numpy arrays for numeric
+        columns, lists of strings for text columns)
+    """
+    magic, version, column_count, rows, meta_length = _HEADER.unpack_from(payload, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('Not a columnar payload')
+
+    offset = _HEADER.size
+    meta = json.loads(payload[offset:offset + meta_length].decode('utf-8'))
+    offset += meta_length
+
+    layout: List = []
+    for _ in range(column_count):
+        name_length = payload[offset]
+        name = payload[offset + 1:offset + 1 + name_length].decode('utf-8')
+        kind = chr(payload[offset + 1 + name_length])
+        layout.append((name, kind))
+        offset += name_length + 2
+
+    columns = {}
+    for name, kind in layout:
+        offset += -offset % 8
+        if kind == 's':
+            (length,) = struct.unpack_from('<I', payload, offset)
+            text = payload[offset + 4:offset + 4 + length].decode('utf-8')
+            columns[name] = text.split('\0') if rows else []
+            offset += 4 + length
+        else:
+            dtype = np.dtype(_NUMPY_TYPES[kind])
+            columns[name] = np.frombuffer(payload, dtype=dtype, count=rows, offset=offset)
+            offset += dtype.itemsize * rows
+    return {'meta': meta, 'columns': columns}
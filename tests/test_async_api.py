@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Tests for the async (ASGI) serving mode
+Run: python3 -m pytest tests/test_async_api.py
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip('quart')
+pytest.importorskip('asyncpg')
+
+from flask import Flask
+
+import api.aio.blueprints.stocks as aio_stocks
+import api.aio.cache as aio_cache
+import api.aio.db as aio_db
+import api.blueprints.stocks as stocks
+from api.aio import AppDispatcher, _with_first_chunk, create_async_app
+from api.aio.cache import AsyncResponseCache
+from api.aio.db import AsyncPool
+from api.json_provider import OrjsonProvider, orjson
+
+TTLS = {'stock_list': 3600, 'stock_prices': 300}
+
+STOCKS = {'VNM': {'id': 1, 'symbol': 'VNM', 'name': 'Vinamilk', 'exchange': 'HOSE', 'is_active': True}}
+
+
+def test_misses_are_computed_once(monkeypatch):
+    monkeypatch.setattr(aio_cache, 'CATEGORY_REFRESH', {})
+    cache = AsyncResponseCache(ttls=TTLS, sources={})
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ['VNM']
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_compute('stock_list', 'all', compute) for _ in range(20)))
+
+    assert asyncio.run(run()) == [['VNM']] * 20
+    assert len(calls) == 1
+    stats = cache.stats()['categories']['stock_list']
+    assert (stats['misses'], stats['coalesced']) == (1, 19)
+    assert cache.get('stock_list', 'all') == ['VNM']
+
+
+def test_failed_computation_reaches_waiters(monkeypatch):
+    monkeypatch.setattr(aio_cache, 'CATEGORY_REFRESH', {})
+    cache = AsyncResponseCache(ttls=TTLS, sources={})
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise RuntimeError('database down')
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_compute('stock_list', 'all', compute) for _ in range(3)),
+                                    return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(run()))
+    assert cache.get('stock_list', 'all') is None
+    assert not cache._flights
+
+
+class FakeConnection:
+    def __init__(self, pid):
+        self.pid = pid
+        self.closed = False
+        self.broken = False
+
+    def get_server_pid(self):
+        return self.pid
+
+    async def set_type_codec(self, *args, **kwargs):
+        pass
+
+    def add_termination_listener(self, callback):
+        pass
+
+    def is_closed(self):
+        return self.closed
+
+    async def execute(self, query):
+        if self.broken:
+            raise ConnectionResetError('connection reset by peer')
+
+    async def close(self, timeout=None):
+        self.closed = True
+
+    def terminate(self):
+        self.closed = True
+
+
+class FakeAsyncpgPool:
+    """Hands out idle connections, opening new ones (pid 1, 2, ...) when none are left"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.idle = []
+        self.opened = 0
+
+    async def acquire(self, timeout=None):
+        while self.idle:
+            conn = self.idle.pop()
+            if not conn.closed:
+                return conn
+        self.opened += 1
+        conn = FakeConnection(self.opened)
+        await self.pool._init_connection(conn)
+        return conn
+
+    async def release(self, conn):
+        if not conn.closed:
+            self.idle.append(conn)
+
+    def get_size(self):
+        return len(self.idle)
+
+
+def test_async_pool_lifetime_and_idle_validation(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(aio_db.time, 'monotonic', lambda: clock[0])
+    pool = AsyncPool(1, 2, max_lifetime=60, validate_idle=5)
+    pool._pool = FakeAsyncpgPool(pool)
+
+    async def checkout():
+        async with pool.connection() as conn:
+            return conn
+
+    async def run():
+        first = await checkout()
+        assert await checkout() is first
+
+        # Idle past validate_idle and broken: replaced before use
+        clock[0] += 10
+        first.broken = True
+        second = await checkout()
+        assert second.pid == 2 and first.closed
+
+        # Past max_lifetime: closed when returned
+        clock[0] += 61
+        assert await checkout() is second and second.closed
+        return pool.stats()
+
+    stats = asyncio.run(run())
+    assert (stats['closed_broken'], stats['closed_lifetime'], stats['max_lifetime']) == (1, 1, 60)
+
+
+def test_dispatcher_sends_writes_and_other_routes_to_flask():
+    dispatcher = AppDispatcher(create_async_app(), wsgi_app=None)
+
+    assert dispatcher.handles('/api/stocks', 'GET')
+    assert dispatcher.handles('/api/stock/VNM/history', 'HEAD')
+    assert dispatcher.handles('/api/cache/invalidate', 'POST')
+    assert not dispatcher.handles('/api/watchlist', 'POST')
+    assert not dispatcher.handles('/api/controls/x', 'PUT')
+    assert not dispatcher.handles('/api/stocks', 'OPTIONS')
+    assert not dispatcher.handles('/dashboard.html', 'GET')
+    assert not dispatcher.handles('/api/investment/plans', 'GET')
+
+
+def test_empty_wsgi_bodies_still_start_the_response():
+    def wsgi_app(environ, start_response):
+        start_response('304 Not Modified', [])
+        return []
+
+    assert list(_with_first_chunk(wsgi_app)({}, lambda status, headers: None)) == [b'']
+
+
+def test_stock_route_matches_flask(monkeypatch):
+    def fake_query(query, args=(), one=False, typed=False):
+        assert query is stocks.STOCK_BY_SYMBOL
+        return dict(STOCKS[args[0]]) if args[0] in STOCKS else None
+
+    async def fake_async_query(query, args=(), one=False, typed=False):
+        return fake_query(query, args, one, typed)
+
+    monkeypatch.setattr(stocks, 'query_db', fake_query)
+    monkeypatch.setattr(aio_stocks, 'query_db', fake_async_query)
+
+    flask_app = Flask(__name__)
+    if orjson is not None:
+        flask_app.json = OrjsonProvider(flask_app)
+    flask_app.register_blueprint(stocks.stocks_bp)
+    flask_client = flask_app.test_client()
+
+    async def fetch(path):
+        response = await create_async_app().test_client().get(path)
+        return response.status_code, await response.get_data()
+
+    for path in ('/api/stock/VNM', '/api/stock/NOPE'):
+        expected = flask_client.get(path)
+        assert asyncio.run(fetch(path)) == (expected.status_code, expected.get_data())
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Tests for the query constants and response builders of the API blueprints
+Run: python3 -m pytest tests/test_blueprint_helpers.py
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+from flask import Flask
+from werkzeug.datastructures import MultiDict
+
+import api.blueprints.market as market
+import api.blueprints.news as news
+import api.blueprints.stocks as stocks
+import api.blueprints.system as system
+import api.conditional as conditional
+from api import data_version
+from api.statements import positional
+
+
+def _bar(day, close):
+    return {'date': day, 'open': close, 'high': close, 'low': close, 'close': close,
+            'volume': 1000, 'change': 0.0, 'change_percent': 0.0}
+
+
+def test_history_range_and_format():
+    assert stocks._history_range(MultiDict({'start': '2024-01-02', 'end': '2024-02-01'})) == \
+        (date(2024, 1, 2), date(2024, 2, 1))
+    assert stocks._history_range(MultiDict({'end': '2024-02-01', 'days': '10'})) == \
+        (date(2024, 1, 22), date(2024, 2, 1))
+    # Capped to a year
+    date_from, date_to = stocks._history_range(MultiDict({'days': '1000'}))
+    assert date_to is None and date_from == datetime.now().date() - timedelta(days=365)
+
+    for bad in ({'start': '02/01/2024'}, {'days': '0'}, {'start': '2024-02-02', 'end': '2024-02-01'}):
+        with pytest.raises(ValueError):
+            stocks._history_range(MultiDict(bad))
+
+    assert stocks._response_format(MultiDict()) == 'json'
+    assert stocks._response_format(MultiDict({'format': 'Binary'})) == 'binary'
+    with pytest.raises(ValueError):
+        stocks._response_format(MultiDict({'format': 'xml'}))
+
+
+def test_range_closed():
+    validators = {'last_date': date(2024, 5, 2)}
+    assert stocks._range_closed(validators, date(2024, 5, 1))
+    assert not stocks._range_closed(validators, date(2024, 5, 2))
+    assert not stocks._range_closed(validators, None)
+    assert not stocks._range_closed({'last_date': None}, date(2024, 5, 1))
+
+
+def test_batch_request_grouping_and_payload():
+    symbols, query, args, response_format = stocks._batch_request(
+        MultiDict({'symbols': 'vnm, FPT,VNM,,hpg', 'bars': '5', 'format': 'columnar'}))
+    assert symbols == ['VNM', 'FPT', 'HPG']
+    assert query is stocks.BATCH_BARS and args == (None, None, 5, symbols)
+    assert response_format == 'columnar'
+
+    _, query, args, _ = stocks._batch_request(MultiDict({'symbols': 'VNM', 'start': '2024-01-02'}))
+    assert query is stocks.BATCH_RANGE and args == (['VNM'], date(2024, 1, 2), None, None)
+
+    for bad in ({}, {'symbols': 'VNM', 'bars': '0'}):
+        with pytest.raises(ValueError):
+            stocks._batch_request(MultiDict(bad))
+
+    rows = [{'symbol': symbol, **_bar(day, close)}
+            for symbol, day, close in (('VNM', date(2024, 1, 2), 70.0), ('VNM', date(2024, 1, 3), 71.0),
+                                       ('FPT', date(2024, 1, 2), 90.0))]
+    grouped, row_symbols, missing = stocks._group_batch(rows, ['VNM', 'FPT', 'HPG'])
+    assert row_symbols == ['VNM', 'VNM', 'FPT']
+    assert missing == ['HPG']
+    assert grouped['VNM'] == [_bar(date(2024, 1, 2), 70.0), _bar(date(2024, 1, 3), 71.0)]
+
+    payload = stocks._batch_payload(grouped, missing, 'json')
+    assert (payload['count'], payload['missing']) == (2, ['HPG'])
+    assert payload['data'] is grouped
+    payload = stocks._batch_payload(grouped, missing, 'columnar')
+    assert payload['format'] == 'columnar'
+    assert payload['data']['VNM']['close'] == [70.0, 71.0]
+
+
+def test_compatibility_rows_fill_missing_values():
+    row = {'symbol': 'VNM', 'price': None, 'change': 1.5, 'change_percent': None, 'volume': 100,
+           'high': 72.0, 'low': None, 'open': 70.0, 'timestamp': '2024-05-02T15:00:00'}
+    current = stocks._current_json(row)
+    assert (current['price'], current['change'], current['low'], current['source']) == (0, 1.5, 0, 'PostgreSQL')
+
+    bar = stocks._history_json_row({'date': '2024-05-02', 'open': 70.0, 'high': 72.0, 'low': 69.0,
+                                    'close': 71.0, 'volume': None, 'change': 1.0, 'change_percent': None})
+    assert bar['price'] == bar['close'] == 71.0
+    assert (bar['volume'], bar['change_percent']) == (0, 0)
+
+
+def test_categorize_and_levels():
+    body = stocks._categorize([{'symbol': 'VCB'}, {'symbol': 'FPT'}, {'symbol': 'GOLD1'}])
+    categories = body['categories']
+    assert categories['banks'] == ['VCB']
+    assert categories['tech'] == ['FPT']
+    assert categories['commodities'] == ['GOLD1']
+    assert categories['all'] == ['FPT', 'VCB']
+    assert body['total'] == body['total_stocks'] == 2
+
+    analysis = {'indicators': {'rsi': 55.0}}
+    stocks._add_levels(analysis, None)
+    assert 'levels' not in analysis
+    levels = {'nearest_support': 68.0, 'nearest_resistance': 74.0}
+    stocks._add_levels(analysis, levels)
+    assert analysis['levels'] is levels
+    assert analysis['indicators'] == {'rsi': 55.0, 'support_level': 68.0, 'resistance_level': 74.0}
+
+
+def test_market_helpers(monkeypatch):
+    rows = [{'indicator_type': 'cpi', 'date': date(2024, 5, 1)},
+            {'indicator_type': 'cpi', 'date': date(2024, 4, 1)},
+            {'indicator_type': 'gdp', 'date': date(2024, 3, 31)}]
+    assert market._latest_by_type(rows) == [rows[0], rows[2]]
+
+    monkeypatch.setattr(market, 'watchlist_storage', [])
+    default = market._watchlist_payload()
+    assert default['is_default'] and default['count'] == len(default['watchlist'])
+    monkeypatch.setattr(market, 'watchlist_storage', ['VNM'])
+    assert market._watchlist_payload() == {'watchlist': ['VNM'], 'is_default': False, 'count': 1}
+
+
+def test_system_status_and_controls_routes(monkeypatch):
+    last_seen = datetime.now() - timedelta(minutes=5)
+    results = {
+        system.ACTIVE_STOCK_COUNT: {'count': 300},
+        system.LATEST_STOCK_UPDATE: {'latest_date': date(2024, 5, 2), 'count': 290},
+        system.LATEST_INDEX_UPDATE: {'latest_date': date(2024, 5, 2)},
+        system.LATEST_MACRO_UPDATE: {'latest_date': None},
+        system.SCHEDULER_ACTIVITY: {'count': 3, 'last_seen': last_seen},
+        system.CONTROLS: [
+            {'control_key': 'auto_collect', 'control_value': 'true', 'control_type': 'setting'},
+            {'control_key': 'pause', 'control_value': 'false', 'control_type': 'signal'},
+            {'control_key': 'phase', 'control_value': 'idle', 'control_type': 'state'},
+        ],
+    }
+
+    def fake_query(query, args=(), one=False, typed=False):
+        return results[query]
+
+    monkeypatch.setattr(system, 'query_db', fake_query)
+    app = Flask(__name__)
+    app.register_blueprint(system.system_bp)
+    client = app.test_client()
+
+    status = client.get('/api/system-status').get_json()
+    assert (status['database']['status'], status['database']['stock_count']) == ('connected', 300)
+    assert status['database']['message'] == '300 active stocks'
+    assert status['data_collection']['last_stock_update'] == '2024-05-02'
+    assert status['data_collection']['stock_count_today'] == 290
+    assert status['data_collection']['last_index_update'] == '2024-05-02'
+    assert status['data_collection']['last_macro_update'] is None
+    assert status['scheduler']['status'] == 'running'
+    assert status['scheduler']['message'] == 'Last activity: 5 minutes ago'
+    assert status['overall'] == 'healthy'
+
+    controls = client.get('/api/controls').get_json()
+    assert [len(controls[key]) for key in ('settings', 'signals', 'states')] == [1, 1, 1]
+    assert controls['total'] == 3
+
+
+def test_system_status_degrades_without_database():
+    status = system._new_status()
+    system._set_scheduler_idle(status, None)
+    assert status['scheduler']['status'] == 'unknown'
+    assert not system._set_scheduler_activity(status, {'count': 0, 'last_seen': None})
+    assert system._set_overall(status)['overall'] == 'degraded'
+
+
+def test_version_rows_and_positional_sql():
+    row = {'counter': None, 'last_date': date(2024, 5, 2), 'modified': None, 'indicator_counter': '7'}
+    assert data_version.price_state(row) == {
+        'version': '0:2024-05-02', 'last_date': date(2024, 5, 2), 'modified': None, 'indicator_version': '7'}
+    assert data_version.stocks_version({'total': 300, 'max_id': None, 'modified': None}) == '300:0:'
+
+    assert positional("SELECT * FROM t WHERE a = %s AND b <= %s;") == "SELECT * FROM t WHERE a = $1 AND b <= $2"
+
+
+def test_compact_history_file_is_bounded(monkeypatch):
+    assert stocks._history_bars(MultiDict()) == stocks.BATCH_MAX_BARS
+    assert stocks._history_bars(MultiDict({'bars': '250'})) == 250
+    with pytest.raises(ValueError):
+        stocks._history_bars(MultiDict({'bars': str(stocks.BATCH_MAX_BARS + 1)}))
+
+    queries = []
+
+    def fake_query(query, args=(), one=False, typed=False):
+        queries.append((query, args))
+        return [{'symbol': 'VNM', **_bar(date(2024, 1, 2), 70.0)}, {'symbol': 'VNM', **_bar(date(2024, 1, 3), 71.0)}]
+
+    def no_stream(*args, **kwargs):
+        raise AssertionError('compact formats must not read the full history')
+
+    monkeypatch.setattr(conditional, 'get_price_validators',
+                        lambda force=False: {'version': '1:2024-01-03', 'last_date': date(2024, 1, 3), 'modified': None})
+    monkeypatch.setattr(stocks, 'query_db', fake_query)
+    monkeypatch.setattr(stocks, 'stream_query', no_stream)
+    app = Flask(__name__)
+    app.register_blueprint(stocks.stocks_bp)
+    client = app.test_client()
+
+    body = client.get('/data/vnm_history.json?format=columnar&bars=2').get_json()
+    assert queries == [(stocks.BATCH_BARS, (None, None, 2, ['VNM']))]
+    assert (body['symbol'], body['count'], body['columns']['close']) == ('VNM', 2, [70.0, 71.0])
+    assert client.get('/data/VNM_history.json?format=binary&bars=0').status_code == 400
+
+
+def _streaming_client(monkeypatch, chunks, fail_after=None):
+    """Client whose history stream yields `chunks`, raising after `fail_after` of them"""
+    returned = []
+
+    def fake_stream(query, args=(), chunk_size=2000, typed=False):
+        assert (query, args, typed) == (stocks.FULL_HISTORY, ('VNM',), True)
+        try:
+            for index, rows in enumerate(chunks):
+                if index == fail_after:
+                    raise RuntimeError('connection lost')
+                yield rows
+        finally:
+            returned.append(True)
+
+    monkeypatch.setattr(conditional, 'get_price_validators',
+                        lambda force=False: {'version': '1:2024-01-04', 'last_date': date(2024, 1, 4), 'modified': None})
+    monkeypatch.setattr(stocks, 'stream_query', fake_stream)
+    app = Flask(__name__)
+    app.register_blueprint(stocks.stocks_bp)
+    return app.test_client(), returned
+
+
+def test_history_file_streams_chunks_as_one_array(monkeypatch):
+    days = [date(2024, 1, 2) + timedelta(days=i) for i in range(5)]
+    rows = [{**_bar(day.isoformat(), 70.0 + i), 'change': 1.0} for i, day in enumerate(days)]
+    client, returned = _streaming_client(monkeypatch, [rows[:2], rows[2:4], rows[4:]])
+
+    response = client.get('/data/vnm_history.json')
+    assert response.status_code == 200 and response.mimetype == 'application/json'
+    body = response.get_json()
+    assert body == [stocks._history_json_row(row) for row in rows]
+    assert body[0] == {'date': '2024-01-02', 'open': 70.0, 'high': 70.0, 'low': 70.0, 'close': 70.0,
+                       'price': 70.0, 'volume': 1000, 'change': 1.0, 'change_percent': 0}
+    assert returned == [True]
+
+
+def test_history_file_stream_error_returns_the_connection(monkeypatch):
+    rows = [_bar('2024-01-02', 70.0), _bar('2024-01-03', 71.0)]
+
+    # The database fails after the first chunk: the array is left unterminated
+    client, returned = _streaming_client(monkeypatch, [rows[:1], rows[1:]], fail_after=1)
+    body = client.get('/data/VNM_history.json').get_data(as_text=True)
+    assert body.startswith('[{') and not body.endswith(']')
+    assert returned == [True]
+
+    # Formatting a row fails: the suspended stream is closed, not left to the GC
+    client, returned = _streaming_client(monkeypatch, [rows[:1], [{'date': '2024-01-03'}]])
+    body = client.get('/data/VNM_history.json').get_data(as_text=True)
+    assert not body.endswith(']')
+    assert returned == [True]
+
+    # The client goes away mid-stream
+    client, returned = _streaming_client(monkeypatch, [rows[:1], rows[1:]])
+    response = client.get('/data/VNM_history.json', buffered=False)
+    stream = iter(response.response)
+    assert next(stream) == b'[' and next(stream).startswith(b'{')
+    response.close()
+    assert returned == [True]
+
+
+def test_cache_invalidation_is_restricted(monkeypatch):
+    app = Flask(__name__)
+    app.register_blueprint(system.system_bp)
+    client = app.test_client()
+    remote = {'REMOTE_ADDR': '10.0.0.5'}
+
+    # Without a token only loopback may invalidate
+    monkeypatch.setattr(system, 'CACHE_ADMIN_TOKEN', None)
+    assert client.post('/api/cache/invalidate', environ_base=remote).status_code == 403
+    assert client.post('/api/cache/invalidate').get_json()['success']
+
+    monkeypatch.setattr(system, 'CACHE_ADMIN_TOKEN', 's3cret')
+    assert client.post('/api/cache/invalidate').status_code == 403
+    assert client.post('/api/cache/invalidate', environ_base=remote,
+                       headers={'Authorization': 'Bearer wrong'}).status_code == 403
+    response = client.post('/api/cache/invalidate', environ_base=remote,
+                           headers={'Authorization': 'Bearer s3cret'}, json={'category': 'news'})
+    assert response.get_json() == {'success': True, 'category': 'news', 'removed': 0}
+
+
+def test_news_limit_is_bounded_by_the_scrape():
+    assert news._news_limit(MultiDict()) == 10
+    assert news._news_limit(MultiDict({'limit': str(news.NEWS_FETCH_LIMIT)})) == news.NEWS_FETCH_LIMIT
+    for bad in ('0', '-3', str(news.NEWS_FETCH_LIMIT + 1)):
+        with pytest.raises(ValueError):
+            news._news_limit(MultiDict({'limit': bad}))
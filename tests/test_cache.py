@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Tests for the API response/query cache
+Run: python3 -m pytest tests/test_cache.py
+"""
+
+import threading
+import time
+
+import pytest
+from flask import Flask, jsonify, request
+
+import api.cache as api_cache
+from api.cache import ResponseCache
+
+
+TTLS = {'stock_list': 3600, 'stock_prices': 300}
+
+
+def test_get_set_and_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(api_cache.time, 'monotonic', lambda: now[0])
+    cache = ResponseCache(max_entries=10, ttls=TTLS, sources={}, stale_ttls={})
+
+    assert cache.get('stock_prices', 'VNM') is None
+    cache.set('stock_prices', 'VNM', [1, 2])
+    assert cache.get('stock_prices', 'VNM') == [1, 2]
+
+    now[0] += 301
+    assert cache.get('stock_prices', 'VNM') is None
+    stats = cache.stats()['categories']['stock_prices']
+    assert (stats['hits'], stats['misses'], stats['expired'], stats['entries']) == (1, 2, 1, 0)
+
+    with pytest.raises(ValueError):
+        cache.set('unknown', 'key', 1)
+
+
+def test_lru_eviction():
+    cache = ResponseCache(max_entries=2, ttls=TTLS, sources={})
+    cache.set('stock_list', 'a', 1)
+    cache.set('stock_prices', 'b', 2)
+    cache.get('stock_list', 'a')  # 'b' is now least recently used
+    cache.set('stock_prices', 'c', 3)
+
+    assert cache.get('stock_prices', 'b') is None
+    assert cache.get('stock_list', 'a') == 1
+    assert cache.stats()['categories']['stock_prices']['evictions'] == 1
+
+
+def test_data_version_change_makes_entries_stale():
+    version = ['1']
+    cache = ResponseCache(ttls=TTLS, sources={'stock_prices': (lambda: version[0],)})
+    cache.set('stock_prices', 'VNM', 'old')
+    assert cache.get('stock_prices', 'VNM') == 'old'
+
+    version[0] = '2'
+    assert cache.get('stock_prices', 'VNM') is None
+    assert cache.stats()['categories']['stock_prices']['stale'] == 1
+
+
+def test_invalidate():
+    cache = ResponseCache(ttls=TTLS, sources={})
+    cache.set('stock_list', 'a', 1)
+    cache.set('stock_prices', 'b', 2)
+    cache.set('stock_prices', 'c', 3)
+
+    assert cache.invalidate('stock_prices', 'b') == 1
+    assert cache.invalidate('stock_prices') == 1
+    assert cache.get('stock_list', 'a') == 1
+    assert cache.invalidate() == 1
+    assert cache.stats()['entries'] == 0
+
+
+def test_concurrent_misses_compute_once():
+    cache = ResponseCache(ttls=TTLS, sources={})
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'value'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_compute('stock_list', 'k', compute)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(cache.get_or_compute('stock_list', 'k', compute)))
+                 for _ in range(5)]
+    for thread in followers:
+        thread.start()
+    for _ in range(500):
+        if cache.stats()['categories']['stock_list']['coalesced'] == 5:
+            break
+        time.sleep(0.01)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert results == ['value'] * 6
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert stats['in_flight'] == 0 and stats['categories']['stock_list']['misses'] == 1
+
+
+def test_stale_while_revalidate(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(api_cache.time, 'monotonic', lambda: now[0])
+    cache = ResponseCache(ttls=TTLS, sources={}, stale_ttls={'stock_prices': 60})
+    cache.set('stock_prices', 'VNM', 'old')
+    now[0] += 310
+
+    # While one request refreshes, others get the expired value immediately
+    during_refresh = []
+    value = cache.get_or_compute(
+        'stock_prices', 'VNM',
+        lambda: during_refresh.append(cache.get_or_compute('stock_prices', 'VNM', lambda: 'unused')) or 'new')
+    assert value == 'new' and during_refresh == ['old']
+    assert cache.get('stock_prices', 'VNM') == 'new'
+
+    # A failed refresh keeps serving the stale value; past the window it raises
+    now[0] += 310
+    assert cache.get_or_compute('stock_prices', 'VNM', lambda: 1 / 0) == 'new'
+    now[0] += 60
+    with pytest.raises(ZeroDivisionError):
+        cache.get_or_compute('stock_prices', 'VNM', lambda: 1 / 0)
+    assert cache.stats()['categories']['stock_prices']['errors'] == 2
+
+
+def test_uncacheable_values_are_not_stored():
+    cache = ResponseCache(ttls=TTLS, sources={})
+    assert cache.get_or_compute('stock_list', 'k', lambda: [], cacheable=bool) == []
+    assert cache.get('stock_list', 'k') is None
+
+
+def test_cached_route(monkeypatch):
+    monkeypatch.setattr(api_cache, 'cache', ResponseCache(ttls=TTLS, sources={}))
+    calls = []
+
+    app = Flask(__name__)
+
+    @app.route('/history/<symbol>')
+    @api_cache.cached('stock_prices')
+    def history(symbol):
+        calls.append(request.full_path)
+        if symbol == 'MISSING':
+            return jsonify({'success': False}), 404
+        return jsonify({'symbol': symbol, 'days': request.args.get('days')})
+
+    client = app.test_client()
+    first = client.get('/history/VNM?days=30&start=2024-01-01')
+    # Same arguments in another order, plus a cache buster
+    again = client.get('/history/VNM?start=2024-01-01&days=30&_=123')
+    assert again.data == first.data and again.mimetype == 'application/json'
+    assert len(calls) == 1
+
+    client.get('/history/VNM?days=60')
+    client.get('/history/MISSING')
+    client.get('/history/MISSING')
+    assert len(calls) == 4
+
+    with pytest.raises(ValueError):
+        api_cache.cached('unknown')
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for the technical indicator batch job
+Run: python3 -m pytest tests/test_compute_indicators.py
+"""
+
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+# Importing jobs pulls in the collectors and their data source
+pytest.importorskip('vnstock')
+
+from jobs.compute_indicators import INCREMENTAL_BARS, TABLE_COLUMNS, TechnicalIndicatorCalculator, _db_value
+from src import indicators
+from src.indicator_state import IndicatorState
+
+
+def _history(length, seed=3):
+    rng = random.Random(seed)
+    price = 50.0
+    start = date(2024, 1, 1)
+    bars = []
+    for i in range(length):
+        price = round(price * (1 + rng.uniform(-0.03, 0.03)), 2)
+        bars.append({'date': start + timedelta(days=i), 'open': price, 'high': price * 1.01,
+                     'low': price * 0.99, 'close': price, 'volume': rng.randint(1000, 9000)})
+    return bars
+
+
+def _row(record):
+    stock_id, bar_date, *values, extra = record
+    return stock_id, bar_date, dict(zip(TABLE_COLUMNS, values)), extra.adapted
+
+
+def test_latest_close_columns_come_from_state():
+    full = _history(250)
+    state = IndicatorState.from_history(full)
+    records = TechnicalIndicatorCalculator().compute({7: full[-INCREMENTAL_BARS:]}, {7: state})
+
+    assert len(records) == 1
+    stock_id, bar_date, values, extra = _row(records[0])
+    assert (stock_id, bar_date) == (7, full[-1]['date'])
+    # The 60-bar history cannot produce a 200-bar SMA; the state can
+    assert values['sma_200'] == round(state.values()['sma_200'], 4)
+    assert values['ema_26'] == round(state.values()['ema_26'], 4)
+    assert extra['volume_sma_20'] == round(state.values()['volume_sma_20'], 4)
+    assert values['atr_14'] is not None
+
+    # A state that is not at the latest bar is ignored
+    stale = IndicatorState.from_history(full[:-1])
+    _, _, values, _ = _row(TechnicalIndicatorCalculator().compute({7: full[-INCREMENTAL_BARS:]}, {7: stale})[0])
+    assert values['sma_200'] is None
+
+
+def test_latest_row_aligns_with_table_columns():
+    histories = {1: _history(80), 2: _history(30, seed=5)}
+    records = TechnicalIndicatorCalculator().compute(histories)
+
+    assert [(r[0], r[1]) for r in records] == [(1, histories[1][-1]['date']), (2, histories[2][-1]['date'])]
+    assert all(len(r) == 2 + len(TABLE_COLUMNS) + 1 for r in records)
+
+    closes = [bar['close'] for bar in histories[1]]
+    series = indicators.compute_all(closes)
+    _, _, values, extra = _row(records[0])
+    assert values['sma_20'] == round(float(series['ma20'][-1]), 4)
+    assert values['rsi_14'] == round(float(series['rsi'][-1]), 4)
+    assert values['bollinger_lower'] == round(float(series['bollinger_lower'][-1]), 4)
+    assert 'analysis' in extra
+
+    # 30 bars cannot fill the 50-bar SMA: NaN is stored as NULL
+    _, _, values, _ = _row(records[1])
+    assert values['sma_50'] is None and values['sma_200'] is None
+    assert values['sma_20'] is not None
+
+
+def test_backfill_emits_one_row_per_bar():
+    histories = {1: _history(40), 2: _history(25, seed=5)}
+    records = TechnicalIndicatorCalculator(backfill=True).compute(histories)
+
+    assert len(records) == 65
+    rows = [_row(r) for r in records]
+    assert [r[1] for r in rows if r[0] == 2] == [bar['date'] for bar in histories[2]]
+    # Only each stock's latest bar carries the price-action analysis
+    analysed = [(r[0], r[1]) for r in rows if 'analysis' in r[3]]
+    assert analysed == [(1, histories[1][-1]['date']), (2, histories[2][-1]['date'])]
+    # Early bars precede every window
+    assert rows[0][2]['sma_20'] is None and rows[0][3]['volume_sma_20'] is None
+
+
+def test_db_value():
+    assert _db_value(float('nan')) is None
+    assert _db_value(None) is None
+    assert _db_value(np.float64(1.234567)) == 1.2346
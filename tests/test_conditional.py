@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for conditional GET handling on price-derived endpoints
+Run: python3 -m pytest tests/test_conditional.py
+"""
+
+from datetime import date, datetime, timezone
+
+import pytest
+from flask import Flask, jsonify, request
+
+import api.conditional as conditional
+
+
+VALIDATORS = {
+    'version': '12:2024-05-02',
+    'last_date': date(2024, 5, 2),
+    'modified': datetime(2024, 5, 2, 8, 30, 15, 250000, tzinfo=timezone.utc),
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    state = dict(VALIDATORS, indicator_version='4')
+    monkeypatch.setattr(conditional, 'get_price_validators', lambda force=False: dict(state))
+
+    app = Flask(__name__)
+    calls = []
+
+    def range_closed(validators, symbol):
+        end = request.args.get('end')
+        return end is not None and date.fromisoformat(end) < validators['last_date']
+
+    @app.route('/history/<symbol>')
+    @conditional.conditional_get(closed=range_closed)
+    def history(symbol):
+        calls.append(symbol)
+        if symbol == 'MISSING':
+            return jsonify({'success': False, 'error': 'not found'}), 404
+        return jsonify({'success': True, 'symbol': symbol})
+
+    @app.route('/analysis/<symbol>')
+    @conditional.conditional_get(versions=(lambda: state['indicator_version'],))
+    def analysis(symbol):
+        calls.append(symbol)
+        return jsonify({'success': True, 'symbol': symbol})
+
+    client = app.test_client()
+    client.calls = calls
+    client.state = state
+    return client
+
+
+def test_validators_and_304_without_calling_view(client):
+    first = client.get('/history/VNM')
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'public, no-cache'
+    assert first.headers['Last-Modified'] == 'Thu, 02 May 2024 08:30:15 GMT'
+    etag = first.headers['ETag']
+
+    again = client.get('/history/VNM', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+    assert client.calls == ['VNM']
+
+    # nginx weakens ETags when it compresses the response
+    weak = client.get('/history/VNM', headers={'If-None-Match': f'W/{etag}'})
+    assert weak.status_code == 304
+
+
+def test_etag_changes_with_url_and_version(client):
+    etag = client.get('/history/VNM').headers['ETag']
+    assert client.get('/history/VNM?days=60').headers['ETag'] != etag
+    assert client.get('/history/FPT').headers['ETag'] != etag
+
+    client.state['version'] = '13:2024-05-02'
+    stale = client.get('/history/VNM', headers={'If-None-Match': etag})
+    assert stale.status_code == 200
+    assert stale.headers['ETag'] != etag
+
+
+def test_if_modified_since(client):
+    fresh = client.get('/history/VNM', headers={'If-Modified-Since': 'Thu, 02 May 2024 08:30:15 GMT'})
+    assert fresh.status_code == 304
+
+    older = client.get('/history/VNM', headers={'If-Modified-Since': 'Thu, 02 May 2024 08:30:14 GMT'})
+    assert older.status_code == 200
+
+
+def test_closed_range_is_long_lived(client):
+    closed = client.get('/history/VNM?end=2024-04-30')
+    assert closed.headers['Cache-Control'].startswith('public, max-age=')
+
+    open_range = client.get('/history/VNM?end=2024-05-02')
+    assert open_range.headers['Cache-Control'] == 'public, no-cache'
+
+
+def test_errors_carry_no_validators(client):
+    response = client.get('/history/MISSING')
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
+    assert 'Cache-Control' not in response.headers
+
+
+def test_extra_versions_are_hashed_into_the_etag(client):
+    first = client.get('/analysis/VNM')
+    etag = first.headers['ETag']
+    # Last-Modified follows prices only, so it is not sent for these views
+    assert 'Last-Modified' not in first.headers
+    assert client.get('/analysis/VNM', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/analysis/VNM', headers={
+        'If-Modified-Since': 'Thu, 02 May 2024 08:30:15 GMT'}).status_code == 200
+
+    # A new indicator batch without new prices still changes the ETag
+    client.state['indicator_version'] = '5'
+    stale = client.get('/analysis/VNM', headers={'If-None-Match': etag})
+    assert stale.status_code == 200
+    assert stale.headers['ETag'] != etag
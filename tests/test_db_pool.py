@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Tests for the thread-safe database connection pool
+Run: python3 -m pytest tests/test_db_pool.py
+"""
+
+import threading
+import time
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+
+import api.pool as api_pool
+from api.pool import ConnectionPool, PoolTimeout
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, args=None):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.conn.queries.append(query)
+
+
+class FakeInfo:
+    def __init__(self):
+        self.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.rollbacks = 0
+        self.queries = []
+        self.info = FakeInfo()
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+def _pool(minconn=1, maxconn=2, **kwargs):
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    return ConnectionPool(minconn, maxconn, connect=connect, **kwargs), opened
+
+
+def test_checkout_reuses_connections():
+    pool, opened = _pool()
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert len(opened) == 1
+
+    stats = pool.stats()
+    assert (stats['in_use'], stats['idle'], stats['checkouts'], stats['created']) == (1, 0, 2, 1)
+
+
+def test_exhausted_pool_waits_then_times_out():
+    pool, _ = _pool(maxconn=1, timeout=0.05)
+    conn = pool.getconn()
+
+    started = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert time.monotonic() - started >= 0.05
+    assert pool.stats()['timeouts'] == 1
+
+    # A connection returned while waiting is handed to the waiter
+    threading.Timer(0.05, pool.putconn, (conn,)).start()
+    assert pool.getconn(timeout=5) is conn
+    assert pool.stats()['wait_ms_max'] >= 40
+
+
+def test_threads_never_exceed_maxconn():
+    pool, opened = _pool(minconn=0, maxconn=3)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(20):
+            conn = pool.getconn()
+            with lock:
+                active.append(conn)
+                peak.append(len(active))
+            time.sleep(0.001)
+            with lock:
+                active.remove(conn)
+            pool.putconn(conn)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert max(peak) <= 3 and len(opened) <= 3
+    stats = pool.stats()
+    assert stats['checkouts'] == 160 and stats['in_use'] == 0 and stats['waiting'] == 0
+
+
+def test_broken_connections_are_replaced():
+    pool, opened = _pool(validate_idle=0)
+    first = pool.getconn()
+    pool.putconn(first)
+
+    first.broken = True
+    conn = pool.getconn()
+    assert conn is not first and first.closed
+    assert len(opened) == 2 and pool.stats()['closed_broken'] == 1
+
+    # Dropped while checked out: not pooled again
+    conn.closed = 1
+    pool.putconn(conn)
+    assert pool.stats()['idle'] == 0 and pool.stats()['closed_broken'] == 2
+
+
+def test_open_transactions_are_rolled_back_on_return():
+    pool, _ = _pool()
+    conn = pool.getconn()
+    conn.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+    pool.putconn(conn)
+    assert conn.rollbacks == 1 and not conn.closed
+
+    with pytest.raises(psycopg2.pool.PoolError):
+        pool.putconn(conn)
+
+
+def test_max_lifetime_and_idle_reaping(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(api_pool.time, 'monotonic', lambda: now[0])
+    pool, opened = _pool(minconn=1, maxconn=3, max_lifetime=100, idle_timeout=10)
+
+    a, b = pool.getconn(), pool.getconn()
+    pool.putconn(a)
+    now[0] += 5
+    pool.putconn(b)
+
+    # a has been idle past the timeout; the minimum connection (b) stays
+    now[0] += 6
+    pool.reap()
+    assert a.closed and not b.closed
+    assert pool.stats()['closed_idle'] == 1
+
+    # Past its lifetime, b is replaced on the next checkout
+    now[0] += 100
+    conn = pool.getconn()
+    assert conn is not b and b.closed
+    assert len(opened) == 3 and pool.stats()['closed_lifetime'] == 1
+
+
+def test_closeall():
+    pool, opened = _pool(minconn=2)
+    conn = pool.getconn()
+    pool.closeall()
+    assert all(c.closed for c in opened)
+    pool.putconn(conn)
+    with pytest.raises(psycopg2.pool.PoolError):
+        pool.getconn()
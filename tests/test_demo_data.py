@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Tests for the synthetic demo data generators
+Run: python3 -m pytest tests/test_demo_data.py
+"""
+
+import numpy as np
+
+from src.demo_data import DemoStockData
+
+
+def test_price_matrix_shape_and_ohlc_consistency():
+    data = DemoStockData.generate_price_matrix(symbols=25, days=300, seed=1)
+
+    assert set(data) == {'open', 'high', 'low', 'close', 'volume'}
+    for matrix in data.values():
+        assert matrix.shape == (25, 300)
+        assert np.isfinite(matrix).all()
+    assert (data['high'] >= np.maximum(data['open'], data['close'])).all()
+    assert (data['low'] <= np.minimum(data['open'], data['close'])).all()
+    assert (data['volume'] >= 100000 * 1000).all()
+
+    # Rows start near the configured base prices
+    bases = [info['base'] for info in DemoStockData.STOCK_PRICES.values()]
+    np.testing.assert_allclose(data['close'][:len(bases), 0], bases, rtol=0.031)
+
+
+def test_price_matrix_is_reproducible():
+    first = DemoStockData.generate_price_matrix(symbols=3, days=50, seed=7)
+    second = DemoStockData.generate_price_matrix(symbols=3, days=50, seed=7)
+    other = DemoStockData.generate_price_matrix(symbols=3, days=50, seed=8)
+
+    for key in first:
+        np.testing.assert_array_equal(first[key], second[key])
+    assert not np.array_equal(first['close'], other['close'])
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental indicator state
+Run: python3 -m pytest tests/test_indicator_state.py
+"""
+
+import json
+import math
+import random
+from datetime import date, timedelta
+
+from src import indicator_state, indicators
+from src.indicator_state import IndicatorState, advance_states, plan_updates
+
+
+def _bars(length, seed=7):
+    rng = random.Random(seed)
+    price = 30000.0
+    start = date(2024, 1, 1)
+    bars = []
+    for i in range(length):
+        price = round(price * (1 + rng.uniform(-0.03, 0.03)), 0)
+        bars.append({'date': start + timedelta(days=i), 'close': price, 'volume': rng.randint(1000, 9000)})
+    return bars
+
+
+def test_incremental_values_match_full_series():
+    bars = _bars(260)
+    closes = [b['close'] for b in bars]
+    state = IndicatorState.from_history(bars)
+    values = state.values()
+
+    series = indicators.compute_all(closes)
+    expected = {
+        'sma_20': series['ma20'][-1],
+        'sma_50': series['ma50'][-1],
+        'sma_200': indicators.rolling_mean(closes, 200)[-1],
+        'ema_12': series['ema12'][-1],
+        'ema_26': series['ema26'][-1],
+        'rsi_14': series['rsi'][-1],
+        'macd': series['macd'][-1],
+        'macd_signal': series['macd_signal'][-1],
+        'bollinger_upper': series['bollinger_upper'][-1],
+        'bollinger_lower': series['bollinger_lower'][-1],
+    }
+    for key, value in expected.items():
+        assert math.isclose(values[key], value, rel_tol=1e-9), key
+
+
+def test_revised_bar_rolls_back_previous_update():
+    bars = _bars(230)
+    revised = dict(bars[-1], close=bars[-1]['close'] * 1.05)
+
+    state = IndicatorState.from_history(bars)
+    state.advance(revised['date'], revised['close'], revised['volume'])
+
+    fresh = IndicatorState.from_history(bars[:-1] + [revised])
+    assert state.values() == fresh.values()
+    assert list(state.closes) == list(fresh.closes)
+
+
+def test_state_round_trips_through_json():
+    bars = _bars(40)
+    state = IndicatorState.from_history(bars[:-1])
+    restored = IndicatorState.from_dict(json.loads(json.dumps(state.to_dict())))
+
+    assert restored.advance(**_args(bars[-1])) == state.advance(**_args(bars[-1]))
+    assert IndicatorState.from_history(bars[:10]).values()['sma_20'] is None
+
+
+def _args(bar):
+    return {'bar_date': bar['date'], 'close': bar['close'], 'volume': bar['volume']}
+
+
+def _fake_store(monkeypatch, stored, states):
+    """Serve load/save calls of advance_states from in-memory bars and states"""
+    saved = {}
+
+    def load_gap_bars(cursor, gaps):
+        return {stock_id: [b for b in stored[stock_id] if after < b['date'].isoformat() < before]
+                for stock_id, (after, before) in gaps.items()}
+
+    def load_recent_history(cursor, stock_ids, bars=indicator_state.WINDOW_SIZE, before=None):
+        return {stock_id: stored[stock_id][-bars:] for stock_id in stock_ids}
+
+    monkeypatch.setattr(indicator_state, 'load_states', lambda cursor, ids: dict(states))
+    monkeypatch.setattr(indicator_state, 'load_gap_bars', load_gap_bars)
+    monkeypatch.setattr(indicator_state, 'load_recent_history', load_recent_history)
+    monkeypatch.setattr(indicator_state, 'save_states', lambda cursor, updated: saved.update(updated))
+    return saved
+
+
+def test_advance_states_replays_missed_bars(monkeypatch):
+    bars = _bars(240)
+    # The state stopped three bars short (failed updates); those bars are stored
+    states = {1: IndicatorState.from_history(bars[:-4])}
+    saved = _fake_store(monkeypatch, {1: bars}, states)
+
+    advance_states(None, [{'stock_id': 1, **bars[-1]}])
+    assert saved[1].last_date == bars[-1]['date'].isoformat()
+    assert saved[1].values() == IndicatorState.from_history(bars).values()
+
+
+def test_older_bar_rebuilds_only_that_stock(monkeypatch):
+    bars = _bars(230)
+    states = {1: IndicatorState.from_history(bars[:-1]), 2: IndicatorState.from_history(bars)}
+    saved = _fake_store(monkeypatch, {1: bars, 2: bars}, states)
+
+    # Stock 2 receives a bar older than its state (e.g. a late correction)
+    advance_states(None, [{'stock_id': 1, **bars[-1]}, {'stock_id': 2, **bars[-5]}])
+    expected = IndicatorState.from_history(bars).values()
+    assert saved[1].values() == expected
+    assert saved[2].values() == IndicatorState.from_history(bars[-indicator_state.WINDOW_SIZE:]).values()
+    assert saved[2].last_date == bars[-1]['date'].isoformat()
+
+    rebuild, gaps = plan_updates(states, [{'stock_id': 2, 'date': bars[-5]['date']},
+                                          {'stock_id': 3, 'date': bars[-1]['date']}])
+    assert rebuild == {2, 3} and gaps == {}
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for the orjson-backed JSON provider
+Run: python3 -m pytest tests/test_json_provider.py
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+
+pytest.importorskip('orjson')
+
+from api.json_provider import OrjsonProvider
+
+
+PAYLOAD = {
+    'symbol': 'VNM',
+    'name': 'Công ty Sữa',
+    'date': date(2024, 5, 2),
+    'updated': datetime(2024, 5, 2, 8, 30, 15),
+    'close': Decimal('70500.00'),
+    'volume': 1200000,
+    'zeta': [1.5, None, {'b': 1, 'a': 2}],
+}
+
+
+def _app(provider):
+    app = Flask(__name__)
+    app.json = provider(app)
+
+    @app.route('/payload')
+    def payload():
+        return jsonify(PAYLOAD)
+
+    return app
+
+
+def test_output_matches_default_provider():
+    default = _app(DefaultJSONProvider).test_client().get('/payload')
+    fast = _app(OrjsonProvider).test_client().get('/payload')
+
+    assert fast.mimetype == 'application/json'
+    assert json.loads(fast.data) == json.loads(default.data)
+    # Same key order and HTTP-date formatting as Flask's encoder
+    assert list(json.loads(fast.data)) == sorted(PAYLOAD)
+    assert json.loads(fast.data)['date'] == 'Thu, 02 May 2024 00:00:00 GMT'
+    assert json.loads(fast.data)['close'] == '70500.00'
+
+
+def test_dumps_and_loads():
+    provider = OrjsonProvider(Flask(__name__))
+    text = provider.dumps({'b': 1, 'a': [1, 2]})
+    assert text == '{"a":[1,2],"b":1}'
+    assert provider.loads(text) == {'a': [1, 2], 'b': 1}
+
+    # Arguments orjson does not support fall back to the stdlib encoder
+    assert provider.dumps({'a': 1}, indent=2) == '{\n  "a": 1\n}'
+
+    with pytest.raises(TypeError):
+        provider.dumps({'a': object()})
+
+
+def test_debug_responses_are_pretty_printed():
+    app = _app(OrjsonProvider)
+    app.debug = True
+    body = app.test_client().get('/payload').data.decode('utf-8')
+    assert body.startswith('{\n  "close"')
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests for support/resistance level detection
+Run: python3 -m pytest tests/test_levels.py
+"""
+
+import random
+
+from src.levels import LevelCache, cluster_pivots, detect_levels, swing_points
+
+
+def _brute_force_swings(values, window, highs=True):
+    pivots = []
+    for i in range(window, len(values) - window):
+        left, right = values[i - window:i], values[i + 1:i + window + 1]
+        if highs and all(v < values[i] for v in left) and all(v <= values[i] for v in right):
+            pivots.append(i)
+        if not highs and all(v > values[i] for v in left) and all(v >= values[i] for v in right):
+            pivots.append(i)
+    return pivots
+
+
+def test_swing_points_match_brute_force():
+    rng = random.Random(4)
+    # Rounded prices produce flat tops and bottoms
+    values = [round(100 + rng.gauss(0, 5)) for _ in range(400)]
+    for window in (1, 3, 5, 10, 20):
+        assert swing_points(values, window, highs=True) == _brute_force_swings(values, window, True)
+        assert swing_points(values, window, highs=False) == _brute_force_swings(values, window, False)
+
+
+def test_nearby_pivots_merge_into_one_zone():
+    pivots = [(100.0, 'low', 5, 10), (100.8, 'low', 10, 40), (120.0, 'high', 5, 25)]
+    zones = cluster_pivots(pivots, length=50, tolerance=0.015)
+    assert len(zones) == 2
+    assert zones[0]['touches'] == 2 and zones[0]['low'] == 100.0 and zones[0]['high'] == 100.8
+
+
+def test_detect_levels_splits_support_and_resistance():
+    # Oscillate between 90 and 110, finish at 100
+    closes = [100 + 10 * ((i % 20) - 10 if (i // 20) % 2 else 10 - (i % 20)) / 10 for i in range(200)] + [100.0]
+    levels = detect_levels([{'close': c} for c in closes], windows=(3, 5))
+    assert levels['support'] and levels['resistance']
+    assert all(z['price'] < 100 for z in levels['support'])
+    assert all(z['price'] >= 100 for z in levels['resistance'])
+    assert levels['nearest_support'] < 100 <= levels['nearest_resistance']
+
+
+def test_cache_is_keyed_by_last_bar():
+    cache = LevelCache(max_entries=2)
+    cache.put('FPT', '2024-06-03', 100.0, {'v': 1})
+    assert cache.get('FPT', '2024-06-03', 100.0) == {'v': 1}
+    assert cache.get('FPT', '2024-06-03', 101.0) is None   # same day, re-collected close
+    cache.put('FPT', '2024-06-04', 102.0, {'v': 2})
+    assert cache.get('FPT', '2024-06-03', 100.0) is None   # older bar replaced
+    assert cache.stats()['entries'] == 1
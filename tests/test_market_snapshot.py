@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for the latest-price snapshot behind the market overview endpoints
+Run: python3 -m pytest tests/test_market_snapshot.py
+"""
+
+from datetime import date
+from decimal import Decimal
+
+from src.market_snapshot import LatestPriceSnapshot
+
+
+def _rows():
+    return [
+        {'symbol': 'VNM', 'name': 'Vinamilk', 'exchange': 'HOSE', 'date': date(2024, 5, 2),
+         'open': Decimal('70000.00'), 'high': Decimal('71000.00'), 'low': Decimal('69500.00'),
+         'close': Decimal('70500.00'), 'volume': 1200000, 'change_percent': Decimal('0.7100')},
+        {'symbol': 'ACB', 'name': 'ACB', 'exchange': 'HOSE', 'date': date(2024, 5, 2),
+         'open': Decimal('25000.00'), 'high': Decimal('25500.00'), 'low': Decimal('24000.00'),
+         'close': Decimal('24200.00'), 'volume': 9000000, 'change_percent': Decimal('-3.2000')},
+        {'symbol': 'FPT', 'name': 'FPT', 'exchange': 'HOSE', 'date': date(2024, 5, 2),
+         'open': Decimal('118000.00'), 'high': Decimal('121000.00'), 'low': Decimal('117000.00'),
+         'close': Decimal('120000.00'), 'volume': 3000000, 'change_percent': Decimal('1.6900')},
+        {'symbol': 'NEW', 'name': 'Newly listed', 'exchange': 'UPCOM', 'date': date(2024, 5, 2),
+         'open': Decimal('10000.00'), 'high': Decimal('10000.00'), 'low': Decimal('10000.00'),
+         'close': Decimal('10000.00'), 'volume': None, 'change_percent': None},
+        {'symbol': 'HPG', 'name': 'Hoa Phat', 'exchange': 'HOSE', 'date': date(2024, 5, 2),
+         'open': Decimal('30000.00'), 'high': Decimal('30500.00'), 'low': Decimal('29800.00'),
+         'close': Decimal('30300.00'), 'volume': 3000000, 'change_percent': Decimal('1.6900')},
+    ]
+
+
+def test_leaderboards_match_sql_ordering():
+    snapshot = LatestPriceSnapshot(_rows(), version='1:2024-05-02')
+    symbols = lambda board, limit=10: [snapshot.symbols[i] for i in snapshot.top(board, limit)]
+
+    # Ties keep symbol order; missing change_percent is excluded
+    assert symbols('gainers') == ['FPT', 'HPG', 'VNM', 'ACB']
+    assert symbols('losers') == ['ACB', 'VNM', 'FPT', 'HPG']
+    assert symbols('gainers', 2) == ['FPT', 'HPG']
+    # Missing volume sorts last
+    assert symbols('most_active') == ['ACB', 'FPT', 'HPG', 'VNM', 'NEW']
+    assert snapshot.top('most_active', -1) == []
+
+
+def test_rows_are_preconverted():
+    snapshot = LatestPriceSnapshot(_rows())
+    assert snapshot.symbols == ['ACB', 'FPT', 'HPG', 'NEW', 'VNM']
+
+    row = snapshot.row(0, ('symbol', 'name', 'date', 'price', 'change', 'change_percent', 'volume'))
+    assert row == {
+        'symbol': 'ACB', 'name': 'ACB', 'date': date(2024, 5, 2), 'price': 24200.0,
+        'change': -800.0, 'change_percent': -3.2, 'volume': 9000000,
+    }
+    assert isinstance(row['price'], float) and isinstance(row['volume'], int)
+
+    missing = snapshot.row(3, ('change_percent', 'volume'))
+    assert missing == {'change_percent': None, 'volume': None}
+
+
+def test_empty_snapshot():
+    snapshot = LatestPriceSnapshot([])
+    assert len(snapshot) == 0
+    assert snapshot.top('gainers', 10) == []
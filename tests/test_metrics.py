@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for request/query instrumentation and the /metrics exposition
+Run: python3 -m pytest tests/test_metrics.py
+"""
+
+import logging
+
+import pytest
+from flask import Flask
+
+import api.metrics as metrics
+from api.metrics import Counter, Histogram, fingerprint, statement_id, track_query
+
+
+def _sample(text, prefix):
+    """Value of the first exposition line starting with prefix"""
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+def test_fingerprint_groups_statements_by_shape():
+    assert fingerprint("SELECT * FROM stocks WHERE symbol = %s AND close > 100.5;") == \
+        "SELECT * FROM stocks WHERE symbol = ? AND close > ?"
+    assert fingerprint("SELECT 1 FROM t WHERE id IN (1, 2, 3)") == fingerprint("SELECT 1 FROM t WHERE id IN (7)")
+    assert fingerprint("INSERT INTO t (a, b) VALUES (1, 'it''s'), (2, 'x') -- note") == \
+        "INSERT INTO t (a, b) VALUES (...)"
+    # Digits inside identifiers are kept
+    assert fingerprint("SELECT ma_20 FROM t /* hint */ WHERE name = %(name)s") == \
+        "SELECT ma_20 FROM t WHERE name = ?"
+    assert statement_id("SELECT 1 FROM t WHERE id = 5") == statement_id("SELECT 1 FROM t WHERE id = %s")
+
+
+def test_histogram_and_counter_exposition():
+    histogram = Histogram('test_seconds', 'Test latency', ('route',), buckets=(0.1, 1.0))
+    histogram.observe(0.05, ('/a',))
+    histogram.observe(0.1, ('/a',))
+    histogram.observe(3.0, ('/a',))
+    counter = Counter('test_total', 'Test count', ('route',))
+    counter.inc(('/"quoted"',), 2)
+
+    lines = list(histogram.samples()) + list(counter.samples())
+    assert lines == [
+        'vnstock_test_seconds_bucket{route="/a",le="0.1"} 2',
+        'vnstock_test_seconds_bucket{route="/a",le="1"} 2',
+        'vnstock_test_seconds_bucket{route="/a",le="+Inf"} 3',
+        'vnstock_test_seconds_sum{route="/a"} 3.15',
+        'vnstock_test_seconds_count{route="/a"} 3',
+        'vnstock_test_total{route="/\\"quoted\\""} 2',
+    ]
+
+
+def test_track_query_records_rows_errors_and_slow_queries(monkeypatch, caplog):
+    monkeypatch.setitem(metrics.METRICS, 'slow_query_ms', 0.000001)
+    query = "SELECT * FROM test_track_query WHERE id = %s"
+    label = statement_id(query)
+
+    with caplog.at_level(logging.WARNING, logger='api.metrics'):
+        with track_query(query) as record:
+            record.rows = 7
+    assert 'Slow query' in caplog.text and 'test_track_query WHERE id = ?' in caplog.text
+
+    with pytest.raises(ZeroDivisionError):
+        with track_query(query):
+            1 / 0
+
+    text = metrics.render()
+    assert _sample(text, f'vnstock_db_query_duration_seconds_count{{query="{label}"}}') == 1
+    assert _sample(text, f'vnstock_db_query_rows_total{{query="{label}"}}') == 7
+    assert _sample(text, f'vnstock_db_query_errors_total{{query="{label}"}}') == 1
+    assert _sample(text, f'vnstock_db_slow_queries_total{{query="{label}"}}') == 1
+    assert f'vnstock_db_statement_info{{query="{label}",statement="SELECT * FROM test_track_query' in text
+
+
+def test_route_latency_and_pool_gauges():
+    app = Flask(__name__)
+    app.before_request(metrics.start_request)
+    app.after_request(metrics.finish_request)
+
+    @app.route('/test-metrics/<symbol>')
+    def route(symbol):
+        return symbol, 404 if symbol == 'MISSING' else 200
+
+    client = app.test_client()
+    client.get('/test-metrics/VNM')
+    client.get('/test-metrics/FPT')
+    client.get('/test-metrics/MISSING')
+    client.post('/test-metrics/FPT')
+
+    pool_stats = {'in_use': 1, 'idle': 3, 'max_connections': 20, 'waiting': 0, 'timeouts': 2,
+                  'created': 4, 'closed_broken': 0, 'closed_lifetime': 1, 'closed_idle': 0}
+    text = metrics.render(pool_stats)
+    route = 'route="/test-metrics/<symbol>"'
+    assert _sample(text, f'vnstock_http_request_duration_seconds_count{{{route},method="GET"}}') == 3
+    assert _sample(text, f'vnstock_http_requests_total{{{route},method="GET",status="404"}}') == 1
+    # Requests that match no route (here: wrong method) share one label
+    assert _sample(text, 'vnstock_http_requests_total{route="<unmatched>",method="POST",status="405"}') == 1
+    assert _sample(text, 'vnstock_db_pool_connections{state="in_use"}') == 1
+    assert _sample(text, 'vnstock_db_pool_timeouts_total') == 2
+    assert _sample(text, 'vnstock_db_pool_connections_closed_total{reason="lifetime"}') == 1
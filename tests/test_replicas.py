@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Tests for read-replica routing
+Run: python3 -m pytest tests/test_replicas.py
+"""
+
+import time
+
+import psycopg2
+import pytest
+from flask import Flask
+
+import api.extensions as ext
+from api.helpers import query_db, stream_query
+from api.replicas import Replica, ReplicaSet, pin_primary
+
+
+class FakeCursor:
+    def __init__(self, pool):
+        self.pool = pool
+        self.rowcount = 0
+        self.streamed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, args=None):
+        if self.pool.down:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.pool.queries.append(' '.join(query.split()))
+        self.rowcount = 1
+
+    def fetchone(self):
+        return self.pool.probe_row
+
+    def fetchall(self):
+        return [{'server': self.pool.name}]
+
+    def fetchmany(self, size):
+        # Named cursors only reach the server on the first fetch
+        if self.pool.fetch_down:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        if self.streamed:
+            return []
+        self.streamed = True
+        return [dict(row, server=self.pool.name) for row in self.pool.stream_rows]
+
+
+class FakeConnection:
+    closed = 0
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self, **kwargs):
+        return FakeCursor(self.pool)
+
+    def commit(self):
+        pass
+
+
+class FakePool:
+    """Just enough of api.pool.ConnectionPool to record where statements run"""
+
+    def __init__(self, name, lag=0.0):
+        self.name = name
+        self.down = False
+        self.probe_row = (True, lag)
+        self.queries = []
+        self.fetch_down = False
+        self.stream_rows = [{'n': 1}]
+        self.checked_out = 0
+
+    def getconn(self, timeout=None):
+        self.checked_out += 1
+        return FakeConnection(self)
+
+    def putconn(self, conn, close=False):
+        self.checked_out -= 1
+
+    def close_idle(self):
+        return 0
+
+    def closeall(self):
+        pass
+
+    def stats(self):
+        return {}
+
+
+def _replica_set(*lags, max_lag=0):
+    replicas = [Replica(f'replica{i}', FakePool(f'replica{i}', lag)) for i, lag in enumerate(lags)]
+    return ReplicaSet(replicas, max_lag=max_lag, check_interval=60)
+
+
+def _probed(*lags, max_lag=0):
+    replicas = _replica_set(*lags, max_lag=max_lag)
+    replicas.probe_all()
+    return replicas
+
+
+@pytest.fixture
+def routed(monkeypatch):
+    primary = FakePool('primary')
+    replicas = _probed(0.0, 0.0)
+    monkeypatch.setattr(ext, 'db_pool', primary)
+    monkeypatch.setattr(ext, 'replicas', replicas)
+    return primary, replicas
+
+
+def test_round_robin_over_healthy_replicas():
+    replicas = _replica_set(0.0, 0.0, 0.0)
+    replicas.replicas[1].pool.down = True
+    replicas.probe_all()
+
+    chosen = [replicas.choose().name for _ in range(4)]
+    assert chosen == ['replica0', 'replica2', 'replica0', 'replica2']
+    assert replicas.stats()['replicas'][1]['healthy'] is False
+
+
+def test_lag_guard_and_no_healthy_replica():
+    replicas = _probed(12.5, 0.5, max_lag=5)
+    assert replicas.choose().name == 'replica1'
+
+    stats = replicas.stats()['replicas'][0]
+    assert stats['healthy'] is False and stats['lag_seconds'] == 12.5
+    assert 'exceeds' in stats['error']
+
+    replicas.mark_failed(replicas.replicas[1], 'boom')
+    assert replicas.choose() is None
+    assert replicas.stats()['primary_fallbacks'] == 1
+
+
+def test_not_a_standby_is_never_used():
+    replicas = _replica_set(None)
+    replicas.replicas[0].pool.probe_row = (False, None)
+    replicas.probe_all()
+    assert replicas.choose() is None
+
+
+def test_reads_never_wait_for_a_probe():
+    replicas = _replica_set(0.0)
+    # Unprobed replicas are not used, and choosing one does not probe
+    assert replicas.choose() is None
+    assert replicas.replicas[0].pool.queries == []
+
+    replicas.start()
+    try:
+        for _ in range(200):
+            if replicas.replicas[0].healthy:
+                break
+            time.sleep(0.01)
+        assert replicas.choose().name == 'replica0'
+    finally:
+        replicas.closeall()
+    assert replicas._stopped.is_set()
+
+
+def test_reads_go_to_replicas_and_writes_to_primary(routed):
+    primary, replicas = routed
+    app = Flask(__name__)
+
+    with app.test_request_context('/'):
+        assert query_db("SELECT 1") == [{'server': 'replica0'}]
+        assert query_db("SELECT 1", primary=True) == [{'server': 'primary'}]
+        assert query_db("SELECT 1") == [{'server': 'replica1'}]
+
+        # After a write, the rest of the request reads from the primary
+        query_db("UPDATE stocks SET name = %s", ['x'])
+        assert query_db("SELECT 1") == [{'server': 'primary'}]
+
+    with app.test_request_context('/'):
+        assert query_db("SELECT 1") == [{'server': 'replica0'}]
+        pin_primary()
+        assert query_db("SELECT 1") == [{'server': 'primary'}]
+
+    assert primary.queries == ['SELECT 1', 'UPDATE stocks SET name = %s', 'SELECT 1', 'SELECT 1']
+
+
+def test_failed_replica_read_is_retried_on_primary(routed):
+    primary, replicas = routed
+    app = Flask(__name__)
+    replicas.replicas[1].pool.down = True
+
+    with app.test_request_context('/'):
+        assert query_db("SELECT 1", one=True) == primary.probe_row
+        assert query_db("SELECT 1", one=True) == replicas.replicas[0].pool.probe_row
+        assert query_db("SELECT 1", one=True) == replicas.replicas[0].pool.probe_row
+
+    stats = replicas.stats()['replicas'][1]
+    assert stats['healthy'] is False and stats['failures'] == 1
+
+
+def test_stream_fails_over_before_the_first_chunk(routed):
+    primary, replicas = routed
+    # The cursor is declared, but the replica dies on the first fetch
+    replicas.replicas[0].pool.fetch_down = True
+
+    with Flask(__name__).test_request_context('/'):
+        assert list(stream_query("SELECT n FROM t")) == [[{'n': 1, 'server': 'primary'}]]
+        assert list(stream_query("SELECT n FROM t")) == [[{'n': 1, 'server': 'replica1'}]]
+
+    assert replicas.stats()['replicas'][0]['healthy'] is False
+    assert [pool.checked_out for pool in (primary, *(r.pool for r in replicas.replicas))] == [0, 0, 0]
+
+
+def test_streamed_history_keeps_the_request_context(routed, monkeypatch):
+    import api.blueprints.stocks as stocks
+    import api.conditional as conditional
+    import api.helpers as helpers
+
+    primary, replicas = routed
+    primary.stream_rows = [{'date': '2024-01-02', 'open': 1.0, 'high': 1.0, 'low': 1.0, 'close': 1.0,
+                            'volume': 10, 'change': 0.0, 'change_percent': 0.0}]
+    monkeypatch.setattr(conditional, 'get_price_validators',
+                        lambda force=False: {'version': '1', 'last_date': None, 'modified': None})
+    monkeypatch.setattr(helpers, '_typed', lambda cursor: cursor)
+    app = Flask(__name__)
+    app.register_blueprint(stocks.stocks_bp)
+    # The request is pinned to the primary; the stream runs after the view returned
+    app.before_request(pin_primary)
+
+    body = app.test_client().get('/data/VNM_history.json').get_json()
+    assert [row['close'] for row in body] == [1.0]
+    assert len(primary.queries) == 1 and 'JOIN stock_prices' in primary.queries[0]
+    assert not any('stock_prices' in q for r in replicas.replicas for q in r.pool.queries)
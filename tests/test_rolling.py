@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tests for the rolling-window statistics
+Run: python3 -m pytest tests/test_rolling.py
+"""
+
+import math
+import random
+import statistics
+
+import numpy as np
+import pytest
+
+from src.rolling import (
+    RollingStats, rolling_argmax, rolling_argmin, rolling_max, rolling_mean,
+    rolling_min, rolling_std, rolling_sum, rolling_var,
+)
+
+
+def _random_walk(n, seed, start=50000.0):
+    rng = random.Random(seed)
+    values = [start]
+    for _ in range(n - 1):
+        values.append(values[-1] * (1 + rng.gauss(0, 0.02)))
+    return values
+
+
+def _brute_force(values, period, fn):
+    out = []
+    for t in range(len(values)):
+        window = values[t - period + 1:t + 1] if t >= period - 1 else []
+        out.append(fn(window) if window and not any(math.isnan(v) for v in window) else math.nan)
+    return np.array(out)
+
+
+@pytest.mark.parametrize('period', [1, 2, 5, 20])
+def test_sum_mean_match_brute_force(period):
+    values = _random_walk(120, seed=period)
+    np.testing.assert_allclose(rolling_sum(values, period), _brute_force(values, period, sum), rtol=1e-12)
+    np.testing.assert_allclose(rolling_mean(values, period),
+                               _brute_force(values, period, statistics.fmean), rtol=1e-12)
+
+
+@pytest.mark.parametrize('period', [2, 5, 20])
+def test_variance_matches_statistics(period):
+    values = _random_walk(300, seed=period)
+    expected = _brute_force(values, period, statistics.variance)
+    np.testing.assert_allclose(rolling_var(values, period), expected, rtol=1e-7)
+    np.testing.assert_allclose(rolling_std(values, period), np.sqrt(expected), rtol=1e-7)
+
+
+def test_variance_stable_on_large_offset():
+    # Tiny moves on a large price level: a naive sum-of-squares loses every digit
+    rng = random.Random(7)
+    values = [1e9 + rng.random() for _ in range(2000)]
+    expected = _brute_force(values, 20, statistics.variance)
+    np.testing.assert_allclose(rolling_var(values, 20), expected, rtol=1e-4)
+
+
+def test_matrix_rows_match_single_series():
+    long = _random_walk(80, seed=1)
+    short = _random_walk(50, seed=2)
+    matrix = np.full((2, 80), np.nan)
+    matrix[0] = long
+    matrix[1, 30:] = short
+
+    for fn in (rolling_sum, rolling_mean, rolling_var, rolling_std, rolling_max, rolling_min):
+        result = fn(matrix, 10)
+        np.testing.assert_allclose(result[0], fn(long, 10), rtol=1e-12)
+        np.testing.assert_allclose(result[1, 30:], fn(short, 10), rtol=1e-12)
+        assert np.isnan(result[1, :39]).all()
+
+
+def test_nan_restarts_window():
+    values = _random_walk(40, seed=3)
+    values[15] = math.nan
+    for fn, reference in ((rolling_var, statistics.variance), (rolling_max, max), (rolling_min, min)):
+        np.testing.assert_allclose(fn(values, 5), _brute_force(values, 5, reference), rtol=1e-9)
+
+
+@pytest.mark.parametrize('period', [1, 3, 7, 50])
+def test_max_min_match_brute_force(period):
+    values = _random_walk(103, seed=period)
+    np.testing.assert_array_equal(rolling_max(values, period), _brute_force(values, period, max))
+    np.testing.assert_array_equal(rolling_min(values, period), _brute_force(values, period, min))
+
+
+def test_short_series_is_all_nan():
+    for fn in (rolling_sum, rolling_var, rolling_max):
+        assert np.isnan(fn([1.0, 2.0], 5)).all()
+
+
+def test_arg_extremes_pick_leftmost():
+    values = [1, 3, 3, 2, 5, 5, 0]
+    assert rolling_argmax(values, 3) == [-1, -1, 1, 1, 4, 4, 4]
+    assert rolling_argmin(values, 3) == [-1, -1, 0, 3, 3, 3, 6]
+
+
+def test_streaming_matches_batch():
+    values = _random_walk(200, seed=11)
+    variance = rolling_var(values, 20)
+    highs, lows = rolling_max(values, 20), rolling_min(values, 20)
+
+    stats = RollingStats(20, extrema=True)
+    plain = RollingStats(20)
+    for t, x in enumerate(values):
+        assert plain.push(x) == (values[t - 20] if t >= 20 else None)
+        evicted = stats.push(x)
+        assert evicted == (values[t - 20] if t >= 20 else None)
+        if stats.full:
+            assert stats.variance() == variance[t]
+            assert stats.max == highs[t]
+            assert stats.min == lows[t]
+            assert stats.sum == pytest.approx(sum(values[t - 19:t + 1]), rel=1e-12)
+            assert plain.variance() == variance[t]
+
+    # Extrema are opt-in
+    with pytest.raises(ValueError):
+        plain.max
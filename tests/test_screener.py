@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory universe screener
+Run: python3 -m pytest tests/test_screener.py
+"""
+
+import random
+
+import pytest
+
+from src import indicators
+from src.screener import UniverseScreen
+
+
+def _universe(count=40, length=120, seed=3):
+    rng = random.Random(seed)
+    histories, metadata = {}, {}
+    for i in range(count):
+        symbol = f"S{i:02d}"
+        price = rng.uniform(10000, 80000)
+        drift = rng.uniform(-0.01, 0.01)
+        bars = []
+        for day in range(length - rng.randint(0, 30)):
+            price *= 1 + drift + rng.uniform(-0.02, 0.02)
+            bars.append({'date': f"d{day}", 'close': round(price), 'volume': rng.randint(1000, 9000)})
+        histories[symbol] = bars
+        metadata[symbol] = {
+            'name': symbol,
+            'exchange': 'HOSE' if i % 2 else 'HNX',
+            'sector': 'Banking' if i % 3 == 0 else 'Retail',
+        }
+    return histories, metadata
+
+
+def test_filters_match_per_symbol_indicators():
+    histories, metadata = _universe()
+    screen = UniverseScreen(histories, metadata)
+    spec = UniverseScreen.parse_filters({'rsi_lt': '45', 'exchange': 'hose', 'ema12_gt': 'ema26', 'limit': '500'})
+    found = {row['symbol'] for row in screen.screen(spec)['stocks']}
+
+    expected = set()
+    for symbol, bars in histories.items():
+        series = indicators.compute_all([b['close'] for b in bars])
+        if (metadata[symbol]['exchange'] == 'HOSE' and series['rsi'][-1] < 45
+                and series['ema12'][-1] > series['ema26'][-1]):
+            expected.add(symbol)
+    assert found == expected
+
+
+def test_sort_limit_and_presets():
+    histories, metadata = _universe()
+    screen = UniverseScreen(histories, metadata)
+
+    result = screen.screen(UniverseScreen.parse_filters({'sort': 'rsi', 'order': 'desc', 'limit': '5'}))
+    rsis = [row['rsi'] for row in result['stocks']]
+    assert len(rsis) == 5 and rsis == sorted(rsis, reverse=True)
+    assert result['total'] == result['universe'] == len(histories)
+
+    oversold = screen.screen(UniverseScreen.parse_filters({'signal': 'oversold', 'limit': '500'}))
+    assert all(row['rsi'] < 30 for row in oversold['stocks'])
+
+
+def test_invalid_filters_raise():
+    for params in ({'foo_lt': '1'}, {'rsi_lt': 'abc'}, {'signal': 'moon'}, {'sort': 'nope'}):
+        with pytest.raises(ValueError):
+            UniverseScreen.parse_filters(params)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory stock search index
+Run: python3 -m pytest tests/test_search_index.py
+"""
+
+from src.search_index import StockSearchIndex, fold
+
+
+def _index():
+    return StockSearchIndex([
+        {'symbol': 'VNM', 'name': 'Công ty Cổ phần Sữa Việt Nam', 'exchange': 'HOSE', 'sector': 'Food'},
+        {'symbol': 'VIC', 'name': 'Tập đoàn Vingroup', 'exchange': 'HOSE', 'sector': 'Real Estate'},
+        {'symbol': 'HPG', 'name': 'Tập đoàn Hòa Phát', 'exchange': 'HOSE', 'sector': 'Steel'},
+        {'symbol': 'SSI', 'name': 'Công ty Chứng khoán SSI', 'exchange': 'HOSE', 'sector': 'Finance'},
+        {'symbol': 'VN30F', 'name': 'Hợp đồng tương lai VN30', 'exchange': 'HNX', 'sector': None},
+        {'symbol': 'DHG', 'name': 'Dược Hậu Giang', 'exchange': 'HOSE', 'sector': 'Pharma'},
+    ], version='6:6:x')
+
+
+def _symbols(results):
+    return [row['symbol'] for row in results]
+
+
+def test_fold():
+    assert fold('Công ty Cổ phần Sữa Việt Nam') == 'cong ty co phan sua viet nam'
+    assert fold('Tập Đoàn  Hòa-Phát') == 'tap doan hoa phat'
+    assert fold(None) == ''
+
+
+def test_accent_insensitive_matching():
+    index = _index()
+    assert _symbols(index.search('sua')) == ['VNM']
+    assert _symbols(index.search('Sữa')) == ['VNM']
+    assert _symbols(index.search('hoa phat')) == ['HPG']
+    assert _symbols(index.search('duoc')) == ['DHG']
+    assert _symbols(index.search('tap doan')) == ['HPG', 'VIC']
+
+
+def test_symbol_ranking():
+    index = _index()
+    # Exact symbol first, then symbol prefixes, then name-word prefixes
+    assert _symbols(index.search('vn')) == ['VN30F', 'VNM']
+    assert _symbols(index.search('ssi')) == ['SSI']
+    assert _symbols(index.search('v')) == ['VIC', 'VN30F', 'VNM']
+    assert index.search('VNM')[0] == {'symbol': 'VNM', 'name': 'Công ty Cổ phần Sữa Việt Nam',
+                                      'exchange': 'HOSE', 'sector': 'Food'}
+
+
+def test_substring_matching():
+    index = _index()
+    assert _symbols(index.search('group')) == ['VIC']
+    assert _symbols(index.search('khoan ss')) == ['SSI']
+    assert _symbols(index.search('ng')) == ['DHG', 'SSI', 'VIC', 'VN30F', 'VNM']
+
+
+def test_limits_and_misses():
+    index = _index()
+    assert len(index.search('cong', limit=1)) == 1
+    assert index.search('xyz') == []
+    assert index.search('   ') == []
+    assert index.search('v', limit=0) == []
+    assert len(StockSearchIndex([]).search('a')) == 0
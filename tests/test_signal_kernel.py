@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for the single-pass signal kernel
+Run: python3 -m pytest tests/test_signal_kernel.py
+"""
+
+import math
+import random
+
+import pytest
+
+from src import indicators
+from src.signal_kernel import SignalKernel
+from src.technical_analysis import TechnicalAnalyzer
+
+
+def _series(length, seed=11):
+    rng = random.Random(seed)
+    price = 25000.0
+    closes, volumes = [], []
+    for _ in range(length):
+        price = round(price * (1 + rng.uniform(-0.03, 0.03)))
+        closes.append(float(price))
+        volumes.append(float(rng.randint(1000, 9000)))
+    return closes, volumes
+
+
+@pytest.mark.parametrize('length', [2, 15, 30, 34, 60, 120, 260])
+def test_values_match_engine_exactly(length):
+    closes, volumes = _series(length)
+    values = SignalKernel().run(closes, volumes)['values']
+    series = indicators.compute_all(closes, volumes)
+
+    for key in ['rsi', 'ma20', 'ma50', 'ema12', 'ema26', 'macd', 'macd_signal', 'macd_histogram',
+                'bollinger_upper', 'bollinger_middle', 'bollinger_lower', 'volume_ma20']:
+        expected = float(series[key][-1])
+        if math.isnan(expected):
+            assert math.isnan(values[key]), key
+        else:
+            assert values[key] == expected, key
+
+
+def test_single_pass_matches_separate_analyses():
+    closes, volumes = _series(150)
+    combined = TechnicalAnalyzer.analyze(closes, volumes, price_action_bars=60)
+    price_action = combined.pop('price_action')
+
+    assert combined == TechnicalAnalyzer.analyze_series(closes, volumes)
+    bars = [{'close': c, 'volume': v} for c, v in zip(closes, volumes)][-60:]
+    assert price_action == TechnicalAnalyzer.analyze_price_action(bars)
+
+
+def test_config_overrides_thresholds():
+    closes, volumes = _series(80)
+    rsi = SignalKernel().run(closes, volumes)['values']['rsi']
+
+    strict = SignalKernel({'rsi_oversold': rsi + 1}).run(closes, volumes)
+    assert strict['flags']['rsi_oversold']
+
+    with pytest.raises(ValueError):
+        SignalKernel({'rsi_perod': 10})
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for the prepared-statement registry
+Run: python3 -m pytest tests/test_statements.py
+"""
+
+import pytest
+from psycopg2 import errors
+
+from api import statements
+from api.statements import Statement, statement
+from config import DATABASE_POOL
+
+
+class FakeConnection:
+    """Server-side prepared statements of one session"""
+
+    def __init__(self):
+        self.server = set()
+        self.executed = []
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, args=None):
+        conn = self.connection
+        conn.executed.append(query.split('(')[0] if query.startswith('EXECUTE') else query.split(' AS ')[0])
+        if query.startswith('PREPARE '):
+            name = query.split()[1]
+            if name in conn.server:
+                raise errors.DuplicatePreparedStatement()
+            conn.server.add(name)
+        elif query.startswith('EXECUTE '):
+            if query.split()[1].split('(')[0] not in conn.server:
+                raise errors.InvalidSqlStatementName()
+        elif query == 'DEALLOCATE ALL':
+            conn.server.clear()
+
+
+def test_statement_placeholders_become_positional():
+    stmt = Statement('test_window', "SELECT * FROM t WHERE a = %s AND (%s IS NULL OR b <= %s);")
+    assert stmt.param_count == 3
+    assert stmt.prepare_sql == "PREPARE test_window AS SELECT * FROM t WHERE a = $1 AND ($2 IS NULL OR b <= $3)"
+    assert stmt.execute_sql == "EXECUTE test_window(%s, %s, %s)"
+    assert Statement('test_all', "SELECT 1").execute_sql == "EXECUTE test_all"
+
+
+def test_registry_validation():
+    first = statement('test_registry', "SELECT 1 WHERE 1 = %s")
+    assert statement('test_registry', "SELECT 1 WHERE 1 = %s") is first
+    with pytest.raises(ValueError):
+        statement('test_registry', "SELECT 2 WHERE 1 = %s")
+    with pytest.raises(ValueError):
+        statement('Bad-Name', "SELECT 1")
+    with pytest.raises(ValueError):
+        statement('test_named', "SELECT %(symbol)s")
+    with pytest.raises(ValueError):
+        statement('test_like', "SELECT 1 FROM t WHERE name LIKE 'V%'")
+
+
+def test_prepared_once_per_connection():
+    stmt = statement('test_once', "SELECT * FROM t WHERE id = %s")
+    conn, other = FakeConnection(), FakeConnection()
+
+    assert statements.execute(FakeCursor(conn), stmt, (1,)) is True
+    assert statements.execute(FakeCursor(conn), stmt, (2,)) is False
+    assert statements.execute(FakeCursor(other), stmt, (3,)) is True
+
+    assert conn.executed == ['PREPARE test_once', 'EXECUTE test_once', 'EXECUTE test_once']
+    assert statements.prepared_on(conn) == {'test_once'}
+
+
+def test_lost_statements_are_prepared_again():
+    stmt = statement('test_lost', "SELECT * FROM t WHERE id = %s")
+    conn = FakeConnection()
+    statements.execute(FakeCursor(conn), stmt, (1,))
+
+    # e.g. DISCARD ALL by a proxy, or a server-side reset
+    conn.server.clear()
+    conn.executed.clear()
+    assert statements.execute(FakeCursor(conn), stmt, (2,)) is True
+    assert conn.executed == ['EXECUTE test_lost', 'DEALLOCATE ALL', 'PREPARE test_lost', 'EXECUTE test_lost']
+    assert conn.rollbacks == 1
+
+    # Already on the server but not recorded (e.g. prepared outside the registry)
+    fresh = FakeConnection()
+    fresh.server.add('test_lost')
+    assert statements.execute(FakeCursor(fresh), stmt, (3,)) is True
+    assert fresh.executed[-1] == 'EXECUTE test_lost'
+
+
+def test_disabled_runs_plain_sql(monkeypatch):
+    monkeypatch.setitem(DATABASE_POOL, 'prepared_statements', False)
+    stmt = statement('test_disabled', "SELECT * FROM t WHERE id = %s")
+    conn = FakeConnection()
+
+    assert statements.execute(FakeCursor(conn), stmt, (1,)) is False
+    assert conn.executed == ["SELECT * FROM t WHERE id = %s"]
+    assert statements.prepared_on(conn) == set()
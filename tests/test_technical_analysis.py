@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorized indicator engine and TechnicalAnalyzer
+Run: python3 -m pytest tests/test_technical_analysis.py
+"""
+
+import math
+import random
+import statistics
+
+import numpy as np
+
+from src import indicators
+from src.technical_analysis import TechnicalAnalyzer
+
+
+def _random_walk(length, seed, start=50000.0):
+    rng = random.Random(seed)
+    prices = [start]
+    for _ in range(length - 1):
+        prices.append(round(prices[-1] * (1 + rng.uniform(-0.03, 0.03)), 0))
+    return prices
+
+
+def _reference_ema(prices, period):
+    ema = sum(prices[:period]) / period
+    for price in prices[period:]:
+        ema = (price - ema) * (2 / (period + 1)) + ema
+    return ema
+
+
+def _reference_wilder_rsi(prices, period=14):
+    gains = [max(prices[i] - prices[i - 1], 0) for i in range(1, len(prices))]
+    losses = [max(prices[i - 1] - prices[i], 0) for i in range(1, len(prices))]
+    avg_gain = sum(gains[:period]) / period
+    avg_loss = sum(losses[:period]) / period
+    for gain, loss in zip(gains[period:], losses[period:]):
+        avg_gain = (avg_gain * (period - 1) + gain) / period
+        avg_loss = (avg_loss * (period - 1) + loss) / period
+    return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+def test_series_match_reference_implementations():
+    prices = _random_walk(120, seed=1)
+
+    assert math.isclose(indicators.ema(prices, 12)[-1], _reference_ema(prices, 12), rel_tol=1e-9)
+    assert math.isclose(indicators.rsi(prices)[-1], _reference_wilder_rsi(prices), rel_tol=1e-9)
+    assert math.isclose(indicators.rolling_mean(prices, 20)[-1], sum(prices[-20:]) / 20, rel_tol=1e-12)
+    assert math.isclose(indicators.rolling_std(prices, 20)[-1], statistics.stdev(prices[-20:]), rel_tol=1e-9)
+
+
+def test_macd_signal_is_ema_of_macd_line():
+    prices = _random_walk(80, seed=2)
+    series = indicators.macd(prices)
+
+    line = [_reference_ema(prices[:i + 1], 12) - _reference_ema(prices[:i + 1], 26)
+            for i in range(25, len(prices))]
+    assert math.isclose(series['macd'][-1], line[-1], rel_tol=1e-9)
+    assert math.isclose(series['signal'][-1], _reference_ema(line, 9), rel_tol=1e-9)
+    assert np.isnan(series['signal'][25 + 7])
+
+
+def test_matrix_rows_match_single_series():
+    short = _random_walk(40, seed=3)
+    long = _random_walk(90, seed=4)
+    matrix = np.full((2, 90), np.nan)
+    matrix[0, 50:] = short
+    matrix[1, :] = long
+
+    for name in ('rsi', 'ema12', 'macd_signal', 'bollinger_upper'):
+        batch = indicators.compute_all(matrix)[name]
+        np.testing.assert_allclose(batch[0, 50:], indicators.compute_all(short)[name], equal_nan=True)
+        np.testing.assert_allclose(batch[1], indicators.compute_all(long)[name], equal_nan=True)
+
+
+def _random_ohlcv(length, seed):
+    rng = random.Random(seed)
+    closes = _random_walk(length, seed)
+    highs = [c * (1 + rng.uniform(0, 0.02)) for c in closes]
+    lows = [c * (1 - rng.uniform(0, 0.02)) for c in closes]
+    volumes = [float(rng.randint(0, 50000) * 100) for _ in closes]
+    return highs, lows, closes, volumes
+
+
+def test_ohlcv_indicators_match_reference_implementations():
+    highs, lows, closes, volumes = _random_ohlcv(90, seed=6)
+    n = len(closes)
+
+    ks = [(closes[i] - min(lows[i - 13:i + 1])) / (max(highs[i - 13:i + 1]) - min(lows[i - 13:i + 1])) * 100
+          for i in range(13, n)]
+    oscillator = indicators.stochastic(highs, lows, closes)
+    assert math.isclose(oscillator['k'][-1], ks[-1], rel_tol=1e-9)
+    assert math.isclose(oscillator['d'][-1], sum(ks[-3:]) / 3, rel_tol=1e-9)
+    assert np.isnan(oscillator['k'][12]) and np.isnan(oscillator['d'][14])
+
+    true_ranges = [highs[0] - lows[0]] + [
+        max(highs[i] - lows[i], abs(highs[i] - closes[i - 1]), abs(lows[i] - closes[i - 1]))
+        for i in range(1, n)
+    ]
+    average = sum(true_ranges[:14]) / 14
+    for tr in true_ranges[14:]:
+        average = (average * 13 + tr) / 14
+    assert math.isclose(indicators.atr(highs, lows, closes)[-1], average, rel_tol=1e-9)
+
+    balance = 0.0
+    for i in range(1, n):
+        balance += volumes[i] if closes[i] > closes[i - 1] else -volumes[i] if closes[i] < closes[i - 1] else 0
+    assert indicators.obv(closes, volumes)[-1] == balance
+
+    typical = [(h + l + c) / 3 for h, l, c in zip(highs, lows, closes)]
+    positive = sum(typical[i] * volumes[i] for i in range(n - 14, n) if typical[i] > typical[i - 1])
+    negative = sum(typical[i] * volumes[i] for i in range(n - 14, n) if typical[i] < typical[i - 1])
+    expected = 100 - 100 / (1 + positive / negative)
+    assert math.isclose(indicators.mfi(highs, lows, closes, volumes)[-1], expected, rel_tol=1e-9)
+
+
+def test_ohlcv_matrix_rows_match_single_series():
+    histories = {}
+    for symbol, (length, seed) in {'AAA': (40, 7), 'BBB': (90, 8)}.items():
+        highs, lows, closes, volumes = _random_ohlcv(length, seed)
+        histories[symbol] = [{'high': h, 'low': l, 'close': c, 'volume': v}
+                             for h, l, c, v in zip(highs, lows, closes, volumes)]
+
+    symbols, columns = indicators.build_ohlcv_matrix(histories)
+    batch = indicators.compute_all(columns['close'], columns['volume'], highs=columns['high'], lows=columns['low'])
+    for row, symbol in enumerate(symbols):
+        bars = histories[symbol]
+        single = indicators.compute_all([b['close'] for b in bars], [b['volume'] for b in bars],
+                                        highs=[b['high'] for b in bars], lows=[b['low'] for b in bars])
+        for key in indicators.OHLCV_TABLE_COLUMNS.values():
+            np.testing.assert_allclose(batch[key][row, -len(bars):], single[key], rtol=1e-9, equal_nan=True)
+            assert np.isnan(batch[key][row, :-len(bars)]).all()
+
+
+def test_flat_range_stochastic_and_mfi_are_neutral():
+    flat = [100.0] * 30
+    assert indicators.stochastic(flat, flat, flat)['k'][-1] == 50.0
+    assert indicators.mfi(flat, flat, flat, [1000.0] * 30)[-1] == 50.0
+
+
+def test_score_universe_matches_analyze_stock():
+    histories = {f"S{i:02d}": _random_walk(30 + 5 * i, seed=10 + i) for i in range(12)}
+    symbols = sorted(histories)
+    length = max(len(p) for p in histories.values())
+    closes = np.full((len(symbols), length), np.nan)
+    for row, symbol in enumerate(symbols):
+        closes[row, length - len(histories[symbol]):] = histories[symbol]
+
+    scored = TechnicalAnalyzer.score_universe(closes)
+    for row, symbol in enumerate(symbols):
+        bars = [{'close': price} for price in reversed(histories[symbol])]
+        analysis = TechnicalAnalyzer.analyze_stock(bars)
+        assert analysis['score'] == scored['score'][row]
+        assert analysis['recommendation'] == scored['recommendation'][row]
+
+
+def test_analyze_stock_shape():
+    bars = [{'close': price, 'nmVolume': 1000} for price in reversed(_random_walk(60, seed=5))]
+    analysis = TechnicalAnalyzer.analyze_stock(bars)
+
+    assert set(analysis['indicators']) == {'rsi', 'ma20', 'ma50', 'ema12', 'ema26', 'macd', 'bollinger'}
+    macd = analysis['indicators']['macd']
+    assert abs(macd['histogram'] - (macd['macd'] - macd['signal'])) <= 0.011
+    assert TechnicalAnalyzer.analyze_stock([]) == {'error': 'Insufficient data'}
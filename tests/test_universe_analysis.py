@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for the parallel universe analysis runner
+Run: python3 -m pytest tests/test_universe_analysis.py
+"""
+
+import random
+
+import pytest
+
+from src import universe_analysis
+from src.technical_analysis import TechnicalAnalyzer
+from src.universe_analysis import analyze_universe
+
+
+def _histories(count=12, seed=5):
+    rng = random.Random(seed)
+    histories = {}
+    for i in range(count):
+        price = rng.uniform(5000, 90000)
+        bars = []
+        for _ in range(rng.randint(30, 90)):
+            price *= 1 + rng.uniform(-0.03, 0.03)
+            bars.append({'close': round(price), 'volume': rng.randint(1000, 9000)})
+        histories[f"S{i:02d}"] = bars
+    return histories
+
+
+@pytest.fixture
+def always_parallel(monkeypatch):
+    monkeypatch.setattr(universe_analysis, 'MIN_PARALLEL_SYMBOLS', 0)
+
+
+def test_parallel_matches_serial(always_parallel):
+    histories = _histories()
+    assert analyze_universe(histories, workers=2) == analyze_universe(histories, workers=1)
+
+
+def test_rows_match_per_symbol_analysis(always_parallel):
+    histories = _histories()
+    rows = {row['symbol']: row for row in analyze_universe(histories, workers=2)}
+    assert len(rows) == len(histories)
+
+    for symbol, bars in histories.items():
+        analysis = TechnicalAnalyzer.analyze_series([b['close'] for b in bars], [b['volume'] for b in bars])
+        price_action = TechnicalAnalyzer.analyze_price_action(bars[-60:])
+        assert rows[symbol]['score'] == analysis['score']
+        assert rows[symbol]['rsi'] == analysis['indicators']['rsi']
+        assert rows[symbol]['price_action_score'] == price_action['score']
+
+
+def test_small_universe_skips_the_pool(monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError('small universes must be analyzed inline')
+
+    monkeypatch.setattr(universe_analysis, 'ProcessPoolExecutor', no_pool)
+    histories = _histories()
+    assert len(analyze_universe(histories, workers=4)) == len(histories)
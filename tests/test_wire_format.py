@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for the columnar and binary wire formats
+Run: python3 -m pytest tests/test_wire_format.py
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from src import wire_format
+
+
+def _rows():
+    return [
+        {'date': date(2024, 5, 2), 'open': Decimal('70000.00'), 'close': Decimal('70500.00'),
+         'volume': 1200000, 'change_percent': Decimal('0.7100')},
+        {'date': date(2024, 5, 3), 'open': Decimal('70500.00'), 'close': Decimal('70100.00'),
+         'volume': None, 'change_percent': None},
+    ]
+
+
+def test_columns_from_rows():
+    columns = wire_format.columns_from_rows(_rows(), ('date', 'price', 'volume', 'change_percent'),
+                                            aliases={'price': 'close'})
+    assert columns == {
+        'date': [19845, 19846],
+        'price': [70500.0, 70100.0],
+        'volume': [1200000, None],
+        'change_percent': [0.71, None],
+    }
+    assert wire_format.epoch_day(date(1970, 1, 1)) == 0
+
+
+def test_json_columns_from_arrays():
+    columns = wire_format.to_json_columns({
+        'close': np.array([1.5, np.nan]),
+        'volume': np.array([100.0, np.nan]),
+        'symbol': ['VNM', 'FPT'],
+    })
+    assert columns == {'close': [1.5, None], 'volume': [100, None], 'symbol': ['VNM', 'FPT']}
+    assert isinstance(columns['volume'][0], int)
+
+
+def test_binary_round_trip():
+    columns = wire_format.columns_from_rows(_rows(), ('date', 'open', 'close', 'volume', 'change_percent'))
+    columns['symbol'] = ['VNM', 'Sữa']
+    payload = wire_format.encode_binary(columns, {'symbol': 'VNM'})
+
+    decoded = wire_format.decode_binary(payload)
+    assert decoded['meta'] == {'symbol': 'VNM'}
+    result = decoded['columns']
+    assert list(result) == ['date', 'open', 'close', 'volume', 'change_percent', 'symbol']
+    assert result['date'].dtype == np.dtype('<i4') and result['date'].tolist() == [19845, 19846]
+    assert result['close'].tolist() == [70500.0, 70100.0]
+    assert result['volume'].tolist() == [1200000, wire_format.INT_NULL['q']]
+    assert result['change_percent'][0] == 0.71 and np.isnan(result['change_percent'][1])
+    assert result['symbol'] == ['VNM', 'Sữa']
+
+
+def test_binary_numeric_columns_are_aligned():
+    payload = wire_format.encode_binary({'symbol': ['A'], 'close': [1.0], 'volume': np.array([np.nan])})
+    close_offset = payload.index(np.array([1.0], dtype='<f8').tobytes())
+    assert close_offset % 8 == 0
+    assert wire_format.decode_binary(payload)['columns']['volume'].tolist() == [wire_format.INT_NULL['q']]
+
+
+def test_binary_empty_and_invalid():
+    decoded = wire_format.decode_binary(wire_format.encode_binary({'symbol': [], 'close': []}))
+    assert decoded['columns']['symbol'] == [] and len(decoded['columns']['close']) == 0
+
+    with pytest.raises(ValueError):
+        wire_format.encode_binary({'open': [1.0], 'close': []})
+    with pytest.raises(ValueError):
+        wire_format.decode_binary(b'JUNKJUNKJUNKJUNK')